@@ -0,0 +1,81 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+
+"""Compares the convergence of intrinsic value with the number of inventory grid points for the uniform and adaptive
+grids, over one year daily storages with piecewise linear (ratchet) and constant inject/withdraw rates. Errors are
+relative to a uniform grid with 4000 points. The adaptive grid uses more points than num_inventory_grid_points, so
+the mean number of points per period is shown, along with the time taken.
+Run from the src/Cmdty.Storage.Python directory: python -m benchmarks.bench_adaptive_grid"""
+
+import timeit
+from datetime import date
+import cmdty_storage as cs
+from cmdty_storage import numpy_storage as nps
+from benchmarks import bench_intrinsic_engines
+
+
+def _create_ratchet_valuation_inputs(num_inventory_grid_points):
+    valuation_inputs = bench_intrinsic_engines._create_valuation_inputs(num_inventory_grid_points)
+    storage_start = date(2020, 4, 1)
+    constraints = [(storage_start, [(0.0, -1400.0, 900.0), (20000.0, -1500.0, 800.0), (50000.0, -1750.0, 650.0),
+                                    (70000.0, -2000.0, 500.0), (100000.0, -2200.0, 300.0)])]
+    valuation_inputs['cmdty_storage'] = cs.CmdtyStorage('D', storage_start, date(2021, 4, 1), injection_cost=0.01,
+                                                        withdrawal_cost=0.02, constraints=constraints,
+                                                        cmdty_consumed_inject=0.001, inventory_loss=0.00001)
+    return valuation_inputs
+
+
+def _mean_num_grid_points(valuation_inputs, grid):
+    storage_arrays = valuation_inputs['cmdty_storage'].storage_arrays
+    num_inventory_grid_points = valuation_inputs['num_inventory_grid_points']
+    inventory_space = storage_arrays.inventory_space(valuation_inputs['inventory'], 0)
+    if grid == 'adaptive':
+        grid_calc = nps.adaptive_grid_calc(storage_arrays, num_inventory_grid_points)
+    else:
+        spacing = (storage_arrays.max_inventory.max() - storage_arrays.max_inventory.min()) / (num_inventory_grid_points - 1)
+        grid_calc = lambda lower, upper: nps.fixed_spacing_grid(lower, upper, spacing)
+    num_points = [len(grid_calc(lower, upper)) for lower, upper in zip(inventory_space.lower, inventory_space.upper)]
+    return sum(num_points) / len(num_points)
+
+
+def main(number=3, engine='dotnet'):
+    for storage_name, create_valuation_inputs in [('ratchets', _create_ratchet_valuation_inputs),
+                                                  ('constant rates', bench_intrinsic_engines._create_valuation_inputs)]:
+        reference_npv = cs.intrinsic_value(**create_valuation_inputs(4000), engine=engine).npv
+        print('{} storage, reference NPV {:.2f}'.format(storage_name, reference_npv))
+        for num_inventory_grid_points in [20, 40, 80, 160, 320]:
+            valuation_inputs = create_valuation_inputs(num_inventory_grid_points)
+            for grid in ['uniform', 'adaptive']:
+                npv = cs.intrinsic_value(**valuation_inputs, engine=engine, grid=grid).npv
+                time_taken = timeit.timeit(lambda: cs.intrinsic_value(**valuation_inputs, engine=engine, grid=grid),
+                                           number=number) / number
+                print('grid points={:>4}  {:<8}  mean points per period: {:7.1f}  error: {:10.2f}  time: {:8.4f}s'
+                      .format(num_inventory_grid_points, grid, _mean_num_grid_points(valuation_inputs, grid),
+                              npv - reference_npv, time_taken))
+
+
+if __name__ == '__main__':
+    main()
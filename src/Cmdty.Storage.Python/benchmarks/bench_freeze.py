@@ -0,0 +1,56 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Compares .NET engine valuation of storage with valuation of the same storage frozen by CmdtyStorage.freeze, for the
+intrinsic and trinomial tree models over a one year daily storage. The inventory space cache is cleared before each
+valuation so timings only differ in evaluation of the storage constraints and costs.
+Run from the src/Cmdty.Storage.Python directory: python -m benchmarks.bench_freeze"""
+
+import timeit
+import cmdty_storage as cs
+from benchmarks import bench_intrinsic_engines, bench_trinomial_engines
+
+
+def _time_valuation(valuation_func, valuation_inputs, number):
+    def value():
+        valuation_inputs['cmdty_storage'].clear_inventory_space_cache()
+        valuation_func(**valuation_inputs, engine='dotnet')
+    return timeit.timeit(value, number=number) / number
+
+
+def main(number=3, num_inventory_grid_points=100):
+    for model, valuation_func, create_valuation_inputs in \
+            [('intrinsic', cs.intrinsic_value, bench_intrinsic_engines._create_valuation_inputs),
+             ('trinomial', cs.trinomial_value, bench_trinomial_engines._create_valuation_inputs)]:
+        valuation_inputs = create_valuation_inputs(num_inventory_grid_points)
+        storage_time = _time_valuation(valuation_func, valuation_inputs, number)
+        frozen_inputs = dict(valuation_inputs, cmdty_storage=valuation_inputs['cmdty_storage'].freeze())
+        frozen_time = _time_valuation(valuation_func, frozen_inputs, number)
+        print('{:<10} storage: {:8.4f}s  frozen storage: {:8.4f}s  speedup: {:5.2f}x'
+              .format(model, storage_time, frozen_time, storage_time / frozen_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Measures, in fresh Python processes, the time to import cmdty_storage and separately the latency of the first
+valuation, which includes starting the CLR and loading the assemblies, compared to a second valuation.
+Run from the src/Cmdty.Storage.Python directory: python -m benchmarks.bench_import_time [num_processes]"""
+
+import sys
+import json
+import statistics
+import subprocess
+
+_TIMING_SCRIPT = '''
+import json
+import time
+start = time.perf_counter()
+import cmdty_storage as cs
+import_time = time.perf_counter() - start
+
+from benchmarks.bench_intrinsic_engines import _create_valuation_inputs
+valuation_inputs = _create_valuation_inputs(100)
+start = time.perf_counter()
+cs.intrinsic_value(**valuation_inputs)
+first_valuation_time = time.perf_counter() - start
+start = time.perf_counter()
+cs.intrinsic_value(**valuation_inputs)
+second_valuation_time = time.perf_counter() - start
+print(json.dumps([import_time, first_valuation_time, second_valuation_time]))
+'''
+
+
+def main(num_processes=5):
+    timings = [json.loads(subprocess.run([sys.executable, '-c', _TIMING_SCRIPT], check=True,
+                                         stdout=subprocess.PIPE, universal_newlines=True).stdout.splitlines()[-1])
+               for _ in range(num_processes)]
+    for name, times in zip(['import cmdty_storage', 'first valuation', 'second valuation'], zip(*timings)):
+        print('{:<22} median: {:8.4f}s  min: {:8.4f}s  max: {:8.4f}s'
+              .format(name, statistics.median(times), min(times), max(times)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
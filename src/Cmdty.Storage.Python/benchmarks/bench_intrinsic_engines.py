@@ -0,0 +1,61 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Compares the .NET and NumPy intrinsic valuation engines over a one year daily storage for increasing grid sizes.
+Run from the src/Cmdty.Storage.Python directory: python -m benchmarks.bench_intrinsic_engines"""
+
+import timeit
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+import cmdty_storage as cs
+
+
+def _create_valuation_inputs(num_inventory_grid_points):
+    storage_start = date(2020, 4, 1)
+    storage_end = date(2021, 4, 1)
+    cmdty_storage = cs.CmdtyStorage('D', storage_start, storage_end, injection_cost=0.01, withdrawal_cost=0.02,
+                                    min_inventory=0.0, max_inventory=100000.0, max_injection_rate=650.0,
+                                    max_withdrawal_rate=1400.0, cmdty_consumed_inject=0.001, inventory_loss=0.00001)
+    forward_index = pd.period_range(start=storage_start, end=storage_end, freq='D')
+    day_nums = np.arange(len(forward_index))
+    forward_curve = pd.Series(18.0 + 4.0 * np.cos(2.0 * np.pi * day_nums / 365.0), index=forward_index)
+    interest_rates = pd.Series(0.02, index=pd.period_range(start=storage_start, end=storage_end + timedelta(days=60), freq='D'))
+    return dict(cmdty_storage=cmdty_storage, val_date=storage_start, inventory=0.0, forward_curve=forward_curve,
+                interest_rates=interest_rates, settlement_rule=lambda period: period.asfreq('M').asfreq('D', 'end') + 20,
+                num_inventory_grid_points=num_inventory_grid_points, numerical_tolerance=1E-9)
+
+
+def main(number=3):
+    for num_inventory_grid_points in [100, 500, 1000]:
+        valuation_inputs = _create_valuation_inputs(num_inventory_grid_points)
+        dotnet_time = timeit.timeit(lambda: cs.intrinsic_value(**valuation_inputs, engine='dotnet'), number=number) / number
+        numpy_time = timeit.timeit(lambda: cs.intrinsic_value(**valuation_inputs, engine='numpy'), number=number) / number
+
+        print('grid points={:>5}  dotnet: {:8.4f}s  numpy: {:8.4f}s  speedup: {:7.1f}x'
+              .format(num_inventory_grid_points, dotnet_time, numpy_time, dotnet_time / numpy_time))
+
+
+if __name__ == '__main__':
+    main()
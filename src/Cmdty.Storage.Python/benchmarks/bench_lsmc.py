@@ -0,0 +1,69 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Times LSMC valuation of a one year daily storage with two factors, and measures peak memory allocated, for
+increasing numbers of paths simulated in batches of fixed size. Peak memory grows with the number of paths only by
+the factor values held per path, not by the paths' inventory grid values.
+Run from the src/Cmdty.Storage.Python directory: python -m benchmarks.bench_lsmc"""
+
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+import cmdty_storage as cs
+
+
+def _create_valuation_inputs(num_paths, batch_size, num_threads):
+    storage_start = date(2020, 4, 1)
+    storage_end = date(2021, 4, 1)
+    cmdty_storage = cs.CmdtyStorage('D', storage_start, storage_end, injection_cost=0.01, withdrawal_cost=0.02,
+                                    min_inventory=0.0, max_inventory=100000.0, max_injection_rate=650.0,
+                                    max_withdrawal_rate=1400.0, cmdty_consumed_inject=0.001, inventory_loss=0.00001)
+    forward_index = pd.period_range(start=storage_start, end=storage_end, freq='D')
+    day_nums = np.arange(len(forward_index))
+    forward_curve = pd.Series(18.0 + 4.0 * np.cos(2.0 * np.pi * day_nums / 365.0), index=forward_index)
+    interest_rates = pd.Series(0.02, index=pd.period_range(start=storage_start, end=storage_end + timedelta(days=60), freq='D'))
+    return dict(cmdty_storage=cmdty_storage, val_date=storage_start, inventory=0.0, forward_curve=forward_curve,
+                interest_rates=interest_rates, settlement_rule=lambda period: period.asfreq('M').asfreq('D', 'end') + 20,
+                factors=[(20.0, 1.1), (0.0, 0.15)], factor_corrs=0.2, num_paths=num_paths, batch_size=batch_size,
+                seed=11, num_threads=num_threads, num_inventory_grid_points=50, numerical_tolerance=1E-9)
+
+
+def main(batch_size=1000, num_threads=1):
+    for num_paths in [1000, 4000, 16000]:
+        valuation_inputs = _create_valuation_inputs(num_paths, batch_size, num_threads)
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        results = cs.lsmc_value(**valuation_inputs)
+        elapsed = time.perf_counter() - start_time
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('paths={:>6}  npv: {:12.1f}  std error: {:8.1f}  time: {:8.2f}s  peak memory: {:7.1f}MB'
+              .format(num_paths, results.npv, results.standard_error, elapsed, peak_memory / 1E6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Compares rolling intrinsic valuation with re-optimising from scratch, by calling intrinsic_value with the NumPy engine
+on each snapshot, over a one year daily storage for increasing numbers of forward curve snapshots.
+Run from the src/Cmdty.Storage.Python directory: python -m benchmarks.bench_rolling_intrinsic"""
+
+import timeit
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+import cmdty_storage as cs
+
+
+def _create_valuation_inputs(snapshot_spacing_days):
+    storage_start = date(2020, 4, 1)
+    storage_end = date(2021, 4, 1)
+    cmdty_storage = cs.CmdtyStorage('D', storage_start, storage_end, injection_cost=0.01, withdrawal_cost=0.02,
+                                    min_inventory=0.0, max_inventory=100000.0, max_injection_rate=650.0,
+                                    max_withdrawal_rate=1400.0, cmdty_consumed_inject=0.001, inventory_loss=0.00001)
+    forward_index = pd.period_range(start=storage_start, end=storage_end, freq='D')
+    day_nums = np.arange(len(forward_index))
+    snapshot_dates = pd.period_range(start=storage_start, end=storage_end - timedelta(days=1),
+                                     freq='D')[::snapshot_spacing_days]
+    snapshot_shifts = np.sin(np.arange(len(snapshot_dates)))
+    curve_snapshots = pd.DataFrame({snapshot_date: 18.0 + shift + 4.0 * np.cos(2.0 * np.pi * day_nums / 365.0)
+                                    for snapshot_date, shift in zip(snapshot_dates, snapshot_shifts)}, index=forward_index)
+    interest_rates = pd.Series(0.02, index=pd.period_range(start=storage_start, end=storage_end + timedelta(days=60), freq='D'))
+    return dict(cmdty_storage=cmdty_storage, curve_snapshots=curve_snapshots, inventory=0.0,
+                interest_rates=interest_rates, settlement_rule=lambda period: period.asfreq('M').asfreq('D', 'end') + 20,
+                num_inventory_grid_points=100, numerical_tolerance=1E-9)
+
+
+def _naive_rolling_intrinsic(cmdty_storage, curve_snapshots, snapshot_inventories, interest_rates, settlement_rule,
+                             num_inventory_grid_points, numerical_tolerance):
+    for snapshot_date, inventory in zip(curve_snapshots.columns, snapshot_inventories):
+        cs.intrinsic_value(cmdty_storage, snapshot_date, inventory, curve_snapshots[snapshot_date], interest_rates,
+                           settlement_rule, num_inventory_grid_points, numerical_tolerance, engine='numpy')
+
+
+def main(number=3):
+    for snapshot_spacing_days in [30, 7, 1]:
+        valuation_inputs = _create_valuation_inputs(snapshot_spacing_days)
+        results = cs.rolling_intrinsic_value(**valuation_inputs)
+        # Inventory at the start of the period of each snapshot on the rolling intrinsic decision path
+        inventory_path = results.decisions['inventory'].shift(1, fill_value=valuation_inputs['inventory'])
+        snapshot_inventories = np.maximum(inventory_path.reindex(results.npvs.index).values, 0.0)
+        naive_inputs = dict(valuation_inputs, curve_snapshots=valuation_inputs['curve_snapshots'][results.npvs.index],
+                            snapshot_inventories=snapshot_inventories)
+        del naive_inputs['inventory']
+
+        rolling_time = timeit.timeit(lambda: cs.rolling_intrinsic_value(**valuation_inputs), number=number) / number
+        naive_time = timeit.timeit(lambda: _naive_rolling_intrinsic(**naive_inputs), number=number) / number
+        print('snapshots={:>4}  rolling: {:8.4f}s  naive: {:8.4f}s  speedup: {:7.1f}x'
+              .format(len(results.npvs), rolling_time, naive_time, naive_time / rolling_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""Compares bulk conversion of pandas Series to .NET TimeSeries against element-by-element conversion.
+Run from the src/Cmdty.Storage.Python directory: python -m benchmarks.bench_time_series_conversion"""
+
+import timeit
+import numpy as np
+import pandas as pd
+import clr
+import System as dotnet
+from cmdty_storage import utils
+
+
+def _create_series(freq, num_periods):
+    index = pd.period_range(start='2020-01-01', freq=freq, periods=num_periods)
+    return pd.Series(np.random.uniform(20.0, 80.0, num_periods), index=index)
+
+
+def main(number=3):
+    for freq, num_periods in [('D', 730), ('H', 17520), ('15min', 70080)]:
+        series = _create_series(freq, num_periods)
+        time_period_type = utils.FREQ_TO_PERIOD_TYPE[freq]
+
+        elementwise_time = timeit.timeit(lambda: utils._series_to_time_series_elementwise(
+                                series, time_period_type, dotnet.Double, lambda x: x), number=number) / number
+        bulk_time = timeit.timeit(lambda: utils.series_to_double_time_series(series, time_period_type),
+                                number=number) / number
+
+        print('freq={:>6} points={:>6}  element-wise: {:8.4f}s  bulk: {:8.4f}s  speedup: {:7.1f}x'
+              .format(freq, num_periods, elementwise_time, bulk_time, elementwise_time / bulk_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Compares trinomial_sensitivities with bumped revaluations by separate calls to trinomial_value with the numpy
+engine, over a one year daily storage.
+Run from the src/Cmdty.Storage.Python directory: python -m benchmarks.bench_trinomial_sensitivities"""
+
+import timeit
+import cmdty_storage as cs
+from benchmarks.bench_trinomial_engines import _create_valuation_inputs
+
+_BUMPS = {'forward_curve': 0.01, 'spot_volatility': 0.01, 'mean_reversion': 0.1, 'interest_rates': 0.0001}
+
+
+def _separate_revaluations(valuation_inputs):
+    cs.trinomial_value(**valuation_inputs, engine='numpy')
+    for input_name, bump_size in _BUMPS.items():
+        for signed_bump in (bump_size, -bump_size):
+            bumped_inputs = dict(valuation_inputs, **{input_name: valuation_inputs[input_name] + signed_bump})
+            cs.trinomial_value(**bumped_inputs, engine='numpy')
+
+
+def main(number=3, num_inventory_grid_points=100):
+    valuation_inputs = _create_valuation_inputs(num_inventory_grid_points)
+    separate_time = timeit.timeit(lambda: _separate_revaluations(valuation_inputs), number=number) / number
+    print('separate calls       time: {:8.4f}s'.format(separate_time))
+    for max_workers in [1, 4]:
+        sensitivities_time = timeit.timeit(lambda: cs.trinomial_sensitivities(**valuation_inputs, bumps=_BUMPS,
+                                                                              max_workers=max_workers),
+                                           number=number) / number
+        print('sensitivities workers={}  time: {:8.4f}s  speedup: {:5.2f}x'
+              .format(max_workers, sensitivities_time, separate_time / sensitivities_time))
+
+
+if __name__ == '__main__':
+    main()
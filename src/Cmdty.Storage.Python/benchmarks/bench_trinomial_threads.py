@@ -0,0 +1,53 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Measures scaling of the .NET trinomial tree valuation with the number of threads used to value price levels in
+parallel, over a one year daily storage.
+Run from the src/Cmdty.Storage.Python directory: python -m benchmarks.bench_trinomial_threads [max_threads]"""
+
+import os
+import sys
+import timeit
+import cmdty_storage as cs
+from benchmarks.bench_trinomial_engines import _create_valuation_inputs
+
+
+def main(max_threads=None, number=1, num_inventory_grid_points=250):
+    max_threads = max_threads or os.cpu_count()
+    valuation_inputs = _create_valuation_inputs(num_inventory_grid_points)
+    serial_npv = cs.trinomial_value(**valuation_inputs, num_threads=1)
+    thread_counts = sorted({min(2 ** i, max_threads) for i in range(max_threads.bit_length() + 1)})
+    serial_time = None
+    for num_threads in thread_counts:
+        npv = cs.trinomial_value(**valuation_inputs, num_threads=num_threads)
+        if npv != serial_npv:
+            raise AssertionError('NPV with {} threads of {} not equal to serial NPV of {}.'
+                                 .format(num_threads, npv, serial_npv))
+        time = timeit.timeit(lambda: cs.trinomial_value(**valuation_inputs, num_threads=num_threads),
+                             number=number) / number
+        serial_time = serial_time or time
+        print('threads={:>3}  time: {:8.4f}s  speedup: {:5.2f}x'.format(num_threads, time, serial_time / time))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else None)
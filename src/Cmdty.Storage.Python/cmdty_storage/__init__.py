@@ -23,6 +23,13 @@
 
 from cmdty_storage.__version__ import __version__
 from cmdty_storage.cmdty_storage import CmdtyStorage
-from cmdty_storage.intrinsic import intrinsic_value
-from cmdty_storage.trinomial import trinomial_value
+from cmdty_storage.terminal_npv import LinearTerminalNpv, PiecewiseLinearTerminalNpv
+from cmdty_storage.settlement_rules import DaysAfterMonthEnd, SamePeriod
+from cmdty_storage.intrinsic import intrinsic_value, intrinsic_value_batch
+from cmdty_storage.trinomial import trinomial_value, trinomial_sensitivities, trinomial_simulate, \
+    TrinomialSimulationResults, trinomial_valuation_results, TrinomialValuationResults, trinomial_grid_convergence
+from cmdty_storage.portfolio import StorageValuationSpec, PortfolioValuationResults, value_portfolio
+from cmdty_storage.rolling_intrinsic import RollingIntrinsicResults, rolling_intrinsic_value
+from cmdty_storage.lsmc import LsmcValuationResults, lsmc_value
+from cmdty_storage.grid_convergence import GridConvergenceResults
 from cmdty_storage.utils import FREQ_TO_PERIOD_TYPE
\ No newline at end of file
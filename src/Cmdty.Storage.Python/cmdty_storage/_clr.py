@@ -0,0 +1,69 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""
+Lazily loaded .NET namespaces and types. The CLR is started and the Cmdty assemblies loaded, from the lib directory
+of this package, on first access of one of the module attributes rather than when cmdty_storage is imported.
+"""
+
+import importlib
+from pathlib import Path
+
+LIB_DIR = Path(__file__).resolve().parent / 'lib'
+
+_ASSEMBLIES = ('Cmdty.TimePeriodValueTypes', 'Cmdty.TimeSeries', 'Cmdty.Storage')
+
+# Attribute name to (namespace, type name or None for the namespace itself)
+_ATTRIBUTES = {
+    'dotnet': ('System', None),
+    'dotnet_cols_gen': ('System.Collections.Generic', None),
+    'Marshal': ('System.Runtime.InteropServices', 'Marshal'),
+    'tp': ('Cmdty.TimePeriodValueTypes', None),
+    'ts': ('Cmdty.TimeSeries', None),
+    'net_cs': ('Cmdty.Storage', None),
+}
+
+_assemblies_loaded = False
+
+
+def load_assemblies():
+    """Starts the CLR and loads the Cmdty assemblies, if this hasn't already been done."""
+    global _assemblies_loaded
+    if not _assemblies_loaded:
+        import clr
+        for assembly in _ASSEMBLIES:
+            clr.AddReference(str(LIB_DIR / assembly))
+        _assemblies_loaded = True
+
+
+def __getattr__(name):
+    if name not in _ATTRIBUTES:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    load_assemblies()
+    namespace_name, type_name = _ATTRIBUTES[name]
+    attribute = importlib.import_module(namespace_name)
+    if type_name is not None:
+        attribute = getattr(attribute, type_name)
+    globals()[name] = attribute  # Subsequent accesses don't go through __getattr__
+    return attribute
@@ -21,18 +21,13 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 # OTHER DEALINGS IN THE SOFTWARE.
 
-import clr
-import System as dotnet
-import System.Collections.Generic as dotnet_cols_gen
-from pathlib import Path
-
-clr.AddReference(str(Path('cmdty_storage/lib/Cmdty.Storage')))
-import Cmdty.Storage as net_cs
-
-from typing import Union, Callable, Iterable, Tuple, NamedTuple
+from typing import Union, Callable, Iterable, Tuple, NamedTuple, Optional
 from datetime import datetime, date
+import copy
 import pandas as pd
-from cmdty_storage import utils
+from cmdty_storage import utils, _clr
+from cmdty_storage.numpy_storage import StorageArrays, InventorySpaceCacheInfo
+from cmdty_storage.terminal_npv import LinearTerminalNpv, PiecewiseLinearTerminalNpv
 
 
 class InjectWithdrawRange(NamedTuple):
@@ -60,53 +55,71 @@ def __init__(self,
                  max_withdrawal_rate: Union[None, float, int, pd.Series] = None,
                  cmdty_consumed_inject: Union[None, float, int, pd.Series] = None,
                  cmdty_consumed_withdraw: Union[None, float, int, pd.Series] = None,
-                 terminal_storage_npv: Union[None, Callable[[float, float], float]] = None,
+                 terminal_storage_npv: Union[None, LinearTerminalNpv, PiecewiseLinearTerminalNpv,
+                                             Callable[[float, float], float]] = None,
                  inventory_loss: Union[None, float, int, pd.Series] = None,
                  inventory_cost: Union[None, float, int, pd.Series] = None):
 
         if freq not in utils.FREQ_TO_PERIOD_TYPE:
             raise ValueError("freq parameter value of '{}' not supported. The allowable values can be found in the keys of the dict curves.FREQ_TO_PERIOD_TYPE.".format(freq))
 
+        if constraints is not None:
+            utils.raise_if_not_none(min_inventory, "min_inventory parameter should not be provided if constraints parameter is provided.")
+            utils.raise_if_not_none(max_inventory, "max_inventory parameter should not be provided if constraints parameter is provided.")
+            utils.raise_if_not_none(max_injection_rate, "max_injection_rate parameter should not be provided if constraints parameter is provided.")
+            utils.raise_if_not_none(max_withdrawal_rate, "max_withdrawal_rate parameter should not be provided if constraints parameter is provided.")
+            # Held as lists, as constraints are iterated by both the .NET builder and StorageArrays
+            constraints = [(period, list(rates_by_inventory)) for period, rates_by_inventory in constraints]
+        else:
+            utils.raise_if_none(min_inventory, "min_inventory parameter should be provided if constraints parameter is not provided.")
+            utils.raise_if_none(max_inventory, "max_inventory parameter should be provided if constraints parameter is not provided.")
+            utils.raise_if_none(max_injection_rate, "max_injection_rate parameter should be provided if constraints parameter is not provided.")
+            utils.raise_if_none(max_withdrawal_rate, "max_withdrawal_rate parameter should be provided if constraints parameter is not provided.")
+        self._init_args = dict(freq=freq, storage_start=storage_start, storage_end=storage_end, injection_cost=injection_cost,
+                               withdrawal_cost=withdrawal_cost, constraints=constraints, min_inventory=min_inventory,
+                               max_inventory=max_inventory, max_injection_rate=max_injection_rate,
+                               max_withdrawal_rate=max_withdrawal_rate, cmdty_consumed_inject=cmdty_consumed_inject,
+                               cmdty_consumed_withdraw=cmdty_consumed_withdraw, terminal_storage_npv=terminal_storage_npv,
+                               inventory_loss=inventory_loss, inventory_cost=inventory_cost)
+        self._storage_arrays = None
+        # The .NET storage is built on first use, so valuations with the numpy engines don't load the CLR
+        self._net_storage = None
+        self._unfrozen_net_storage = None
+        self._freq = freq
+
+    def _build_net_storage(self, freq, storage_start, storage_end, injection_cost, withdrawal_cost, constraints,
+                           min_inventory, max_inventory, max_injection_rate, max_withdrawal_rate, cmdty_consumed_inject,
+                           cmdty_consumed_withdraw, terminal_storage_npv, inventory_loss, inventory_cost):
         time_period_type = utils.FREQ_TO_PERIOD_TYPE[freq]
 
         start_period = utils.from_datetime_like(storage_start, time_period_type)
         end_period = utils.from_datetime_like(storage_end, time_period_type)
 
-        builder = net_cs.IBuilder[time_period_type](net_cs.CmdtyStorage[time_period_type].Builder)
+        builder = _clr.net_cs.IBuilder[time_period_type](_clr.net_cs.CmdtyStorage[time_period_type].Builder)
 
         builder = builder.WithActiveTimePeriod(start_period, end_period)
 
-        net_constraints = dotnet_cols_gen.List[net_cs.InjectWithdrawRangeByInventoryAndPeriod[time_period_type]]()
+        net_constraints = _clr.dotnet_cols_gen.List[_clr.net_cs.InjectWithdrawRangeByInventoryAndPeriod[time_period_type]]()
 
         if constraints is not None:
-            utils.raise_if_not_none(min_inventory, "min_inventory parameter should not be provided if constraints parameter is provided.")
-            utils.raise_if_not_none(max_inventory, "max_inventory parameter should not be provided if constraints parameter is provided.")
-            utils.raise_if_not_none(max_injection_rate, "max_injection_rate parameter should not be provided if constraints parameter is provided.")
-            utils.raise_if_not_none(max_withdrawal_rate, "max_withdrawal_rate parameter should not be provided if constraints parameter is provided.")
-
             for period, rates_by_inventory in constraints:
                 net_period = utils.from_datetime_like(period, time_period_type)
-                net_rates_by_inventory = dotnet_cols_gen.List[net_cs.InjectWithdrawRangeByInventory]()
+                net_rates_by_inventory = _clr.dotnet_cols_gen.List[_clr.net_cs.InjectWithdrawRangeByInventory]()
                 for inventory, min_rate, max_rate in rates_by_inventory:
-                    net_rates_by_inventory.Add(net_cs.InjectWithdrawRangeByInventory(inventory, net_cs.InjectWithdrawRange(min_rate, max_rate)))
-                net_constraints.Add(net_cs.InjectWithdrawRangeByInventoryAndPeriod[time_period_type](net_period, net_rates_by_inventory))
+                    net_rates_by_inventory.Add(_clr.net_cs.InjectWithdrawRangeByInventory(inventory, _clr.net_cs.InjectWithdrawRange(min_rate, max_rate)))
+                net_constraints.Add(_clr.net_cs.InjectWithdrawRangeByInventoryAndPeriod[time_period_type](net_period, net_rates_by_inventory))
 
-            builder = net_cs.IAddInjectWithdrawConstraints[time_period_type](builder)
-            net_cs.CmdtyStorageBuilderExtensions.WithTimeAndInventoryVaryingInjectWithdrawRatesPiecewiseLinear[time_period_type](builder, net_constraints)
+            builder = _clr.net_cs.IAddInjectWithdrawConstraints[time_period_type](builder)
+            _clr.net_cs.CmdtyStorageBuilderExtensions.WithTimeAndInventoryVaryingInjectWithdrawRatesPiecewiseLinear[time_period_type](builder, net_constraints)
 
         else:
-            utils.raise_if_none(min_inventory, "min_inventory parameter should be provided if constraints parameter is not provided.")
-            utils.raise_if_none(max_inventory, "max_inventory parameter should be provided if constraints parameter is not provided.")
-            utils.raise_if_none(max_injection_rate, "max_injection_rate parameter should be provided if constraints parameter is not provided.")
-            utils.raise_if_none(max_withdrawal_rate, "max_withdrawal_rate parameter should be provided if constraints parameter is not provided.")
-
-            builder = net_cs.IAddInjectWithdrawConstraints[time_period_type](builder)
+            builder = _clr.net_cs.IAddInjectWithdrawConstraints[time_period_type](builder)
 
             max_injection_rate_is_scalar = utils.is_scalar(max_injection_rate)
             max_withdrawal_rate_is_scalar = utils.is_scalar(max_withdrawal_rate)
 
             if max_injection_rate_is_scalar and max_withdrawal_rate_is_scalar:
-                net_cs.CmdtyStorageBuilderExtensions.WithConstantInjectWithdrawRange[time_period_type](builder, -max_withdrawal_rate, max_injection_rate)
+                _clr.net_cs.CmdtyStorageBuilderExtensions.WithConstantInjectWithdrawRange[time_period_type](builder, -max_withdrawal_rate, max_injection_rate)
             else:
                 if max_injection_rate_is_scalar:
                     max_injection_rate = pd.Series(data=[max_injection_rate] * len(max_withdrawal_rate), index=max_withdrawal_rate.index)
@@ -114,24 +127,24 @@ def __init__(self,
                     max_withdrawal_rate = pd.Series(data=[max_withdrawal_rate] * len(max_injection_rate), index=max_injection_rate.index)
 
                 inject_withdraw_series = max_injection_rate.combine(max_withdrawal_rate, lambda inj_rate, with_rate: (-with_rate, inj_rate)).dropna()
-                net_inj_with_series = utils.series_to_time_series(inject_withdraw_series, time_period_type, net_cs.InjectWithdrawRange, lambda tup: net_cs.InjectWithdrawRange(tup[0], tup[1]))
+                net_inj_with_series = utils.series_to_time_series(inject_withdraw_series, time_period_type, _clr.net_cs.InjectWithdrawRange, lambda tup: _clr.net_cs.InjectWithdrawRange(tup[0], tup[1]))
                 builder.WithInjectWithdrawRangeSeries(net_inj_with_series)
 
-            builder = net_cs.IAddMinInventory[time_period_type](builder)
+            builder = _clr.net_cs.IAddMinInventory[time_period_type](builder)
             if isinstance(min_inventory, pd.Series):
                 net_series_min_inventory = utils.series_to_double_time_series(min_inventory, time_period_type)
                 builder.WithMinInventoryTimeSeries(net_series_min_inventory)
             else: # Assume min_inventory is a constaint number
                 builder.WithConstantMinInventory(min_inventory)
 
-            builder = net_cs.IAddMaxInventory[time_period_type](builder)
+            builder = _clr.net_cs.IAddMaxInventory[time_period_type](builder)
             if isinstance(max_inventory, pd.Series):
                 net_series_max_inventory = utils.series_to_double_time_series(max_inventory, time_period_type)
                 builder.WithMaxInventoryTimeSeries(net_series_max_inventory)
             else: # Assume max_inventory is a constaint number
                 builder.WithConstantMaxInventory(max_inventory)
 
-        builder = net_cs.IAddInjectionCost[time_period_type](builder)
+        builder = _clr.net_cs.IAddInjectionCost[time_period_type](builder)
 
         if utils.is_scalar(injection_cost):
             builder.WithPerUnitInjectionCost(injection_cost)
@@ -139,7 +152,7 @@ def __init__(self,
             net_series_injection_cost = utils.series_to_double_time_series(injection_cost, time_period_type)
             builder.WithPerUnitInjectionCostTimeSeries(net_series_injection_cost)
 
-        builder = net_cs.IAddCmdtyConsumedOnInject[time_period_type](builder)
+        builder = _clr.net_cs.IAddCmdtyConsumedOnInject[time_period_type](builder)
 
         if cmdty_consumed_inject is not None:
             if utils.is_scalar(cmdty_consumed_inject):
@@ -150,14 +163,14 @@ def __init__(self,
         else:
             builder.WithNoCmdtyConsumedOnInject()
 
-        builder = net_cs.IAddWithdrawalCost[time_period_type](builder)
+        builder = _clr.net_cs.IAddWithdrawalCost[time_period_type](builder)
         if utils.is_scalar(withdrawal_cost):
             builder.WithPerUnitWithdrawalCost(withdrawal_cost)
         else:
             net_series_withdrawal_cost = utils.series_to_double_time_series(withdrawal_cost, time_period_type)
             builder.WithPerUnitWithdrawalCostTimeSeries(net_series_withdrawal_cost)
 
-        builder = net_cs.IAddCmdtyConsumedOnWithdraw[time_period_type](builder)
+        builder = _clr.net_cs.IAddCmdtyConsumedOnWithdraw[time_period_type](builder)
 
         if cmdty_consumed_withdraw is not None:
             if utils.is_scalar(cmdty_consumed_withdraw):
@@ -168,7 +181,7 @@ def __init__(self,
         else:
             builder.WithNoCmdtyConsumedOnWithdraw()
 
-        builder = net_cs.IAddCmdtyInventoryLoss[time_period_type](builder)
+        builder = _clr.net_cs.IAddCmdtyInventoryLoss[time_period_type](builder)
         if inventory_loss is not None:
             if utils.is_scalar(inventory_loss):
                 builder.WithFixedPercentCmdtyInventoryLoss(inventory_loss)
@@ -178,7 +191,7 @@ def __init__(self,
         else:
             builder.WithNoCmdtyInventoryLoss()
 
-        builder = net_cs.IAddCmdtyInventoryCost[time_period_type](builder)
+        builder = _clr.net_cs.IAddCmdtyInventoryCost[time_period_type](builder)
         if inventory_cost is not None:
             if utils.is_scalar(inventory_cost):
                 builder.WithFixedPerUnitInventoryCost(inventory_cost)
@@ -188,87 +201,161 @@ def __init__(self,
         else:
             builder.WithNoInventoryCost()
 
-        builder = net_cs.IAddTerminalStorageState[time_period_type](builder)
+        builder = _clr.net_cs.IAddTerminalStorageState[time_period_type](builder)
 
         if terminal_storage_npv is None:
             builder.MustBeEmptyAtEnd()
-        else:
-            builder.WithTerminalInventoryNpv(dotnet.Func[dotnet.Double, dotnet.Double, dotnet.Double](terminal_storage_npv))
-
-        self._net_storage = net_cs.IBuildCmdtyStorage[time_period_type](builder).Build()
-        self._freq = freq
+        elif isinstance(terminal_storage_npv, LinearTerminalNpv):
+            _clr.net_cs.CmdtyStorageBuilderExtensions.WithLinearTerminalInventoryNpv[time_period_type](builder,
+                                    terminal_storage_npv.price_multiplier, terminal_storage_npv.fixed_cost)
+        elif isinstance(terminal_storage_npv, PiecewiseLinearTerminalNpv):
+            net_inventories = _clr.dotnet_cols_gen.List[_clr.dotnet.Double]()
+            net_price_multipliers = _clr.dotnet_cols_gen.List[_clr.dotnet.Double]()
+            for inventory, price_multiplier in terminal_storage_npv.multipliers_by_inventory:
+                net_inventories.Add(inventory)
+                net_price_multipliers.Add(price_multiplier)
+            _clr.net_cs.CmdtyStorageBuilderExtensions.WithPiecewiseLinearTerminalInventoryNpv[time_period_type](builder,
+                                    net_inventories, net_price_multipliers)
+        else:  # Python callable, called back from .NET for every terminal NPV evaluation
+            builder.WithTerminalInventoryNpv(_clr.dotnet.Func[_clr.dotnet.Double, _clr.dotnet.Double, _clr.dotnet.Double](terminal_storage_npv))
+
+        return _clr.net_cs.IBuildCmdtyStorage[time_period_type](builder).Build()
 
     def _net_time_period(self, period):
         time_period_type = utils.FREQ_TO_PERIOD_TYPE[self._freq]
         return utils.from_datetime_like(period, time_period_type)
 
+    def _get_unfrozen_net_storage(self):
+        if self._unfrozen_net_storage is None:
+            self._unfrozen_net_storage = self._build_net_storage(**self._init_args)
+        return self._unfrozen_net_storage
+
     @property
-    def net_storage(self) -> net_cs.CmdtyStorage:
+    def net_storage(self):
+        """
+        The .NET Cmdty.Storage.CmdtyStorage object, or Cmdty.Storage.FrozenCmdtyStorage if created by freeze. Built, so
+        loading the CLR, on first access.
+        """
+        if self._net_storage is None:
+            self._net_storage = self._get_unfrozen_net_storage()
         return self._net_storage
 
+    def freeze(self, start: Optional[utils.TimePeriodSpecType] = None,
+               end: Optional[utils.TimePeriodSpecType] = None) -> 'CmdtyStorage':
+        """
+        Creates a copy of this storage for faster repeated valuation, with the .NET net_storage replaced by a
+        Cmdty.Storage.FrozenCmdtyStorage holding constraints, costs and volumes consumed in arrays for each period from
+        start to end inclusive, and storage_arrays created up front.
+
+        Args:
+            start: First period to freeze. Defaults to the storage start period.
+            end: Last period to freeze. Defaults to the storage end period.
+        """
+        net_start = self._net_time_period(self.start if start is None else start)
+        net_end = self._net_time_period(self.end if end is None else end)
+        unfrozen_net_storage = self._get_unfrozen_net_storage()
+        frozen_storage = copy.copy(self)
+        frozen_storage._net_storage = unfrozen_net_storage.Freeze(net_start, net_end)
+        frozen_storage._storage_arrays = self.storage_arrays
+        return frozen_storage
+
+    @property
+    def storage_arrays(self) -> StorageArrays:
+        """Storage parameters as NumPy arrays, as used by the NumPy valuation engines."""
+        if self._storage_arrays is None:
+            self._storage_arrays = StorageArrays(**self._init_args)
+        return self._storage_arrays
+
+    def inventory_space_cache_info(self, engine: str = 'dotnet') -> InventorySpaceCacheInfo:
+        """
+        Hit and miss counts, size and capacity of the least recently used cache of inventory space, which is reused
+        by valuations with the same starting inventory and valuation period.
+
+        Args:
+            engine (str): 'dotnet' for the cache used by the .NET valuation engine, or 'numpy' for the NumPy engine.
+        """
+        if engine == 'numpy':
+            return self.storage_arrays.inventory_space_cache_info()
+        if engine != 'dotnet':
+            raise ValueError("engine parameter value of '{}' not supported. Allowable values are 'dotnet' and 'numpy'.".format(engine))
+        net_cache = self.net_storage.InventorySpaceCache
+        return InventorySpaceCacheInfo(net_cache.Hits, net_cache.Misses, net_cache.Count, net_cache.Capacity)
+
+    def clear_inventory_space_cache(self):
+        """Empties the .NET and NumPy engine inventory space caches and resets their hit and miss counts."""
+        if self._unfrozen_net_storage is not None:  # Frozen storages share the cache of the storage they were created from
+            self._unfrozen_net_storage.InventorySpaceCache.Clear()
+        if self._storage_arrays is not None:
+            self._storage_arrays.clear_inventory_space_cache()
+
     @property
     def freq(self) -> str:
         return self._freq
 
     @property
     def empty_at_end(self) -> bool:
-        return self._net_storage.MustBeEmptyAtEnd
+        return self._init_args['terminal_storage_npv'] is None
 
     @property
     def start(self) -> pd.Period:
-        return utils.net_time_period_to_pandas_period(self._net_storage.StartPeriod, self._freq)
+        return pd.Period(self._init_args['storage_start'], freq=self._freq)
 
     @property
     def end(self) -> pd.Period:
-        return utils.net_time_period_to_pandas_period(self._net_storage.EndPeriod, self._freq)
+        return pd.Period(self._init_args['storage_end'], freq=self._freq)
+
+    @property
+    def periods(self) -> pd.PeriodIndex:
+        """Periods from start to end inclusive, without creating storage_arrays."""
+        return pd.period_range(start=self.start, end=self.end, freq=self._freq)
 
     def inject_withdraw_range(self, period, inventory) -> InjectWithdrawRange:
 
         net_time_period = self._net_time_period(period)
-        net_inject_withdraw = self._net_storage.GetInjectWithdrawRange(net_time_period, inventory)
+        net_inject_withdraw = self.net_storage.GetInjectWithdrawRange(net_time_period, inventory)
 
         return InjectWithdrawRange(net_inject_withdraw.MinInjectWithdrawRate, net_inject_withdraw.MaxInjectWithdrawRate)
 
     def min_inventory(self, period) -> float:
         net_time_period = self._net_time_period(period)
-        return self._net_storage.MinInventory(net_time_period)
+        return self.net_storage.MinInventory(net_time_period)
 
     def max_inventory(self, period) -> float:
         net_time_period = self._net_time_period(period)
-        return self._net_storage.MaxInventory(net_time_period)
+        return self.net_storage.MaxInventory(net_time_period)
 
     def injection_cost(self, period, inventory, injected_volume) -> float:
         net_time_period = self._net_time_period(period)
-        net_inject_costs = self._net_storage.InjectionCost(net_time_period, inventory, injected_volume)
+        net_inject_costs = self.net_storage.InjectionCost(net_time_period, inventory, injected_volume)
         if net_inject_costs.Length > 0:
             return net_inject_costs[0].Amount
         return 0.0
 
     def cmdty_consumed_inject(self, period, inventory, injected_volume) -> float:
         net_time_period = self._net_time_period(period)
-        return self._net_storage.CmdtyVolumeConsumedOnInject(net_time_period, inventory, injected_volume)
+        return self.net_storage.CmdtyVolumeConsumedOnInject(net_time_period, inventory, injected_volume)
 
     def withdrawal_cost(self, period, inventory, withdrawn_volume) -> float:
         net_time_period = self._net_time_period(period)
-        net_withdrawal_costs = self._net_storage.WithdrawalCost(net_time_period, inventory, withdrawn_volume)
+        net_withdrawal_costs = self.net_storage.WithdrawalCost(net_time_period, inventory, withdrawn_volume)
         if net_withdrawal_costs.Length > 0:
             return net_withdrawal_costs[0].Amount
         return 0.0
 
     def cmdty_consumed_withdraw(self, period, inventory, withdrawn_volume) -> float:
         net_time_period = self._net_time_period(period)
-        return self._net_storage.CmdtyVolumeConsumedOnWithdraw(net_time_period, inventory, withdrawn_volume)
+        return self.net_storage.CmdtyVolumeConsumedOnWithdraw(net_time_period, inventory, withdrawn_volume)
 
     def terminal_storage_npv(self, cmdty_price, terminal_inventory) -> float:
-        return self._net_storage.TerminalStorageNpv(cmdty_price, terminal_inventory)
+        return self.net_storage.TerminalStorageNpv(cmdty_price, terminal_inventory)
 
     def inventory_pcnt_loss(self, period) -> float:
         net_time_period = self._net_time_period(period)
-        return self._net_storage.CmdtyInventoryPercentLoss(net_time_period)
+        return self.net_storage.CmdtyInventoryPercentLoss(net_time_period)
 
     def inventory_cost(self, period, inventory) -> float:
         net_time_period = self._net_time_period(period)
-        net_inventory_cost = self._net_storage.CmdtyInventoryCost(net_time_period, inventory)
+        net_inventory_cost = self.net_storage.CmdtyInventoryCost(net_time_period, inventory)
         if len(net_inventory_cost) > 0:
             return net_inventory_cost[0].Amount
         return 0.0
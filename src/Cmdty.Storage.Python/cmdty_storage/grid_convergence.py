@@ -0,0 +1,107 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import math
+from typing import NamedTuple, Callable, Tuple
+
+# Each grid halves the spacing of the previous: 11, 21, 41, 81, ...
+GRID_CONVERGENCE_INITIAL_POINTS = 11
+# Order of convergence in grid spacing assumed when it can't be estimated. Linear interpolation is second order.
+DEFAULT_CONVERGENCE_ORDER = 2.0
+MIN_CONVERGENCE_ORDER = 1.0
+MAX_CONVERGENCE_ORDER = 4.0
+
+
+class GridConvergenceResults(NamedTuple):
+    """
+    Attributes:
+        npv: NPV extrapolated to zero grid spacing from the NPVs of the finest grids.
+        error_estimate: estimate of the absolute discretisation error of npv.
+        converged: True if error_estimate is within the tolerance.
+        num_inventory_grid_points: grid sizes valued on, in increasing order.
+        grid_npvs: NPV on each grid of num_inventory_grid_points.
+    """
+    npv: float
+    error_estimate: float
+    converged: bool
+    num_inventory_grid_points: Tuple[int, ...]
+    grid_npvs: Tuple[float, ...]
+
+
+def converge_grid(grid_npv: Callable[[int], float],
+                  grid_tolerance: float,
+                  max_inventory_grid_points: int,
+                  initial_inventory_grid_points: int = GRID_CONVERGENCE_INITIAL_POINTS) -> GridConvergenceResults:
+    """
+    Values on a sequence of grids, each with half the spacing of the previous, until the estimated discretisation error
+    is within grid_tolerance, or the next grid would have more than max_inventory_grid_points.
+
+    From the second grid on, the NPV is Richardson extrapolated from the last two grid NPVs. The order of convergence
+    is estimated from the last two NPV differences, or assumed to be DEFAULT_CONVERGENCE_ORDER before there are three
+    grids. If the differences change sign, or don't shrink, the grids are not yet fine enough for extrapolation, so the
+    finest NPV is used. The error estimate is the larger of the last two changes in the extrapolated NPV, so at least
+    four grids are used, and a single small change before the NPVs settle doesn't stop the refinement.
+
+    Args:
+        grid_npv: function of the number of inventory grid points returning the NPV valued with that grid.
+    """
+    if not grid_tolerance > 0.0:
+        raise ValueError("grid_tolerance must be positive.")
+    if initial_inventory_grid_points < 3:
+        raise ValueError("initial_inventory_grid_points value must be at least 3.")
+    min_max_inventory_grid_points = 8 * initial_inventory_grid_points - 7
+    if max_inventory_grid_points < min_max_inventory_grid_points:
+        raise ValueError("max_inventory_grid_points must allow at least four grids, so must be at least {}."
+                         .format(min_max_inventory_grid_points))
+
+    grid_sizes = [initial_inventory_grid_points]
+    grid_npvs = [grid_npv(initial_inventory_grid_points)]
+    extrapolated_npvs = []
+    error_estimate = math.inf
+    while True:
+        num_grid_points = 2 * grid_sizes[-1] - 1
+        if num_grid_points > max_inventory_grid_points:
+            break
+        grid_sizes.append(num_grid_points)
+        grid_npvs.append(grid_npv(num_grid_points))
+        extrapolated_npvs.append(_extrapolate(grid_npvs))
+        if len(extrapolated_npvs) >= 3:
+            error_estimate = max(abs(extrapolated_npvs[-1] - extrapolated_npvs[-2]),
+                                 abs(extrapolated_npvs[-2] - extrapolated_npvs[-3]))
+            if error_estimate <= grid_tolerance:
+                break
+    return GridConvergenceResults(float(extrapolated_npvs[-1]), float(error_estimate), bool(error_estimate <= grid_tolerance),
+                                  tuple(grid_sizes), tuple(float(npv) for npv in grid_npvs))
+
+
+def _extrapolate(grid_npvs):
+    last_diff = grid_npvs[-1] - grid_npvs[-2]
+    order = DEFAULT_CONVERGENCE_ORDER
+    if len(grid_npvs) >= 3:
+        previous_diff = grid_npvs[-2] - grid_npvs[-3]
+        if last_diff == 0.0 or previous_diff == 0.0 or not 0.0 < last_diff / previous_diff < 1.0:
+            return grid_npvs[-1]
+        order = min(max(math.log2(previous_diff / last_diff), MIN_CONVERGENCE_ORDER), MAX_CONVERGENCE_ORDER)
+    return grid_npvs[-1] + last_diff / (2.0 ** order - 1.0)
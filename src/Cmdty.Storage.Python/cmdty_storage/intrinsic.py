@@ -22,21 +22,22 @@
 # OTHER DEALINGS IN THE SOFTWARE.
 
 import pandas as pd
-import clr
-import System as dotnet
-from cmdty_storage import utils, CmdtyStorage
-from typing import NamedTuple, Union, Callable
+import numpy as np
+from cmdty_storage import utils, CmdtyStorage, numpy_intrinsic, numpy_storage as nps, _clr
+from cmdty_storage.grid_convergence import GridConvergenceResults, converge_grid
+from typing import NamedTuple, Union, Callable, Optional, Sequence
 from datetime import date
-from pathlib import Path
-clr.AddReference(str(Path('cmdty_storage/lib/Cmdty.Storage')))
-import Cmdty.Storage as net_cs
-clr.AddReference(str(Path("cmdty_storage/lib/Cmdty.TimePeriodValueTypes")))
-import Cmdty.TimePeriodValueTypes as tp
 
 
 class IntrinsicValuationResults(NamedTuple):
     npv: float
     profile: pd.DataFrame
+    grid_convergence: Optional[GridConvergenceResults] = None
+
+
+class IntrinsicBatchValuationResults(NamedTuple):
+    npvs: np.ndarray
+    profiles: Optional[pd.DataFrame]
 
 
 def intrinsic_value(cmdty_storage: CmdtyStorage,
@@ -46,64 +47,191 @@ def intrinsic_value(cmdty_storage: CmdtyStorage,
                     interest_rates: pd.Series,
                     settlement_rule: Callable[[pd.Period], date],
                     num_inventory_grid_points: int = 100,
-                    numerical_tolerance: float = 1E-12) -> IntrinsicValuationResults:
+                    numerical_tolerance: float = 1E-12,
+                    engine: str = 'dotnet',
+                    grid: str = 'uniform',
+                    grid_tolerance: Optional[float] = None,
+                    max_inventory_grid_points: int = 2561,
+                    decision_freq: Optional[str] = None) -> IntrinsicValuationResults:
     """
     Calculates the intrinsic value of commodity storage.
 
     Args:
         settlement_rule (callable): Mapping function from pandas.Period type to the date on which the cmdty delivered in
             this period is settled. The pandas.Period parameter will have freq equal to the cmdty_storage parameter's freq property.
+        engine (str): 'dotnet' to value using the .NET Cmdty.Storage library, or 'numpy' to use the NumPy implementation
+            of the same algorithm, which is vectorized over the inventory grid and doesn't call into the CLR.
+        grid (str): 'uniform' for num_inventory_grid_points evenly spaced over the global inventory range, or 'adaptive'
+            to use the same spacing away from the inventory space bounds and the inventory levels at which piecewise
+            linear inject/withdraw rates change slope, with finer spacing near them. Gives a more accurate NPV for
+            the same num_inventory_grid_points, so fewer points are needed for a given accuracy.
+        grid_tolerance (float, optional): if specified, num_inventory_grid_points is ignored and the storage is valued
+            on grids of increasing size, from 11 points until the estimated absolute error of the extrapolated NPV is
+            within grid_tolerance, or the next grid would have more than max_inventory_grid_points. The npv attribute
+            of the result is then the extrapolated NPV, the profile is from the finest grid, and grid_convergence
+            holds the grid sizes used and the error estimate. See grid_convergence.converge_grid.
+        decision_freq (str, optional): pandas Offset Alias, such as '4H' for a storage with hourly freq, for decision
+            blocks over which the inject/withdraw volume is held constant, with a block starting on each decision_freq
+            boundary and on the first period. Prices, costs and losses still accrue in each period of cmdty_storage
+            freq, but decisions are only optimised at block starts. If None, a decision is made in every period.
     """
     if cmdty_storage.freq != forward_curve.index.freqstr:
         raise ValueError("cmdty_storage and forward_curve have different frequencies.")
+    nps.check_grid_type(grid)
+    if grid_tolerance is not None:
+        grid_profiles = []
+
+        def grid_npv(num_grid_points):
+            grid_results = intrinsic_value(cmdty_storage, val_date, inventory, forward_curve, interest_rates,
+                                           settlement_rule, num_grid_points, numerical_tolerance, engine, grid,
+                                           decision_freq=decision_freq)
+            grid_profiles.append(grid_results.profile)
+            return grid_results.npv
+
+        grid_convergence = converge_grid(grid_npv, grid_tolerance, max_inventory_grid_points)
+        return IntrinsicValuationResults(grid_convergence.npv, grid_profiles[-1], grid_convergence)
+    if engine == 'numpy':
+        npv, profile = numpy_intrinsic.intrinsic_value(cmdty_storage.storage_arrays, val_date, inventory, forward_curve,
+                                                       interest_rates, settlement_rule, num_inventory_grid_points,
+                                                       numerical_tolerance, grid, decision_freq)
+        return IntrinsicValuationResults(npv, profile)
+    if engine != 'dotnet':
+        raise ValueError("engine parameter value of '{}' not supported. Allowable values are 'dotnet' and 'numpy'.".format(engine))
+    time_period_type = utils.FREQ_TO_PERIOD_TYPE[cmdty_storage.freq]
+
+    net_forward_curve = utils.series_to_double_time_series(forward_curve, time_period_type)
+    intrinsic_calc = _create_intrinsic_calc(cmdty_storage, val_date, inventory, net_forward_curve, interest_rates,
+                                            settlement_rule, num_inventory_grid_points, numerical_tolerance, grid,
+                                            decision_freq)
+
+    net_val_results = _clr.net_cs.IIntrinsicCalculate[time_period_type](intrinsic_calc).Calculate()
+
+    return IntrinsicValuationResults(net_val_results.NetPresentValue, _profile_data_frame(net_val_results, cmdty_storage.freq))
+
+
+def intrinsic_value_batch(cmdty_storage: CmdtyStorage,
+                          val_date: utils.TimePeriodSpecType,
+                          inventories: Union[float, int, Sequence[float], np.ndarray],
+                          forward_curves: Union[pd.DataFrame, np.ndarray],
+                          interest_rates: pd.Series,
+                          settlement_rule: Callable[[pd.Period], date],
+                          num_inventory_grid_points: int = 100,
+                          numerical_tolerance: float = 1E-12,
+                          return_profiles: bool = False,
+                          grid: str = 'uniform',
+                          decision_freq: Optional[str] = None) -> IntrinsicBatchValuationResults:
+    """
+    Calculates the intrinsic value of commodity storage for many scenarios of starting inventory and forward curve.
+
+    All inputs other than inventory and forward curve are converted to .NET once and shared by all scenarios, with
+    the loop over scenarios performed within .NET.
+
+    Args:
+        inventories: starting inventory for each scenario, or a single inventory used for all scenarios.
+        forward_curves: forward curve scenarios, one per column. If a pandas.DataFrame, the index must be a
+            pandas.PeriodIndex with the same freq as cmdty_storage. If a 2-D numpy.ndarray, row i holds the
+            forward price for the i-th period after the period containing val_date.
+        settlement_rule (callable): Mapping function from pandas.Period type to the date on which the cmdty delivered in
+            this period is settled. The pandas.Period parameter will have freq equal to the cmdty_storage parameter's freq property.
+        return_profiles (bool): if True the storage profiles of all scenarios are returned stacked in a single
+            pandas.DataFrame with a MultiIndex of scenario and period.
+        grid (str): 'uniform' or 'adaptive' inventory grid. See intrinsic_value.
+        decision_freq (str, optional): pandas Offset Alias for decision blocks over which the inject/withdraw volume is
+            held constant. See intrinsic_value.
+    """
+    nps.check_grid_type(grid)
+    if isinstance(forward_curves, pd.DataFrame):
+        if cmdty_storage.freq != forward_curves.index.freqstr:
+            raise ValueError("cmdty_storage and forward_curves have different frequencies.")
+    else:
+        forward_curves = np.asarray(forward_curves, dtype=np.float64)
+        if forward_curves.ndim != 2:
+            raise ValueError("forward_curves must be 2-dimensional.")
+        curves_index = pd.period_range(start=val_date, freq=cmdty_storage.freq, periods=forward_curves.shape[0])
+        forward_curves = pd.DataFrame(data=forward_curves, index=curves_index)
+
+    num_scenarios = forward_curves.shape[1]
+    if num_scenarios == 0:
+        raise ValueError("forward_curves must contain at least one scenario.")
+    inventories = np.asarray(inventories, dtype=np.float64)
+    if inventories.ndim == 0:
+        inventories = np.full(num_scenarios, inventories.item())
+    if inventories.shape != (num_scenarios,):
+        raise ValueError("Number of inventories must equal number of forward_curves scenarios.")
+
     time_period_type = utils.FREQ_TO_PERIOD_TYPE[cmdty_storage.freq]
+    net_forward_curves = _clr.dotnet_cols_gen.List[_clr.ts.TimeSeries[time_period_type, _clr.dotnet.Double]](num_scenarios)
+    for _, forward_curve in forward_curves.items():
+        net_forward_curves.Add(utils.series_to_double_time_series(forward_curve, time_period_type))
+    net_inventories = utils.numpy_to_net_double_array(inventories)
+
+    intrinsic_calc = _create_intrinsic_calc(cmdty_storage, val_date, float(inventories[0]), net_forward_curves[0], interest_rates,
+                                            settlement_rule, num_inventory_grid_points, numerical_tolerance, grid,
+                                            decision_freq)
+
+    net_batch_results = _clr.net_cs.IIntrinsicCalculate[time_period_type](intrinsic_calc).CalculateBatch(net_inventories,
+                                                                                                  net_forward_curves)
+
+    npvs = np.fromiter((net_val_results.NetPresentValue for net_val_results in net_batch_results), dtype=np.float64,
+                       count=num_scenarios)
+    profiles = None
+    if return_profiles:
+        profiles = pd.concat([_profile_data_frame(net_val_results, cmdty_storage.freq) for net_val_results in net_batch_results],
+                             keys=forward_curves.columns, names=['scenario', 'period'])
 
-    intrinsic_calc = net_cs.IntrinsicStorageValuation[time_period_type].ForStorage(cmdty_storage.net_storage)
+    return IntrinsicBatchValuationResults(npvs, profiles)
+
+
+def _create_intrinsic_calc(cmdty_storage, val_date, inventory, net_forward_curve, interest_rates, settlement_rule,
+                           num_inventory_grid_points, numerical_tolerance, grid='uniform', decision_freq=None):
+    time_period_type = utils.FREQ_TO_PERIOD_TYPE[cmdty_storage.freq]
 
-    net_cs.IIntrinsicAddStartingInventory[time_period_type](intrinsic_calc).WithStartingInventory(inventory)
+    intrinsic_calc = _clr.net_cs.IntrinsicStorageValuation[time_period_type].ForStorage(cmdty_storage.net_storage)
+
+    _clr.net_cs.IIntrinsicAddStartingInventory[time_period_type](intrinsic_calc).WithStartingInventory(inventory)
 
     current_period = utils.from_datetime_like(val_date, time_period_type)
-    net_cs.IIntrinsicAddCurrentPeriod[time_period_type](intrinsic_calc).ForCurrentPeriod(current_period)
+    _clr.net_cs.IIntrinsicAddCurrentPeriod[time_period_type](intrinsic_calc).ForCurrentPeriod(current_period)
 
-    net_forward_curve = utils.series_to_double_time_series(forward_curve, time_period_type)
-    net_cs.IIntrinsicAddForwardCurve[time_period_type](intrinsic_calc).WithForwardCurve(net_forward_curve)
+    _clr.net_cs.IIntrinsicAddForwardCurve[time_period_type](intrinsic_calc).WithForwardCurve(net_forward_curve)
 
-    net_settlement_rule = utils.wrap_settle_for_dotnet(settlement_rule, cmdty_storage.freq)
-    net_cs.IIntrinsicAddCmdtySettlementRule[time_period_type](intrinsic_calc).WithCmdtySettlementRule(net_settlement_rule)
+    net_settlement_rule = utils.settlement_rule_for_dotnet(settlement_rule, cmdty_storage.freq,
+                                                          cmdty_storage.periods)
+    _clr.net_cs.IIntrinsicAddCmdtySettlementRule[time_period_type](intrinsic_calc).WithCmdtySettlementRule(net_settlement_rule)
     
-    interest_rate_time_series = utils.series_to_double_time_series(interest_rates, utils.FREQ_TO_PERIOD_TYPE['D'])
-    net_cs.IntrinsicStorageValuationExtensions.WithAct365ContinuouslyCompoundedInterestRateCurve[time_period_type](intrinsic_calc, interest_rate_time_series)
+    net_discount_factor_curve = utils.discount_factor_curve_for_dotnet(interest_rates, val_date, cmdty_storage.freq)
+    _clr.net_cs.IntrinsicStorageValuationExtensions.WithDiscountFactorCurve[time_period_type](intrinsic_calc, net_discount_factor_curve)
+
+    if grid == 'adaptive':
+        _clr.net_cs.IntrinsicStorageValuationExtensions.WithAdaptiveInventoryGrid[time_period_type](
+            intrinsic_calc, num_inventory_grid_points, nps.ADAPTIVE_GRID_REFINEMENT_FACTOR, nps.ADAPTIVE_GRID_REFINEMENT_WIDTH)
+    else:
+        _clr.net_cs.IntrinsicStorageValuationExtensions.WithFixedNumberOfPointsOnGlobalInventoryRange[time_period_type](intrinsic_calc, num_inventory_grid_points)
+
+    _clr.net_cs.IntrinsicStorageValuationExtensions.WithLinearInventorySpaceInterpolation[time_period_type](intrinsic_calc)
 
-    net_cs.IntrinsicStorageValuationExtensions.WithFixedNumberOfPointsOnGlobalInventoryRange[time_period_type](intrinsic_calc, num_inventory_grid_points)
+    _clr.net_cs.IIntrinsicAddNumericalTolerance[time_period_type](intrinsic_calc).WithNumericalTolerance(numerical_tolerance)
 
-    net_cs.IntrinsicStorageValuationExtensions.WithLinearInventorySpaceInterpolation[time_period_type](intrinsic_calc)
+    if decision_freq is not None:
+        net_decision_schedule = utils.decision_schedule_for_dotnet(decision_freq, cmdty_storage.freq,
+                                                                   cmdty_storage.periods)
+        _clr.net_cs.IIntrinsicCalculate[time_period_type](intrinsic_calc).WithDecisionSchedule(net_decision_schedule)
 
-    net_cs.IIntrinsicAddNumericalTolerance[time_period_type](intrinsic_calc).WithNumericalTolerance(numerical_tolerance)
+    return intrinsic_calc
 
-    net_val_results = net_cs.IIntrinsicCalculate[time_period_type](intrinsic_calc).Calculate()
 
+def _profile_data_frame(net_val_results, freq):
     net_profile = net_val_results.StorageProfile
     if net_profile.Count == 0:
-        index = pd.PeriodIndex(data=[], freq=cmdty_storage.freq)
+        index = pd.PeriodIndex(data=[], freq=freq)
     else:
         profile_start = utils.net_datetime_to_py_datetime(net_profile.Indices[0].Start)
-        index = pd.period_range(start=profile_start, freq=cmdty_storage.freq, periods=net_profile.Count)
-
-    inventories = [None] * net_profile.Count
-    inject_withdraw_volumes = [None] * net_profile.Count
-    cmdty_consumed = [None] * net_profile.Count
-    inventory_loss = [None] * net_profile.Count
-    net_position = [None] * net_profile.Count
-
-    for i, profile_data in enumerate(net_profile.Data):
-        inventories[i] = profile_data.Inventory
-        inject_withdraw_volumes[i] = profile_data.InjectWithdrawVolume
-        cmdty_consumed[i] = profile_data.CmdtyConsumed
-        inventory_loss[i] = profile_data.InventoryLoss
-        net_position[i] = profile_data.NetPosition
-
-    data_frame_data = {'inventory' : inventories, 'inject_withdraw_volume' : inject_withdraw_volumes,
-                  'cmdty_consumed' : cmdty_consumed, 'inventory_loss' : inventory_loss, 'net_position' : net_position}
-    data_frame = pd.DataFrame(data=data_frame_data, index=index)
-    
-    return IntrinsicValuationResults(net_val_results.NetPresentValue, data_frame)
+        index = pd.period_range(start=profile_start, freq=freq, periods=net_profile.Count)
+
+    net_profile_arrays = net_val_results.GetStorageProfileArrays()
+    data_frame_data = {'inventory' : utils.net_double_array_to_numpy(net_profile_arrays.Inventory),
+                       'inject_withdraw_volume' : utils.net_double_array_to_numpy(net_profile_arrays.InjectWithdrawVolume),
+                       'cmdty_consumed' : utils.net_double_array_to_numpy(net_profile_arrays.CmdtyConsumed),
+                       'inventory_loss' : utils.net_double_array_to_numpy(net_profile_arrays.InventoryLoss),
+                       'net_position' : utils.net_double_array_to_numpy(net_profile_arrays.NetPosition)}
+    return pd.DataFrame(data=data_frame_data, index=index)
@@ -0,0 +1,392 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import NamedTuple, Union, Callable, Sequence, Tuple, Optional, List
+from cmdty_storage import utils, CmdtyStorage, numpy_storage as nps
+
+
+class LsmcValuationResults(NamedTuple):
+    """
+    Attributes:
+        npv: mean of the discounted cash flows on the valuation paths from following the decisions implied by the
+            regressed continuation values.
+        standard_error: standard error of npv.
+        expected_profile: mean inventory, at the end of each period, and volumes over the valuation paths.
+    """
+    npv: float
+    standard_error: float
+    expected_profile: pd.DataFrame
+
+
+FactorsType = Sequence[Tuple[float, Union[float, pd.Series]]]
+
+
+def lsmc_value(cmdty_storage: CmdtyStorage,
+               val_date: utils.TimePeriodSpecType,
+               inventory: Union[float, int],
+               forward_curve: pd.Series,
+               interest_rates: pd.Series,
+               settlement_rule: Callable[[pd.Period], date],
+               factors: FactorsType,
+               factor_corrs: Union[None, float, np.ndarray] = None,
+               num_paths: int = 10000,
+               batch_size: int = 2000,
+               basis_degree: int = 2,
+               seed: Optional[int] = None,
+               num_threads: int = 1,
+               num_inventory_grid_points: int = 100,
+               numerical_tolerance: float = 1E-12) -> LsmcValuationResults:
+    """
+    Calculates the value of commodity storage using Least-Squares Monte Carlo with a multi-factor price process.
+
+    The spot price is the forward price multiplied by the exponential of the sum of mean-reverting Gaussian factors,
+    less half their variance, so that the expected spot price equals the forward price. Continuation values on the
+    inventory grid are regressed on polynomials of the factors in a backward pass, then the storage is valued on a
+    second, independent, set of paths simulated forward, exercising the decisions implied by the regressions.
+
+    Paths are simulated and regressed in batches of batch_size, accumulating the regression normal equations, so
+    memory use is proportional to batch_size and the inventory grid, but not the number of time steps. In the backward
+    pass factors are simulated backward in time, from their distribution conditional on the next time step.
+
+    Args:
+        settlement_rule (callable): Mapping function from pandas.Period type to the date on which the cmdty delivered in
+            this period is settled. The pandas.Period parameter will have freq equal to the cmdty_storage parameter's freq property.
+        factors (sequence): (mean reversion, volatility) tuple for each factor. Volatilities can be a float, or a
+            pandas.Series with the same freq as cmdty_storage containing values for all periods from val_date until
+            the storage end.
+        factor_corrs (float or numpy.ndarray): correlation matrix of the factors' Brownian motions. Can be None for one
+            factor, or a float for two factors.
+        num_paths (int): number of simulated paths in each of the backward and forward passes.
+        batch_size (int): number of paths simulated and regressed together.
+        basis_degree (int): maximum total degree of the polynomials in the factors used as regression basis functions.
+        seed (int): seed for the random number generator. Results are reproducible for the same seed and batch_size,
+            for any number of threads. Results differ between calls if None.
+        num_threads (int): number of threads used to process the batches of each time step in parallel.
+    """
+    if cmdty_storage.freq != forward_curve.index.freqstr:
+        raise ValueError("cmdty_storage and forward_curve have different frequencies.")
+    for _, factor_vol in factors:
+        if isinstance(factor_vol, pd.Series) and cmdty_storage.freq != factor_vol.index.freqstr:
+            raise ValueError("cmdty_storage and factor volatility have different frequencies.")
+    return _lsmc_value(cmdty_storage.storage_arrays, val_date, inventory, forward_curve, interest_rates,
+                       settlement_rule, factors, factor_corrs, num_paths, batch_size, basis_degree, seed, num_threads,
+                       num_inventory_grid_points, numerical_tolerance)
+
+
+def _lsmc_value(storage: nps.StorageArrays, val_date, inventory, forward_curve, interest_rates, settlement_rule,
+                factors, factor_corrs, num_paths, batch_size, basis_degree, seed, num_threads, num_inventory_grid_points,
+                numerical_tolerance) -> LsmcValuationResults:
+    if inventory < 0:
+        raise ValueError("Inventory cannot be negative.")
+    if num_inventory_grid_points < 3:
+        raise ValueError("num_inventory_grid_points value must be at least 3.")
+    if numerical_tolerance <= 0:
+        raise ValueError("Numerical tolerance must be positive.")
+    if num_paths < 2:
+        raise ValueError("num_paths must be at least 2.")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    if basis_degree < 1:
+        raise ValueError("basis_degree must be at least 1.")
+    if num_threads < 1:
+        raise ValueError("num_threads must be at least 1.")
+
+    current_period = pd.Period(val_date, freq=storage.freq)
+    current_period_num = storage.period_num(current_period)
+    end_num = storage.num_periods - 1
+    empty_profile = nps.profile_data_frame(pd.PeriodIndex([], freq=storage.freq), *([np.empty(0)] * 4))
+
+    if current_period_num > end_num:
+        return LsmcValuationResults(0.0, 0.0, empty_profile)
+
+    # Simulation periods run from the current period, where the factors are zero, until the storage end
+    sim_periods = pd.period_range(start=current_period, end=storage.end, freq=storage.freq)
+    forward_prices = nps.period_values(forward_curve, sim_periods)
+    if np.any(np.isnan(forward_prices)):
+        raise ValueError("Forward curve does not contain prices for all periods from {} until storage end period."
+                         .format(current_period))
+
+    if current_period_num == end_num:
+        if storage.empty_at_end:
+            if inventory > 0:
+                raise ValueError("Storage must be empty at end, but inventory is greater than zero.")
+            return LsmcValuationResults(0.0, 0.0, empty_profile)
+        if inventory < storage.min_inventory[end_num]:
+            raise ValueError("Current inventory is lower than the minimum allowed in the end period.")
+        if inventory > storage.max_inventory[end_num]:
+            raise ValueError("Current inventory is greater than the maximum allowed in the end period.")
+        return LsmcValuationResults(storage.terminal_npv(forward_prices[-1], np.array([inventory]))[0], 0.0, empty_profile)
+
+    process = _FactorProcess(sim_periods, factors, factor_corrs)
+
+    inventory_space = storage.inventory_space(inventory, current_period_num)
+    start_active = inventory_space.start_active
+    # Simulation period index of storage period number 0
+    sim_offset = -current_period_num
+
+    active_periods = storage.periods[start_active:end_num]
+    present_day = current_period.asfreq('D', how='start').ordinal
+    settlement_days = nps.settlement_day_ordinals(settlement_rule, active_periods)
+    discount_curve = nps.discount_factor_curve(interest_rates, present_day)
+    discount_factors_settlement = nps.curve_discount_factors(discount_curve, present_day, settlement_days)
+    discount_factors_costs = nps.curve_discount_factors(discount_curve, present_day,
+                                                        nps.first_day_ordinals(active_periods))
+
+    grid_spacing = (storage.max_inventory.max() - storage.min_inventory.min()) / (num_inventory_grid_points - 1)
+    if not grid_spacing > 0.0:
+        raise ValueError("Inventory grid spacing must be positive.")
+
+    num_decision_periods = end_num - start_active
+    # Element i is the inventory grid at the start of period number start_active + i, including the end period
+    inventory_grids = [np.array([float(inventory)])] + \
+                      [nps.fixed_spacing_grid(lower, upper, grid_spacing)
+                       for lower, upper in zip(inventory_space.lower, inventory_space.upper)]
+    # Decision sets on the inventory grid don't depend on the price so are calculated once for all paths
+    decision_sets = [storage.decision_set_and_costs(start_active + i, inventory_grids[i], inventory_space.lower[i],
+                                                    inventory_space.upper[i], numerical_tolerance)
+                     for i in range(num_decision_periods)]
+    basis_exponents = _basis_exponents(process.num_factors, basis_degree)
+    end_sim_index = end_num + sim_offset
+
+    def spot_prices(sim_index, factor_values):
+        return forward_prices[sim_index] * np.exp(np.sum(factor_values, axis=1) - 0.5 * process.log_spot_variances[sim_index])
+
+    def basis_functions(sim_index, factor_values):
+        return _basis_functions(process.standardised(sim_index, factor_values), basis_exponents)
+
+    def grid_storage_values(period_num, factor_values, coefficients):
+        """Storage values, with shape (num inventory grid points, num paths), at the start of period_num."""
+        active_index = period_num - start_active
+        sim_index = period_num + sim_offset
+        # Paths on the last axis, so the decision set broadcasts against them and decisions stay on axis 0
+        continuation_values = coefficients.T @ basis_functions(sim_index, factor_values).T
+        next_inventory_grid = inventory_grids[active_index + 1]
+        decision_set = nps.DecisionSet(*(array[..., np.newaxis] for array in decision_sets[active_index]))
+        decision_set = decision_set._replace(zero_decision_valid=np.broadcast_to(
+                            decision_set.zero_decision_valid, (len(decision_set.inventories), len(factor_values))))
+
+        def continuation_value(inventories_after_decision):
+            # Interpolated for all paths at once, with the paths axis of the result moved last
+            return np.moveaxis(nps.linear_interpolate(next_inventory_grid, continuation_values.T,
+                                                      inventories_after_decision[..., 0]), 0, -1)
+
+        return nps.optimal_decisions_for_set(decision_set, spot_prices(sim_index, factor_values), continuation_value,
+                                             discount_factors_settlement[active_index],
+                                             discount_factors_costs[active_index]).storage_npv
+
+    batch_sizes = [min(batch_size, num_paths - batch_start) for batch_start in range(0, num_paths, batch_size)]
+    backward_seed_seq, forward_seed_seq = np.random.SeedSequence(seed).spawn(2)
+    backward_rngs = [np.random.default_rng(seed_seq) for seed_seq in backward_seed_seq.spawn(len(batch_sizes))]
+    forward_rngs = [np.random.default_rng(seed_seq) for seed_seq in forward_seed_seq.spawn(len(batch_sizes))]
+
+    # Element i holds the coefficients, with shape (num basis functions, num inventory grid points of period number
+    # start_active + i + 1), of the regression of storage values at the start of the next period
+    regression_coefficients: List[Optional[np.ndarray]] = [None] * num_decision_periods
+    factor_values_by_batch = [None] * len(batch_sizes)
+
+    def backward_step(batch_num, period_num):
+        """
+        Storage values for the batch at the start of period_num + 1, from the factors held for the batch, then the
+        factors are simulated back to period_num. Returns the batch contribution to the regression normal equations.
+        """
+        next_factor_values = factor_values_by_batch[batch_num]
+        if period_num + 1 == end_num:
+            next_values = storage.terminal_npv(spot_prices(end_sim_index, next_factor_values),
+                                               inventory_grids[-1][:, np.newaxis])
+        else:
+            next_values = grid_storage_values(period_num + 1, next_factor_values,
+                                              regression_coefficients[period_num + 1 - start_active])
+        factor_values = process.sample_previous(period_num + sim_offset, next_factor_values, backward_rngs[batch_num])
+        factor_values_by_batch[batch_num] = factor_values
+        basis = basis_functions(period_num + sim_offset, factor_values)
+        return basis.T @ basis, basis.T @ next_values.T
+
+    def forward_batch(batch_num):
+        """Simulates the batch forward following the regressed decisions, returning the path NPVs and profile sums."""
+        rng = forward_rngs[batch_num]
+        factor_values = np.zeros((batch_sizes[batch_num], process.num_factors))
+        for sim_index in range(start_active + sim_offset):
+            factor_values = process.sample_next(sim_index, factor_values, rng)
+        inventories = np.full(batch_sizes[batch_num], float(inventory))
+        path_npvs = np.zeros(batch_sizes[batch_num])
+        profile_sums = np.empty((num_decision_periods, 4))
+        for active_index in range(num_decision_periods):
+            period_num = start_active + active_index
+            sim_index = period_num + sim_offset
+            cmdty_prices = spot_prices(sim_index, factor_values)
+            continuation_values = basis_functions(sim_index, factor_values) @ regression_coefficients[active_index]
+            next_inventory_grid = inventory_grids[active_index + 1]
+            decision_set = storage.decision_set_and_costs(period_num, inventories, inventory_space.lower[active_index],
+                                                          inventory_space.upper[active_index], numerical_tolerance)
+            decisions = nps.optimal_decisions_for_set(
+                            decision_set, cmdty_prices,
+                            lambda inventories_after_decision: nps.path_linear_interpolate(
+                                next_inventory_grid, continuation_values, inventories_after_decision),
+                            discount_factors_settlement[active_index], discount_factors_costs[active_index])
+            decision_costs, _ = storage.decision_costs_and_cmdty_consumed(period_num, decisions.inject_withdraw)
+            path_npvs += -(decisions.inject_withdraw + decisions.cmdty_consumed) * cmdty_prices * \
+                         discount_factors_settlement[active_index] - \
+                         (decision_costs + inventories * storage.inventory_cost[period_num]) * \
+                         discount_factors_costs[active_index]
+            inventories = inventories + decisions.inject_withdraw - decisions.inventory_loss
+            profile_sums[active_index] = [np.sum(inventories), np.sum(decisions.inject_withdraw),
+                                          np.sum(decisions.cmdty_consumed), np.sum(decisions.inventory_loss)]
+            factor_values = process.sample_next(sim_index, factor_values, rng)
+        path_npvs += storage.terminal_npv(spot_prices(end_sim_index, factor_values), inventories)
+        return path_npvs, profile_sums
+
+    # Threads rather than processes, as the batches of each step share the regression coefficients and their work is
+    # mostly in NumPy operations over all the paths of a batch, which release the GIL
+    executor = ThreadPoolExecutor(max_workers=num_threads) if num_threads > 1 else None
+    batch_map = executor.map if executor is not None else map
+    batch_nums = range(len(batch_sizes))
+    try:
+        for batch_num in batch_nums:
+            factor_values_by_batch[batch_num] = process.sample_marginal(end_sim_index, backward_rngs[batch_num],
+                                                                        batch_sizes[batch_num])
+        for period_num in range(end_num - 1, start_active - 1, -1):
+            # Normal equations are summed in batch order, so results don't depend on the number of threads
+            normal_equations = list(batch_map(backward_step, batch_nums, [period_num] * len(batch_sizes)))
+            basis_gram = sum(gram for gram, _ in normal_equations)
+            basis_values_products = sum(products for _, products in normal_equations)
+            regression_coefficients[period_num - start_active] = np.linalg.lstsq(basis_gram, basis_values_products,
+                                                                                 rcond=None)[0]
+        forward_results = list(batch_map(forward_batch, batch_nums))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    path_npvs = np.concatenate([npvs for npvs, _ in forward_results])
+    profile_means = sum(sums for _, sums in forward_results) / num_paths
+    expected_profile = nps.profile_data_frame(active_periods, *profile_means.T)
+    return LsmcValuationResults(float(np.mean(path_npvs)), float(np.std(path_npvs, ddof=1) / np.sqrt(num_paths)),
+                                expected_profile)
+
+
+class _FactorProcess:
+    """
+    Mean-reverting Gaussian factors x_i, with dx_i = -mean_reversion_i * x_i * dt + vol_i(t) * dW_i, starting at zero
+    on the first simulation period. Volatilities are constant over each period. Holds, for each simulation period, the
+    factor covariance matrix and the matrices used to sample exactly forward and backward in time between periods.
+    """
+
+    def __init__(self, sim_periods: pd.PeriodIndex, factors: FactorsType, factor_corrs):
+        self.num_factors = len(factors)
+        if self.num_factors == 0:
+            raise ValueError("At least one factor must be specified.")
+        correlations = _factor_correlations(self.num_factors, factor_corrs)
+        mean_reversions = np.array([mean_reversion for mean_reversion, _ in factors], dtype=np.float64)
+        if np.any(mean_reversions < 0):
+            raise ValueError("Factor mean reversion cannot be negative.")
+        vols = np.stack([nps.period_values(factor_vol, sim_periods) for _, factor_vol in factors], axis=1)
+        if np.any(np.isnan(vols[:-1])):
+            raise ValueError("Factor volatility does not contain values for all periods until storage end period.")
+        if np.any(vols[:-1] < 0):
+            raise ValueError("Factor volatility cannot be negative.")
+
+        start_times = sim_periods.start_time
+        time_steps = (start_times[1:] - start_times[:-1]).total_seconds().values / (365.0 * 24.0 * 60.0 * 60.0)
+        mean_reversion_sums = mean_reversions[:, np.newaxis] + mean_reversions[np.newaxis, :]
+
+        num_sim_periods = len(sim_periods)
+        self.covariances = np.zeros((num_sim_periods, self.num_factors, self.num_factors))
+        self.decays = np.empty((num_sim_periods - 1, self.num_factors))
+        self.forward_noise_roots = np.empty((num_sim_periods - 1, self.num_factors, self.num_factors))
+        self.backward_means = np.empty((num_sim_periods - 1, self.num_factors, self.num_factors))
+        self.backward_noise_roots = np.empty((num_sim_periods - 1, self.num_factors, self.num_factors))
+        for i, time_step in enumerate(time_steps):
+            decay = np.exp(-mean_reversions * time_step)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                integrated_decays = np.where(mean_reversion_sums > 0.0,
+                                             -np.expm1(-mean_reversion_sums * time_step) / mean_reversion_sums, time_step)
+            noise_covariance = correlations * np.outer(vols[i], vols[i]) * integrated_decays
+            covariance = self.covariances[i]
+            next_covariance = decay[:, np.newaxis] * covariance * decay[np.newaxis, :] + noise_covariance
+            self.covariances[i + 1] = next_covariance
+            self.decays[i] = decay
+            self.forward_noise_roots[i] = _psd_sqrt(noise_covariance)
+            # Distribution of the factors conditional on their values on the next period
+            backward_mean = (covariance * decay[np.newaxis, :]) @ np.linalg.pinv(next_covariance)
+            self.backward_means[i] = backward_mean
+            self.backward_noise_roots[i] = _psd_sqrt(covariance - backward_mean @ (decay[:, np.newaxis] * covariance))
+        self.log_spot_variances = np.sum(self.covariances, axis=(1, 2))
+        std_devs = np.sqrt(np.diagonal(self.covariances, axis1=1, axis2=2))
+        self._standardisers = np.where(std_devs > 0.0, std_devs, 1.0)
+
+    def sample_marginal(self, sim_index: int, rng: np.random.Generator, num_paths: int) -> np.ndarray:
+        return rng.standard_normal((num_paths, self.num_factors)) @ _psd_sqrt(self.covariances[sim_index]).T
+
+    def sample_next(self, sim_index: int, factor_values: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Factor values on simulation period sim_index + 1 given factor_values on sim_index."""
+        noise = rng.standard_normal(factor_values.shape) @ self.forward_noise_roots[sim_index].T
+        return factor_values * self.decays[sim_index] + noise
+
+    def sample_previous(self, sim_index: int, next_factor_values: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Factor values on simulation period sim_index given next_factor_values on sim_index + 1."""
+        noise = rng.standard_normal(next_factor_values.shape) @ self.backward_noise_roots[sim_index].T
+        return next_factor_values @ self.backward_means[sim_index].T + noise
+
+    def standardised(self, sim_index: int, factor_values: np.ndarray) -> np.ndarray:
+        return factor_values / self._standardisers[sim_index]
+
+
+def _factor_correlations(num_factors: int, factor_corrs) -> np.ndarray:
+    if factor_corrs is None:
+        if num_factors > 1:
+            raise ValueError("factor_corrs must be specified for more than one factor.")
+        return np.ones((1, 1))
+    if np.isscalar(factor_corrs):
+        if num_factors != 2:
+            raise ValueError("factor_corrs can only be a float for two factors.")
+        return np.array([[1.0, factor_corrs], [factor_corrs, 1.0]])
+    correlations = np.asarray(factor_corrs, dtype=np.float64)
+    if correlations.shape != (num_factors, num_factors):
+        raise ValueError("factor_corrs must have shape ({0}, {0}).".format(num_factors))
+    if not np.allclose(correlations, correlations.T) or not np.allclose(np.diagonal(correlations), 1.0):
+        raise ValueError("factor_corrs must be symmetric with ones on the diagonal.")
+    if np.min(np.linalg.eigvalsh(correlations)) < -1E-10:
+        raise ValueError("factor_corrs must be positive semi-definite.")
+    return correlations
+
+
+def _psd_sqrt(matrix: np.ndarray) -> np.ndarray:
+    """Symmetric square root of a positive semi-definite matrix, robust to it being singular."""
+    eigenvalues, eigenvectors = np.linalg.eigh(0.5 * (matrix + matrix.T))
+    return (eigenvectors * np.sqrt(np.maximum(eigenvalues, 0.0))) @ eigenvectors.T
+
+
+def _basis_exponents(num_factors: int, basis_degree: int) -> np.ndarray:
+    """Exponents, with shape (num basis functions, num_factors), of all monomials up to total degree basis_degree."""
+    return np.array([exponents for degree in range(basis_degree + 1)
+                     for exponents in itertools.product(range(degree + 1), repeat=num_factors)
+                     if sum(exponents) == degree])
+
+
+def _basis_functions(factor_values: np.ndarray, basis_exponents: np.ndarray) -> np.ndarray:
+    return np.prod(factor_values[:, np.newaxis, :] ** basis_exponents[np.newaxis], axis=2)
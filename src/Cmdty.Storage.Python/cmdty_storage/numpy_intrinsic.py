@@ -0,0 +1,219 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import Union, Callable, Tuple, Optional
+from cmdty_storage import numpy_storage as nps
+
+
+def intrinsic_value(storage: nps.StorageArrays,
+                    val_date,
+                    inventory: Union[float, int],
+                    forward_curve: pd.Series,
+                    interest_rates: pd.Series,
+                    settlement_rule: Callable[[pd.Period], date],
+                    num_inventory_grid_points: int,
+                    numerical_tolerance: float,
+                    grid: str = 'uniform',
+                    decision_freq: Optional[str] = None) -> Tuple[float, pd.DataFrame]:
+    """
+    Calculates the intrinsic value of commodity storage with NumPy, replicating .NET IntrinsicStorageValuation
+    using a fixed number of points on the global inventory range, or the adaptive grid if grid is 'adaptive', and
+    linear interpolation. If decision_freq is specified the inject/withdraw volume is held constant over decision
+    blocks, as .NET IntrinsicStorageValuation with a decision schedule, and backward induction is only performed over
+    the block starts.
+
+    Returns:
+        Tuple of the NPV and the storage profile pandas.DataFrame.
+    """
+    if inventory < 0:
+        raise ValueError("Inventory cannot be negative.")
+    if num_inventory_grid_points < 3:
+        raise ValueError("num_inventory_grid_points value must be at least 3.")
+    if numerical_tolerance <= 0:
+        raise ValueError("Numerical tolerance must be positive.")
+    nps.check_grid_type(grid)
+
+    current_period = pd.Period(val_date, freq=storage.freq)
+    current_period_num = storage.period_num(current_period)
+    end_num = storage.num_periods - 1
+    empty_profile = nps.profile_data_frame(pd.PeriodIndex([], freq=storage.freq), *([np.empty(0)] * 4))
+
+    if current_period_num > end_num:
+        return 0.0, empty_profile
+
+    forward_prices = nps.period_values(forward_curve, storage.periods)
+
+    if current_period_num == end_num:
+        if storage.empty_at_end:
+            if inventory > 0:
+                raise ValueError("Storage must be empty at end, but inventory is greater than zero.")
+            return 0.0, empty_profile
+        if inventory < storage.min_inventory[end_num]:
+            raise ValueError("Current inventory is lower than the minimum allowed in the end period.")
+        if inventory > storage.max_inventory[end_num]:
+            raise ValueError("Current inventory is greater than the maximum allowed in the end period.")
+        return storage.terminal_npv(forward_prices[end_num], np.array([inventory]))[0], empty_profile
+
+    inventory_space = storage.inventory_space(inventory, current_period_num)
+    start_active = inventory_space.start_active
+    if np.any(np.isnan(forward_prices[start_active:])):
+        raise ValueError("Forward curve does not contain prices for all periods from {} until storage end period."
+                         .format(storage.periods[start_active]))
+
+    active_periods = storage.periods[start_active:end_num]
+    present_day = current_period.asfreq('D', how='start').ordinal
+    settlement_days = nps.settlement_day_ordinals(settlement_rule, active_periods)
+    discount_curve = nps.discount_factor_curve(interest_rates, present_day)
+    discount_factors_settlement = nps.curve_discount_factors(discount_curve, present_day, settlement_days)
+    discount_factors_costs = nps.curve_discount_factors(discount_curve, present_day,
+                                                        nps.first_day_ordinals(active_periods))
+
+    if grid == 'adaptive':
+        grid_calc = nps.adaptive_grid_calc(storage, num_inventory_grid_points)
+    else:
+        # As .NET WithFixedNumberOfPointsOnGlobalInventoryRange, the global range runs from the lowest to highest max inventory
+        grid_spacing = (storage.max_inventory.max() - storage.max_inventory.min()) / (num_inventory_grid_points - 1)
+        if not grid_spacing > 0.0:
+            raise ValueError("Inventory grid spacing must be positive.")
+
+        def grid_calc(lower, upper):
+            return nps.fixed_spacing_grid(lower, upper, grid_spacing)
+
+    cmdty_price_at_end = forward_prices[end_num]
+
+    def terminal_value(inventories):
+        return storage.terminal_npv(cmdty_price_at_end, inventories)
+
+    def interpolated_value(inventory_grid, storage_npvs):
+        return lambda inventories: nps.linear_interpolate(inventory_grid, storage_npvs, inventories)
+
+    if decision_freq is not None:
+        return _decision_block_intrinsic_value(storage, inventory, inventory_space, forward_prices,
+                                               discount_factors_settlement, discount_factors_costs, grid_calc,
+                                               terminal_value, interpolated_value, numerical_tolerance, decision_freq)
+
+    num_periods = len(inventory_space.lower)
+    # Element i is the storage value by inventory at the start of period number start_active + i + 1
+    storage_value_by_inventory = [None] * num_periods
+    storage_value_by_inventory[-1] = terminal_value
+
+    for i in range(num_periods - 2, -1, -1):
+        period_num = start_active + i + 1
+        active_index = period_num - start_active
+        inventory_grid = grid_calc(inventory_space.lower[i], inventory_space.upper[i])
+        decisions = storage.optimal_decisions(period_num, inventory_grid, inventory_space.lower[i + 1],
+                                              inventory_space.upper[i + 1], forward_prices[period_num],
+                                              storage_value_by_inventory[i + 1], discount_factors_settlement[active_index],
+                                              discount_factors_costs[active_index], numerical_tolerance)
+        storage_value_by_inventory[i] = interpolated_value(inventory_grid, decisions.storage_npv)
+
+    # Loop forward from start inventory choosing optimal decisions
+    inventories = np.empty(num_periods)
+    inject_withdraw_volumes = np.empty(num_periods)
+    cmdty_consumed = np.empty(num_periods)
+    inventory_losses = np.empty(num_periods)
+    storage_npv = 0.0
+
+    inventory_loop = float(inventory)
+    for i in range(num_periods):
+        period_num = start_active + i
+        decisions = storage.optimal_decisions(period_num, np.array([inventory_loop]), inventory_space.lower[i],
+                                              inventory_space.upper[i], forward_prices[period_num],
+                                              storage_value_by_inventory[i], discount_factors_settlement[i],
+                                              discount_factors_costs[i], numerical_tolerance)
+        inventory_loop += decisions.inject_withdraw[0] - decisions.inventory_loss[0]
+        if i == 0:
+            storage_npv = decisions.storage_npv[0]
+        inventories[i] = inventory_loop
+        inject_withdraw_volumes[i] = decisions.inject_withdraw[0]
+        cmdty_consumed[i] = decisions.cmdty_consumed[0]
+        inventory_losses[i] = decisions.inventory_loss[0]
+
+    profile = nps.profile_data_frame(active_periods, inventories, inject_withdraw_volumes, cmdty_consumed, inventory_losses)
+    return storage_npv, profile
+
+
+def _decision_block_intrinsic_value(storage, inventory, inventory_space, forward_prices, discount_factors_settlement,
+                                    discount_factors_costs, grid_calc, terminal_value, interpolated_value,
+                                    numerical_tolerance, decision_freq):
+    start_active = inventory_space.start_active
+    end_num = storage.num_periods - 1
+    block_starts = storage.decision_block_starts(start_active, decision_freq)
+    block_ends = np.append(block_starts[1:], end_num)
+    num_blocks = len(block_starts)
+    # Element i is the storage value by inventory at the start of block i, with the terminal value last
+    storage_value_by_inventory = [None] * (num_blocks + 1)
+    storage_value_by_inventory[-1] = terminal_value
+
+    def block_storage_npvs(block_index, inventories):
+        """Decision set of block block_index for inventories, and the storage NPV for each decision."""
+        block_start, block_end = block_starts[block_index], block_ends[block_index]
+        active_slice = slice(block_start - start_active, block_end - start_active)
+        decisions, zero_decision_valid = storage.block_decision_set(block_start, block_end - block_start, inventories,
+                                                                    inventory_space.lower[active_slice.stop - 1],
+                                                                    inventory_space.upper[active_slice.stop - 1],
+                                                                    numerical_tolerance)
+        discounted_volumes, cost_npvs, inventories_after_block = storage.block_volumes_and_costs(block_start,
+                        inventories, decisions, discount_factors_settlement[active_slice], discount_factors_costs[active_slice])
+        storage_npvs = storage_value_by_inventory[block_index + 1](inventories_after_block) - \
+                       np.tensordot(forward_prices[block_start:block_end], discounted_volumes, axes=1) - cost_npvs
+        storage_npvs[1, ~zero_decision_valid] = -np.inf
+        return decisions, storage_npvs
+
+    # The first block only has the starting inventory, so is valued in the forward loop
+    for block_index in range(num_blocks - 1, 0, -1):
+        active_index = block_starts[block_index] - start_active
+        inventory_grid = grid_calc(inventory_space.lower[active_index - 1], inventory_space.upper[active_index - 1])
+        _, storage_npvs = block_storage_npvs(block_index, inventory_grid)
+        storage_value_by_inventory[block_index] = interpolated_value(inventory_grid, np.max(storage_npvs, axis=0))
+
+    # Loop forward from start inventory choosing optimal decisions, held for each period of the block
+    num_periods = end_num - start_active
+    inventories = np.empty(num_periods)
+    inject_withdraw_volumes = np.empty(num_periods)
+    cmdty_consumed = np.empty(num_periods)
+    inventory_losses = np.empty(num_periods)
+    storage_npv = 0.0
+
+    inventory_loop = float(inventory)
+    for block_index in range(num_blocks):
+        decisions, storage_npvs = block_storage_npvs(block_index, np.array([inventory_loop]))
+        optimal_index = np.argmax(storage_npvs[:, 0])
+        if block_index == 0:
+            storage_npv = storage_npvs[optimal_index, 0]
+        decision = decisions[optimal_index, 0]
+        for period_num in range(block_starts[block_index], block_ends[block_index]):
+            i = period_num - start_active
+            inventory_losses[i] = storage.inventory_loss[period_num] * inventory_loop
+            cmdty_consumed[i] = storage.decision_costs_and_cmdty_consumed(period_num, np.array([decision]))[1][0]
+            inventory_loop += decision - inventory_losses[i]
+            inventories[i] = inventory_loop
+            inject_withdraw_volumes[i] = decision
+
+    profile = nps.profile_data_frame(storage.periods[start_active:end_num], inventories, inject_withdraw_volumes,
+                                     cmdty_consumed, inventory_losses)
+    return storage_npv, profile
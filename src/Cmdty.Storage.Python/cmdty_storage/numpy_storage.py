@@ -0,0 +1,785 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import NamedTuple, Optional, Callable, Tuple, Union
+from cmdty_storage.terminal_npv import LinearTerminalNpv, PiecewiseLinearTerminalNpv
+from cmdty_storage.settlement_rules import DaysAfterMonthEnd, SamePeriod
+
+
+class InjectWithdrawTable(NamedTuple):
+    """Piecewise linear inject/withdraw rates by inventory, equivalent to .NET PiecewiseLinearInjectWithdrawConstraint."""
+    inventories: np.ndarray
+    min_rates: np.ndarray
+    max_rates: np.ndarray
+
+
+class InventorySpace(NamedTuple):
+    start_active: int
+    lower: np.ndarray
+    upper: np.ndarray
+    forward_min: Optional[np.ndarray] = None
+    forward_max: Optional[np.ndarray] = None
+
+
+class InventorySpaceCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+    capacity: int
+
+
+class DecisionSet(NamedTuple):
+    """Price independent part of the optimal decision calculation for an array of inventories in one period."""
+    inventories: np.ndarray
+    decisions: np.ndarray
+    inventory_losses: np.ndarray
+    zero_decision_valid: np.ndarray
+    decision_costs: np.ndarray
+    cmdty_consumed: np.ndarray
+    inventory_costs: np.ndarray
+
+
+class OptimalDecisions(NamedTuple):
+    storage_npv: np.ndarray
+    inject_withdraw: np.ndarray
+    cmdty_consumed: np.ndarray
+    inventory_loss: np.ndarray
+
+
+def linear_interpolate(x_coords: np.ndarray, y_coords: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    Linear interpolation with linear extrapolation from the first and last segments, as MathNet LinearSpline.
+    A single point gives a constant function, as .NET LinearInterpolatorFactory. y_coords can have leading dimensions,
+    for example one row per tree price level, in which case the result has shape y_coords.shape[:-1] + x.shape.
+    """
+    if len(x_coords) == 1:
+        return y_coords[..., np.zeros(np.shape(x), dtype=np.intp)]
+    segment = np.clip(np.searchsorted(x_coords, x, side='right') - 1, 0, len(x_coords) - 2)
+    x_left = x_coords[segment]
+    y_left = y_coords[..., segment]
+    gradient = (y_coords[..., segment + 1] - y_left) / (x_coords[segment + 1] - x_left)
+    return y_left + (x - x_left) * gradient
+
+
+def path_linear_interpolate(x_coords: np.ndarray, y_coords: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    As linear_interpolate, but with a row of y_coords for each path, interpolated at the element of x, which has paths
+    on the last axis, for that path.
+    """
+    if len(x_coords) == 1:
+        return np.broadcast_to(y_coords[:, 0], np.shape(x)).copy()
+    segment = np.clip(np.searchsorted(x_coords, x, side='right') - 1, 0, len(x_coords) - 2)
+    path_indices = np.arange(len(y_coords))
+    x_left = x_coords[segment]
+    y_left = y_coords[path_indices, segment]
+    gradient = (y_coords[path_indices, segment + 1] - y_left) / (x_coords[segment + 1] - x_left)
+    return y_left + (x - x_left) * gradient
+
+
+def fixed_spacing_grid(lower: float, upper: float, spacing: float) -> np.ndarray:
+    """Grid points as .NET FixedSpacingStateSpaceGridCalc, accumulating the spacing one step at a time."""
+    if lower > upper:
+        raise ValueError("lower value cannot be above upper value.")
+    if lower == upper:
+        return np.array([lower])
+    max_num_steps = int(np.ceil((upper - lower) / spacing)) + 2
+    grid = np.add.accumulate(np.concatenate(([lower], np.full(max_num_steps, spacing))))
+    last_index = np.argmax(grid[1:] >= upper) + 1
+    grid = grid[:last_index + 1]
+    grid[last_index] = upper
+    return grid
+
+
+def adaptive_grid(lower: float, upper: float, spacing: float, refined_spacing: float, refinement_width: float,
+                  breakpoints: np.ndarray) -> np.ndarray:
+    """
+    Grid points as .NET AdaptiveStateSpaceGridCalc, with breakpoints inside the bounds included, points within
+    refinement_width of a breakpoint or bound refined_spacing apart, and other points at most spacing apart.
+    breakpoints must be sorted in ascending order.
+    """
+    if lower > upper:
+        raise ValueError("lower value cannot be above upper value.")
+    grid = [lower]
+    if lower == upper:
+        return np.array(grid)
+    half_refined_spacing = refined_spacing / 2.0
+    segment_start = lower
+    breakpoint_index = 0
+    while segment_start < upper:
+        # Breakpoints closer than half the refined spacing to the previous grid point or the upper bound are skipped
+        while breakpoint_index < len(breakpoints) and breakpoints[breakpoint_index] <= segment_start + half_refined_spacing:
+            breakpoint_index += 1
+        if breakpoint_index < len(breakpoints) and breakpoints[breakpoint_index] < upper - half_refined_spacing:
+            segment_end = float(breakpoints[breakpoint_index])
+        else:
+            segment_end = upper
+        grid_point = segment_start
+        while True:
+            if grid_point - segment_start < refinement_width or segment_end - grid_point <= refinement_width:
+                step = refined_spacing
+            else:
+                step = max(min(spacing, segment_end - refinement_width - grid_point), refined_spacing)
+            grid_point += step
+            if grid_point > segment_end - half_refined_spacing:
+                break
+            grid.append(grid_point)
+        grid.append(segment_end)
+        segment_start = segment_end
+    return np.array(grid)
+
+
+def bang_bang_decision_set(min_rates, max_rates, inventories, inventory_losses, next_step_min_inventory,
+                           next_step_max_inventory, numerical_tolerance) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorised equivalent of .NET StorageHelper.CalculateBangBangDecisionSet. Returns the arrays of withdrawal and
+    injection decisions. The zero decision is part of the set where withdrawal is negative and injection positive.
+    """
+    if next_step_min_inventory > next_step_max_inventory:
+        raise ValueError("next_step_min_inventory value cannot be higher than next_step_max_inventory value.")
+
+    inventories_after_loss = inventories - inventory_losses
+
+    inventories_after_max_withdrawal = min_rates + inventories_after_loss
+    if np.any(inventories_after_max_withdrawal - next_step_max_inventory >= numerical_tolerance):
+        raise ValueError("Inventory constraints cannot be fulfilled. This could potentially be fixed by increasing the numerical tolerance.")
+    withdrawals = np.where(inventories_after_max_withdrawal > next_step_max_inventory,
+                           next_step_max_inventory - inventories_after_loss,
+                           np.where(inventories_after_max_withdrawal > next_step_min_inventory, min_rates,
+                                    next_step_min_inventory - inventories_after_loss))
+
+    inventories_after_max_injection = max_rates + inventories_after_loss
+    if np.any(next_step_min_inventory - inventories_after_max_injection >= numerical_tolerance):
+        raise ValueError("Inventory constraints cannot be fulfilled. This could potentially be fixed by increasing the numerical tolerance.")
+    injections = np.where(inventories_after_max_injection < next_step_min_inventory,
+                          next_step_min_inventory - inventories_after_loss,
+                          np.where(inventories_after_max_injection < next_step_max_inventory, max_rates,
+                                   next_step_max_inventory - inventories_after_loss))
+
+    return withdrawals, injections
+
+
+def decision_period_flags(periods: pd.PeriodIndex, decision_freq: str) -> np.ndarray:
+    """
+    Boolean array which is True for each of periods which starts on a boundary of decision_freq, a pandas Offset
+    Alias such as '4H', so starts a decision block. Fixed frequencies are aligned as pandas.DatetimeIndex.floor, so
+    '4H' blocks start at midnight, 04:00 and so on.
+    """
+    start_times = periods.start_time
+    try:
+        block_start_times = start_times.floor(decision_freq)
+    except ValueError:
+        # Frequencies of varying length, such as 'M', can't be used to floor
+        block_start_times = start_times.to_period(decision_freq).start_time
+    return np.asarray(block_start_times == start_times)
+
+
+def discount_factor_curve(interest_rates: pd.Series, present_day: int) -> np.ndarray:
+    """
+    Dense Act/365 continuously compounded discount factor curve from the daily interest_rates curve. Element i is the
+    discount factor for the day i days after present_day, a pandas daily Period ordinal, with NaN for days without an
+    interest rate. Element 0 is 1.0.
+    """
+    rate_days = _period_values_index(interest_rates, 'D').asi8
+    rate_values = interest_rates.values.astype(np.float64)
+    after_present = rate_days > present_day
+    day_offsets = rate_days[after_present] - present_day
+    curve = np.full(day_offsets.max() + 1 if len(day_offsets) > 0 else 1, np.nan)
+    curve[0] = 1.0
+    curve[day_offsets] = np.exp(-day_offsets / 365.0 * rate_values[after_present])
+    return curve
+
+
+def curve_discount_factors(curve: np.ndarray, present_day: int, cash_flow_days: np.ndarray) -> np.ndarray:
+    """
+    Looks up discount factors for cash_flow_days, pandas daily Period ordinals, from a curve created by
+    discount_factor_curve. Cash flows on or before present_day have discount factor 1.0.
+    """
+    day_offsets = np.maximum(np.asarray(cash_flow_days, dtype=np.int64) - present_day, 0)
+    missing = day_offsets >= len(curve)
+    missing[~missing] = np.isnan(curve[day_offsets[~missing]])
+    if np.any(missing):
+        missing_day = pd.Period(ordinal=int(present_day + day_offsets[missing][0]), freq='D')
+        raise ValueError("Interest rate curves does not contain point for date {}.".format(missing_day))
+    return curve[day_offsets]
+
+
+def discount_factors(interest_rates: pd.Series, present_day: int, cash_flow_days: np.ndarray) -> np.ndarray:
+    """
+    Act/365 continuously compounded discount factors from the daily interest_rates curve. present_day and
+    cash_flow_days are pandas daily Period ordinals.
+    """
+    return curve_discount_factors(discount_factor_curve(interest_rates, present_day), present_day, cash_flow_days)
+
+
+def first_day_ordinals(periods: pd.PeriodIndex) -> np.ndarray:
+    """Ordinals of the day containing the start of each period, as .NET ITimePeriod.First<Day>()."""
+    return periods.asfreq('D', how='start').asi8
+
+
+def settlement_day_ordinals(settlement_rule: Callable[[pd.Period], date], periods: pd.PeriodIndex) -> np.ndarray:
+    """
+    Daily Period ordinals of the settlement day for each of periods. Built-in rules from the settlement_rules module are
+    evaluated vectorized, other callables once per period.
+    """
+    if isinstance(settlement_rule, (DaysAfterMonthEnd, SamePeriod)):
+        return settlement_rule.settlement_day_ordinals(periods)
+    settle_days = np.empty(len(periods), dtype=np.int64)
+    for i, period in enumerate(periods):
+        settle_date = settlement_rule(period)
+        settle_days[i] = pd.Period(date(settle_date.year, settle_date.month, settle_date.day), freq='D').ordinal
+    return settle_days
+
+
+def period_values(data, periods: pd.PeriodIndex) -> np.ndarray:
+    """Values of a scalar or pandas.Series input for each of periods, with nan for periods not in the Series."""
+    if data is None:
+        return np.zeros(len(periods))
+    if isinstance(data, pd.Series):
+        series = pd.Series(data.values, index=_period_values_index(data, periods.freq))
+        return series.reindex(periods).values.astype(np.float64)
+    return np.full(len(periods), float(data))
+
+
+def _period_values_index(series: pd.Series, freq) -> pd.PeriodIndex:
+    if isinstance(series.index, pd.DatetimeIndex):
+        return series.index.to_period(freq)
+    return pd.PeriodIndex(series.index, freq=freq)
+
+
+GRID_TYPES = ('uniform', 'adaptive')
+# As the defaults of .NET WithAdaptiveInventoryGrid
+ADAPTIVE_GRID_REFINEMENT_FACTOR = 4
+ADAPTIVE_GRID_REFINEMENT_WIDTH = 3.0
+
+
+def profile_data_frame(index: pd.PeriodIndex, inventories: np.ndarray, inject_withdraw_volumes: np.ndarray,
+                       cmdty_consumed: np.ndarray, inventory_losses: np.ndarray) -> pd.DataFrame:
+    """Storage profile with the columns of the .NET engine intrinsic valuation profile."""
+    data_frame_data = {'inventory' : inventories,
+                       'inject_withdraw_volume' : inject_withdraw_volumes,
+                       'cmdty_consumed' : cmdty_consumed,
+                       'inventory_loss' : inventory_losses,
+                       'net_position' : -inject_withdraw_volumes - cmdty_consumed}
+    return pd.DataFrame(data=data_frame_data, index=index)
+
+
+def check_grid_type(grid: str):
+    if grid not in GRID_TYPES:
+        raise ValueError("grid parameter value must be one of {}, not '{}'.".format(GRID_TYPES, grid))
+
+
+def adaptive_grid_calc(storage: 'StorageArrays', num_inventory_grid_points: int) -> Callable[[float, float], np.ndarray]:
+    """
+    Function of the inventory space bounds returning an adaptive_grid, as .NET WithAdaptiveInventoryGrid. The spacing
+    away from breakpoints and bounds is the global inventory range divided by num_inventory_grid_points - 1.
+    """
+    spacing = (storage.max_inventory.max() - storage.min_inventory.min()) / (num_inventory_grid_points - 1)
+    if not spacing > 0.0:
+        raise ValueError("Inventory grid spacing must be positive.")
+    refined_spacing = spacing / ADAPTIVE_GRID_REFINEMENT_FACTOR
+    refinement_width = spacing * ADAPTIVE_GRID_REFINEMENT_WIDTH
+    breakpoints = storage.inventory_breakpoints()
+    return lambda lower, upper: adaptive_grid(lower, upper, spacing, refined_spacing, refinement_width, breakpoints)
+
+
+# Maximum number of inventory spaces cached by each StorageArrays instance, as .NET InventorySpaceCache.DefaultCapacity
+INVENTORY_SPACE_CACHE_CAPACITY = 64
+
+
+class StorageArrays:
+    """
+    Storage parameters as arrays over all periods from storage start to storage end inclusive. Periods are referred
+    to by period number, their offset from the storage start period.
+
+    Used by the NumPy valuation engines, this class has no dependency on pythonnet. Calculations follow the .NET
+    Cmdty.Storage implementation, including the order of floating point operations.
+    """
+
+    def __init__(self,
+                 freq: str,
+                 storage_start,
+                 storage_end,
+                 injection_cost,
+                 withdrawal_cost,
+                 constraints=None,
+                 min_inventory=None,
+                 max_inventory=None,
+                 max_injection_rate=None,
+                 max_withdrawal_rate=None,
+                 cmdty_consumed_inject=None,
+                 cmdty_consumed_withdraw=None,
+                 terminal_storage_npv: Optional[Callable[[float, float], float]] = None,
+                 inventory_loss=None,
+                 inventory_cost=None):
+        self.freq = freq
+        self.start = pd.Period(storage_start, freq=freq)
+        self.end = pd.Period(storage_end, freq=freq)
+        self.periods = pd.period_range(start=self.start, end=self.end, freq=freq)
+        num_periods = len(self.periods)
+
+        self.min_rates = np.full(num_periods, np.nan)
+        self.max_rates = np.full(num_periods, np.nan)
+        self.inject_withdraw_tables = [None] * num_periods
+
+        if constraints is not None:
+            self.min_inventory = np.empty(num_periods)
+            self.max_inventory = np.empty(num_periods)
+            constraints = sorted(((pd.Period(period, freq=freq), rates_by_inventory) for period, rates_by_inventory in constraints),
+                                 key=lambda constraint: constraint[0])
+            constraint_periods = pd.PeriodIndex([period for period, _ in constraints], freq=freq)
+            # Each period uses the most recent constraint, as .NET CmdtyStorageBuilderExtensions
+            constraint_positions = np.searchsorted(constraint_periods.asi8, self.periods.asi8, side='right') - 1
+            if constraint_positions[0] < 0:
+                raise ValueError("constraints do not start until after the storage start period.")
+            for constraint_position in np.unique(constraint_positions):
+                period_mask = constraint_positions == constraint_position
+                rates_by_inventory = sorted(constraints[constraint_position][1], key=lambda row: row[0])
+                inventories, min_rates, max_rates = (np.array(column, dtype=np.float64) for column in zip(*rates_by_inventory))
+                self.min_inventory[period_mask] = inventories.min()
+                self.max_inventory[period_mask] = inventories.max()
+                if len(inventories) == 2 and min_rates[0] == min_rates[1] and max_rates[0] == max_rates[1]:
+                    self.min_rates[period_mask] = min_rates[0]
+                    self.max_rates[period_mask] = max_rates[0]
+                else:
+                    table = InjectWithdrawTable(inventories, min_rates, max_rates)
+                    for period_num in np.flatnonzero(period_mask):
+                        self.inject_withdraw_tables[period_num] = table
+        else:
+            self.min_inventory = period_values(min_inventory, self.periods)
+            self.max_inventory = period_values(max_inventory, self.periods)
+            self.min_rates = -period_values(max_withdrawal_rate, self.periods)
+            self.max_rates = period_values(max_injection_rate, self.periods)
+
+        self.empty_at_end = terminal_storage_npv is None
+        if self.empty_at_end:
+            self.max_inventory[-1] = 0.0
+        self.terminal_storage_npv = terminal_storage_npv
+
+        self.injection_cost = period_values(injection_cost, self.periods)
+        self.withdrawal_cost = period_values(withdrawal_cost, self.periods)
+        self.cmdty_consumed_inject = period_values(cmdty_consumed_inject, self.periods)
+        self.cmdty_consumed_withdraw = period_values(cmdty_consumed_withdraw, self.periods)
+        self.inventory_loss = period_values(inventory_loss, self.periods)
+        self.inventory_cost = period_values(inventory_cost, self.periods)
+
+        # Inventory bounds implied by the constraints of later periods, calculated on demand back from the end period.
+        # Held as a (lowest period number, min, max) tuple of read-only arrays, replaced as a whole when extended
+        self._backward_bounds = None
+
+        # Least recently used memo of inventory_space results, keyed on starting inventory and start active period number
+        self._inventory_space_cache = OrderedDict()
+        self._inventory_space_cache_lock = threading.Lock()
+        self._inventory_space_cache_hits = 0
+        self._inventory_space_cache_misses = 0
+
+    def __getstate__(self):
+        # Pickled, for example to send to a worker process, without the lock or inventory space memo
+        state = self.__dict__.copy()
+        del state['_inventory_space_cache_lock']
+        state['_inventory_space_cache'] = OrderedDict()
+        state['_inventory_space_cache_hits'] = 0
+        state['_inventory_space_cache_misses'] = 0
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._inventory_space_cache_lock = threading.Lock()
+
+    @property
+    def num_periods(self) -> int:
+        return len(self.periods)
+
+    def period_num(self, period: pd.Period) -> int:
+        return (period.ordinal - self.start.ordinal) // self.start.freq.n
+
+    def inventory_breakpoints(self) -> np.ndarray:
+        """
+        Distinct inventories, in ascending order, of the piecewise linear inject/withdraw tables of periods before the
+        storage end, as .NET StorageHelper.InventoryBreakpoints.
+        """
+        tables = {id(table): table for table in self.inject_withdraw_tables[:-1] if table is not None}
+        if not tables:
+            return np.empty(0)
+        return np.unique(np.concatenate([table.inventories for table in tables.values()]))
+
+    def inject_withdraw_range(self, period_num: int, inventories: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if period_num >= self.num_periods - 1:
+            return np.zeros(np.shape(inventories)), np.zeros(np.shape(inventories))
+        table = self.inject_withdraw_tables[period_num]
+        if table is None:
+            return np.full(np.shape(inventories), self.min_rates[period_num]), np.full(np.shape(inventories), self.max_rates[period_num])
+        return linear_interpolate(table.inventories, table.min_rates, inventories), \
+               linear_interpolate(table.inventories, table.max_rates, inventories)
+
+    def _checked_inject_withdraw_range(self, period_num: int, inventory: float) -> Tuple[float, float]:
+        min_inventory = self.min_inventory[period_num]
+        if inventory < min_inventory:
+            raise ValueError("Inventory is below minimum allowed value of {} during period {}.".format(min_inventory, self.periods[period_num]))
+        max_inventory = self.max_inventory[period_num]
+        if inventory > max_inventory:
+            raise ValueError("Inventory is above maximum allowed value of {} during period {}.".format(max_inventory, self.periods[period_num]))
+        min_rates, max_rates = self.inject_withdraw_range(period_num, np.array([inventory]))
+        return min_rates[0], max_rates[0]
+
+    def inventory_space_upper_bound(self, period_num: int, next_lower: float, next_upper: float) -> float:
+        inventory_pcnt_loss = self.inventory_loss[period_num]
+        current_max_inventory = self.max_inventory[period_num]
+        table = self.inject_withdraw_tables[period_num]
+        if table is None:
+            solved_max_inventory = (next_upper - self.min_rates[period_num]) / (1 - inventory_pcnt_loss)
+            return min(solved_max_inventory, current_max_inventory)
+
+        min_rate, max_rate = self.inject_withdraw_range(period_num, np.array([current_max_inventory]))
+        next_max_from_max = current_max_inventory * (1 - inventory_pcnt_loss) + max_rate[0]
+        next_min_from_max = current_max_inventory * (1 - inventory_pcnt_loss) + min_rate[0]
+        if next_min_from_max <= next_upper and next_lower <= next_max_from_max:
+            return current_max_inventory
+
+        bracket_upper_inventory = table.inventories[-1]
+        bracket_upper_after_withdraw = next_min_from_max
+        for i in range(len(table.inventories) - 2, -1, -1):
+            bracket_lower_inventory = table.inventories[i]
+            bracket_lower_after_withdraw = bracket_lower_inventory * (1 - inventory_pcnt_loss) + table.min_rates[i]
+            if bracket_lower_after_withdraw <= next_upper <= bracket_upper_after_withdraw:
+                return _interpolate_linear_and_solve(bracket_lower_inventory, bracket_lower_after_withdraw,
+                                                     bracket_upper_inventory, bracket_upper_after_withdraw, next_upper)
+            bracket_upper_after_withdraw = bracket_lower_after_withdraw
+            bracket_upper_inventory = bracket_lower_inventory
+        raise ValueError("Storage inventory constraints cannot be satisfied.")
+
+    def inventory_space_lower_bound(self, period_num: int, next_lower: float, next_upper: float) -> float:
+        inventory_pcnt_loss = self.inventory_loss[period_num]
+        current_min_inventory = self.min_inventory[period_num]
+        table = self.inject_withdraw_tables[period_num]
+        if table is None:
+            solved_min_inventory = (next_lower - self.max_rates[period_num]) / (1 - inventory_pcnt_loss)
+            return max(solved_min_inventory, current_min_inventory)
+
+        min_rate, max_rate = self.inject_withdraw_range(period_num, np.array([current_min_inventory]))
+        next_max_from_min = current_min_inventory * (1 - inventory_pcnt_loss) + max_rate[0]
+        next_min_from_min = current_min_inventory * (1 - inventory_pcnt_loss) + min_rate[0]
+        if next_min_from_min <= next_upper and next_lower <= next_max_from_min:
+            return current_min_inventory
+
+        bracket_lower_inventory = table.inventories[0]
+        bracket_lower_after_inject = next_max_from_min
+        for i in range(1, len(table.inventories)):
+            bracket_upper_inventory = table.inventories[i]
+            bracket_upper_after_inject = bracket_upper_inventory * (1 - inventory_pcnt_loss) + table.max_rates[i]
+            if bracket_lower_after_inject <= next_lower <= bracket_upper_after_inject:
+                return _interpolate_linear_and_solve(bracket_lower_inventory, bracket_lower_after_inject,
+                                                     bracket_upper_inventory, bracket_upper_after_inject, next_lower)
+            bracket_lower_after_inject = bracket_upper_after_inject
+            bracket_lower_inventory = bracket_upper_inventory
+        raise ValueError("Storage inventory constraints cannot be satisfied.")
+
+    def inventory_space(self, starting_inventory: float, current_period_num: int,
+                        previous: Optional[InventorySpace] = None) -> InventorySpace:
+        """
+        Equivalent of .NET StorageHelper.CalculateInventorySpace. Element i of the returned lower and upper arrays
+        holds the inventory range at the start of period number start_active + i + 1.
+
+        If previous, an inventory space calculated for the same or an earlier period, is provided, the forward pass
+        over periods stops once its inventory bounds equal those of previous, after which they are reused. Otherwise
+        results are cached, as .NET CmdtyStorage.InventorySpaceCache, with the returned arrays made read-only.
+        """
+        if current_period_num > self.num_periods - 1:
+            raise ValueError("Storage has expired")
+        start_active = max(0, current_period_num)
+        if previous is not None:
+            return self._calc_inventory_space(starting_inventory, start_active, previous)
+
+        key = (float(starting_inventory), start_active)
+        with self._inventory_space_cache_lock:
+            inventory_space = self._inventory_space_cache.get(key)
+            if inventory_space is not None:
+                self._inventory_space_cache_hits += 1
+                self._inventory_space_cache.move_to_end(key)
+                return inventory_space
+            self._inventory_space_cache_misses += 1
+
+        inventory_space = self._calc_inventory_space(starting_inventory, start_active, None)
+        for array in inventory_space[1:]:
+            array.setflags(write=False)
+        with self._inventory_space_cache_lock:
+            self._inventory_space_cache[key] = inventory_space
+            if len(self._inventory_space_cache) > INVENTORY_SPACE_CACHE_CAPACITY:
+                self._inventory_space_cache.popitem(last=False)
+        return inventory_space
+
+    def inventory_space_cache_info(self) -> InventorySpaceCacheInfo:
+        with self._inventory_space_cache_lock:
+            return InventorySpaceCacheInfo(self._inventory_space_cache_hits, self._inventory_space_cache_misses,
+                                           len(self._inventory_space_cache), INVENTORY_SPACE_CACHE_CAPACITY)
+
+    def clear_inventory_space_cache(self):
+        with self._inventory_space_cache_lock:
+            self._inventory_space_cache.clear()
+            self._inventory_space_cache_hits = 0
+            self._inventory_space_cache_misses = 0
+
+    def _calc_inventory_space(self, starting_inventory: float, start_active: int,
+                              previous: Optional[InventorySpace]) -> InventorySpace:
+        end_num = self.num_periods - 1
+        num_periods = end_num - start_active
+
+        forward_min = np.empty(num_periods)
+        forward_max = np.empty(num_periods)
+        min_inventory_forward = starting_inventory
+        max_inventory_forward = starting_inventory
+        for i in range(num_periods):
+            period_num = start_active + i
+            inventory_pcnt_loss = self.inventory_loss[period_num]
+
+            min_rate, _ = self._checked_inject_withdraw_range(period_num, min_inventory_forward)
+            loss_at_min = inventory_pcnt_loss * min_inventory_forward
+            min_inventory_forward = max(min_inventory_forward - loss_at_min + min_rate, self.min_inventory[period_num + 1])
+            forward_min[i] = min_inventory_forward
+
+            _, max_rate = self._checked_inject_withdraw_range(period_num, max_inventory_forward)
+            loss_at_max = inventory_pcnt_loss * max_inventory_forward
+            max_inventory_forward = min(max_inventory_forward - loss_at_max + max_rate, self.max_inventory[period_num + 1])
+            forward_max[i] = max_inventory_forward
+
+            if previous is not None and previous.start_active <= period_num:
+                previous_index = period_num - previous.start_active
+                if previous.forward_min[previous_index] == min_inventory_forward and \
+                        previous.forward_max[previous_index] == max_inventory_forward:
+                    forward_min[i + 1:] = previous.forward_min[previous_index + 1:]
+                    forward_max[i + 1:] = previous.forward_max[previous_index + 1:]
+                    break
+
+        backward_min, backward_max = self._backward_inventory_bounds(start_active)
+        upper = np.minimum(forward_max, backward_max)
+        lower = np.maximum(forward_min, backward_min)
+        if np.any(lower > upper):
+            raise ValueError("Inventory constraints cannot be fulfilled.")
+        return InventorySpace(start_active, lower, upper, forward_min, forward_max)
+
+    def _backward_inventory_bounds(self, start_active: int) -> Tuple[np.ndarray, np.ndarray]:
+        backward_bounds = self._backward_bounds
+        if backward_bounds is None:
+            end_num = self.num_periods - 1
+            lowest_period_num = end_num
+            backward_min = np.empty(self.num_periods)
+            backward_max = np.empty(self.num_periods)
+            backward_max[end_num] = 0.0 if self.empty_at_end else self.max_inventory[end_num]
+            backward_min[end_num] = 0.0 if self.empty_at_end else self.min_inventory[end_num]
+        else:
+            lowest_period_num, backward_min, backward_max = backward_bounds
+            if lowest_period_num <= start_active + 1:
+                return backward_min[start_active + 1:], backward_max[start_active + 1:]
+            # Published arrays may be being read by other threads, so are extended in copies
+            backward_min = backward_min.copy()
+            backward_max = backward_max.copy()
+
+        for period_num in range(lowest_period_num - 1, start_active, -1):
+            next_min = backward_min[period_num + 1]
+            next_max = backward_max[period_num + 1]
+            backward_max[period_num] = self.inventory_space_upper_bound(period_num, next_min, next_max)
+            backward_min[period_num] = self.inventory_space_lower_bound(period_num, next_min, next_max)
+            lowest_period_num = period_num
+        backward_min.setflags(write=False)
+        backward_max.setflags(write=False)
+
+        with self._inventory_space_cache_lock:
+            # Another thread may have published bounds extending further back in the meantime
+            if self._backward_bounds is None or lowest_period_num < self._backward_bounds[0]:
+                self._backward_bounds = (lowest_period_num, backward_min, backward_max)
+        return backward_min[start_active + 1:], backward_max[start_active + 1:]
+
+    def terminal_npv(self, cmdty_price: Union[float, np.ndarray], inventories: np.ndarray) -> np.ndarray:
+        """Terminal storage NPVs for cmdty_price, which can be an array, broadcast against inventories."""
+        shape = np.broadcast(cmdty_price, inventories).shape
+        if self.terminal_storage_npv is None:
+            return np.zeros(shape)
+        if isinstance(self.terminal_storage_npv, (LinearTerminalNpv, PiecewiseLinearTerminalNpv)):
+            return self.terminal_storage_npv(cmdty_price, np.asarray(inventories, dtype=np.float64))
+        cmdty_prices, inventories = np.broadcast_arrays(cmdty_price, inventories)
+        return np.array([self.terminal_storage_npv(float(price), float(inventory))
+                         for price, inventory in zip(np.ravel(cmdty_prices), np.ravel(inventories))]).reshape(shape)
+
+    def decision_set(self, period_num: int, inventories: np.ndarray, next_step_min_inventory: float,
+                     next_step_max_inventory: float, numerical_tolerance: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Bang-bang decision set for an array of inventories at the start of period_num. Returns the decisions, stacked
+        with shape (3,) + inventories.shape as withdrawal, zero and injection, the inventory losses, and a boolean
+        array which is False where the zero decision is not part of the decision set.
+        """
+        min_rates, max_rates = self.inject_withdraw_range(period_num, inventories)
+        inventory_losses = self.inventory_loss[period_num] * inventories
+        withdrawals, injections = bang_bang_decision_set(min_rates, max_rates, inventories, inventory_losses,
+                                                         next_step_min_inventory, next_step_max_inventory, numerical_tolerance)
+        decisions = np.stack([withdrawals, np.zeros(np.shape(withdrawals)), injections])
+        return decisions, inventory_losses, (withdrawals < 0.0) & (injections > 0.0)
+
+    def decision_block_starts(self, start_active: int, decision_freq: str) -> np.ndarray:
+        """
+        Period numbers of the starts of the decision blocks from start_active until the period before the storage end.
+        A block starts on start_active, the first period in which a decision is made, and on each later period
+        starting on a boundary of decision_freq. See decision_period_flags.
+        """
+        flags = decision_period_flags(self.periods[start_active:self.num_periods - 1], decision_freq)
+        flags[0] = True
+        return start_active + np.flatnonzero(flags)
+
+    def block_decision_set(self, period_num: int, num_block_periods: int, inventories: np.ndarray,
+                           next_block_min_inventory: float, next_block_max_inventory: float,
+                           numerical_tolerance: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Bang-bang decision set for a volume injected or withdrawn in each of the num_block_periods periods from
+        period_num, for an array of inventories at the start of period_num, as .NET
+        StorageHelper.CalculateBlockBangBangDecisionSet. Returns the decisions, stacked with shape
+        (3,) + inventories.shape as decision_set, and a boolean array which is False where the zero decision is not
+        part of the decision set.
+        """
+        min_rates = np.full(np.shape(inventories), -np.inf)
+        max_rates = np.full(np.shape(inventories), np.inf)
+        min_decisions = np.full(np.shape(inventories), -np.inf)
+        max_decisions = np.full(np.shape(inventories), np.inf)
+        # Inventory after each period with nothing injected or withdrawn, and its sensitivity to the volume held
+        inventories_without_decision = inventories
+        sensitivity = 0.0
+        for block_index in range(num_block_periods):
+            block_period_num = period_num + block_index
+            # As for a single period, the inject/withdraw rates are those at the inventory at the start of the block
+            period_min_rates, period_max_rates = self.inject_withdraw_range(block_period_num, inventories)
+            min_rates = np.maximum(min_rates, period_min_rates)
+            max_rates = np.minimum(max_rates, period_max_rates)
+
+            inventory_loss = self.inventory_loss[block_period_num]
+            inventories_without_decision = inventories_without_decision - inventory_loss * inventories_without_decision
+            sensitivity = sensitivity - inventory_loss * sensitivity + 1.0
+            if block_index == num_block_periods - 1:
+                next_min_inventory, next_max_inventory = next_block_min_inventory, next_block_max_inventory
+            else:
+                next_min_inventory = self.min_inventory[block_period_num + 1]
+                next_max_inventory = self.max_inventory[block_period_num + 1]
+            min_decisions = np.maximum(min_decisions, (next_min_inventory - inventories_without_decision) / sensitivity)
+            max_decisions = np.minimum(max_decisions, (next_max_inventory - inventories_without_decision) / sensitivity)
+
+        if np.any(min_decisions - max_decisions >= numerical_tolerance):
+            raise ValueError("Inventory constraints cannot be fulfilled with the decision held constant over the decision block.")
+        min_decisions = np.minimum(min_decisions, max_decisions)
+        # Where the rates don't allow the inventory constraints to be met, such as when the inject/withdraw constraints
+        # change within the block, the inventory constraints take precedence
+        withdrawals = np.minimum(np.maximum(min_rates, min_decisions), max_decisions)
+        injections = np.minimum(np.maximum(max_rates, min_decisions), max_decisions)
+        decisions = np.stack([withdrawals, np.zeros(np.shape(withdrawals)), injections])
+        return decisions, (withdrawals < 0.0) & (injections > 0.0)
+
+    def block_volumes_and_costs(self, period_num: int, inventories: np.ndarray, decisions: np.ndarray,
+                                discount_factors_settlement: np.ndarray,
+                                discount_factors_costs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Price independent part of the NPV of injecting or withdrawing decisions, broadcast with inventories, in each
+        period of the decision block from period_num, as .NET StorageHelper.DecisionBlockVolumesAndCosts. The
+        discount factors have an element for each period of the block. Returns the volumes bought in each period,
+        including those consumed, multiplied by the settlement discount factor and stacked along a new first axis,
+        the NPV of the injection, withdrawal and inventory costs, and the inventories after the block. The NPV for
+        cmdty prices in each period of the block is minus their dot product with the discounted volumes, less the
+        cost NPV.
+        """
+        num_block_periods = len(discount_factors_settlement)
+        discounted_volumes = np.empty((num_block_periods,) + np.shape(decisions))
+        cost_npvs = np.zeros(np.shape(decisions))
+        inventories_loop = inventories
+        for block_index in range(num_block_periods):
+            block_period_num = period_num + block_index
+            decision_costs, cmdty_consumed = self.decision_costs_and_cmdty_consumed(block_period_num, decisions)
+            discounted_volumes[block_index] = (decisions + cmdty_consumed) * discount_factors_settlement[block_index]
+            cost_npvs = cost_npvs + (decision_costs + inventories_loop * self.inventory_cost[block_period_num]) * \
+                        discount_factors_costs[block_index]
+            inventories_loop = inventories_loop + decisions - self.inventory_loss[block_period_num] * inventories_loop
+        return discounted_volumes, cost_npvs, inventories_loop
+
+    def decision_costs_and_cmdty_consumed(self, period_num: int, decisions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Undiscounted injection or withdrawal costs, and volumes of cmdty consumed, for an array of decisions."""
+        injecting = decisions > 0.0
+        decision_costs = np.where(injecting, self.injection_cost[period_num] * decisions,
+                                  self.withdrawal_cost[period_num] * np.abs(decisions))
+        cmdty_consumed = np.where(injecting, self.cmdty_consumed_inject[period_num] * np.abs(decisions),
+                                  self.cmdty_consumed_withdraw[period_num] * np.abs(decisions))
+        return decision_costs, cmdty_consumed
+
+    def decision_set_and_costs(self, period_num: int, inventories: np.ndarray, next_step_min_inventory: float,
+                               next_step_max_inventory: float, numerical_tolerance: float) -> DecisionSet:
+        """
+        Decision set, costs and volumes for an array of inventories at the start of period_num. These don't depend on
+        prices so can be reused when calculating optimal decisions for different forward curves.
+        """
+        decisions, inventory_losses, zero_decision_valid = self.decision_set(period_num, inventories, next_step_min_inventory,
+                                                                             next_step_max_inventory, numerical_tolerance)
+        decision_costs, cmdty_consumed = self.decision_costs_and_cmdty_consumed(period_num, decisions)
+        inventory_costs = inventories * self.inventory_cost[period_num]
+        return DecisionSet(inventories, decisions, inventory_losses, zero_decision_valid, decision_costs, cmdty_consumed,
+                           inventory_costs)
+
+    def optimal_decisions(self, period_num: int, inventories: np.ndarray, next_step_min_inventory: float,
+                          next_step_max_inventory: float, cmdty_price, continuation_value: Callable[[np.ndarray], np.ndarray],
+                          discount_factor_settlement: float, discount_factor_costs: float,
+                          numerical_tolerance: float) -> OptimalDecisions:
+        """
+        Optimal bang-bang decisions, and associated storage NPV, for an array of inventories at the start of period_num.
+        cmdty_price can be a scalar or an array broadcastable with inventories. continuation_value maps an array of
+        shape (3,) + inventories.shape of inventories after decision to their continuation values.
+        """
+        decision_set = self.decision_set_and_costs(period_num, inventories, next_step_min_inventory,
+                                                   next_step_max_inventory, numerical_tolerance)
+        return optimal_decisions_for_set(decision_set, cmdty_price, continuation_value, discount_factor_settlement,
+                                         discount_factor_costs)
+
+
+def optimal_decisions_for_set(decision_set: DecisionSet, cmdty_price, continuation_value: Callable[[np.ndarray], np.ndarray],
+                              discount_factor_settlement: float, discount_factor_costs: float) -> OptimalDecisions:
+    """Optimal decisions, and associated storage NPV, from a decision set created by StorageArrays.decision_set_and_costs."""
+    decisions = decision_set.decisions
+    cmdty_consumed = decision_set.cmdty_consumed
+    inventories_after_decision = decision_set.inventories + decisions - decision_set.inventory_losses
+    continuation_npvs = continuation_value(inventories_after_decision)
+
+    inject_withdraw_npvs = -decisions * cmdty_price * discount_factor_settlement
+    cmdty_consumed_npvs = -cmdty_consumed * cmdty_price * discount_factor_settlement
+    inventory_cost_npvs = decision_set.inventory_costs * discount_factor_costs
+
+    storage_npvs = continuation_npvs + inject_withdraw_npvs - decision_set.decision_costs * discount_factor_costs + \
+                   cmdty_consumed_npvs - inventory_cost_npvs
+    storage_npvs[1, ~decision_set.zero_decision_valid] = -np.inf
+
+    optimal_index = np.argmax(storage_npvs, axis=0)[np.newaxis]
+    return OptimalDecisions(np.take_along_axis(storage_npvs, optimal_index, axis=0)[0],
+                            np.take_along_axis(decisions, optimal_index, axis=0)[0],
+                            np.take_along_axis(cmdty_consumed, optimal_index, axis=0)[0],
+                            decision_set.inventory_losses)
+
+
+def _interpolate_linear_and_solve(x1, y1, x2, y2, y):
+    gradient = (y2 - y1) / (x2 - x1)
+    constant = y1 - gradient * x1
+    return (y - constant) / gradient
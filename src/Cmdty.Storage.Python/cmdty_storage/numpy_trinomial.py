@@ -0,0 +1,794 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import numpy as np
+import pandas as pd
+from datetime import date
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import NamedTuple, List, Callable, Dict, Sequence, Optional, Tuple
+from cmdty_storage import numpy_storage as nps
+
+
+class TrinomialTree(NamedTuple):
+    """
+    Recombining trinomial tree held as arrays, one element per period. For period i, prices[i] and probabilities[i]
+    hold the spot price and unconditional probability of each node, ordered by price level. transition_indices[i] and
+    transition_probabilities[i] have shape (num nodes, 3) and hold the down, middle and up destination nodes in
+    period i + 1, and the probability of each transition.
+    """
+    periods: pd.PeriodIndex
+    prices: List[np.ndarray]
+    probabilities: List[np.ndarray]
+    transition_indices: List[np.ndarray]
+    transition_probabilities: List[np.ndarray]
+
+
+def one_factor_tree(periods: pd.PeriodIndex,
+                    forward_prices: np.ndarray,
+                    spot_volatilities: np.ndarray,
+                    mean_reversion: float,
+                    time_step: float) -> TrinomialTree:
+    """
+    Creates a trinomial tree for a spot price with mean-reverting log, as Cmdty.Core OneFactorTrinomialTree. The
+    Hull-White tree is built for a zero mean Ornstein-Uhlenbeck process with unit volatility, with node spacing
+    sqrt(3 * V) for V the variance over one time_step, and branching switched to point inwards beyond j_max, the
+    smallest integer greater than 0.184 / (1 - exp(-mean_reversion * time_step)). The node values of period i are
+    multiplied by spot_volatilities[i], and the node prices scaled so that the expected spot price in each period
+    equals the forward price.
+    """
+    if mean_reversion <= 0:
+        raise ValueError("mean_reversion must be positive.")
+    if time_step <= 0:
+        raise ValueError("time_step must be positive.")
+    if np.any(spot_volatilities <= 0):
+        raise ValueError("spot_volatility must be positive.")
+
+    decay = np.exp(-mean_reversion * time_step) - 1.0
+    variance = (1.0 - np.exp(-2.0 * mean_reversion * time_step)) / (2.0 * mean_reversion)
+    spacing = np.sqrt(3.0 * variance)
+    max_level = int(np.floor(-0.184 / decay)) + 1
+
+    node_levels = [np.zeros(1, dtype=np.intp)]
+    probabilities = [np.ones(1)]
+    transition_indices = []
+    transition_probabilities = []
+    for i in range(len(periods) - 1):
+        levels = node_levels[i]
+        middle_levels = np.clip(levels, -max_level + 1, max_level - 1)
+        # Difference between the expected value and the middle destination node, in units of spacing
+        eta = levels * (1.0 + decay) - middle_levels
+        up_probabilities = 1.0 / 6.0 + 0.5 * (eta * eta + eta)
+        down_probabilities = 1.0 / 6.0 + 0.5 * (eta * eta - eta)
+        middle_probabilities = 2.0 / 3.0 - eta * eta
+
+        next_max_level = min(i + 1, max_level)
+        next_indices = np.stack([middle_levels - 1, middle_levels, middle_levels + 1], axis=1) + next_max_level
+        next_probabilities = np.stack([down_probabilities, middle_probabilities, up_probabilities], axis=1)
+
+        next_node_probabilities = np.zeros(2 * next_max_level + 1)
+        np.add.at(next_node_probabilities, next_indices, probabilities[i][:, np.newaxis] * next_probabilities)
+
+        node_levels.append(np.arange(-next_max_level, next_max_level + 1))
+        probabilities.append(next_node_probabilities)
+        transition_indices.append(next_indices)
+        transition_probabilities.append(next_probabilities)
+
+    prices = []
+    for forward_price, spot_volatility, levels, node_probabilities in zip(forward_prices, spot_volatilities,
+                                                                          node_levels, probabilities):
+        unscaled_prices = np.exp(spot_volatility * spacing * levels)
+        prices.append(forward_price * unscaled_prices / np.sum(node_probabilities * unscaled_prices))
+
+    return TrinomialTree(periods, prices, probabilities, transition_indices, transition_probabilities)
+
+
+class TreeInventoryGrids(NamedTuple):
+    """
+    Price independent part of a tree valuation. decision_sets[i] holds the decision set, with costs and volumes, on
+    the inventory grid at the start of period number start_active + i, the first grid being the starting inventory.
+    """
+    start_active: int
+    decision_sets: Sequence[nps.DecisionSet]
+
+
+class _LowMemoryDecisionSets(Sequence):
+    """Decision sets calculated each time they are indexed, so that those for all periods are never held at once."""
+
+    def __init__(self, decision_set, num_periods):
+        self._decision_set = decision_set
+        self._num_periods = num_periods
+
+    def __len__(self):
+        return self._num_periods
+
+    def __getitem__(self, index):
+        if not -self._num_periods <= index < self._num_periods:
+            raise IndexError("Decision set index out of range.")
+        return self._decision_set(index % self._num_periods)
+
+
+def tree_inventory_grids(storage: nps.StorageArrays,
+                         inventory: float,
+                         current_period_num: int,
+                         num_inventory_grid_points: int,
+                         numerical_tolerance: float,
+                         grid: str = 'uniform',
+                         low_memory: bool = False) -> TreeInventoryGrids:
+    """
+    If low_memory is True the decision sets are calculated as they are accessed, rather than all up front, so that
+    memory use doesn't grow with the number of periods, at the cost of recalculating them on each access.
+    """
+    inventory_space = storage.inventory_space(inventory, current_period_num)
+    start_active = inventory_space.start_active
+    end_num = storage.num_periods - 1
+    grid_calc = _tree_grid_calc(storage, num_inventory_grid_points, grid)
+
+    def decision_set(active_index):
+        period_num = start_active + active_index
+        if active_index == 0:
+            inventory_grid = np.array([float(inventory)])
+        else:
+            inventory_grid = grid_calc(inventory_space.lower[active_index - 1], inventory_space.upper[active_index - 1])
+        return storage.decision_set_and_costs(period_num, inventory_grid, inventory_space.lower[active_index],
+                                              inventory_space.upper[active_index], numerical_tolerance)
+
+    num_active_periods = end_num - start_active
+    if low_memory:
+        return TreeInventoryGrids(start_active, _LowMemoryDecisionSets(decision_set, num_active_periods))
+    return TreeInventoryGrids(start_active, [decision_set(active_index) for active_index in range(num_active_periods)])
+
+
+def _tree_grid_calc(storage, num_inventory_grid_points, grid):
+    if grid == 'adaptive':
+        return nps.adaptive_grid_calc(storage, num_inventory_grid_points)
+    grid_spacing = (storage.max_inventory.max() - storage.min_inventory.min()) / (num_inventory_grid_points - 1)
+    if not grid_spacing > 0.0:
+        raise ValueError("Inventory grid spacing must be positive.")
+
+    def grid_calc(lower, upper):
+        return nps.fixed_spacing_grid(lower, upper, grid_spacing)
+    return grid_calc
+
+
+class TreeValuationGrids(NamedTuple):
+    """
+    Backward induction results held for every period. storage_npvs[i] and decision_indices[i] have shape
+    (num price levels, num inventory grid points) and hold the storage NPV, and the index into the decision set of the
+    optimal decision, on the inventory grid inventory_grids.decision_sets[i].inventories.
+    """
+    npv: float
+    inventory_grids: TreeInventoryGrids
+    storage_npvs: List[np.ndarray]
+    decision_indices: List[np.ndarray]
+
+
+def tree_storage_npv(storage: nps.StorageArrays,
+                     tree: TrinomialTree,
+                     tree_offset: int,
+                     inventory_grids: TreeInventoryGrids,
+                     discount_factors_settlement: np.ndarray,
+                     discount_factors_costs: np.ndarray) -> float:
+    """
+    Backward induction over the tree, evaluated over all tree price levels and the whole inventory grid at once, only
+    holding the storage NPVs for the next period. tree_offset is the tree period index of storage period number 0, and
+    the discount factors have an element for each period from inventory_grids.start_active until the period before
+    the storage end.
+    """
+    npv, _, _ = _backward_induction(storage, tree, tree_offset, inventory_grids, discount_factors_settlement,
+                                    discount_factors_costs, False)
+    return npv
+
+
+def tree_valuation_grids(storage: nps.StorageArrays,
+                         tree: TrinomialTree,
+                         tree_offset: int,
+                         inventory_grids: TreeInventoryGrids,
+                         discount_factors_settlement: np.ndarray,
+                         discount_factors_costs: np.ndarray) -> TreeValuationGrids:
+    """As tree_storage_npv, but holding the storage NPVs and optimal decisions for every period."""
+    npv, storage_npvs, decision_indices = _backward_induction(storage, tree, tree_offset, inventory_grids,
+                                                              discount_factors_settlement, discount_factors_costs, True)
+    return TreeValuationGrids(npv, inventory_grids, storage_npvs, decision_indices)
+
+
+def _backward_induction(storage, tree, tree_offset, inventory_grids, discount_factors_settlement,
+                        discount_factors_costs, hold_all_periods) -> Tuple[float, List[np.ndarray], List[np.ndarray]]:
+    start_active = inventory_grids.start_active
+    end_num = storage.num_periods - 1
+    end_prices = tree.prices[end_num + tree_offset]
+    # Storage NPVs with shape (num price levels, num inventory grid points) for the start of next period
+    next_inventory_grid = None
+    next_storage_npvs = None
+    storage_npvs_by_period = []
+    decision_indices_by_period = []
+
+    for period_num in range(end_num - 1, start_active - 1, -1):
+        active_index = period_num - start_active
+        tree_num = period_num + tree_offset
+        decision_set = inventory_grids.decision_sets[active_index]
+        inventory_grid = decision_set.inventories
+        decisions = decision_set.decisions
+        inventories_after_decision = inventory_grid + decisions - decision_set.inventory_losses
+
+        # Shape (num next price levels, 3, num grid points)
+        if period_num == end_num - 1:
+            continuation_npvs = np.stack([storage.terminal_npv(price, inventories_after_decision) for price in end_prices])
+        else:
+            continuation_npvs = nps.linear_interpolate(next_inventory_grid, next_storage_npvs, inventories_after_decision)
+        transition_indices = tree.transition_indices[tree_num]
+        transition_probabilities = tree.transition_probabilities[tree_num]
+        expected_continuation_npvs = np.zeros((len(transition_indices),) + decisions.shape)
+        for branch in range(3):
+            expected_continuation_npvs += continuation_npvs[transition_indices[:, branch]] * \
+                                          transition_probabilities[:, branch, np.newaxis, np.newaxis]
+
+        discount_factor_settlement = discount_factors_settlement[active_index]
+        discount_factor_costs = discount_factors_costs[active_index]
+        cmdty_prices = tree.prices[tree_num][:, np.newaxis, np.newaxis]
+        storage_npvs = _immediate_npvs(decision_set, cmdty_prices, discount_factor_settlement, discount_factor_costs) + \
+                       expected_continuation_npvs
+        storage_npvs[:, 1, ~decision_set.zero_decision_valid] = -np.inf
+        next_storage_npvs = np.max(storage_npvs, axis=1)
+        next_inventory_grid = inventory_grid
+        if hold_all_periods:
+            storage_npvs_by_period.append(next_storage_npvs)
+            decision_indices_by_period.append(np.argmax(storage_npvs, axis=1).astype(np.int8))
+
+    npv = float(np.sum(next_storage_npvs[:, 0] * tree.probabilities[start_active + tree_offset]))
+    return npv, storage_npvs_by_period[::-1], decision_indices_by_period[::-1]
+
+
+def decision_block_tree_storage_npv(storage: nps.StorageArrays,
+                                    tree: TrinomialTree,
+                                    tree_offset: int,
+                                    inventory: float,
+                                    inventory_space: nps.InventorySpace,
+                                    grid_calc: Callable[[float, float], np.ndarray],
+                                    discount_factors_settlement: np.ndarray,
+                                    discount_factors_costs: np.ndarray,
+                                    numerical_tolerance: float,
+                                    decision_freq: str) -> float:
+    """
+    As tree_storage_npv, but with the inject/withdraw volume held constant over decision blocks starting on
+    decision_freq boundaries, as .NET TreeStorageValuation with a decision schedule. Backward induction is only
+    performed over the block starts, using the expected spot price in each period of the block, and the probabilities
+    of the tree nodes at the block end, conditional on each tree node at the block start.
+    """
+    start_active = inventory_space.start_active
+    end_num = storage.num_periods - 1
+    block_starts = storage.decision_block_starts(start_active, decision_freq)
+    block_ends = np.append(block_starts[1:], end_num)
+    # Storage NPVs with shape (num price levels, num inventory grid points) for the start of the next block
+    next_inventory_grid = None
+    next_storage_npvs = None
+
+    for block_start, block_end in zip(block_starts[::-1], block_ends[::-1]):
+        active_slice = slice(block_start - start_active, block_end - start_active)
+        if block_start == start_active:
+            inventory_grid = np.array([float(inventory)])
+        else:
+            inventory_grid = grid_calc(inventory_space.lower[active_slice.start - 1],
+                                       inventory_space.upper[active_slice.start - 1])
+        decisions, zero_decision_valid = storage.block_decision_set(block_start, block_end - block_start, inventory_grid,
+                                                                    inventory_space.lower[active_slice.stop - 1],
+                                                                    inventory_space.upper[active_slice.stop - 1],
+                                                                    numerical_tolerance)
+        discounted_volumes, cost_npvs, inventories_after_block = storage.block_volumes_and_costs(block_start,
+                        inventory_grid, decisions, discount_factors_settlement[active_slice],
+                        discount_factors_costs[active_slice])
+
+        # Shape (num block end price levels, 3, num grid points)
+        if block_end == end_num:
+            continuation_npvs = np.stack([storage.terminal_npv(price, inventories_after_block)
+                                          for price in tree.prices[end_num + tree_offset]])
+        else:
+            continuation_npvs = nps.linear_interpolate(next_inventory_grid, next_storage_npvs, inventories_after_block)
+        expected_prices, end_node_probabilities = _block_node_expectations(tree, block_start + tree_offset,
+                                                                           block_end - block_start)
+        storage_npvs = np.tensordot(end_node_probabilities, continuation_npvs, axes=1) - \
+                       np.tensordot(expected_prices, discounted_volumes, axes=1) - cost_npvs
+        storage_npvs[:, 1, ~zero_decision_valid] = -np.inf
+        next_storage_npvs = np.max(storage_npvs, axis=1)
+        next_inventory_grid = inventory_grid
+
+    return float(np.sum(next_storage_npvs[:, 0] * tree.probabilities[start_active + tree_offset]))
+
+
+def _block_node_expectations(tree, tree_num, num_periods):
+    """
+    Expected spot price in each of the num_periods periods from tree period tree_num, with shape (num nodes,
+    num_periods), and the probability of each node of tree period tree_num + num_periods, with shape (num nodes,
+    num block end nodes), conditional on each node of tree period tree_num.
+    """
+    num_nodes = len(tree.prices[tree_num])
+    node_probabilities = np.identity(num_nodes)
+    expected_prices = np.empty((num_nodes, num_periods))
+    for i in range(num_periods):
+        period_tree_num = tree_num + i
+        expected_prices[:, i] = node_probabilities @ tree.prices[period_tree_num]
+        transition_indices = tree.transition_indices[period_tree_num]
+        transition_matrix = np.zeros((len(transition_indices), len(tree.prices[period_tree_num + 1])))
+        np.add.at(transition_matrix, (np.arange(len(transition_indices))[:, np.newaxis], transition_indices),
+                  tree.transition_probabilities[period_tree_num])
+        node_probabilities = node_probabilities @ transition_matrix
+    return expected_prices, node_probabilities
+
+
+def _immediate_npvs(decision_set, cmdty_prices, discount_factor_settlement, discount_factor_costs):
+    """NPV of the cash flows in one period for each decision of decision_set, broadcast with cmdty_prices."""
+    decisions = decision_set.decisions
+    inventory_cost_npvs = decision_set.inventory_costs * discount_factor_costs
+    return -decisions * cmdty_prices * discount_factor_settlement - \
+           decision_set.decision_costs * discount_factor_costs + \
+           -decision_set.cmdty_consumed * cmdty_prices * discount_factor_settlement - inventory_cost_npvs
+
+
+def trinomial_value(storage: nps.StorageArrays,
+                    val_date,
+                    inventory: float,
+                    forward_curve: pd.Series,
+                    spot_volatility: pd.Series,
+                    mean_reversion: float,
+                    time_step: float,
+                    interest_rates: pd.Series,
+                    settlement_rule: Callable[[pd.Period], date],
+                    num_inventory_grid_points: int,
+                    numerical_tolerance: float,
+                    grid: str = 'uniform',
+                    decision_freq: Optional[str] = None) -> float:
+    """
+    Calculates the value of commodity storage using a one-factor trinomial tree with NumPy, following .NET
+    TreeStorageValuation with a fixed number of points on the global inventory range, or the adaptive grid if grid is
+    'adaptive', and linear interpolation. Each backward induction step is evaluated over all tree price levels and the
+    whole inventory grid at once. Decision sets are calculated period by period during backward induction, so that,
+    other than the tree, memory use doesn't grow with the number of periods. If decision_freq is specified the
+    inject/withdraw volume is held constant over decision blocks, see decision_block_tree_storage_npv.
+    """
+    _check_valuation_inputs(inventory, num_inventory_grid_points, numerical_tolerance)
+    nps.check_grid_type(grid)
+    current_period = pd.Period(val_date, freq=storage.freq)
+    current_period_num = storage.period_num(current_period)
+    end_num = storage.num_periods - 1
+
+    if current_period_num > end_num:
+        return 0.0
+    if current_period_num == end_num and storage.empty_at_end:
+        if inventory > 0:
+            raise ValueError("Storage must be empty at end, but inventory is greater than zero.")
+        return 0.0
+
+    tree, tree_offset = _create_tree(storage, current_period, forward_curve, spot_volatility, mean_reversion, time_step)
+    if current_period_num == end_num:
+        return _end_period_npv(storage, inventory, tree, tree_offset)
+
+    if decision_freq is not None:
+        inventory_space = storage.inventory_space(inventory, current_period_num)
+        discount_factors_settlement, discount_factors_costs = _active_discount_factors(storage, current_period,
+                                                        inventory_space.start_active, interest_rates, settlement_rule)
+        return decision_block_tree_storage_npv(storage, tree, tree_offset, inventory, inventory_space,
+                                               _tree_grid_calc(storage, num_inventory_grid_points, grid),
+                                               discount_factors_settlement, discount_factors_costs,
+                                               numerical_tolerance, decision_freq)
+
+    inventory_grids = tree_inventory_grids(storage, inventory, current_period_num, num_inventory_grid_points,
+                                           numerical_tolerance, grid, low_memory=True)
+    discount_factors_settlement, discount_factors_costs = _active_discount_factors(storage, current_period,
+                                                    inventory_grids.start_active, interest_rates, settlement_rule)
+    return tree_storage_npv(storage, tree, tree_offset, inventory_grids, discount_factors_settlement,
+                            discount_factors_costs)
+
+
+class TreeValuation(NamedTuple):
+    """
+    Tree valuation holding the storage NPVs and optimal decisions for every period. tree is None if the storage has
+    expired, and grids is None if no decision is made before the storage end.
+    """
+    npv: float
+    tree: Optional[TrinomialTree]
+    tree_offset: int
+    grids: Optional[TreeValuationGrids]
+
+
+def trinomial_valuation(storage: nps.StorageArrays,
+                        val_date,
+                        inventory: float,
+                        forward_curve: pd.Series,
+                        spot_volatility: pd.Series,
+                        mean_reversion: float,
+                        time_step: float,
+                        interest_rates: pd.Series,
+                        settlement_rule: Callable[[pd.Period], date],
+                        num_inventory_grid_points: int,
+                        numerical_tolerance: float,
+                        grid: str = 'uniform') -> TreeValuation:
+    """As trinomial_value, but holding the storage NPVs and optimal decisions on the inventory grid for every period."""
+    _check_valuation_inputs(inventory, num_inventory_grid_points, numerical_tolerance)
+    nps.check_grid_type(grid)
+    current_period = pd.Period(val_date, freq=storage.freq)
+    current_period_num = storage.period_num(current_period)
+    end_num = storage.num_periods - 1
+
+    if current_period_num > end_num:
+        return TreeValuation(0.0, None, 0, None)
+    if current_period_num == end_num and storage.empty_at_end:
+        if inventory > 0:
+            raise ValueError("Storage must be empty at end, but inventory is greater than zero.")
+        return TreeValuation(0.0, None, 0, None)
+
+    tree, tree_offset = _create_tree(storage, current_period, forward_curve, spot_volatility, mean_reversion, time_step)
+    if current_period_num == end_num:
+        return TreeValuation(_end_period_npv(storage, inventory, tree, tree_offset), tree, tree_offset, None)
+
+    inventory_grids = tree_inventory_grids(storage, inventory, current_period_num, num_inventory_grid_points,
+                                           numerical_tolerance, grid)
+    discount_factors_settlement, discount_factors_costs = _active_discount_factors(storage, current_period,
+                                                    inventory_grids.start_active, interest_rates, settlement_rule)
+    valuation_grids = tree_valuation_grids(storage, tree, tree_offset, inventory_grids, discount_factors_settlement,
+                                           discount_factors_costs)
+    return TreeValuation(valuation_grids.npv, tree, tree_offset, valuation_grids)
+
+
+class TrinomialSimulationResults(NamedTuple):
+    """
+    Results of following the optimal decisions of a trinomial tree valuation on paths sampled in the tree. Other than
+    npv and periods, attributes are arrays with one row per path and, other than path_npvs, one column per element of
+    periods, the periods from the first in which a decision is made until the period before the storage end.
+
+    Attributes:
+        npv: storage NPV calculated by backward induction on the tree.
+        spot_prices: tree spot price.
+        inject_withdraw: optimal volume injected (positive) or withdrawn (negative).
+        cmdty_consumed: volume of commodity consumed by the injection or withdrawal.
+        inventories: inventory at the end of the period.
+        path_npvs: realised NPV on each path, being the discounted cash flows from following the decisions plus the
+            terminal storage NPV. Its mean converges to npv as the number of paths increases.
+    """
+    npv: float
+    periods: pd.PeriodIndex
+    spot_prices: np.ndarray
+    inject_withdraw: np.ndarray
+    cmdty_consumed: np.ndarray
+    inventories: np.ndarray
+    path_npvs: np.ndarray
+
+
+def trinomial_simulate(storage: nps.StorageArrays,
+                       val_date,
+                       inventory: float,
+                       forward_curve: pd.Series,
+                       spot_volatility: pd.Series,
+                       mean_reversion: float,
+                       time_step: float,
+                       interest_rates: pd.Series,
+                       settlement_rule: Callable[[pd.Period], date],
+                       num_paths: int,
+                       seed: Optional[int],
+                       num_inventory_grid_points: int,
+                       numerical_tolerance: float,
+                       num_threads: int,
+                       grid: str = 'uniform') -> TrinomialSimulationResults:
+    """
+    Values the storage with trinomial_valuation, then samples num_paths paths in the tree and follows the optimal
+    decisions along them. The tree is that of one_factor_tree, the same as the Cmdty.Core OneFactorTrinomialTree
+    valued on by the dotnet engine, so paths are sampled in the tree of trinomial_value. All paths are sampled up
+    front, so results depend on seed but not num_threads. Paths are then simulated in num_threads chunks in parallel,
+    each chunk a period at a time over all its paths at once. Where a path inventory is on the inventory grid the
+    optimal decision is looked up, otherwise it is recalculated from the storage NPVs of the next period.
+    """
+    if num_paths < 1:
+        raise ValueError("num_paths must be at least 1.")
+    if num_threads < 1:
+        raise ValueError("num_threads must be at least 1.")
+    valuation = trinomial_valuation(storage, val_date, inventory, forward_curve, spot_volatility, mean_reversion,
+                                    time_step, interest_rates, settlement_rule, num_inventory_grid_points,
+                                    numerical_tolerance, grid)
+    end_num = storage.num_periods - 1
+    rng = np.random.default_rng(seed)
+
+    def no_decision_results(path_npvs):
+        no_decisions = np.empty((num_paths, 0))
+        return TrinomialSimulationResults(valuation.npv, pd.PeriodIndex([], freq=storage.freq), no_decisions,
+                                          no_decisions, no_decisions, no_decisions, path_npvs)
+
+    tree, tree_offset, valuation_grids = valuation.tree, valuation.tree_offset, valuation.grids
+    if tree is None:
+        return no_decision_results(np.zeros(num_paths))
+    if valuation_grids is None:
+        end_nodes = _sample_tree_paths(tree, end_num + tree_offset, 1, num_paths, rng)[:, 0]
+        return no_decision_results(storage.terminal_npv(tree.prices[end_num + tree_offset][end_nodes],
+                                                        np.full(num_paths, float(inventory))))
+
+    current_period = pd.Period(val_date, freq=storage.freq)
+    current_period_num = storage.period_num(current_period)
+    inventory_grids = valuation_grids.inventory_grids
+    start_active = inventory_grids.start_active
+    discount_factors_settlement, discount_factors_costs = _active_discount_factors(storage, current_period,
+                                                    start_active, interest_rates, settlement_rule)
+    inventory_space = storage.inventory_space(inventory, current_period_num)
+
+    num_active_periods = end_num - start_active
+    # Node indices on each path from the first decision period until the end period
+    nodes = _sample_tree_paths(tree, start_active + tree_offset, num_active_periods + 1, num_paths, rng)
+    spot_prices = np.empty((num_paths, num_active_periods))
+    inject_withdraw = np.empty((num_paths, num_active_periods))
+    cmdty_consumed = np.empty((num_paths, num_active_periods))
+    inventories = np.empty((num_paths, num_active_periods))
+    path_npvs = np.empty(num_paths)
+
+    def simulate_chunk(path_indices):
+        chunk_nodes = nodes[path_indices]
+        inventories_loop = np.full(len(path_indices), float(inventory))
+        npvs_loop = np.zeros(len(path_indices))
+        for active_index in range(num_active_periods):
+            period_num = start_active + active_index
+            tree_num = period_num + tree_offset
+            period_nodes = chunk_nodes[:, active_index]
+            cmdty_prices = tree.prices[tree_num][period_nodes]
+            # Paths often share inventories, so the decision set is calculated for each distinct inventory once
+            unique_inventories, unique_index = np.unique(inventories_loop, return_inverse=True)
+            unique_decision_set = storage.decision_set_and_costs(period_num, unique_inventories,
+                                        inventory_space.lower[active_index], inventory_space.upper[active_index],
+                                        numerical_tolerance)
+            decision_set = nps.DecisionSet(*(array[..., unique_index] for array in unique_decision_set))
+
+            inventory_grid = inventory_grids.decision_sets[active_index].inventories
+            grid_index = np.minimum(np.searchsorted(inventory_grid, inventories_loop), len(inventory_grid) - 1)
+            on_grid = inventory_grid[grid_index] == inventories_loop
+            decision_indices = np.empty(len(path_indices), dtype=np.intp)
+            decision_indices[on_grid] = valuation_grids.decision_indices[active_index][period_nodes[on_grid],
+                                                                                       grid_index[on_grid]]
+            off_grid = ~on_grid
+            if np.any(off_grid):
+                off_grid_decision_set = nps.DecisionSet(*(array[..., off_grid] for array in decision_set))
+                storage_npvs = _immediate_npvs(off_grid_decision_set, cmdty_prices[off_grid],
+                                               discount_factors_settlement[active_index],
+                                               discount_factors_costs[active_index]) + \
+                               _expected_continuation_npvs(storage, tree, tree_num, valuation_grids, active_index,
+                                                           period_nodes[off_grid], off_grid_decision_set)
+                storage_npvs[1, ~off_grid_decision_set.zero_decision_valid] = -np.inf
+                decision_indices[off_grid] = np.argmax(storage_npvs, axis=0)
+
+            optimal_index = decision_indices[np.newaxis]
+            npvs_loop += np.take_along_axis(_immediate_npvs(decision_set, cmdty_prices,
+                                                            discount_factors_settlement[active_index],
+                                                            discount_factors_costs[active_index]),
+                                            optimal_index, axis=0)[0]
+            optimal_decisions = np.take_along_axis(decision_set.decisions, optimal_index, axis=0)[0]
+            inventories_loop = inventories_loop + optimal_decisions - decision_set.inventory_losses
+            spot_prices[path_indices, active_index] = cmdty_prices
+            inject_withdraw[path_indices, active_index] = optimal_decisions
+            cmdty_consumed[path_indices, active_index] = np.take_along_axis(decision_set.cmdty_consumed,
+                                                                            optimal_index, axis=0)[0]
+            inventories[path_indices, active_index] = inventories_loop
+        end_tree_num = end_num + tree_offset
+        path_npvs[path_indices] = npvs_loop + storage.terminal_npv(tree.prices[end_tree_num][chunk_nodes[:, -1]],
+                                                                   inventories_loop)
+
+    path_chunks = np.array_split(np.arange(num_paths), min(num_threads, num_paths))
+    # Threads rather than processes, as the chunks share the valuation grids and result arrays and their work is mostly
+    # in NumPy operations over all the paths of a chunk, which release the GIL
+    if num_threads > 1:
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            list(executor.map(simulate_chunk, path_chunks))
+    else:
+        simulate_chunk(path_chunks[0])
+
+    return TrinomialSimulationResults(valuation.npv, storage.periods[start_active:end_num], spot_prices,
+                                      inject_withdraw, cmdty_consumed, inventories, path_npvs)
+
+
+SENSITIVITY_INPUTS = ('forward_curve', 'spot_volatility', 'mean_reversion', 'interest_rates')
+
+
+def trinomial_sensitivities(storage: nps.StorageArrays,
+                            val_date,
+                            inventory: float,
+                            forward_curve: pd.Series,
+                            spot_volatility: pd.Series,
+                            mean_reversion: float,
+                            time_step: float,
+                            interest_rates: pd.Series,
+                            settlement_rule: Callable[[pd.Period], date],
+                            bumps: Dict[str, float],
+                            num_inventory_grid_points: int,
+                            numerical_tolerance: float,
+                            max_workers: int) -> pd.DataFrame:
+    """
+    Central difference sensitivities of the trinomial_value NPV to additive bumps of the inputs named by the keys of
+    bumps, which must be in SENSITIVITY_INPUTS. The inventory space, grids, decision sets, costs and settlement days
+    don't depend on these inputs so are calculated once, then the bumped revaluations run on a pool of max_workers
+    processes, or in turn if max_workers is 1. Each revaluation is a backward induction of many small NumPy
+    operations, which hold the GIL for most of their time, so processes rather than threads are used, and the storage
+    terminal_storage_npv must be picklable if max_workers is more than 1.
+    """
+    _check_valuation_inputs(inventory, num_inventory_grid_points, numerical_tolerance)
+    for input_name, bump_size in bumps.items():
+        if input_name not in SENSITIVITY_INPUTS:
+            raise ValueError("Bump of '{}' not supported. Allowable inputs are {}.".format(input_name, SENSITIVITY_INPUTS))
+        if not bump_size > 0:
+            raise ValueError("Bump size of '{}' must be positive.".format(input_name))
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+
+    current_period = pd.Period(val_date, freq=storage.freq)
+    current_period_num = storage.period_num(current_period)
+    end_num = storage.num_periods - 1
+    base_inputs = dict(forward_curve=forward_curve, spot_volatility=spot_volatility, mean_reversion=mean_reversion,
+                       interest_rates=interest_rates)
+
+    def bumped_inputs(input_name, signed_bump):
+        return dict(base_inputs, **{input_name: base_inputs[input_name] + signed_bump})
+
+    # Unbumped scenario followed by up and down bumps of each input
+    scenarios = [(None, base_inputs)] + [(input_name, bumped_inputs(input_name, signed_bump))
+                                         for input_name, bump_size in bumps.items()
+                                         for signed_bump in (bump_size, -bump_size)]
+
+    if current_period_num >= end_num:
+        # Only the terminal NPV is left to value, so there is no work worth sending to other processes
+        npvs = [trinomial_value(storage, val_date, inventory, time_step=time_step, settlement_rule=settlement_rule,
+                                num_inventory_grid_points=num_inventory_grid_points,
+                                numerical_tolerance=numerical_tolerance, **inputs) for _, inputs in scenarios]
+    else:
+        inventory_grids = tree_inventory_grids(storage, inventory, current_period_num, num_inventory_grid_points,
+                                               numerical_tolerance)
+        active_periods = storage.periods[inventory_grids.start_active:end_num]
+        present_day = current_period.asfreq('D', how='start').ordinal
+        settlement_days = nps.settlement_day_ordinals(settlement_rule, active_periods)
+        cost_days = nps.first_day_ordinals(active_periods)
+
+        def discount_factors(inputs):
+            discount_curve = nps.discount_factor_curve(inputs['interest_rates'], present_day)
+            return nps.curve_discount_factors(discount_curve, present_day, settlement_days), \
+                   nps.curve_discount_factors(discount_curve, present_day, cost_days)
+
+        # Bumping interest rates leaves the tree unchanged, and bumping other inputs leaves the discount factors
+        # unchanged. Bumped trees are built by the revaluations, so in parallel along with the backward induction
+        base_tree = _create_tree(storage, current_period, forward_curve, spot_volatility, mean_reversion, time_step)
+        base_discount_factors = discount_factors(base_inputs)
+
+        def revaluation_args(input_name, inputs):
+            if input_name is None:
+                return base_tree, None, base_discount_factors
+            if input_name == 'interest_rates':
+                return base_tree, None, discount_factors(inputs)
+            return None, (inputs['forward_curve'], inputs['spot_volatility'], inputs['mean_reversion']), \
+                   base_discount_factors
+
+        revalue = partial(_revalue_scenario, storage, current_period, time_step, inventory_grids)
+        trees, tree_inputs, scenario_discount_factors = zip(*(revaluation_args(input_name, inputs)
+                                                              for input_name, inputs in scenarios))
+        if max_workers > 1:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                npvs = list(executor.map(revalue, trees, tree_inputs, scenario_discount_factors))
+        else:
+            npvs = list(map(revalue, trees, tree_inputs, scenario_discount_factors))
+
+    npvs_up = np.array(npvs[1::2])
+    npvs_down = np.array(npvs[2::2])
+    bump_sizes = np.array(list(bumps.values()), dtype=np.float64)
+    return pd.DataFrame(data={'bump_size': bump_sizes,
+                              'npv': np.full(len(bumps), npvs[0]),
+                              'npv_up': npvs_up,
+                              'npv_down': npvs_down,
+                              'sensitivity': (npvs_up - npvs_down) / (2.0 * bump_sizes)},
+                        index=pd.Index(list(bumps.keys()), name='input'))
+
+
+def _revalue_scenario(storage, current_period, time_step, inventory_grids, tree, tree_inputs, discount_factors):
+    """
+    Storage NPV of a trinomial_sensitivities scenario on tree, a (tree, tree_offset) tuple, or if tree is None on the
+    tree built from tree_inputs, a (forward_curve, spot_volatility, mean_reversion) tuple. At module level so that it
+    can be run by worker processes.
+    """
+    if tree is None:
+        tree = _create_tree(storage, current_period, *tree_inputs, time_step)
+    tree, tree_offset = tree
+    discount_factors_settlement, discount_factors_costs = discount_factors
+    return tree_storage_npv(storage, tree, tree_offset, inventory_grids, discount_factors_settlement,
+                            discount_factors_costs)
+
+
+def _check_valuation_inputs(inventory, num_inventory_grid_points, numerical_tolerance):
+    if inventory < 0:
+        raise ValueError("Inventory cannot be negative.")
+    if num_inventory_grid_points < 3:
+        raise ValueError("num_inventory_grid_points value must be at least 3.")
+    if numerical_tolerance <= 0:
+        raise ValueError("Numerical tolerance must be positive.")
+
+
+def _create_tree(storage, current_period, forward_curve, spot_volatility, mean_reversion, time_step):
+    """Returns the tree and the tree period index of storage period number 0."""
+    forward_curve_start = pd.Period(forward_curve.index[0], freq=storage.freq)
+    if forward_curve_start > current_period:
+        raise ValueError("Forward curve starts too late. Must start on or before the current period.")
+    # As OneFactorTrinomialTree, the tree starts with a single node on the first period of the forward curve
+    tree_periods = pd.period_range(start=forward_curve_start, end=storage.end, freq=storage.freq)
+    forward_prices = nps.period_values(forward_curve, tree_periods)
+    if np.any(np.isnan(forward_prices)):
+        raise ValueError("Forward curve does not contain prices for all periods until storage end period.")
+    spot_volatilities = nps.period_values(spot_volatility, tree_periods)
+    if np.any(np.isnan(spot_volatilities)):
+        raise ValueError("spot_volatility does not contain values for all periods until storage end period.")
+    tree = one_factor_tree(tree_periods, forward_prices, spot_volatilities, mean_reversion, time_step)
+    return tree, -storage.period_num(forward_curve_start)
+
+
+def _active_discount_factors(storage, current_period, start_active, interest_rates, settlement_rule):
+    """Discount factors for commodity settlement and costs for each period from start_active until before the end."""
+    active_periods = storage.periods[start_active:storage.num_periods - 1]
+    present_day = current_period.asfreq('D', how='start').ordinal
+    discount_curve = nps.discount_factor_curve(interest_rates, present_day)
+    discount_factors_settlement = nps.curve_discount_factors(discount_curve, present_day,
+                                                             nps.settlement_day_ordinals(settlement_rule, active_periods))
+    discount_factors_costs = nps.curve_discount_factors(discount_curve, present_day,
+                                                        nps.first_day_ordinals(active_periods))
+    return discount_factors_settlement, discount_factors_costs
+
+
+def _sample_tree_paths(tree, start_tree_num, num_periods, num_paths, rng):
+    """Node indices, with shape (num_paths, num_periods), of paths sampled in the tree starting at start_tree_num."""
+    nodes = np.empty((num_paths, num_periods), dtype=np.intp)
+    start_probabilities = tree.probabilities[start_tree_num]
+    nodes[:, 0] = np.minimum(np.searchsorted(np.cumsum(start_probabilities), rng.random(num_paths), side='right'),
+                             len(start_probabilities) - 1)
+    for i in range(1, num_periods):
+        tree_num = start_tree_num + i - 1
+        cumulative_probabilities = np.cumsum(tree.transition_probabilities[tree_num][nodes[:, i - 1]], axis=1)
+        branches = np.sum(rng.random(num_paths)[:, np.newaxis] >= cumulative_probabilities[:, :2], axis=1)
+        nodes[:, i] = tree.transition_indices[tree_num][nodes[:, i - 1], branches]
+    return nodes
+
+
+def _expected_continuation_npvs(storage, tree, tree_num, valuation_grids, active_index, nodes, decision_set):
+    """
+    Expected continuation NPVs, with shape (3, num paths), for each decision of decision_set, which has an inventory
+    for each path, with the paths on tree nodes nodes of period tree_num.
+    """
+    inventories_after_decision = decision_set.inventories + decision_set.decisions - decision_set.inventory_losses
+    next_active_index = active_index + 1
+    expected_continuation_npvs = np.zeros(inventories_after_decision.shape)
+    for branch in range(3):
+        next_nodes = tree.transition_indices[tree_num][nodes, branch]
+        if next_active_index == len(valuation_grids.storage_npvs):
+            continuation_npvs = storage.terminal_npv(tree.prices[tree_num + 1][next_nodes], inventories_after_decision)
+        else:
+            continuation_npvs = nps.path_linear_interpolate(
+                valuation_grids.inventory_grids.decision_sets[next_active_index].inventories,
+                valuation_grids.storage_npvs[next_active_index][next_nodes], inventories_after_decision)
+        expected_continuation_npvs += continuation_npvs * tree.transition_probabilities[tree_num][nodes, branch]
+    return expected_continuation_npvs
+
+
+def _end_period_npv(storage, inventory, tree, tree_offset):
+    end_num = storage.num_periods - 1
+    if inventory < storage.min_inventory[end_num]:
+        raise ValueError("Current inventory is lower than the minimum allowed in the end period.")
+    if inventory > storage.max_inventory[end_num]:
+        raise ValueError("Current inventory is greater than the maximum allowed in the end period.")
+    end_tree_num = end_num + tree_offset
+    terminal_npvs = np.array([storage.terminal_npv(price, np.array([inventory]))[0] for price in tree.prices[end_tree_num]])
+    return float(np.sum(terminal_npvs * tree.probabilities[end_tree_num]))
@@ -0,0 +1,131 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import os
+import math
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Dict, Any, Optional, Sequence, List
+from cmdty_storage import _clr
+from cmdty_storage.cmdty_storage import CmdtyStorage
+from cmdty_storage.intrinsic import intrinsic_value
+from cmdty_storage.trinomial import trinomial_value
+
+
+class StorageValuationSpec(NamedTuple):
+    """
+    Picklable specification of a storage contract valuation.
+
+    Attributes:
+        storage: keyword arguments of the CmdtyStorage constructor.
+        valuation: keyword arguments of the valuation function, intrinsic_value or trinomial_value, excluding
+            cmdty_storage. settlement_rule must be picklable, so use a built-in rule such as DaysAfterMonthEnd or a
+            module level function rather than a lambda.
+    """
+    storage: Dict[str, Any]
+    valuation: Dict[str, Any]
+
+
+class PortfolioValuationResults(NamedTuple):
+    """
+    Results of value_portfolio, with elements in the same order as the specs. For a contract which failed to value the
+    NPV is NaN, the profile None, and the error is a message describing the exception raised.
+    """
+    npvs: np.ndarray
+    profiles: List[Optional[pd.DataFrame]]
+    errors: List[Optional[str]]
+
+
+_VALUATION_METHODS = ('intrinsic', 'trinomial')
+
+
+def value_portfolio(specs: Sequence[StorageValuationSpec],
+                    method: str = 'intrinsic',
+                    max_workers: Optional[int] = None,
+                    chunk_size: Optional[int] = None) -> PortfolioValuationResults:
+    """
+    Values a portfolio of storage contracts in parallel using a pool of processes. Each worker process loads the CLR and
+    Cmdty.Storage assemblies once on start up, then values the chunks of contracts sent to it. An exception raised when
+    valuing one contract is recorded in the results for that contract, and doesn't stop valuation of the others.
+
+    Args:
+        specs: specifications of the contracts to value.
+        method (str): 'intrinsic' to value with intrinsic_value, or 'trinomial' to value with trinomial_value. Profiles
+            are only available for the intrinsic method.
+        max_workers (int): number of worker processes. Defaults to the number of processors.
+        chunk_size (int): number of contracts sent to a worker at a time. Defaults to a size which gives each worker
+            about four chunks.
+    """
+    if method not in _VALUATION_METHODS:
+        raise ValueError("method parameter value of '{}' not supported. Allowable values are 'intrinsic' and 'trinomial'."
+                         .format(method))
+    max_workers = max_workers or os.cpu_count()
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(len(specs) / (max_workers * 4)))
+    elif chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    chunks = [list(specs[i:i + chunk_size]) for i in range(0, len(specs), chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_initialize_worker) as executor:
+        futures = [executor.submit(_value_chunk, method, chunk) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            try:
+                results.extend(future.result())
+            except Exception as e:  # Chunk could not be sent to, or valued by, a worker
+                results.extend([(np.nan, None, _error_message(e))] * len(chunk))
+
+    return PortfolioValuationResults(npvs=np.array([npv for npv, _, _ in results], dtype=np.float64),
+                                     profiles=[profile for _, profile, _ in results],
+                                     errors=[error for _, _, error in results])
+
+
+def _initialize_worker():
+    # Load the CLR and assemblies once per worker on start up, rather than with the first chunk
+    _clr.load_assemblies()
+
+
+def _value_chunk(method, specs):
+    return [_value_contract(method, spec) for spec in specs]
+
+
+def _value_contract(method, spec):
+    try:
+        cmdty_storage = CmdtyStorage(**spec.storage)
+        if method == 'intrinsic':
+            results = intrinsic_value(cmdty_storage, **spec.valuation)
+            npv, profile = results.npv, results.profile
+        else:
+            npv, profile = trinomial_value(cmdty_storage, **spec.valuation), None
+        return float(npv), profile, None
+    except Exception as e:
+        return np.nan, None, _error_message(e)
+
+
+def _error_message(exception):
+    # Message rather than exception object returned as .NET exceptions cannot be pickled
+    return '{}: {}'.format(type(exception).__name__, exception)
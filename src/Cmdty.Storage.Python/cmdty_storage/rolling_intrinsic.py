@@ -0,0 +1,251 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import numpy as np
+import pandas as pd
+from datetime import date
+from typing import NamedTuple, Union, Callable, Tuple
+from cmdty_storage import CmdtyStorage, numpy_storage as nps
+
+
+class RollingIntrinsicResults(NamedTuple):
+    """
+    Attributes:
+        npvs: intrinsic NPV calculated at each re-optimisation, indexed by snapshot period.
+        decisions: decision path, indexed by period, with the period of the snapshot on which each decision was made,
+            the inventory at the end of the period, and the volumes injected, withdrawn, consumed and lost.
+        pnl: realised undiscounted cash flows by period, from buying or selling the net position at the price of the
+            period in the snapshot on which the decision was made, less injection, withdrawal and inventory costs.
+    """
+    npvs: pd.Series
+    decisions: pd.DataFrame
+    pnl: pd.DataFrame
+
+
+def rolling_intrinsic_value(cmdty_storage: CmdtyStorage,
+                            curve_snapshots: pd.DataFrame,
+                            inventory: Union[float, int],
+                            interest_rates: pd.Series,
+                            settlement_rule: Callable[[pd.Period], date],
+                            num_inventory_grid_points: int = 100,
+                            numerical_tolerance: float = 1E-12) -> RollingIntrinsicResults:
+    """
+    Rolling intrinsic valuation of commodity storage. Moving forward through the forward curve snapshots, the storage
+    intrinsic value is optimised from the current inventory using the snapshot's curve, then the optimal decisions are
+    applied until the period of the next snapshot, when the storage is re-optimised.
+
+    Inventory space, inventory grids, decision sets and costs of later periods are reused from the previous
+    re-optimisation when unchanged, so only the price dependent calculations are repeated for each snapshot.
+
+    Args:
+        curve_snapshots (pandas.DataFrame): forward curves, with index the delivery periods, of the same freq as
+            cmdty_storage, and one column per snapshot. Column labels are the snapshot dates, in increasing order with
+            at most one snapshot per period.
+        inventory (float): inventory at the start of the period of the first snapshot.
+        interest_rates (pandas.Series): daily Act/365 continuously compounded interest rates used to discount to the
+            first day of the period of each snapshot.
+        settlement_rule (callable): Mapping function from pandas.Period type to the date on which the cmdty delivered in
+            this period is settled.
+    """
+    if cmdty_storage.freq != curve_snapshots.index.freqstr:
+        raise ValueError("cmdty_storage and curve_snapshots have different frequencies.")
+    if inventory < 0:
+        raise ValueError("Inventory cannot be negative.")
+    if num_inventory_grid_points < 3:
+        raise ValueError("num_inventory_grid_points value must be at least 3.")
+    if numerical_tolerance <= 0:
+        raise ValueError("Numerical tolerance must be positive.")
+    return _rolling_intrinsic_value(cmdty_storage.storage_arrays, curve_snapshots, inventory, interest_rates,
+                                    settlement_rule, num_inventory_grid_points, numerical_tolerance)
+
+
+def _rolling_intrinsic_value(storage: nps.StorageArrays, curve_snapshots, inventory, interest_rates, settlement_rule,
+                             num_inventory_grid_points, numerical_tolerance):
+    snapshot_periods = pd.PeriodIndex([pd.Period(snapshot_date, freq=storage.freq)
+                                       for snapshot_date in curve_snapshots.columns], freq=storage.freq)
+    if np.any(np.diff(snapshot_periods.asi8) <= 0):
+        raise ValueError("curve_snapshots columns must be in increasing order, with at most one snapshot per period.")
+
+    end_num = storage.num_periods - 1
+    # Start period number of each snapshot, and of the period after the last decision
+    start_nums = np.clip((snapshot_periods.asi8 - storage.start.ordinal) // storage.start.freq.n, 0, end_num)
+    start_nums = np.append(start_nums, end_num)
+
+    forward_prices = _snapshot_forward_prices(curve_snapshots, storage)
+    decision_periods = storage.periods[:end_num]
+    settlement_days = nps.settlement_day_ordinals(settlement_rule, decision_periods)
+    cost_days = nps.first_day_ordinals(decision_periods)
+
+    # As .NET WithFixedNumberOfPointsOnGlobalInventoryRange, the global range runs from the lowest to highest max inventory
+    grid_spacing = (storage.max_inventory.max() - storage.max_inventory.min()) / (num_inventory_grid_points - 1)
+    if not grid_spacing > 0.0:
+        raise ValueError("Inventory grid spacing must be positive.")
+
+    decision_sets = {}  # Period number to tuple of inventory bounds and DecisionSet
+    inventory_space = None
+    npvs = []
+    decisions = _DecisionPath()
+    inventory_loop = float(inventory)
+
+    for snapshot_num, snapshot_period in enumerate(snapshot_periods):
+        start_active = start_nums[snapshot_num]
+        if start_active == end_num:
+            break
+        snapshot_prices = forward_prices[:, snapshot_num]
+        if np.any(np.isnan(snapshot_prices[start_active:])):
+            raise ValueError("Forward curve snapshot {} does not contain prices for all periods from {} until storage "
+                             "end period.".format(curve_snapshots.columns[snapshot_num], storage.periods[start_active]))
+
+        inventory_space = storage.inventory_space(inventory_loop, start_active, inventory_space)
+        present_day = snapshot_period.asfreq('D', how='start').ordinal
+        discount_curve = nps.discount_factor_curve(interest_rates, present_day)
+        discount_factors_settlement = nps.curve_discount_factors(discount_curve, present_day, settlement_days[start_active:])
+        discount_factors_costs = nps.curve_discount_factors(discount_curve, present_day, cost_days[start_active:])
+
+        storage_value_by_inventory = _backward_induction(storage, start_active, inventory_space, snapshot_prices,
+                                                         discount_factors_settlement, discount_factors_costs,
+                                                         decision_sets, grid_spacing, numerical_tolerance)
+
+        # Apply optimal decisions until the period of the next snapshot
+        num_executed = start_nums[snapshot_num + 1] - start_active
+        for i in range(max(num_executed, 1)):
+            period_num = start_active + i
+            optimal = storage.optimal_decisions(period_num, np.array([inventory_loop]), inventory_space.lower[i],
+                                                inventory_space.upper[i], snapshot_prices[period_num],
+                                                storage_value_by_inventory[i], discount_factors_settlement[i],
+                                                discount_factors_costs[i], numerical_tolerance)
+            if i == 0:
+                npvs.append(optimal.storage_npv[0])
+            if i < num_executed:
+                decisions.append(period_num, snapshot_period, inventory_loop, snapshot_prices[period_num], optimal)
+                inventory_loop += optimal.inject_withdraw[0] - optimal.inventory_loss[0]
+
+    npvs_series = pd.Series(npvs, index=snapshot_periods[:len(npvs)], dtype=np.float64)
+    decisions_frame, pnl_frame = decisions.data_frames(storage)
+    return RollingIntrinsicResults(npvs_series, decisions_frame, pnl_frame)
+
+
+def _snapshot_forward_prices(curve_snapshots: pd.DataFrame, storage: nps.StorageArrays) -> np.ndarray:
+    """Forward prices with shape (num storage periods, num snapshots), with nan for periods not in curve_snapshots."""
+    index = nps._period_values_index(curve_snapshots, storage.freq)
+    snapshots = pd.DataFrame(curve_snapshots.values, index=index)
+    return snapshots.reindex(storage.periods).values.astype(np.float64)
+
+
+def _backward_induction(storage, start_active, inventory_space, forward_prices, discount_factors_settlement,
+                        discount_factors_costs, decision_sets, grid_spacing, numerical_tolerance):
+    """
+    Backward induction as numpy_intrinsic.intrinsic_value, returning the list of storage value by inventory functions.
+    decision_sets caches, by period number, the DecisionSet on the inventory grid together with the inventory bounds
+    it was created for. Cached sets are reused while the bounds are unchanged, which is the case for all periods after
+    the inventory space calculated from the current inventory has converged to that of the previous snapshot.
+    """
+    end_num = storage.num_periods - 1
+    cmdty_price_at_end = forward_prices[end_num]
+
+    def terminal_value(inventories):
+        return storage.terminal_npv(cmdty_price_at_end, inventories)
+
+    def interpolated_value(inventory_grid, storage_npvs):
+        return lambda inventories: nps.linear_interpolate(inventory_grid, storage_npvs, inventories)
+
+    lower = inventory_space.lower
+    upper = inventory_space.upper
+    num_periods = len(lower)
+    # Element i is the storage value by inventory at the start of period number start_active + i + 1
+    storage_value_by_inventory = [None] * num_periods
+    storage_value_by_inventory[-1] = terminal_value
+
+    for i in range(num_periods - 2, -1, -1):
+        period_num = start_active + i + 1
+        active_index = period_num - start_active
+        inventory_bounds = (lower[i], upper[i], lower[i + 1], upper[i + 1])
+        cached = decision_sets.get(period_num)
+        if cached is not None and cached[0] == inventory_bounds:
+            decision_set = cached[1]
+        else:
+            inventory_grid = nps.fixed_spacing_grid(lower[i], upper[i], grid_spacing)
+            decision_set = storage.decision_set_and_costs(period_num, inventory_grid, lower[i + 1], upper[i + 1],
+                                                          numerical_tolerance)
+            decision_sets[period_num] = (inventory_bounds, decision_set)
+        decisions = nps.optimal_decisions_for_set(decision_set, forward_prices[period_num],
+                                                  storage_value_by_inventory[i + 1],
+                                                  discount_factors_settlement[active_index],
+                                                  discount_factors_costs[active_index])
+        storage_value_by_inventory[i] = interpolated_value(decision_set.inventories, decisions.storage_npv)
+
+    return storage_value_by_inventory
+
+
+class _DecisionPath:
+    """Accumulates the decisions executed between re-optimisations."""
+
+    def __init__(self):
+        self.period_nums = []
+        self.decision_periods = []
+        self.inventories = []
+        self.inject_withdraw_volumes = []
+        self.cmdty_consumed = []
+        self.inventory_losses = []
+        self.cmdty_prices = []
+        self.inventories_before = []
+
+    def append(self, period_num: int, decision_period: pd.Period, inventory: float,
+               cmdty_price: float, decisions: nps.OptimalDecisions):
+        self.period_nums.append(period_num)
+        self.decision_periods.append(decision_period)
+        self.inventories_before.append(inventory)
+        self.inventories.append(inventory + decisions.inject_withdraw[0] - decisions.inventory_loss[0])
+        self.inject_withdraw_volumes.append(decisions.inject_withdraw[0])
+        self.cmdty_consumed.append(decisions.cmdty_consumed[0])
+        self.inventory_losses.append(decisions.inventory_loss[0])
+        self.cmdty_prices.append(cmdty_price)
+
+    def data_frames(self, storage: nps.StorageArrays) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        period_nums = np.array(self.period_nums, dtype=np.int64)
+        index = storage.periods[period_nums]
+        inject_withdraw_volumes = np.array(self.inject_withdraw_volumes, dtype=np.float64)
+        cmdty_consumed = np.array(self.cmdty_consumed, dtype=np.float64)
+        net_positions = -inject_withdraw_volumes - cmdty_consumed
+        decisions = pd.DataFrame(data={'decision_period': pd.PeriodIndex(self.decision_periods, freq=storage.freq),
+                                       'inventory': np.array(self.inventories, dtype=np.float64),
+                                       'inject_withdraw_volume': inject_withdraw_volumes,
+                                       'cmdty_consumed': cmdty_consumed,
+                                       'inventory_loss': np.array(self.inventory_losses, dtype=np.float64),
+                                       'net_position': net_positions},
+                                 index=index)
+
+        cmdty_prices = np.array(self.cmdty_prices, dtype=np.float64)
+        decision_costs = np.empty(len(period_nums))
+        for i, period_num in enumerate(period_nums):
+            decision_costs[i] = storage.decision_costs_and_cmdty_consumed(period_num, inject_withdraw_volumes[i:i + 1])[0][0]
+        inventory_costs = np.array(self.inventories_before, dtype=np.float64) * storage.inventory_cost[period_nums]
+        cash_flows = net_positions * cmdty_prices - decision_costs - inventory_costs
+        pnl = pd.DataFrame(data={'cmdty_price': cmdty_prices,
+                                 'decision_cost': decision_costs,
+                                 'inventory_cost': inventory_costs,
+                                 'cash_flow': cash_flows,
+                                 'cumulative_pnl': np.cumsum(cash_flows)},
+                           index=index)
+        return decisions, pnl
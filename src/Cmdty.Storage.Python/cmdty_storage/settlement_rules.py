@@ -0,0 +1,51 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import numpy as np
+import pandas as pd
+from typing import NamedTuple
+
+
+class DaysAfterMonthEnd(NamedTuple):
+    """
+    Settlement rule of num_days after the last day of the calendar month containing the start of the delivery period.
+    For example, DaysAfterMonthEnd(20) settles on the 20th of the following month. Evaluated natively by .NET.
+    """
+    num_days: int
+
+    def __call__(self, period: pd.Period) -> pd.Period:
+        return period.asfreq('M').asfreq('D', how='end') + self.num_days
+
+    def settlement_day_ordinals(self, periods: pd.PeriodIndex) -> np.ndarray:
+        return periods.asfreq('M').asfreq('D', how='end').asi8 + self.num_days
+
+
+class SamePeriod(NamedTuple):
+    """Settlement rule of the day containing the start of the delivery period. Evaluated natively by .NET."""
+
+    def __call__(self, period: pd.Period) -> pd.Period:
+        return period.asfreq('D', how='start')
+
+    def settlement_day_ordinals(self, periods: pd.PeriodIndex) -> np.ndarray:
+        return periods.asfreq('D', how='start').asi8
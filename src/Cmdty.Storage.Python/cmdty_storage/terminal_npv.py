@@ -0,0 +1,66 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import numpy as np
+from typing import NamedTuple, Sequence, Tuple
+
+
+class LinearTerminalNpv(NamedTuple):
+    """
+    Terminal storage NPV of cmdty_price * inventory * price_multiplier - fixed_cost for any inventory left in storage
+    at the end, and zero if the storage is empty. Evaluated within .NET, so valuations don't call back into Python.
+    """
+    price_multiplier: float = 1.0
+    fixed_cost: float = 0.0
+
+    def __call__(self, cmdty_price, inventory):
+        return np.where(np.asarray(inventory) > 0.0, cmdty_price * inventory * self.price_multiplier - self.fixed_cost, 0.0)
+
+
+class PiecewiseLinearTerminalNpv(NamedTuple):
+    """
+    Terminal storage NPV of cmdty_price * inventory * price multiplier, with the price multiplier linearly interpolated,
+    and extrapolated, by inventory from the (inventory, price_multiplier) rows of multipliers_by_inventory. Evaluated
+    within .NET, so valuations don't call back into Python.
+    """
+    multipliers_by_inventory: Sequence[Tuple[float, float]]
+
+    @property
+    def inventories(self) -> np.ndarray:
+        return np.array(sorted(inventory for inventory, _ in self.multipliers_by_inventory), dtype=np.float64)
+
+    @property
+    def price_multipliers(self) -> np.ndarray:
+        return np.array([multiplier for _, multiplier in sorted(self.multipliers_by_inventory, key=lambda row: row[0])],
+                        dtype=np.float64)
+
+    def __call__(self, cmdty_price, inventory):
+        if len(self.multipliers_by_inventory) < 2:
+            raise ValueError("multipliers_by_inventory must contain at least two rows.")
+        inventories = self.inventories
+        price_multipliers = self.price_multipliers
+        segment = np.clip(np.searchsorted(inventories, inventory, side='right') - 1, 0, len(inventories) - 2)
+        gradient = (price_multipliers[segment + 1] - price_multipliers[segment]) / (inventories[segment + 1] - inventories[segment])
+        price_multiplier = price_multipliers[segment] + (inventory - inventories[segment]) * gradient
+        return cmdty_price * inventory * price_multiplier
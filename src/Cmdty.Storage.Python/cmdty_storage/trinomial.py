@@ -21,15 +21,121 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 # OTHER DEALINGS IN THE SOFTWARE.
 
-import clr
-import System as dotnet
-from cmdty_storage import utils, CmdtyStorage
-from pathlib import Path
-from typing import Union, Callable
+from cmdty_storage import utils, CmdtyStorage, numpy_trinomial, numpy_storage as nps, _clr
+from cmdty_storage.grid_convergence import GridConvergenceResults, converge_grid
+from cmdty_storage.numpy_trinomial import TrinomialSimulationResults
+from typing import Callable, Dict, Optional, List, NamedTuple
 from datetime import date
+import numpy as np
 import pandas as pd
-clr.AddReference(str(Path('cmdty_storage/lib/Cmdty.Storage')))
-import Cmdty.Storage as net_cs
+
+
+class _TreeResultsArrays(NamedTuple):
+    """Tree valuation results for each decision period held in contiguous arrays, ordered as the .NET
+    TreeStorageValuationResultsArrays class."""
+    periods: pd.PeriodIndex
+    num_price_levels: np.ndarray
+    num_grid_points: np.ndarray
+    tree_prices: np.ndarray
+    tree_probabilities: np.ndarray
+    inventory_grids: np.ndarray
+    storage_npvs: np.ndarray
+    inject_withdraw_decisions: np.ndarray
+
+
+class TrinomialValuationResults:
+    """
+    Results of a trinomial tree valuation. Other than npv, attributes hold values for each period in which a decision
+    is made. These are loaded from contiguous arrays, each copied in a single block, when one of them is first
+    accessed, so there is no extra cost if only npv is used.
+
+    Attributes:
+        npv: storage NPV.
+        periods: periods in which a decision is made, from the current period until the period before storage end.
+        tree_prices: list with, for each period, an array of the spot price at each tree price level.
+        tree_probabilities: list with, for each period, an array of the probability of each tree price level.
+        inventory_grids: list with, for each period, an array of the inventory grid points at the start of the period.
+        storage_npvs: list with, for each period, an array with shape (num price levels, num inventory grid points) of
+            the storage NPV.
+        inject_withdraw_decisions: list with, for each period, an array with shape (num price levels, num inventory grid
+            points) of the optimal volume injected (positive) or withdrawn (negative).
+    """
+    _PADDED_ATTRIBUTES = ('tree_prices', 'tree_probabilities', 'inventory_grids', 'storage_npvs',
+                          'inject_withdraw_decisions')
+
+    def __init__(self, npv: float, load_arrays: Callable[[], _TreeResultsArrays]):
+        self.npv = npv
+        self._load_arrays = load_arrays
+        self._arrays = None
+        self._ragged = {}
+
+    def __repr__(self):
+        return 'TrinomialValuationResults(npv={})'.format(self.npv)
+
+    @property
+    def periods(self) -> pd.PeriodIndex:
+        return self._results_arrays().periods
+
+    @property
+    def tree_prices(self) -> List[np.ndarray]:
+        return self._ragged_arrays('tree_prices')
+
+    @property
+    def tree_probabilities(self) -> List[np.ndarray]:
+        return self._ragged_arrays('tree_probabilities')
+
+    @property
+    def inventory_grids(self) -> List[np.ndarray]:
+        return self._ragged_arrays('inventory_grids')
+
+    @property
+    def storage_npvs(self) -> List[np.ndarray]:
+        return self._ragged_arrays('storage_npvs')
+
+    @property
+    def inject_withdraw_decisions(self) -> List[np.ndarray]:
+        return self._ragged_arrays('inject_withdraw_decisions')
+
+    def padded(self, attribute: str, fill_value: float = np.nan) -> np.ndarray:
+        """
+        Values of one of the per period attributes as a single array padded with fill_value. Has shape (num periods,
+        max num price levels) for tree_prices and tree_probabilities, (num periods, max num grid points) for
+        inventory_grids, and (num periods, max num price levels, max num grid points) for storage_npvs and
+        inject_withdraw_decisions.
+        """
+        if attribute not in self._PADDED_ATTRIBUTES:
+            raise ValueError("attribute parameter value of '{}' not supported. Allowable values are {}."
+                             .format(attribute, self._PADDED_ATTRIBUTES))
+        arrays = self._results_arrays()
+        max_price_levels = int(arrays.num_price_levels.max(initial=0))
+        max_grid_points = int(arrays.num_grid_points.max(initial=0))
+        shape = {'tree_prices': (max_price_levels,), 'tree_probabilities': (max_price_levels,),
+                 'inventory_grids': (max_grid_points,)}.get(attribute, (max_price_levels, max_grid_points))
+        padded_values = np.full((len(arrays.periods),) + shape, fill_value, dtype=np.float64)
+        for i, period_values in enumerate(self._ragged_arrays(attribute)):
+            padded_values[(i,) + tuple(slice(0, length) for length in period_values.shape)] = period_values
+        return padded_values
+
+    def _results_arrays(self) -> _TreeResultsArrays:
+        if self._arrays is None:
+            self._arrays = self._load_arrays()
+        return self._arrays
+
+    def _ragged_arrays(self, attribute) -> List[np.ndarray]:
+        """Views of the contiguous array of attribute for each period."""
+        if attribute not in self._ragged:
+            arrays = self._results_arrays()
+            values = getattr(arrays, attribute)
+            if attribute in ('tree_prices', 'tree_probabilities'):
+                shapes = [(num_price_levels,) for num_price_levels in arrays.num_price_levels]
+            elif attribute == 'inventory_grids':
+                shapes = [(num_grid_points,) for num_grid_points in arrays.num_grid_points]
+            else:
+                shapes = list(zip(arrays.num_price_levels, arrays.num_grid_points))
+            sizes = [int(np.prod(shape)) for shape in shapes]
+            split_values = np.split(values, np.cumsum(sizes)[:-1]) if sizes else []
+            self._ragged[attribute] = [period_values.reshape(shape) for period_values, shape in zip(split_values, shapes)]
+        return self._ragged[attribute]
 
 
 def trinomial_value(cmdty_storage: CmdtyStorage,
@@ -42,43 +148,312 @@ def trinomial_value(cmdty_storage: CmdtyStorage,
                     interest_rates: pd.Series,
                     settlement_rule: Callable[[pd.Period], date],
                     num_inventory_grid_points: int = 100,
-                    numerical_tolerance: float = 1E-12) -> float:
+                    numerical_tolerance: float = 1E-12,
+                    engine: str = 'dotnet',
+                    num_threads: int = 1,
+                    grid: str = 'uniform',
+                    grid_tolerance: Optional[float] = None,
+                    max_inventory_grid_points: int = 2561,
+                    decision_freq: Optional[str] = None) -> float:
     """
     Calculates the value of commodity storage using a one-factor trinomial tree.
 
     Args:
         settlement_rule (callable): Mapping function from pandas.Period type to the date on which the cmdty delivered in
             this period is settled. The pandas.Period parameter will have freq equal to the cmdty_storage parameter's freq property.
+        engine (str): 'dotnet' to value using the .NET Cmdty.Storage library, or 'numpy' to use the NumPy implementation,
+            which holds the tree as arrays and vectorizes each backward induction step over all price levels and the
+            inventory grid.
+        num_threads (int): maximum number of threads used by the dotnet engine to value the price levels of each tree
+            time step in parallel. Results are identical for any number of threads. Not used by the numpy engine, which
+            already vectorizes over price levels.
+        grid (str): 'uniform' for num_inventory_grid_points evenly spaced over the global inventory range, or 'adaptive'
+            for finer spacing near the inventory space bounds and the inventory levels at which piecewise linear
+            inject/withdraw rates change slope. See intrinsic_value.
+        grid_tolerance (float, optional): if specified, num_inventory_grid_points is ignored and the storage is valued
+            on grids of increasing size until the estimated absolute error of the extrapolated NPV is within
+            grid_tolerance, or the next grid would have more than max_inventory_grid_points. The extrapolated NPV is
+            returned. Use trinomial_grid_convergence for the error estimate and the grid sizes used.
+        decision_freq (str, optional): pandas Offset Alias, such as '4H' for a storage with hourly freq, for decision
+            blocks over which the inject/withdraw volume is held constant. See intrinsic_value.
+    """
+    if num_threads < 1:
+        raise ValueError("num_threads must be at least 1.")
+    if cmdty_storage.freq != forward_curve.index.freqstr:
+        raise ValueError("cmdty_storage and forward_curve have different frequencies.")
+    if cmdty_storage.freq != spot_volatility.index.freqstr:
+        raise ValueError("cmdty_storage and spot_volatility have different frequencies.")
+    nps.check_grid_type(grid)
+    if grid_tolerance is not None:
+        return trinomial_grid_convergence(cmdty_storage, val_date, inventory, forward_curve, spot_volatility,
+                                          mean_reversion, time_step, interest_rates, settlement_rule, grid_tolerance,
+                                          max_inventory_grid_points, numerical_tolerance, engine, num_threads, grid,
+                                          decision_freq).npv
+    if engine == 'numpy':
+        return numpy_trinomial.trinomial_value(cmdty_storage.storage_arrays, val_date, inventory, forward_curve,
+                                               spot_volatility, mean_reversion, time_step, interest_rates,
+                                               settlement_rule, num_inventory_grid_points, numerical_tolerance, grid,
+                                               decision_freq)
+    if engine != 'dotnet':
+        raise ValueError("engine parameter value of '{}' not supported. Allowable values are 'dotnet' and 'numpy'.".format(engine))
+    trinomial_calc, time_period_type = _create_trinomial_calc(cmdty_storage, val_date, inventory, forward_curve,
+                                                spot_volatility, mean_reversion, time_step, interest_rates,
+                                                settlement_rule, num_inventory_grid_points, numerical_tolerance,
+                                                num_threads, grid, decision_freq)
+    # CalculateNpv only holds the values for the next time step during backward induction
+    return _clr.net_cs.ITreeCalculate[time_period_type](trinomial_calc).CalculateNpv()
+
+
+def trinomial_grid_convergence(cmdty_storage: CmdtyStorage,
+                               val_date: utils.TimePeriodSpecType,
+                               inventory: float,
+                               forward_curve: pd.Series,
+                               spot_volatility: pd.Series,
+                               mean_reversion: float,
+                               time_step: float,
+                               interest_rates: pd.Series,
+                               settlement_rule: Callable[[pd.Period], date],
+                               grid_tolerance: float,
+                               max_inventory_grid_points: int = 2561,
+                               numerical_tolerance: float = 1E-12,
+                               engine: str = 'dotnet',
+                               num_threads: int = 1,
+                               grid: str = 'uniform',
+                               decision_freq: Optional[str] = None) -> GridConvergenceResults:
+    """
+    Values commodity storage with trinomial_value on inventory grids of increasing size until the estimated absolute
+    error of the extrapolated NPV is within grid_tolerance, or the next grid would have more than
+    max_inventory_grid_points. See grid_convergence.converge_grid.
+
+    Returns:
+        GridConvergenceResults holding the extrapolated NPV, the error estimate and the grid sizes used.
+    """
+    return converge_grid(lambda num_grid_points: trinomial_value(cmdty_storage, val_date, inventory, forward_curve,
+                                    spot_volatility, mean_reversion, time_step, interest_rates, settlement_rule,
+                                    num_grid_points, numerical_tolerance, engine, num_threads, grid,
+                                    decision_freq=decision_freq),
+                         grid_tolerance, max_inventory_grid_points)
+
+
+def trinomial_valuation_results(cmdty_storage: CmdtyStorage,
+                                val_date: utils.TimePeriodSpecType,
+                                inventory: float,
+                                forward_curve: pd.Series,
+                                spot_volatility: pd.Series,
+                                mean_reversion: float,
+                                time_step: float,
+                                interest_rates: pd.Series,
+                                settlement_rule: Callable[[pd.Period], date],
+                                num_inventory_grid_points: int = 100,
+                                numerical_tolerance: float = 1E-12,
+                                engine: str = 'dotnet',
+                                num_threads: int = 1,
+                                grid: str = 'uniform') -> TrinomialValuationResults:
+    """
+    Calculates the value of commodity storage using a one-factor trinomial tree, as trinomial_value, returning the
+    tree, inventory grids, and storage NPVs and optimal decisions for each tree price level and inventory grid point.
+
+    For the dotnet engine these are copied from contiguous .NET arrays, each in a single block, the first time one of
+    them is accessed. The backward induction holds the results for every period, so uses more memory than
+    trinomial_value, which only holds those for the next period.
+
+    Returns:
+        TrinomialValuationResults.
     """
+    if num_threads < 1:
+        raise ValueError("num_threads must be at least 1.")
     if cmdty_storage.freq != forward_curve.index.freqstr:
         raise ValueError("cmdty_storage and forward_curve have different frequencies.")
     if cmdty_storage.freq != spot_volatility.index.freqstr:
         raise ValueError("cmdty_storage and spot_volatility have different frequencies.")
+    nps.check_grid_type(grid)
+    if engine == 'numpy':
+        storage_arrays = cmdty_storage.storage_arrays
+        valuation = numpy_trinomial.trinomial_valuation(storage_arrays, val_date, inventory, forward_curve,
+                                                        spot_volatility, mean_reversion, time_step, interest_rates,
+                                                        settlement_rule, num_inventory_grid_points,
+                                                        numerical_tolerance, grid)
+        return TrinomialValuationResults(valuation.npv, lambda: _numpy_tree_results_arrays(storage_arrays, valuation))
+    if engine != 'dotnet':
+        raise ValueError("engine parameter value of '{}' not supported. Allowable values are 'dotnet' and 'numpy'.".format(engine))
+    trinomial_calc, time_period_type = _create_trinomial_calc(cmdty_storage, val_date, inventory, forward_curve,
+                                                spot_volatility, mean_reversion, time_step, interest_rates,
+                                                settlement_rule, num_inventory_grid_points, numerical_tolerance,
+                                                num_threads, grid)
+    net_val_results = _clr.net_cs.ITreeCalculate[time_period_type](trinomial_calc).Calculate()
+    return TrinomialValuationResults(net_val_results.NetPresentValue,
+                                     lambda: _net_tree_results_arrays(net_val_results, cmdty_storage.freq))
+
+
+def _net_tree_results_arrays(net_val_results, freq):
+    net_arrays = net_val_results.GetResultsArrays()
+    if net_arrays.NumPeriods == 0:
+        periods = pd.PeriodIndex(data=[], freq=freq)
+    else:
+        start = utils.net_datetime_to_py_datetime(net_val_results.InventorySpaceGrids.Indices[0].Start)
+        periods = pd.period_range(start=start, freq=freq, periods=net_arrays.NumPeriods)
+    return _TreeResultsArrays(periods,
+                              utils.net_int_array_to_numpy(net_arrays.NumPriceLevels),
+                              utils.net_int_array_to_numpy(net_arrays.NumGridPoints),
+                              utils.net_double_array_to_numpy(net_arrays.TreePrices),
+                              utils.net_double_array_to_numpy(net_arrays.TreeProbabilities),
+                              utils.net_double_array_to_numpy(net_arrays.InventoryGrids),
+                              utils.net_double_array_to_numpy(net_arrays.StorageNpvs),
+                              utils.net_double_array_to_numpy(net_arrays.InjectWithdrawDecisions))
+
+
+def _numpy_tree_results_arrays(storage_arrays, valuation):
+    if valuation.grids is None:
+        empty = np.empty(0)
+        return _TreeResultsArrays(pd.PeriodIndex(data=[], freq=storage_arrays.freq), np.empty(0, dtype=np.int32),
+                                  np.empty(0, dtype=np.int32), empty, empty, empty, empty, empty)
+    tree, tree_offset, grids = valuation.tree, valuation.tree_offset, valuation.grids
+    start_active = grids.inventory_grids.start_active
+    decision_sets = grids.inventory_grids.decision_sets
+    tree_nums = range(start_active + tree_offset, start_active + tree_offset + len(decision_sets))
+    decisions = [decision_set.decisions[decision_indices, np.arange(len(decision_set.inventories))]
+                 for decision_set, decision_indices in zip(decision_sets, grids.decision_indices)]
+    return _TreeResultsArrays(storage_arrays.periods[start_active:start_active + len(decision_sets)],
+                              np.array([len(tree.prices[tree_num]) for tree_num in tree_nums], dtype=np.int32),
+                              np.array([len(decision_set.inventories) for decision_set in decision_sets], dtype=np.int32),
+                              np.concatenate([tree.prices[tree_num] for tree_num in tree_nums]),
+                              np.concatenate([tree.probabilities[tree_num] for tree_num in tree_nums]),
+                              np.concatenate([decision_set.inventories for decision_set in decision_sets]),
+                              np.concatenate([storage_npvs.ravel() for storage_npvs in grids.storage_npvs]),
+                              np.concatenate([period_decisions.ravel() for period_decisions in decisions]))
+
+
+def _create_trinomial_calc(cmdty_storage, val_date, inventory, forward_curve, spot_volatility, mean_reversion, time_step,
+                           interest_rates, settlement_rule, num_inventory_grid_points, numerical_tolerance, num_threads,
+                           grid, decision_freq=None):
     time_period_type = utils.FREQ_TO_PERIOD_TYPE[cmdty_storage.freq]
 
-    trinomial_calc = net_cs.TreeStorageValuation[time_period_type].ForStorage(cmdty_storage.net_storage)
-    net_cs.ITreeAddStartingInventory[time_period_type](trinomial_calc).WithStartingInventory(inventory)
+    trinomial_calc = _clr.net_cs.TreeStorageValuation[time_period_type].ForStorage(cmdty_storage.net_storage)
+    _clr.net_cs.ITreeAddStartingInventory[time_period_type](trinomial_calc).WithStartingInventory(inventory)
 
     current_period = utils.from_datetime_like(val_date, time_period_type)
-    net_cs.ITreeAddCurrentPeriod[time_period_type](trinomial_calc).ForCurrentPeriod(current_period)
+    _clr.net_cs.ITreeAddCurrentPeriod[time_period_type](trinomial_calc).ForCurrentPeriod(current_period)
 
     net_forward_curve = utils.series_to_double_time_series(forward_curve, time_period_type)
-    net_cs.ITreeAddForwardCurve[time_period_type](trinomial_calc).WithForwardCurve(net_forward_curve)
+    _clr.net_cs.ITreeAddForwardCurve[time_period_type](trinomial_calc).WithForwardCurve(net_forward_curve)
 
     net_spot_volatility = utils.series_to_double_time_series(spot_volatility, time_period_type)
-    net_cs.TreeStorageValuationExtensions.WithOneFactorTrinomialTree[time_period_type](
+    _clr.net_cs.TreeStorageValuationExtensions.WithOneFactorTrinomialTree[time_period_type](
                         trinomial_calc, net_spot_volatility, mean_reversion, time_step)
 
-    net_settlement_rule = utils.wrap_settle_for_dotnet(settlement_rule, cmdty_storage.freq)
-    net_cs.ITreeAddCmdtySettlementRule[time_period_type](trinomial_calc).WithCmdtySettlementRule(net_settlement_rule)
+    net_settlement_rule = utils.settlement_rule_for_dotnet(settlement_rule, cmdty_storage.freq,
+                                                          cmdty_storage.periods)
+    _clr.net_cs.ITreeAddCmdtySettlementRule[time_period_type](trinomial_calc).WithCmdtySettlementRule(net_settlement_rule)
 
-    interest_rate_time_series = utils.series_to_double_time_series(interest_rates, utils.FREQ_TO_PERIOD_TYPE['D'])
-    net_cs.TreeStorageValuationExtensions.WithAct365ContinuouslyCompoundedInterestRateCurve[time_period_type](
-                                    trinomial_calc, interest_rate_time_series)
+    net_discount_factor_curve = utils.discount_factor_curve_for_dotnet(interest_rates, val_date, cmdty_storage.freq)
+    _clr.net_cs.TreeStorageValuationExtensions.WithDiscountFactorCurve[time_period_type](
+                                    trinomial_calc, net_discount_factor_curve)
 
-    net_cs.TreeStorageValuationExtensions.WithFixedNumberOfPointsOnGlobalInventoryRange[time_period_type](
+    if grid == 'adaptive':
+        _clr.net_cs.TreeStorageValuationExtensions.WithAdaptiveInventoryGrid[time_period_type](
+                                    trinomial_calc, num_inventory_grid_points, nps.ADAPTIVE_GRID_REFINEMENT_FACTOR,
+                                    nps.ADAPTIVE_GRID_REFINEMENT_WIDTH)
+    else:
+        _clr.net_cs.TreeStorageValuationExtensions.WithFixedNumberOfPointsOnGlobalInventoryRange[time_period_type](
                                     trinomial_calc, num_inventory_grid_points)
-    net_cs.TreeStorageValuationExtensions.WithLinearInventorySpaceInterpolation[time_period_type](trinomial_calc)
-    net_cs.ITreeAddNumericalTolerance[time_period_type](trinomial_calc).WithNumericalTolerance(numerical_tolerance)
-    npv = net_cs.ITreeCalculate[time_period_type](trinomial_calc).Calculate()
-    return npv.NetPresentValue
+    _clr.net_cs.TreeStorageValuationExtensions.WithLinearInventorySpaceInterpolation[time_period_type](trinomial_calc)
+    _clr.net_cs.ITreeAddNumericalTolerance[time_period_type](trinomial_calc).WithNumericalTolerance(numerical_tolerance)
+    _clr.net_cs.ITreeCalculate[time_period_type](trinomial_calc).WithMaxDegreeOfParallelism(num_threads)
+    if decision_freq is not None:
+        net_decision_schedule = utils.decision_schedule_for_dotnet(decision_freq, cmdty_storage.freq,
+                                                                   cmdty_storage.periods)
+        _clr.net_cs.ITreeCalculate[time_period_type](trinomial_calc).WithDecisionSchedule(net_decision_schedule)
+    return trinomial_calc, time_period_type
+
+
+def trinomial_sensitivities(cmdty_storage: CmdtyStorage,
+                            val_date: utils.TimePeriodSpecType,
+                            inventory: float,
+                            forward_curve: pd.Series,
+                            spot_volatility: pd.Series,
+                            mean_reversion: float,
+                            time_step: float,
+                            interest_rates: pd.Series,
+                            settlement_rule: Callable[[pd.Period], date],
+                            bumps: Dict[str, float],
+                            num_inventory_grid_points: int = 100,
+                            numerical_tolerance: float = 1E-12,
+                            max_workers: int = 1) -> pd.DataFrame:
+    """
+    Calculates sensitivities of the one-factor trinomial tree value, using the numpy engine, by central differences.
+
+    The numpy engine builds the same one-factor tree as the Cmdty.Core OneFactorTrinomialTree used by the default
+    dotnet engine, so the NPVs agree with trinomial_value for either engine to within floating point differences.
+    The inventory space, inventory grids and decision sets are calculated once and shared by all the bumped
+    revaluations, rather than recalculated for each as by separate calls to trinomial_value.
+
+    Args:
+        bumps (dict): additive bump size by name of the input to bump. Allowable names are 'forward_curve',
+            'spot_volatility', 'mean_reversion' and 'interest_rates', each bump being applied to all periods.
+        max_workers (int): number of worker processes used to run the bumped revaluations in parallel. The default of 1
+            runs them in turn in the calling process. If more than 1, the terminal_storage_npv of cmdty_storage must be
+            picklable, so a LinearTerminalNpv, PiecewiseLinearTerminalNpv or module level function rather than a lambda.
+
+    Returns:
+        pandas.DataFrame indexed by bumped input name, with columns bump_size, npv (unbumped), npv_up, npv_down and
+        sensitivity, the change in NPV per unit change in the input.
+    """
+    if cmdty_storage.freq != forward_curve.index.freqstr:
+        raise ValueError("cmdty_storage and forward_curve have different frequencies.")
+    if cmdty_storage.freq != spot_volatility.index.freqstr:
+        raise ValueError("cmdty_storage and spot_volatility have different frequencies.")
+    return numpy_trinomial.trinomial_sensitivities(cmdty_storage.storage_arrays, val_date, inventory, forward_curve,
+                                                   spot_volatility, mean_reversion, time_step, interest_rates,
+                                                   settlement_rule, bumps, num_inventory_grid_points,
+                                                   numerical_tolerance, max_workers)
+
+
+def trinomial_simulate(cmdty_storage: CmdtyStorage,
+                       val_date: utils.TimePeriodSpecType,
+                       inventory: float,
+                       forward_curve: pd.Series,
+                       spot_volatility: pd.Series,
+                       mean_reversion: float,
+                       time_step: float,
+                       interest_rates: pd.Series,
+                       settlement_rule: Callable[[pd.Period], date],
+                       num_paths: int = 10000,
+                       seed: Optional[int] = None,
+                       num_inventory_grid_points: int = 100,
+                       numerical_tolerance: float = 1E-12,
+                       num_threads: int = 1,
+                       grid: str = 'uniform') -> TrinomialSimulationResults:
+    """
+    Values commodity storage using a one-factor trinomial tree, with the numpy engine, then simulates following the
+    optimal decisions on paths sampled in the tree, for example to calculate the distribution of P&L or volumes.
+
+    The numpy engine is always used. It builds the same one-factor tree as the Cmdty.Core OneFactorTrinomialTree used
+    by the default dotnet engine of trinomial_value, so the paths are sampled in the tree, and follow the decisions,
+    of that valuation, with NPV agreeing with trinomial_value to within floating point differences.
+
+    Valuation is performed once, holding the storage NPV and optimal decision on the inventory grid for each period
+    and tree price level. Paths are simulated a period at a time over many paths at once, with the optimal decision
+    looked up where a path inventory is on the inventory grid, and otherwise recalculated from the storage NPVs for
+    the next period.
+
+    Args:
+        settlement_rule (callable): Mapping function from pandas.Period type to the date on which the cmdty delivered in
+            this period is settled. The pandas.Period parameter will have freq equal to the cmdty_storage parameter's freq property.
+        num_paths (int): number of paths sampled in the tree.
+        seed (int): seed for the random number generator used to sample paths. Results are reproducible for the same
+            seed, for any number of threads. Results differ between calls if None.
+        num_threads (int): number of threads used to simulate the paths, split into equal sized chunks, in parallel.
+        grid (str): 'uniform' or 'adaptive' inventory grid. See trinomial_value.
+
+    Returns:
+        TrinomialSimulationResults with arrays of spot prices, decisions, inventories and realised NPVs with one row
+        per path.
+    """
+    if cmdty_storage.freq != forward_curve.index.freqstr:
+        raise ValueError("cmdty_storage and forward_curve have different frequencies.")
+    if cmdty_storage.freq != spot_volatility.index.freqstr:
+        raise ValueError("cmdty_storage and spot_volatility have different frequencies.")
+    return numpy_trinomial.trinomial_simulate(cmdty_storage.storage_arrays, val_date, inventory, forward_curve,
+                                              spot_volatility, mean_reversion, time_step, interest_rates,
+                                              settlement_rule, num_paths, seed, num_inventory_grid_points,
+                                              numerical_tolerance, num_threads, grid)
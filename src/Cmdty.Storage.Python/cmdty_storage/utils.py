@@ -22,15 +22,14 @@
 # OTHER DEALINGS IN THE SOFTWARE.
 
 import pandas as pd
+import numpy as np
+from pandas.tseries.frequencies import to_offset
 from datetime import datetime
-import clr
-import System as dotnet
-from pathlib import Path
-clr.AddReference(str(Path("cmdty_storage/lib/Cmdty.TimePeriodValueTypes")))
-import Cmdty.TimePeriodValueTypes as tp
-clr.AddReference(str(Path('cmdty_storage/lib/Cmdty.TimeSeries')))
-import Cmdty.TimeSeries as ts
+from cmdty_storage import _clr
+from cmdty_storage.numpy_storage import settlement_day_ordinals, discount_factor_curve, decision_period_flags
+from cmdty_storage.settlement_rules import DaysAfterMonthEnd, SamePeriod
 from typing import Union
+from collections.abc import Mapping
 from datetime import date
 
 
@@ -41,8 +40,8 @@ def from_datetime_like(datetime_like, time_period_type):
     else:
         time_args = (0, 0, 0)
 
-    date_time = dotnet.DateTime(datetime_like.year, datetime_like.month, datetime_like.day, *time_args)
-    return tp.TimePeriodFactory.FromDateTime[time_period_type](date_time)
+    date_time = _clr.dotnet.DateTime(datetime_like.year, datetime_like.month, datetime_like.day, *time_args)
+    return _clr.tp.TimePeriodFactory.FromDateTime[time_period_type](date_time)
 
 
 def net_datetime_to_py_datetime(net_datetime):
@@ -56,20 +55,124 @@ def net_time_period_to_pandas_period(net_time_period, freq):
 
 def series_to_double_time_series(series, time_period_type):
     """Converts an instance of pandas Series to a Cmdty.TimeSeries.TimeSeries type with Double data type."""
-    return series_to_time_series(series, time_period_type, dotnet.Double, lambda x: x)
+    period_index = _contiguous_period_index(series.index, time_period_type)
+    if period_index is None:
+        return _series_to_time_series_elementwise(series, time_period_type, _clr.dotnet.Double, lambda x: x)
+    net_start = from_datetime_like(period_index[0], time_period_type)
+    net_values = numpy_to_net_double_array(series.values)
+    return _clr.ts.TimeSeries[time_period_type, _clr.dotnet.Double](net_start, net_values)
 
 
 def series_to_time_series(series, time_period_type, net_data_type, data_selector):
-    """Converts an instance of pandas Series to a Cmdty.TimeSeries.TimeSeries."""
+    """
+    Converts an instance of pandas Series to a Cmdty.TimeSeries.TimeSeries. If net_data_type is Double or Int32 the
+    values selected by data_selector are collected into a NumPy array and copied to .NET in a single block. Values of
+    any other .NET type, such as structs, are set in the .NET array one element at a time.
+    """
+    period_index = _contiguous_period_index(series.index, time_period_type)
+    if period_index is None:
+        return _series_to_time_series_elementwise(series, time_period_type, net_data_type, data_selector)
+    net_start = from_datetime_like(period_index[0], time_period_type)
     series_len = len(series)
-    net_indices = dotnet.Array.CreateInstance(time_period_type, series_len)
-    net_values = dotnet.Array.CreateInstance(net_data_type, series_len)
+    if net_data_type == _clr.dotnet.Double:
+        net_values = numpy_to_net_double_array(np.fromiter(map(data_selector, series.values), dtype=np.float64,
+                                                           count=series_len))
+    elif net_data_type == _clr.dotnet.Int32:
+        net_values = numpy_to_net_int_array(np.fromiter(map(data_selector, series.values), dtype=np.int32,
+                                                        count=series_len))
+    else:
+        net_values = _clr.dotnet.Array.CreateInstance(net_data_type, series_len)
+        for i, value in enumerate(series.values):
+            net_values[i] = data_selector(value)
+    return _clr.ts.TimeSeries[time_period_type, net_data_type](net_start, net_values)
+
+
+def _series_to_time_series_elementwise(series, time_period_type, net_data_type, data_selector):
+    """Converts a pandas Series to a Cmdty.TimeSeries.TimeSeries one element at a time. Used as the fallback
+    for indices which can't be converted in bulk."""
+    series_len = len(series)
+    net_indices = _clr.dotnet.Array.CreateInstance(time_period_type, series_len)
+    net_values = _clr.dotnet.Array.CreateInstance(net_data_type, series_len)
 
     for i in range(series_len):
         net_indices[i] = from_datetime_like(series.index[i], time_period_type)
         net_values[i] = data_selector(series.values[i])
 
-    return ts.TimeSeries[time_period_type, net_data_type](net_indices, net_values)
+    return _clr.ts.TimeSeries[time_period_type, net_data_type](net_indices, net_values)
+
+
+def _contiguous_period_index(index, time_period_type):
+    """Returns index as a pandas PeriodIndex with granularity matching time_period_type, or None if this isn't
+    possible or the index is empty or contains gaps."""
+    if len(index) == 0:
+        return None
+    freq = _period_type_to_freq(time_period_type)
+    if freq is None:
+        return None
+    if isinstance(index, pd.PeriodIndex):
+        if index.freq != to_offset(freq):
+            return None
+        period_index = index
+    elif isinstance(index, pd.DatetimeIndex):
+        period_index = index.to_period(freq)
+    else:
+        return None
+    offsets = period_index_offsets(period_index)
+    if not np.array_equal(offsets, np.arange(len(offsets))):
+        return None
+    return period_index
+
+
+def _period_type_to_freq(time_period_type):
+    """Returns the pandas freq string of the .NET time period type, or None if it isn't a key of FREQ_TO_PERIOD_TYPE."""
+    for freq, period_type in FREQ_TO_PERIOD_TYPE.items():
+        if period_type == time_period_type:
+            return freq
+    return None
+
+
+def period_index_offsets(period_index):
+    """Returns a numpy int64 array of the number of periods each element of period_index is offset from the first."""
+    ordinals = period_index.asi8
+    return (ordinals - ordinals[0]) // period_index.freq.n
+
+
+def numpy_to_net_double_array(values):
+    """Copies a 1-D array-like of numbers into a new .NET Double array using a single block memory copy."""
+    np_values = np.ascontiguousarray(values, dtype=np.float64)
+    net_array = _clr.dotnet.Array.CreateInstance(_clr.dotnet.Double, len(np_values))
+    if len(np_values) > 0:
+        _clr.Marshal.Copy(_int_ptr(np_values.ctypes.data), net_array, 0, len(np_values))
+    return net_array
+
+
+def numpy_to_net_int_array(values):
+    """Copies a 1-D array-like of integers into a new .NET Int32 array using a single block memory copy."""
+    np_values = np.ascontiguousarray(values, dtype=np.int32)
+    net_array = _clr.dotnet.Array.CreateInstance(_clr.dotnet.Int32, len(np_values))
+    if len(np_values) > 0:
+        _clr.Marshal.Copy(_int_ptr(np_values.ctypes.data), net_array, 0, len(np_values))
+    return net_array
+
+
+def net_double_array_to_numpy(net_array):
+    """Copies a .NET Double array into a new numpy float64 array using a single block memory copy."""
+    np_values = np.empty(net_array.Length, dtype=np.float64)
+    if net_array.Length > 0:
+        _clr.Marshal.Copy(net_array, 0, _int_ptr(np_values.ctypes.data), net_array.Length)
+    return np_values
+
+
+def net_int_array_to_numpy(net_array):
+    """Copies a .NET Int32 array into a new numpy int32 array using a single block memory copy."""
+    np_values = np.empty(net_array.Length, dtype=np.int32)
+    if net_array.Length > 0:
+        _clr.Marshal.Copy(net_array, 0, _int_ptr(np_values.ctypes.data), net_array.Length)
+    return np_values
+
+
+def _int_ptr(address):
+    return _clr.dotnet.IntPtr.__overloads__[_clr.dotnet.Int64](address)
 
 
 def net_time_series_to_pandas_series(net_time_series, freq):
@@ -95,15 +198,33 @@ def raise_if_not_none(arg, error_message):
         raise ValueError(error_message)
 
 
-FREQ_TO_PERIOD_TYPE = {
-        "15min" : tp.QuarterHour,
-        "30min" : tp.HalfHour,
-        "H" : tp.Hour,
-        "D" : tp.Day,
-        "M" : tp.Month,
-        "Q" : tp.Quarter
+class _FreqToPeriodType(Mapping):
+    """Read-only dict of freq to .NET time period type, which only loads the CLR when a value is accessed."""
+
+    _PERIOD_TYPE_NAMES = {
+        "15min" : 'QuarterHour',
+        "30min" : 'HalfHour',
+        "H" : 'Hour',
+        "D" : 'Day',
+        "M" : 'Month',
+        "Q" : 'Quarter'
     }
-""" dict of str: .NET time period type.
+
+    def __getitem__(self, freq):
+        return getattr(_clr.tp, self._PERIOD_TYPE_NAMES[freq])
+
+    def __iter__(self):
+        return iter(self._PERIOD_TYPE_NAMES)
+
+    def __len__(self):
+        return len(self._PERIOD_TYPE_NAMES)
+
+    def __contains__(self, freq):
+        return freq in self._PERIOD_TYPE_NAMES
+
+
+FREQ_TO_PERIOD_TYPE = _FreqToPeriodType()
+""" Mapping of str: .NET time period type.
 Each item describes an allowable granularity of curves constructed, as specified by the 
 freq parameter in the curves public methods.
 
@@ -117,14 +238,57 @@ def wrap_settle_for_dotnet(py_settle_func, freq):
     def wrapper_settle_function(py_function, net_time_period, freq):
         pandas_period = net_time_period_to_pandas_period(net_time_period, freq)
         py_function_result = py_function(pandas_period)
-        net_settle_day = from_datetime_like(py_function_result, tp.Day)
+        net_settle_day = from_datetime_like(py_function_result, _clr.tp.Day)
         return net_settle_day
 
     def wrapped_function(net_time_period):
         return wrapper_settle_function(py_settle_func, net_time_period, freq)
 
     time_period_type = FREQ_TO_PERIOD_TYPE[freq]
-    return dotnet.Func[time_period_type, tp.Day](wrapped_function)
+    return _clr.dotnet.Func[time_period_type, _clr.tp.Day](wrapped_function)
+
+
+TimePeriodSpecType = Union[datetime, date, pd.Period]
+
+
+def settlement_rule_for_dotnet(settlement_rule, freq, periods: pd.PeriodIndex):
+    """
+    Converts settlement_rule to a .NET Func<T, Day> which doesn't call back into Python. Built-in rules from the
+    settlement_rules module are mapped to their .NET equivalent. Any other callable is evaluated once for each of
+    periods, and the results passed to .NET as a lookup table.
+    """
+    time_period_type = FREQ_TO_PERIOD_TYPE[freq]
+    if isinstance(settlement_rule, DaysAfterMonthEnd):
+        return _clr.net_cs.CmdtySettlementRules.DaysAfterMonthEnd[time_period_type](settlement_rule.num_days)
+    if isinstance(settlement_rule, SamePeriod):
+        return _clr.net_cs.CmdtySettlementRules.SamePeriod[time_period_type]()
+
+    settle_day_ordinals = settlement_day_ordinals(settlement_rule, periods)
+    reference_day = pd.Period(ordinal=int(settle_day_ordinals[0]), freq='D')
+    net_first_period = from_datetime_like(periods[0], time_period_type)
+    net_reference_day = from_datetime_like(reference_day, _clr.tp.Day)
+    net_settle_day_offsets = numpy_to_net_int_array(settle_day_ordinals - settle_day_ordinals[0])
+    return _clr.net_cs.CmdtySettlementRules.LookupTable[time_period_type](net_first_period, net_reference_day,
+                                                                    net_settle_day_offsets)
+
+
+def decision_schedule_for_dotnet(decision_freq: str, freq, periods: pd.PeriodIndex):
+    """
+    Converts decision_freq to a .NET Func<T, bool> decision schedule, true for the periods which start a decision
+    block, evaluated once for each of periods and passed to .NET as a lookup table.
+    """
+    time_period_type = FREQ_TO_PERIOD_TYPE[freq]
+    decision_period_offsets = np.flatnonzero(decision_period_flags(periods, decision_freq))
+    net_first_period = from_datetime_like(periods[0], time_period_type)
+    return _clr.net_cs.DecisionSchedules.LookupTable[time_period_type](net_first_period, len(periods),
+                                                                      numpy_to_net_int_array(decision_period_offsets))
 
 
-TimePeriodSpecType = Union[datetime, date, pd.Period]
\ No newline at end of file
+def discount_factor_curve_for_dotnet(interest_rates: pd.Series, val_date, freq):
+    """
+    Creates a .NET DiscountFactorCurve, discounting to the first day of the period of frequency freq containing
+    val_date, with the dense array of discount factors calculated in NumPy.
+    """
+    present_day = pd.Period(val_date, freq=freq).asfreq('D', how='start')
+    curve = discount_factor_curve(interest_rates, present_day.ordinal)
+    return _clr.net_cs.DiscountFactorCurve(from_datetime_like(present_day, _clr.tp.Day), numpy_to_net_double_array(curve))
@@ -58,7 +58,8 @@
     ],
     install_requires=[
         'pythonnet>=2.4.0',
-        'pandas>=0.24.2'
+        'pandas>=0.24.2',
+        'numpy>=1.17'
         ],
     package_data={'cmdty_storage' : [
                         'lib/*.dll',
@@ -22,9 +22,15 @@
 # OTHER DEALINGS IN THE SOFTWARE.
 
 import unittest
+import os
+import pickle
+import subprocess
+import sys
+import textwrap
 import cmdty_storage as cs
 from datetime import date
 import pandas as pd
+import numpy as np
 from tests import utils
 
 
@@ -142,6 +148,10 @@ def test_start_property(self):
     def test_end_property(self):
         storage = self._create_storage()
         self.assertEqual(pd.Period(self._default_storage_end, freq='D'), storage.end)
+
+    def test_periods_property_equals_storage_arrays_periods(self):
+        storage = self._create_storage()
+        pd.testing.assert_index_equal(storage.storage_arrays.periods, storage.periods)
         
     def test_freq_property(self):
         storage = self._create_storage()
@@ -168,6 +178,29 @@ def test_terminal_storage_npv_evaluates_to_function_specified(self):
                 self.assertEqual(TestCmdtyStorage._default_terminal_npv_calc(cmdty_price, terminal_inventory), 
                                  storage.terminal_storage_npv(cmdty_price, terminal_inventory))
 
+    def test_terminal_storage_npv_linear_terminal_npv(self):
+        storage = self._create_storage(terminal_storage_npv=cs.LinearTerminalNpv(price_multiplier=0.95, fixed_cost=15.4))
+        for cmdty_price in [0.0, 23.85, 75.9, 100.22]:
+            for terminal_inventory in [500.58, 1268.65, 1800.0]:
+                self.assertAlmostEqual(cmdty_price * terminal_inventory * 0.95 - 15.4,
+                                       storage.terminal_storage_npv(cmdty_price, terminal_inventory), places=10)
+
+    def test_terminal_storage_npv_linear_terminal_npv_zero_inventory_equals_zero(self):
+        terminal_npv = cs.LinearTerminalNpv(price_multiplier=0.95, fixed_cost=15.4)
+        storage = self._create_storage(terminal_storage_npv=terminal_npv)
+        for cmdty_price in [0.0, 23.85, 75.9, 100.22]:
+            self.assertEqual(0.0, terminal_npv(cmdty_price, 0.0))
+            self.assertEqual(0.0, storage.terminal_storage_npv(cmdty_price, 0.0))
+
+    def test_terminal_storage_npv_piecewise_linear_terminal_npv_interpolates_price_multiplier(self):
+        terminal_npv = cs.PiecewiseLinearTerminalNpv([(0.0, 1.0), (2000.0, 0.8), (1000.0, 0.9)])
+        storage = self._create_storage(terminal_storage_npv=terminal_npv)
+        self.assertFalse(storage.empty_at_end)
+        for cmdty_price in [0.0, 23.85, 75.9, 100.22]:
+            self.assertAlmostEqual(cmdty_price * 500.0 * 0.95, storage.terminal_storage_npv(cmdty_price, 500.0), places=10)
+            self.assertAlmostEqual(cmdty_price * 1500.0 * 0.85, storage.terminal_storage_npv(cmdty_price, 1500.0), places=10)
+            self.assertAlmostEqual(terminal_npv(cmdty_price, 1268.65), storage.terminal_storage_npv(cmdty_price, 1268.65), places=10)
+
     def test_inject_withdraw_range_linearly_interpolated(self):
         storage = self._create_storage()
         # Inventory half way between pillars, so assert against mean of min/max inject/withdraw at the pillars
@@ -243,6 +276,14 @@ def test_min_inventory_property_from_constraints_table(self):
         self.assertEqual(0.0, storage.min_inventory(date(2019, 8, 29)))
         self.assertEqual(0.0, storage.min_inventory(date(2019, 9, 11)))
 
+    def test_constraints_generator_storage_arrays_equal_constraints_list(self):
+        constraints_generator = ((period, (rates for rates in rates_by_inventory))
+                                 for period, rates_by_inventory in self._default_constraints)
+        generator_storage_arrays = self._create_storage(constraints=constraints_generator).storage_arrays
+        storage_arrays = self._create_storage().storage_arrays
+        np.testing.assert_array_equal(storage_arrays.min_inventory, generator_storage_arrays.min_inventory)
+        np.testing.assert_array_equal(storage_arrays.max_inventory, generator_storage_arrays.max_inventory)
+
     def test_min_inventory_property_from_float_init_param(self):
         storage = self._create_storage(constraints=None, min_inventory=self._constant_min_inventory,
                         max_inventory=self._constant_max_inventory, max_injection_rate=self._constant_max_injection_rate, 
@@ -403,6 +444,61 @@ def test_inventory_cost_series_init_parameter(self):
                 inventory_cost = storage.inventory_cost(dt, inventory)
                 self.assertEqual(expected_inventory_cost * inventory, inventory_cost)
 
+    def test_freeze_evaluates_equal_to_storage(self):
+        storage = self._create_storage(injection_cost=self._series_injection_cost, inventory_cost=self._series_inventory_cost)
+        frozen_storage = storage.freeze()
+        self.assertEqual(storage.start, frozen_storage.start)
+        self.assertEqual(storage.end, frozen_storage.end)
+        self.assertEqual(storage.empty_at_end, frozen_storage.empty_at_end)
+        for dt in [date(2019, 8, 28), date(2019, 9, 1), date(2019, 9, 20)]:
+            self.assertEqual(storage.min_inventory(dt), frozen_storage.min_inventory(dt))
+            self.assertEqual(storage.max_inventory(dt), frozen_storage.max_inventory(dt))
+            self.assertEqual(storage.inventory_pcnt_loss(dt), frozen_storage.inventory_pcnt_loss(dt))
+            for inventory in [0, 500.58, 1234.56, 1800]:
+                self.assertEqual(storage.inject_withdraw_range(dt, inventory), frozen_storage.inject_withdraw_range(dt, inventory))
+                self.assertEqual(storage.injection_cost(dt, inventory, 25.5), frozen_storage.injection_cost(dt, inventory, 25.5))
+                self.assertEqual(storage.inventory_cost(dt, inventory), frozen_storage.inventory_cost(dt, inventory))
+
+    def test_freeze_shares_storage_arrays(self):
+        storage = self._create_storage()
+        frozen_storage = storage.freeze(date(2019, 9, 1))
+        self.assertIs(storage.storage_arrays, frozen_storage.storage_arrays)
+
+    def test_storage_arrays_pickled_without_inventory_space_cache(self):
+        storage_arrays = self._create_storage(terminal_storage_npv=cs.LinearTerminalNpv(fixed_cost=15.4)).storage_arrays
+        inventory_space = storage_arrays.inventory_space(650.0, 1)
+        unpickled_storage_arrays = pickle.loads(pickle.dumps(storage_arrays))
+        self.assertEqual(0, unpickled_storage_arrays.inventory_space_cache_info().size)
+        unpickled_inventory_space = unpickled_storage_arrays.inventory_space(650.0, 1)
+        np.testing.assert_array_equal(inventory_space.lower, unpickled_inventory_space.lower)
+        np.testing.assert_array_equal(inventory_space.upper, unpickled_inventory_space.upper)
+
+    def test_freeze_start_before_storage_start_raises(self):
+        storage = self._create_storage()
+        with self.assertRaises(Exception):
+            storage.freeze(date(2019, 8, 27))
+
+    def test_numpy_engine_valuation_does_not_load_clr(self):
+        # Run in a new interpreter, as other tests load the CLR into this one
+        script = textwrap.dedent("""
+            import sys
+            from datetime import date
+            import pandas as pd
+            import cmdty_storage as cs
+            storage = cs.CmdtyStorage('D', date(2019, 8, 28), date(2019, 9, 25), 0.015, 0.02, min_inventory=0.0,
+                                      max_inventory=1000.0, max_injection_rate=50.0, max_withdrawal_rate=60.0)
+            forward_curve = pd.Series(60.0, index=pd.period_range(date(2019, 9, 2), date(2019, 9, 25), freq='D'))
+            interest_rates = pd.Series(0.03, index=pd.period_range(date(2019, 9, 2), date(2019, 11, 30), freq='D'))
+            cs.intrinsic_value(storage, date(2019, 9, 2), 0.0, forward_curve, interest_rates, cs.SamePeriod(),
+                               engine='numpy')
+            assert storage.start == pd.Period(date(2019, 8, 28), freq='D') and storage.empty_at_end
+            sys.exit('CLR loaded' if 'clr' in sys.modules else 0)
+        """)
+        package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        completed = subprocess.run([sys.executable, '-c', script], cwd=package_dir, stderr=subprocess.PIPE,
+                                   universal_newlines=True)
+        self.assertEqual(0, completed.returncode, completed.stderr)
+
 
 if __name__ == '__main__':
     unittest.main()
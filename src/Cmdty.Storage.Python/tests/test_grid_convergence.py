@@ -0,0 +1,76 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import unittest
+from cmdty_storage.grid_convergence import converge_grid
+
+
+def _second_order_npv(num_grid_points):
+    grid_spacing = 1.0 / (num_grid_points - 1)
+    return 100.0 - 50.0 * grid_spacing ** 2
+
+
+class TestConvergeGrid(unittest.TestCase):
+
+    def test_second_order_convergence_extrapolates_to_limit(self):
+        results = converge_grid(_second_order_npv, grid_tolerance=1E-6, max_inventory_grid_points=1000)
+        self.assertTrue(results.converged)
+        self.assertEqual((11, 21, 41, 81), results.num_inventory_grid_points)
+        self.assertAlmostEqual(100.0, results.npv, places=10)
+        self.assertEqual(tuple(_second_order_npv(n) for n in results.num_inventory_grid_points), results.grid_npvs)
+
+    def test_stops_as_soon_as_tolerance_met(self):
+        def mixed_order_npv(num_grid_points):
+            return 100.0 - 1E3 / (num_grid_points - 1) + 5E3 / (num_grid_points - 1) ** 2
+        loose_results = converge_grid(mixed_order_npv, grid_tolerance=1.0, max_inventory_grid_points=100000)
+        tight_results = converge_grid(mixed_order_npv, grid_tolerance=1E-3, max_inventory_grid_points=100000)
+        self.assertTrue(loose_results.converged)
+        self.assertTrue(tight_results.converged)
+        self.assertLess(loose_results.num_inventory_grid_points[-1], tight_results.num_inventory_grid_points[-1])
+        self.assertAlmostEqual(100.0, tight_results.npv, delta=1E-3)
+
+    def test_oscillating_npvs_not_extrapolated(self):
+        grid_sizes = []
+
+        def oscillating_npv(num_grid_points):
+            grid_sizes.append(num_grid_points)
+            return 100.0 + (-1) ** len(grid_sizes) * 10.0 / num_grid_points
+
+        results = converge_grid(oscillating_npv, grid_tolerance=1E-9, max_inventory_grid_points=100)
+        self.assertFalse(results.converged)
+        self.assertEqual((11, 21, 41, 81), results.num_inventory_grid_points)
+        self.assertEqual(results.grid_npvs[-1], results.npv)
+        self.assertGreaterEqual(results.error_estimate, abs(results.grid_npvs[-1] - results.grid_npvs[-2]))
+
+    def test_non_positive_tolerance_raises(self):
+        with self.assertRaises(ValueError):
+            converge_grid(_second_order_npv, grid_tolerance=0.0, max_inventory_grid_points=1000)
+
+    def test_max_grid_points_allowing_three_grids_raises(self):
+        with self.assertRaises(ValueError):
+            converge_grid(_second_order_npv, grid_tolerance=1E-6, max_inventory_grid_points=80)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,6 +23,7 @@
 
 import unittest
 import pandas as pd
+import numpy as np
 import cmdty_storage as cs
 from datetime import date, timedelta
 from tests import utils
@@ -77,6 +78,96 @@ def terminal_npv_calc(price, inventory):
         intrinsic_results = cs.intrinsic_value(cmdty_storage, val_date, inventory, forward_curve, settlement_rule=twentieth_of_next_month,
                         interest_rates=interest_rate_curve, num_inventory_grid_points=100)
         
+    def test_intrinsic_value_profile_consistent_with_decisions(self):
+        storage_start = date(2019, 8, 28)
+        storage_end = date(2019, 9, 25)
+        cmdty_storage = cs.CmdtyStorage('D', storage_start, storage_end, injection_cost=0.1, withdrawal_cost=0.2, min_inventory=0,
+                                     max_inventory=1000, max_injection_rate=2.5, max_withdrawal_rate=3.6,
+                                     cmdty_consumed_inject=0.001, inventory_loss=0.0005)
+        inventory = 60.0
+        val_date = date(2019, 9, 2)
+
+        forward_curve = utils.create_piecewise_flat_series([58.89, 61.41, 70.89, 70.89], [val_date, date(2019, 9, 12), date(2019, 9, 18), storage_end], freq='D')
+
+        interest_rate_curve = pd.Series(index = pd.period_range(val_date, storage_end + timedelta(days=60), freq='D'))
+        interest_rate_curve[:] = 0.03
+
+        twentieth_of_next_month = lambda period: period.asfreq('M').asfreq('D', 'end') + 20
+        profile = cs.intrinsic_value(cmdty_storage, val_date, inventory, forward_curve, settlement_rule=twentieth_of_next_month,
+                        interest_rates=interest_rate_curve, num_inventory_grid_points=100).profile
+
+        self.assertEqual(pd.Period(val_date, freq='D'), profile.index[0])
+        self.assertEqual(pd.Period(storage_end, freq='D') - 1, profile.index[-1])
+        expected_inventory = inventory + (profile['inject_withdraw_volume'] - profile['inventory_loss']).cumsum()
+        pd.testing.assert_series_equal(expected_inventory, profile['inventory'], check_names=False)
+        expected_net_position = -profile['inject_withdraw_volume'] - profile['cmdty_consumed']
+        pd.testing.assert_series_equal(expected_net_position, profile['net_position'], check_names=False)
+
+    def _create_batch_test_inputs(self):
+        storage_start = date(2019, 8, 28)
+        storage_end = date(2019, 9, 25)
+        cmdty_storage = cs.CmdtyStorage('D', storage_start, storage_end, injection_cost=0.1, withdrawal_cost=0.2, min_inventory=0,
+                                     max_inventory=1000, max_injection_rate=2.5, max_withdrawal_rate=3.6,
+                                     cmdty_consumed_inject=0.001, inventory_loss=0.0005)
+        val_date = date(2019, 9, 2)
+        forward_curves = pd.DataFrame({
+            'base': utils.create_piecewise_flat_series([58.89, 61.41, 70.89, 70.89], [val_date, date(2019, 9, 12), date(2019, 9, 18), storage_end], freq='D'),
+            'flat': utils.create_piecewise_flat_series([60.0, 60.0], [val_date, storage_end], freq='D'),
+            'backwardated': utils.create_piecewise_flat_series([70.89, 61.41, 58.89, 58.89], [val_date, date(2019, 9, 12), date(2019, 9, 18), storage_end], freq='D'),
+        })
+        interest_rate_curve = pd.Series(index = pd.period_range(val_date, storage_end + timedelta(days=60), freq='D'))
+        interest_rate_curve[:] = 0.03
+        twentieth_of_next_month = lambda period: period.asfreq('M').asfreq('D', 'end') + 20
+        return cmdty_storage, val_date, forward_curves, interest_rate_curve, twentieth_of_next_month
+
+    def test_intrinsic_value_batch_equals_intrinsic_value_per_scenario(self):
+        cmdty_storage, val_date, forward_curves, interest_rate_curve, settlement_rule = self._create_batch_test_inputs()
+        inventories = [0.0, 30.0, 55.5]
+
+        batch_results = cs.intrinsic_value_batch(cmdty_storage, val_date, inventories, forward_curves, settlement_rule=settlement_rule,
+                            interest_rates=interest_rate_curve, num_inventory_grid_points=100, return_profiles=True)
+
+        self.assertEqual((3,), batch_results.npvs.shape)
+        for scenario_num, (scenario, forward_curve) in enumerate(forward_curves.items()):
+            single_results = cs.intrinsic_value(cmdty_storage, val_date, inventories[scenario_num], forward_curve,
+                                settlement_rule=settlement_rule, interest_rates=interest_rate_curve, num_inventory_grid_points=100)
+            self.assertAlmostEqual(single_results.npv, batch_results.npvs[scenario_num], places=10)
+            pd.testing.assert_frame_equal(single_results.profile, batch_results.profiles.loc[scenario])
+
+    def test_intrinsic_value_batch_grid_and_decision_freq_equal_intrinsic_value_per_scenario(self):
+        cmdty_storage, val_date, forward_curves, interest_rate_curve, settlement_rule = self._create_batch_test_inputs()
+        batch_results = cs.intrinsic_value_batch(cmdty_storage, val_date, 30.0, forward_curves, settlement_rule=settlement_rule,
+                            interest_rates=interest_rate_curve, num_inventory_grid_points=50, grid='adaptive',
+                            decision_freq='W')
+        for scenario_num, (_, forward_curve) in enumerate(forward_curves.items()):
+            single_results = cs.intrinsic_value(cmdty_storage, val_date, 30.0, forward_curve, settlement_rule=settlement_rule,
+                                interest_rates=interest_rate_curve, num_inventory_grid_points=50, grid='adaptive',
+                                decision_freq='W')
+            self.assertAlmostEqual(single_results.npv, batch_results.npvs[scenario_num], places=10)
+
+    def test_intrinsic_value_batch_unknown_grid_raises(self):
+        cmdty_storage, val_date, forward_curves, interest_rate_curve, settlement_rule = self._create_batch_test_inputs()
+        with self.assertRaises(ValueError):
+            cs.intrinsic_value_batch(cmdty_storage, val_date, 30.0, forward_curves, settlement_rule=settlement_rule,
+                            interest_rates=interest_rate_curve, grid='random')
+
+    def test_intrinsic_value_batch_ndarray_curves_scalar_inventory(self):
+        cmdty_storage, val_date, forward_curves, interest_rate_curve, settlement_rule = self._create_batch_test_inputs()
+
+        data_frame_results = cs.intrinsic_value_batch(cmdty_storage, val_date, 30.0, forward_curves, settlement_rule=settlement_rule,
+                            interest_rates=interest_rate_curve)
+        ndarray_results = cs.intrinsic_value_batch(cmdty_storage, val_date, 30.0, forward_curves.values, settlement_rule=settlement_rule,
+                            interest_rates=interest_rate_curve)
+
+        self.assertIsNone(ndarray_results.profiles)
+        np.testing.assert_array_equal(data_frame_results.npvs, ndarray_results.npvs)
+
+    def test_intrinsic_value_batch_inventories_length_mismatch_raises(self):
+        cmdty_storage, val_date, forward_curves, interest_rate_curve, settlement_rule = self._create_batch_test_inputs()
+        with self.assertRaises(ValueError):
+            cs.intrinsic_value_batch(cmdty_storage, val_date, [0.0, 10.0], forward_curves, settlement_rule=settlement_rule,
+                            interest_rates=interest_rate_curve)
+
     def test_expired_storage_returns_zero_npv_empty_profile(self):
         storage_start = date(2019, 8, 28)
         storage_end = date(2019, 9, 25)
@@ -122,5 +213,161 @@ def test_storage_value_date_equals_storage_end_returns_zero_npv_empty_profile(se
         self.assertEqual(0, len(intrinsic_results.profile))
 
 
+    def _create_engine_test_inputs(self, constraints_storage,
+                                   terminal_storage_npv=lambda price, inventory: price * inventory - 15.4):
+        storage_start = date(2019, 8, 28)
+        storage_end = date(2019, 9, 25)
+        if constraints_storage:
+            constraints = [
+                            (date(2019, 8, 28), [(0.0, -150.0, 255.2), (2000.0, -200.0, 175.0)]),
+                            (date(2019, 9, 10), [(0.0, -170.5, 235.8), (700.0, -180.2, 200.77), (1800.0, -190.5, 174.45)])
+                          ]
+            cmdty_storage = cs.CmdtyStorage('D', storage_start, storage_end, 0.015, 0.02, constraints,
+                                    cmdty_consumed_inject=0.0001, cmdty_consumed_withdraw=0.000088,
+                                    terminal_storage_npv=terminal_storage_npv,
+                                    inventory_loss=0.001, inventory_cost=0.002)
+            inventory = 650.0
+        else:
+            cmdty_storage = cs.CmdtyStorage('D', storage_start, storage_end, injection_cost=0.1, withdrawal_cost=0.2, min_inventory=0,
+                                    max_inventory=1000, max_injection_rate=2.5, max_withdrawal_rate=3.6,
+                                    cmdty_consumed_inject=0.001, inventory_loss=0.0005)
+            inventory = 60.0
+        val_date = date(2019, 9, 2)
+        forward_curve = utils.create_piecewise_flat_series([58.89, 61.41, 59.89, 59.89], [val_date, date(2019, 9, 12), date(2019, 9, 18), storage_end], freq='D')
+        interest_rate_curve = pd.Series(index = pd.period_range(val_date, storage_end + timedelta(days=60), freq='D'))
+        interest_rate_curve[:] = 0.03
+        twentieth_of_next_month = lambda period: period.asfreq('M').asfreq('D', 'end') + 20
+        return dict(cmdty_storage=cmdty_storage, val_date=val_date, inventory=inventory, forward_curve=forward_curve,
+                    interest_rates=interest_rate_curve, settlement_rule=twentieth_of_next_month, num_inventory_grid_points=100)
+
+    def _assert_numpy_engine_equals_dotnet_engine(self, valuation_inputs):
+        dotnet_results = cs.intrinsic_value(**valuation_inputs)
+        numpy_results = cs.intrinsic_value(**valuation_inputs, engine='numpy')
+        self.assertAlmostEqual(dotnet_results.npv, numpy_results.npv, delta=abs(dotnet_results.npv) * 1E-10)
+        pd.testing.assert_frame_equal(dotnet_results.profile, numpy_results.profile)
+
+    def test_numpy_engine_piecewise_linear_constraints_equals_dotnet_engine(self):
+        self._assert_numpy_engine_equals_dotnet_engine(self._create_engine_test_inputs(constraints_storage=True))
+
+    def test_numpy_engine_constant_rates_equals_dotnet_engine(self):
+        self._assert_numpy_engine_equals_dotnet_engine(self._create_engine_test_inputs(constraints_storage=False))
+
+    def test_numpy_engine_expired_storage_returns_zero_npv_empty_profile(self):
+        valuation_inputs = self._create_engine_test_inputs(constraints_storage=False)
+        valuation_inputs['val_date'] = date(2019, 9, 26)
+        valuation_inputs['inventory'] = 0.0
+        intrinsic_results = cs.intrinsic_value(**valuation_inputs, engine='numpy')
+        self.assertEqual(0.0, intrinsic_results.npv)
+        self.assertEqual(0, len(intrinsic_results.profile))
+
+    def test_linear_terminal_npv_equals_python_callable_terminal_npv(self):
+        callable_results = cs.intrinsic_value(**self._create_engine_test_inputs(constraints_storage=True,
+                                    terminal_storage_npv=lambda price, inventory: price * inventory - 15.4 if inventory > 0.0 else 0.0))
+        declarative_inputs = self._create_engine_test_inputs(constraints_storage=True,
+                                    terminal_storage_npv=cs.LinearTerminalNpv(price_multiplier=1.0, fixed_cost=15.4))
+        for engine in ['dotnet', 'numpy']:
+            declarative_results = cs.intrinsic_value(**declarative_inputs, engine=engine)
+            self.assertAlmostEqual(callable_results.npv, declarative_results.npv, delta=abs(callable_results.npv) * 1E-10)
+
+    def test_days_after_month_end_settlement_rule_equals_python_callable(self):
+        valuation_inputs = self._create_engine_test_inputs(constraints_storage=True)
+        callable_results = cs.intrinsic_value(**valuation_inputs)
+        valuation_inputs['settlement_rule'] = cs.DaysAfterMonthEnd(20)
+        for engine in ['dotnet', 'numpy']:
+            built_in_rule_results = cs.intrinsic_value(**valuation_inputs, engine=engine)
+            self.assertAlmostEqual(callable_results.npv, built_in_rule_results.npv, delta=abs(callable_results.npv) * 1E-10)
+
+    def test_unknown_engine_raises(self):
+        with self.assertRaises(ValueError):
+            cs.intrinsic_value(**self._create_engine_test_inputs(constraints_storage=False), engine='fortran')
+
+    def test_numpy_engine_adaptive_grid_equals_dotnet_engine(self):
+        for constraints_storage in [True, False]:
+            valuation_inputs = self._create_engine_test_inputs(constraints_storage=constraints_storage)
+            dotnet_results = cs.intrinsic_value(**valuation_inputs, grid='adaptive')
+            numpy_results = cs.intrinsic_value(**valuation_inputs, engine='numpy', grid='adaptive')
+            self.assertAlmostEqual(dotnet_results.npv, numpy_results.npv, delta=abs(dotnet_results.npv) * 1E-10)
+            pd.testing.assert_frame_equal(dotnet_results.profile, numpy_results.profile)
+
+    def test_adaptive_grid_more_accurate_than_uniform_grid_with_twice_the_points(self):
+        valuation_inputs = self._create_engine_test_inputs(constraints_storage=False)
+        reference_npv = cs.intrinsic_value(**dict(valuation_inputs, num_inventory_grid_points=4000), engine='numpy').npv
+        uniform_npv = cs.intrinsic_value(**dict(valuation_inputs, num_inventory_grid_points=100), engine='numpy').npv
+        adaptive_npv = cs.intrinsic_value(**dict(valuation_inputs, num_inventory_grid_points=50), engine='numpy',
+                                          grid='adaptive').npv
+        self.assertLess(abs(adaptive_npv - reference_npv), abs(uniform_npv - reference_npv))
+
+    def test_grid_tolerance_returns_extrapolated_npv_and_grid_convergence(self):
+        valuation_inputs = self._create_engine_test_inputs(constraints_storage=False)
+        for engine in ['dotnet', 'numpy']:
+            results = cs.intrinsic_value(**valuation_inputs, engine=engine, grid_tolerance=0.1)
+            grid_convergence = results.grid_convergence
+            self.assertTrue(grid_convergence.converged)
+            self.assertLessEqual(grid_convergence.error_estimate, 0.1)
+            self.assertEqual(grid_convergence.npv, results.npv)
+            finest_grid_results = cs.intrinsic_value(**dict(valuation_inputs,
+                                    num_inventory_grid_points=grid_convergence.num_inventory_grid_points[-1]), engine=engine)
+            self.assertEqual(grid_convergence.grid_npvs[-1], finest_grid_results.npv)
+            pd.testing.assert_frame_equal(finest_grid_results.profile, results.profile)
+
+    def test_unknown_grid_raises(self):
+        for engine in ['dotnet', 'numpy']:
+            with self.assertRaises(ValueError):
+                cs.intrinsic_value(**self._create_engine_test_inputs(constraints_storage=False), engine=engine, grid='chebyshev')
+
+    def test_decision_freq_equal_to_storage_freq_equals_no_decision_freq(self):
+        valuation_inputs = self._create_engine_test_inputs(constraints_storage=True)
+        for engine in ['dotnet', 'numpy']:
+            results = cs.intrinsic_value(**valuation_inputs, engine=engine)
+            decision_freq_results = cs.intrinsic_value(**valuation_inputs, engine=engine, decision_freq='D')
+            self.assertEqual(results.npv, decision_freq_results.npv)
+            pd.testing.assert_frame_equal(results.profile, decision_freq_results.profile)
+
+    def test_numpy_engine_decision_freq_equals_dotnet_engine(self):
+        for constraints_storage in [True, False]:
+            valuation_inputs = self._create_engine_test_inputs(constraints_storage=constraints_storage)
+            for decision_freq in ['3D', 'W']:
+                dotnet_results = cs.intrinsic_value(**valuation_inputs, decision_freq=decision_freq)
+                numpy_results = cs.intrinsic_value(**valuation_inputs, engine='numpy', decision_freq=decision_freq)
+                self.assertAlmostEqual(dotnet_results.npv, numpy_results.npv, delta=abs(dotnet_results.npv) * 1E-10)
+                pd.testing.assert_frame_equal(dotnet_results.profile, numpy_results.profile)
+
+    def test_decision_freq_inject_withdraw_volume_constant_within_blocks(self):
+        valuation_inputs = self._create_engine_test_inputs(constraints_storage=True)
+        profile = cs.intrinsic_value(**valuation_inputs, engine='numpy', decision_freq='W').profile
+        block_volumes = profile['inject_withdraw_volume'].groupby(profile.index.asfreq('W')).nunique()
+        self.assertTrue((block_volumes == 1).all())
+
+    def test_frozen_storage_equals_storage(self):
+        valuation_inputs = self._create_engine_test_inputs(constraints_storage=True)
+        intrinsic_results = cs.intrinsic_value(**valuation_inputs)
+        frozen_results = cs.intrinsic_value(**dict(valuation_inputs, cmdty_storage=valuation_inputs['cmdty_storage'].freeze()))
+        self.assertEqual(intrinsic_results.npv, frozen_results.npv)
+        pd.testing.assert_frame_equal(intrinsic_results.profile, frozen_results.profile)
+
+    def test_revaluation_with_shifted_curve_uses_cached_inventory_space(self):
+        valuation_inputs = self._create_engine_test_inputs(constraints_storage=True)
+        for engine in ['dotnet', 'numpy']:
+            cmdty_storage = valuation_inputs['cmdty_storage']
+            cmdty_storage.clear_inventory_space_cache()
+            npv = cs.intrinsic_value(**valuation_inputs, engine=engine).npv
+            shifted_inputs = dict(valuation_inputs, forward_curve=valuation_inputs['forward_curve'] + 1.5)
+            shifted_npv = cs.intrinsic_value(**shifted_inputs, engine=engine).npv
+            self.assertNotEqual(npv, shifted_npv)
+            self.assertEqual(cs.intrinsic_value(**valuation_inputs, engine=engine).npv, npv)
+            cache_info = cmdty_storage.inventory_space_cache_info(engine)
+            self.assertEqual(2, cache_info.hits)
+            self.assertEqual(1, cache_info.misses)
+            self.assertEqual(1, cache_info.size)
+
+    def test_different_inventory_misses_inventory_space_cache(self):
+        valuation_inputs = self._create_engine_test_inputs(constraints_storage=True)
+        cs.intrinsic_value(**valuation_inputs, engine='numpy')
+        cs.intrinsic_value(**dict(valuation_inputs, inventory=700.0), engine='numpy')
+        cache_info = valuation_inputs['cmdty_storage'].inventory_space_cache_info('numpy')
+        self.assertEqual(0, cache_info.hits)
+        self.assertEqual(2, cache_info.misses)
+
+
 if __name__ == '__main__':
     unittest.main()
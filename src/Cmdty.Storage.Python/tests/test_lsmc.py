@@ -0,0 +1,115 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import unittest
+import numpy as np
+import pandas as pd
+import cmdty_storage as cs
+from datetime import date, timedelta
+from tests import utils
+
+
+class TestLsmcValue(unittest.TestCase):
+
+    _storage_start = date(2019, 8, 28)
+    _storage_end = date(2019, 9, 25)
+    _val_date = date(2019, 9, 2)
+
+    def _create_valuation_inputs(self, factors, factor_corrs=None):
+        constraints = [
+                        (date(2019, 8, 28), [(0.0, -150.0, 255.2), (2000.0, -200.0, 175.0)]),
+                        (date(2019, 9, 10), [(0.0, -170.5, 235.8), (700.0, -180.2, 200.77), (1800.0, -190.5, 174.45)])
+                      ]
+        cmdty_storage = cs.CmdtyStorage('D', self._storage_start, self._storage_end, 0.015, 0.02, constraints,
+                                        cmdty_consumed_inject=0.0001, cmdty_consumed_withdraw=0.000088,
+                                        inventory_loss=0.001, inventory_cost=0.002)
+        forward_curve = utils.create_piecewise_flat_series([58.89, 61.41, 59.89, 59.89],
+                                                           [self._val_date, date(2019, 9, 12), date(2019, 9, 18),
+                                                            self._storage_end], freq='D')
+        interest_rates = pd.Series(0.03, index=pd.period_range(self._val_date, self._storage_end + timedelta(days=60),
+                                                               freq='D'))
+        return dict(cmdty_storage=cmdty_storage, val_date=self._val_date, inventory=650.0, forward_curve=forward_curve,
+                    interest_rates=interest_rates, settlement_rule=cs.DaysAfterMonthEnd(20), factors=factors,
+                    factor_corrs=factor_corrs, num_paths=2000, batch_size=500, seed=12)
+
+    def _one_factor_vol(self):
+        return utils.create_piecewise_flat_series([1.35, 1.13, 1.24, 1.24], [self._val_date, date(2019, 9, 12),
+                                                  date(2019, 9, 18), self._storage_end], freq='D')
+
+    def _intrinsic_npv(self, valuation_inputs):
+        intrinsic_inputs = {key: value for key, value in valuation_inputs.items()
+                            if key in {'cmdty_storage', 'val_date', 'inventory', 'forward_curve', 'interest_rates',
+                                       'settlement_rule'}}
+        return cs.intrinsic_value(**intrinsic_inputs, engine='numpy').npv
+
+    def test_near_zero_volatility_npv_equals_intrinsic_npv(self):
+        valuation_inputs = self._create_valuation_inputs([(14.5, 1E-8)])
+        lsmc_results = cs.lsmc_value(**valuation_inputs)
+        intrinsic_npv = self._intrinsic_npv(valuation_inputs)
+        self.assertAlmostEqual(intrinsic_npv, lsmc_results.npv, delta=intrinsic_npv * 1E-4)
+
+    def test_one_factor_npv_greater_than_intrinsic_npv(self):
+        valuation_inputs = self._create_valuation_inputs([(14.5, self._one_factor_vol())])
+        lsmc_results = cs.lsmc_value(**valuation_inputs)
+        self.assertGreater(lsmc_results.npv - 3.0 * lsmc_results.standard_error, self._intrinsic_npv(valuation_inputs))
+
+    def test_same_seed_gives_same_results_for_any_number_of_threads(self):
+        valuation_inputs = self._create_valuation_inputs([(14.5, self._one_factor_vol()), (0.0, 0.15)], 0.3)
+        single_thread_results = cs.lsmc_value(**valuation_inputs)
+        multi_thread_results = cs.lsmc_value(**valuation_inputs, num_threads=3)
+        self.assertEqual(single_thread_results.npv, multi_thread_results.npv)
+        self.assertEqual(single_thread_results.standard_error, multi_thread_results.standard_error)
+        pd.testing.assert_frame_equal(single_thread_results.expected_profile, multi_thread_results.expected_profile)
+
+    def test_expected_profile_indexed_by_periods_from_val_date_until_before_storage_end(self):
+        valuation_inputs = self._create_valuation_inputs([(14.5, self._one_factor_vol())])
+        expected_profile = cs.lsmc_value(**valuation_inputs).expected_profile
+        expected_index = pd.period_range(self._val_date, self._storage_end - timedelta(days=1), freq='D')
+        self.assertTrue(expected_index.equals(expected_profile.index))
+        np.testing.assert_allclose(-expected_profile['inject_withdraw_volume'] - expected_profile['cmdty_consumed'],
+                                   expected_profile['net_position'])
+
+    def test_expired_storage_returns_zero_npv(self):
+        valuation_inputs = self._create_valuation_inputs([(14.5, 1.1)])
+        valuation_inputs['val_date'] = date(2019, 9, 26)
+        valuation_inputs['inventory'] = 0.0
+        lsmc_results = cs.lsmc_value(**valuation_inputs)
+        self.assertEqual(0.0, lsmc_results.npv)
+        self.assertEqual(0, len(lsmc_results.expected_profile))
+
+    def test_multiple_factors_without_factor_corrs_raises_value_error(self):
+        valuation_inputs = self._create_valuation_inputs([(14.5, 1.1), (0.0, 0.15)])
+        with self.assertRaises(ValueError):
+            cs.lsmc_value(**valuation_inputs)
+
+    def test_factor_corrs_not_positive_semi_definite_raises_value_error(self):
+        factor_corrs = np.array([[1.0, 0.9, 0.9], [0.9, 1.0, -0.9], [0.9, -0.9, 1.0]])
+        valuation_inputs = self._create_valuation_inputs([(14.5, 1.1), (2.0, 0.5), (0.0, 0.15)], factor_corrs)
+        with self.assertRaises(ValueError):
+            cs.lsmc_value(**valuation_inputs)
+
+
+if __name__ == '__main__':
+    unittest.main()
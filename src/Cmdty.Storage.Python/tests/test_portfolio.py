@@ -0,0 +1,97 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import unittest
+import numpy as np
+import pandas as pd
+import cmdty_storage as cs
+from datetime import date, timedelta
+from tests import utils
+
+
+def _create_spec(max_inventory):
+    storage_start = date(2019, 8, 28)
+    storage_end = date(2019, 9, 25)
+    val_date = date(2019, 9, 2)
+    storage_args = dict(freq='D', storage_start=storage_start, storage_end=storage_end, injection_cost=0.1,
+                        withdrawal_cost=0.2, min_inventory=0, max_inventory=max_inventory, max_injection_rate=2.5,
+                        max_withdrawal_rate=3.6)
+    forward_curve = utils.create_piecewise_flat_series([58.89, 61.41, 70.89, 70.89],
+                                                       [val_date, date(2019, 9, 12), date(2019, 9, 18), storage_end], freq='D')
+    interest_rates = pd.Series(0.03, index=pd.period_range(val_date, storage_end + timedelta(days=60), freq='D'))
+    valuation_args = dict(val_date=val_date, inventory=60.0, forward_curve=forward_curve, interest_rates=interest_rates,
+                          settlement_rule=cs.DaysAfterMonthEnd(20), num_inventory_grid_points=100)
+    return cs.StorageValuationSpec(storage_args, valuation_args)
+
+
+class TestValuePortfolio(unittest.TestCase):
+
+    def test_intrinsic_npvs_and_profiles_equal_intrinsic_value_in_input_order(self):
+        specs = [_create_spec(max_inventory) for max_inventory in [1000, 500, 800, 120, 300]]
+        results = cs.value_portfolio(specs, method='intrinsic', max_workers=2, chunk_size=2)
+        for i, spec in enumerate(specs):
+            expected = cs.intrinsic_value(cs.CmdtyStorage(**spec.storage), **spec.valuation)
+            self.assertEqual(expected.npv, results.npvs[i])
+            pd.testing.assert_frame_equal(expected.profile, results.profiles[i])
+            self.assertIsNone(results.errors[i])
+
+    def test_trinomial_npvs_equal_trinomial_value(self):
+        specs = [_create_spec(max_inventory) for max_inventory in [1000, 500]]
+        for spec in specs:
+            spec.valuation.update(spot_volatility=pd.Series(0.6, index=spec.valuation['forward_curve'].index),
+                                  mean_reversion=14.5, time_step=1.0/365.0)
+        results = cs.value_portfolio(specs, method='trinomial', max_workers=2)
+        for i, spec in enumerate(specs):
+            self.assertEqual(cs.trinomial_value(cs.CmdtyStorage(**spec.storage), **spec.valuation), results.npvs[i])
+            self.assertIsNone(results.profiles[i])
+
+    def test_grid_tolerance_npvs_equal_extrapolated_npvs(self):
+        spec = _create_spec(1000)
+        spec.valuation.update(grid_tolerance=0.1)
+        results = cs.value_portfolio([spec], method='intrinsic', max_workers=1)
+        self.assertEqual(cs.intrinsic_value(cs.CmdtyStorage(**spec.storage), **spec.valuation).npv, results.npvs[0])
+        spec.valuation.update(spot_volatility=pd.Series(0.6, index=spec.valuation['forward_curve'].index),
+                              mean_reversion=14.5, time_step=1.0/365.0)
+        results = cs.value_portfolio([spec], method='trinomial', max_workers=1)
+        self.assertEqual(cs.trinomial_value(cs.CmdtyStorage(**spec.storage), **spec.valuation), results.npvs[0])
+        self.assertIsNone(results.errors[0])
+
+    def test_failing_contract_recorded_and_other_contracts_valued(self):
+        specs = [_create_spec(1000), _create_spec(1000), _create_spec(800)]
+        specs[1].valuation['inventory'] = -10.0
+        results = cs.value_portfolio(specs, max_workers=2, chunk_size=3)
+        self.assertTrue(np.isnan(results.npvs[1]))
+        self.assertIsNone(results.profiles[1])
+        self.assertIn('Inventory cannot be negative', results.errors[1])
+        for i in [0, 2]:
+            self.assertFalse(np.isnan(results.npvs[i]))
+            self.assertIsNone(results.errors[i])
+
+    def test_unknown_method_raises(self):
+        with self.assertRaises(ValueError):
+            cs.value_portfolio([_create_spec(1000)], method='lsmc')
+
+
+if __name__ == '__main__':
+    unittest.main()
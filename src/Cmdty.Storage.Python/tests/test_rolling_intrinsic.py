@@ -0,0 +1,140 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, 
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+import unittest
+import numpy as np
+import pandas as pd
+import cmdty_storage as cs
+from datetime import date, datetime, timedelta
+from tests import utils
+
+
+class TestRollingIntrinsicValue(unittest.TestCase):
+
+    _storage_start = date(2019, 8, 28)
+    _storage_end = date(2019, 9, 25)
+    _first_snapshot_date = date(2019, 9, 2)
+
+    def _create_valuation_inputs(self, snapshot_dates):
+        constraints = [
+                        (date(2019, 8, 28), [(0.0, -150.0, 255.2), (2000.0, -200.0, 175.0)]),
+                        (date(2019, 9, 10), [(0.0, -170.5, 235.8), (700.0, -180.2, 200.77), (1800.0, -190.5, 174.45)])
+                      ]
+        cmdty_storage = cs.CmdtyStorage('D', self._storage_start, self._storage_end, 0.015, 0.02, constraints,
+                                        cmdty_consumed_inject=0.0001, cmdty_consumed_withdraw=0.000088,
+                                        inventory_loss=0.001, inventory_cost=0.002)
+        curve_snapshots = pd.DataFrame({snapshot_date: self._create_forward_curve(shift)
+                                        for shift, snapshot_date in enumerate(snapshot_dates)})
+        interest_rates = pd.Series(0.03, index=pd.period_range(self._first_snapshot_date,
+                                                               self._storage_end + timedelta(days=60), freq='D'))
+        return dict(cmdty_storage=cmdty_storage, curve_snapshots=curve_snapshots, inventory=650.0,
+                    interest_rates=interest_rates, settlement_rule=cs.DaysAfterMonthEnd(20), num_inventory_grid_points=100)
+
+    def _create_forward_curve(self, shift):
+        return utils.create_piecewise_flat_series([58.89 + shift, 61.41 - shift, 59.89, 59.89],
+                                                  [self._first_snapshot_date, date(2019, 9, 12), date(2019, 9, 18),
+                                                   self._storage_end], freq='D')
+
+    def test_single_snapshot_equals_numpy_intrinsic_value(self):
+        valuation_inputs = self._create_valuation_inputs([self._first_snapshot_date])
+        rolling_results = cs.rolling_intrinsic_value(**valuation_inputs)
+        intrinsic_results = cs.intrinsic_value(valuation_inputs['cmdty_storage'], self._first_snapshot_date,
+                                               valuation_inputs['inventory'], self._create_forward_curve(0),
+                                               valuation_inputs['interest_rates'], valuation_inputs['settlement_rule'],
+                                               engine='numpy')
+        self.assertEqual(1, len(rolling_results.npvs))
+        self.assertAlmostEqual(intrinsic_results.npv, rolling_results.npvs.iloc[0], delta=abs(intrinsic_results.npv) * 1E-12)
+        profile_columns = intrinsic_results.profile.columns
+        pd.testing.assert_frame_equal(intrinsic_results.profile, rolling_results.decisions[profile_columns])
+
+    def test_npvs_equal_numpy_intrinsic_value_from_rolled_inventory(self):
+        snapshot_dates = [self._first_snapshot_date, date(2019, 9, 6), date(2019, 9, 13), date(2019, 9, 20)]
+        valuation_inputs = self._create_valuation_inputs(snapshot_dates)
+        rolling_results = cs.rolling_intrinsic_value(**valuation_inputs)
+        self.assertEqual(len(snapshot_dates), len(rolling_results.npvs))
+        inventory = valuation_inputs['inventory']
+        for shift, snapshot_date in enumerate(snapshot_dates):
+            snapshot_period = pd.Period(snapshot_date, freq='D')
+            if snapshot_period != rolling_results.npvs.index[0]:
+                inventory = max(rolling_results.decisions['inventory'][snapshot_period - 1], 0.0)
+            intrinsic_results = cs.intrinsic_value(valuation_inputs['cmdty_storage'], snapshot_date, inventory,
+                                                   self._create_forward_curve(shift), valuation_inputs['interest_rates'],
+                                                   valuation_inputs['settlement_rule'], engine='numpy')
+            self.assertAlmostEqual(intrinsic_results.npv, rolling_results.npvs[snapshot_period],
+                                   delta=abs(intrinsic_results.npv) * 1E-10)
+            self.assertEqual(snapshot_period, rolling_results.decisions['decision_period'][snapshot_period])
+
+    def test_sub_daily_npvs_equal_numpy_intrinsic_value_from_rolled_inventory(self):
+        storage_start = datetime(2019, 9, 2, 0, 0)
+        storage_end = datetime(2019, 9, 2, 12, 0)
+        snapshot_dates = [datetime(2019, 9, 2, 1, 0), datetime(2019, 9, 2, 3, 0), datetime(2019, 9, 2, 6, 30)]
+        interest_rates = pd.Series(0.03, index=pd.period_range(storage_start.date(),
+                                                               storage_end.date() + timedelta(days=60), freq='D'))
+        for freq in ['15min', '30min']:
+            cmdty_storage = cs.CmdtyStorage(freq, storage_start, storage_end, 0.015, 0.02,
+                                            [(storage_start, [(0.0, -15.0, 25.0), (200.0, -20.0, 17.5)])],
+                                            inventory_loss=0.001)
+            forward_curve_index = pd.period_range(snapshot_dates[0], storage_end, freq=freq)
+            forward_curves = [pd.Series(50.0 + shift + 3.0 * np.sin(np.arange(len(forward_curve_index)) / 3.0 + shift),
+                                        index=forward_curve_index) for shift in range(len(snapshot_dates))]
+            curve_snapshots = pd.DataFrame(dict(zip(snapshot_dates, forward_curves)))
+            rolling_results = cs.rolling_intrinsic_value(cmdty_storage, curve_snapshots, 65.0, interest_rates,
+                                                         cs.SamePeriod())
+            self.assertEqual(len(snapshot_dates), len(rolling_results.npvs))
+            inventory = 65.0
+            for forward_curve, snapshot_date in zip(forward_curves, snapshot_dates):
+                snapshot_period = pd.Period(snapshot_date, freq=freq)
+                if snapshot_period != rolling_results.npvs.index[0]:
+                    inventory = max(rolling_results.decisions['inventory'][snapshot_period - 1], 0.0)
+                intrinsic_results = cs.intrinsic_value(cmdty_storage, snapshot_date, inventory, forward_curve,
+                                                       interest_rates, cs.SamePeriod(), engine='numpy')
+                self.assertAlmostEqual(intrinsic_results.npv, rolling_results.npvs[snapshot_period],
+                                       delta=abs(intrinsic_results.npv) * 1E-10)
+                self.assertEqual(snapshot_period, rolling_results.decisions['decision_period'][snapshot_period])
+
+    def test_pnl_cash_flows_consistent_with_decisions(self):
+        valuation_inputs = self._create_valuation_inputs([self._first_snapshot_date, date(2019, 9, 13)])
+        rolling_results = cs.rolling_intrinsic_value(**valuation_inputs)
+        decisions = rolling_results.decisions
+        pnl = rolling_results.pnl
+        expected_cash_flows = decisions['net_position'] * pnl['cmdty_price'] - pnl['decision_cost'] - pnl['inventory_cost']
+        np.testing.assert_allclose(expected_cash_flows.values, pnl['cash_flow'].values)
+        np.testing.assert_allclose(np.cumsum(pnl['cash_flow'].values), pnl['cumulative_pnl'].values)
+        self.assertEqual(pd.Period(self._storage_end, freq='D') - 1, decisions.index[-1])
+
+    def test_snapshots_not_increasing_raises_value_error(self):
+        valuation_inputs = self._create_valuation_inputs([date(2019, 9, 13), self._first_snapshot_date])
+        with self.assertRaises(ValueError):
+            cs.rolling_intrinsic_value(**valuation_inputs)
+
+    def test_snapshot_missing_forward_prices_raises_value_error(self):
+        valuation_inputs = self._create_valuation_inputs([self._first_snapshot_date, date(2019, 9, 13)])
+        valuation_inputs['curve_snapshots'].iloc[-2, 1] = np.nan
+        with self.assertRaises(ValueError):
+            cs.rolling_intrinsic_value(**valuation_inputs)
+
+
+if __name__ == '__main__':
+    unittest.main()
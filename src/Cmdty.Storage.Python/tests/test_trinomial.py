@@ -22,70 +22,309 @@
 # OTHER DEALINGS IN THE SOFTWARE.
 
 import unittest
+import numpy as np
 import pandas as pd
 import cmdty_storage as cs
+from cmdty_storage import numpy_trinomial
 from datetime import date, timedelta
 from tests import utils
 
 
+def _create_trinomial_test_inputs(spot_volatility_factor=1.0, terminal_storage_npv=None):
+    constraints = [
+                            (date(2019, 8, 28),
+                                              [
+                                                  (0.0, -150.0, 255.2),
+                                                  (2000.0, -200.0, 175.0),
+                                              ]),
+                                            (date(2019, 9, 10),
+                                             [
+                                                 (0.0, -170.5, 235.8),
+                                                 (700.0, -180.2, 200.77),
+                                                 (1800.0, -190.5, 174.45),
+                                             ])
+                                        ]
+
+    storage_start = date(2019, 8, 28)
+    storage_end = date(2019, 9, 25)
+    constant_injection_cost = 0.015
+    constant_pcnt_consumed_inject = 0.0001
+    constant_withdrawal_cost = 0.02
+    constant_pcnt_consumed_withdraw = 0.000088
+    constant_pcnt_inventory_loss = 0.001;
+    constant_pcnt_inventory_cost = 0.002;
+
+    def terminal_npv_calc(price, inventory):
+        return price * inventory - 15.4  # Some arbitrary calculation
+
+    if terminal_storage_npv is None:
+        terminal_storage_npv = terminal_npv_calc
+
+    cmdty_storage = cs.CmdtyStorage('D', storage_start, storage_end, constant_injection_cost,
+                                    constant_withdrawal_cost, constraints,
+                                    cmdty_consumed_inject=constant_pcnt_consumed_inject,
+                                    cmdty_consumed_withdraw=constant_pcnt_consumed_withdraw,
+                                    terminal_storage_npv=terminal_storage_npv,
+                                    inventory_loss=constant_pcnt_inventory_loss,
+                                    inventory_cost=constant_pcnt_inventory_cost)
+
+    inventory = 650.0
+    val_date = date(2019, 9, 2)
+
+    forward_curve = utils.create_piecewise_flat_series([58.89, 61.41, 59.89, 59.89],
+                                                       [val_date, date(2019, 9, 12), date(2019, 9, 18),
+                                                        storage_end], freq='D')
+
+    # TODO test with proper interest rate curve
+    flat_interest_rate = 0.03
+    interest_rate_curve = pd.Series(index=pd.period_range(val_date, storage_end + timedelta(days=60), freq='D'))
+    interest_rate_curve[:] = flat_interest_rate
+
+    # Trinomial Tree parameters
+    mean_reversion = 14.5
+    spot_volatility = utils.create_piecewise_flat_series([1.35, 1.13, 1.24, 1.24],
+                               [val_date, date(2019, 9, 12), date(2019, 9, 18), storage_end], freq='D')
+    time_step = 1.0/365.0
+
+    twentieth_of_next_month = lambda period: period.asfreq('M').asfreq('D', 'end') + 20
+    return dict(cmdty_storage=cmdty_storage, val_date=val_date, inventory=inventory, forward_curve=forward_curve,
+                spot_volatility=spot_volatility * spot_volatility_factor, mean_reversion=mean_reversion,
+                time_step=time_step, settlement_rule=twentieth_of_next_month, interest_rates=interest_rate_curve,
+                num_inventory_grid_points=100)
+
+
 class TestIntrinsicValue(unittest.TestCase):
 
     def test_trinomial_value_runs(self):
-        constraints = [
-                                (date(2019, 8, 28),
-                                                  [
-                                                      (0.0, -150.0, 255.2),
-                                                      (2000.0, -200.0, 175.0),
-                                                  ]),
-                                                (date(2019, 9, 10),
-                                                 [
-                                                     (0.0, -170.5, 235.8),
-                                                     (700.0, -180.2, 200.77),
-                                                     (1800.0, -190.5, 174.45),
-                                                 ])
-                                            ]
-
-        storage_start = date(2019, 8, 28)
-        storage_end = date(2019, 9, 25)
-        constant_injection_cost = 0.015
-        constant_pcnt_consumed_inject = 0.0001
-        constant_withdrawal_cost = 0.02
-        constant_pcnt_consumed_withdraw = 0.000088
-        constant_pcnt_inventory_loss = 0.001;
-        constant_pcnt_inventory_cost = 0.002;
-
-        def terminal_npv_calc(price, inventory):
-            return price * inventory - 15.4  # Some arbitrary calculation
-
-        cmdty_storage = cs.CmdtyStorage('D', storage_start, storage_end, constant_injection_cost,
-                                        constant_withdrawal_cost, constraints,
-                                        cmdty_consumed_inject=constant_pcnt_consumed_inject,
-                                        cmdty_consumed_withdraw=constant_pcnt_consumed_withdraw,
-                                        terminal_storage_npv=terminal_npv_calc,
-                                        inventory_loss=constant_pcnt_inventory_loss,
-                                        inventory_cost=constant_pcnt_inventory_cost)
-
-        inventory = 650.0
-        val_date = date(2019, 9, 2)
-
-        forward_curve = utils.create_piecewise_flat_series([58.89, 61.41, 59.89, 59.89],
-                                                           [val_date, date(2019, 9, 12), date(2019, 9, 18),
-                                                            storage_end], freq='D')
-
-        # TODO test with proper interest rate curve
-        flat_interest_rate = 0.03
-        interest_rate_curve = pd.Series(index=pd.period_range(val_date, storage_end + timedelta(days=60), freq='D'))
-        interest_rate_curve[:] = flat_interest_rate
-
-        # Trinomial Tree parameters
-        mean_reversion = 14.5
-        spot_volatility = utils.create_piecewise_flat_series([1.35, 1.13, 1.24, 1.24],
-                                   [val_date, date(2019, 9, 12), date(2019, 9, 18), storage_end], freq='D')
-        time_step = 1.0/365.0
-
-        twentieth_of_next_month = lambda period: period.asfreq('M').asfreq('D', 'end') + 20
-        trinomial_value = cs.trinomial_value(cmdty_storage, val_date, inventory, forward_curve,
-                        spot_volatility, mean_reversion, time_step,
-                         settlement_rule=twentieth_of_next_month,
-                        interest_rates=interest_rate_curve, num_inventory_grid_points=100)
+        trinomial_value = cs.trinomial_value(**_create_trinomial_test_inputs())
         self.assertTrue(isinstance(trinomial_value, float))
+
+    def test_numpy_engine_equals_dotnet_engine(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        dotnet_value = cs.trinomial_value(**trinomial_inputs, engine='dotnet')
+        numpy_value = cs.trinomial_value(**trinomial_inputs, engine='numpy')
+        self.assertIsInstance(numpy_value, float)
+        self.assertAlmostEqual(dotnet_value, numpy_value, delta=abs(dotnet_value) * 1E-8)
+
+    def test_numpy_engine_negligible_volatility_equals_dotnet_engine(self):
+        trinomial_inputs = _create_trinomial_test_inputs(spot_volatility_factor=1E-8)
+        dotnet_value = cs.trinomial_value(**trinomial_inputs, engine='dotnet')
+        numpy_value = cs.trinomial_value(**trinomial_inputs, engine='numpy')
+        self.assertAlmostEqual(dotnet_value, numpy_value, delta=abs(dotnet_value) * 1E-8)
+
+    def test_multiple_threads_equals_single_thread(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        single_thread_value = cs.trinomial_value(**trinomial_inputs, num_threads=1)
+        multi_thread_value = cs.trinomial_value(**trinomial_inputs, num_threads=4)
+        self.assertEqual(single_thread_value, multi_thread_value)
+
+    def test_frozen_storage_equals_storage(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        trinomial_value = cs.trinomial_value(**trinomial_inputs)
+        trinomial_inputs['cmdty_storage'] = trinomial_inputs['cmdty_storage'].freeze()
+        self.assertEqual(trinomial_value, cs.trinomial_value(**trinomial_inputs))
+
+    def test_numpy_engine_adaptive_grid_negligible_volatility_equals_dotnet_engine(self):
+        trinomial_inputs = _create_trinomial_test_inputs(spot_volatility_factor=1E-8)
+        dotnet_value = cs.trinomial_value(**trinomial_inputs, engine='dotnet', grid='adaptive')
+        numpy_value = cs.trinomial_value(**trinomial_inputs, engine='numpy', grid='adaptive')
+        self.assertAlmostEqual(dotnet_value, numpy_value, delta=abs(dotnet_value) * 1E-8)
+
+    def test_decision_freq_equal_to_storage_freq_equals_no_decision_freq(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        for engine in ['dotnet', 'numpy']:
+            trinomial_value = cs.trinomial_value(**trinomial_inputs, engine=engine)
+            decision_freq_value = cs.trinomial_value(**trinomial_inputs, engine=engine, decision_freq='D')
+            self.assertAlmostEqual(trinomial_value, decision_freq_value, delta=abs(trinomial_value) * 1E-12)
+
+    def test_numpy_engine_decision_freq_negligible_volatility_equals_dotnet_engine(self):
+        trinomial_inputs = _create_trinomial_test_inputs(spot_volatility_factor=1E-8)
+        dotnet_value = cs.trinomial_value(**trinomial_inputs, engine='dotnet', decision_freq='W')
+        numpy_value = cs.trinomial_value(**trinomial_inputs, engine='numpy', decision_freq='W')
+        self.assertAlmostEqual(dotnet_value, numpy_value, delta=abs(dotnet_value) * 1E-8)
+
+    def test_decision_freq_value_less_than_value_without(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        trinomial_value = cs.trinomial_value(**trinomial_inputs, engine='numpy')
+        decision_freq_value = cs.trinomial_value(**trinomial_inputs, engine='numpy', decision_freq='W')
+        self.assertLess(decision_freq_value, trinomial_value)
+
+    def test_numpy_engine_low_memory_decision_sets_equal_decision_sets(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        storage_arrays = trinomial_inputs['cmdty_storage'].storage_arrays
+        current_period_num = storage_arrays.period_num(pd.Period(trinomial_inputs['val_date'], freq='D'))
+        for grid in ('uniform', 'adaptive'):
+            inventory_grids = numpy_trinomial.tree_inventory_grids(storage_arrays, trinomial_inputs['inventory'],
+                                                                   current_period_num, 100, 1E-12, grid)
+            low_memory_grids = numpy_trinomial.tree_inventory_grids(storage_arrays, trinomial_inputs['inventory'],
+                                                                    current_period_num, 100, 1E-12, grid, low_memory=True)
+            self.assertEqual(inventory_grids.start_active, low_memory_grids.start_active)
+            self.assertEqual(len(inventory_grids.decision_sets), len(low_memory_grids.decision_sets))
+            for decision_set, low_memory_decision_set in zip(inventory_grids.decision_sets,
+                                                             low_memory_grids.decision_sets):
+                for array, low_memory_array in zip(decision_set, low_memory_decision_set):
+                    np.testing.assert_array_equal(array, low_memory_array)
+
+    def test_grid_tolerance_returns_extrapolated_npv_of_trinomial_grid_convergence(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        grid_convergence = cs.trinomial_grid_convergence(**trinomial_inputs, grid_tolerance=0.1)
+        self.assertTrue(grid_convergence.converged)
+        self.assertEqual(grid_convergence.npv, cs.trinomial_value(**trinomial_inputs, grid_tolerance=0.1))
+        finest_grid_value = cs.trinomial_value(**dict(trinomial_inputs,
+                                    num_inventory_grid_points=grid_convergence.num_inventory_grid_points[-1]))
+        self.assertEqual(grid_convergence.grid_npvs[-1], finest_grid_value)
+
+    def test_num_threads_less_than_one_raises(self):
+        with self.assertRaises(ValueError):
+            cs.trinomial_value(**_create_trinomial_test_inputs(), num_threads=0)
+
+    def test_unknown_engine_raises(self):
+        with self.assertRaises(ValueError):
+            cs.trinomial_value(**_create_trinomial_test_inputs(), engine='fortran')
+
+
+class TestTrinomialSensitivities(unittest.TestCase):
+
+    _bumps = {'forward_curve': 0.01, 'spot_volatility': 0.01, 'mean_reversion': 0.1, 'interest_rates': 0.0001}
+
+    def test_bumped_npvs_equal_numpy_engine_trinomial_value_of_bumped_inputs(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        sensitivities = cs.trinomial_sensitivities(**trinomial_inputs, bumps=self._bumps)
+        self.assertEqual(cs.trinomial_value(**trinomial_inputs, engine='numpy'), sensitivities['npv']['forward_curve'])
+        for input_name, bump_size in self._bumps.items():
+            bumped_up_inputs = dict(trinomial_inputs, **{input_name: trinomial_inputs[input_name] + bump_size})
+            bumped_down_inputs = dict(trinomial_inputs, **{input_name: trinomial_inputs[input_name] - bump_size})
+            npv_up = cs.trinomial_value(**bumped_up_inputs, engine='numpy')
+            npv_down = cs.trinomial_value(**bumped_down_inputs, engine='numpy')
+            self.assertEqual(npv_up, sensitivities['npv_up'][input_name])
+            self.assertEqual(npv_down, sensitivities['npv_down'][input_name])
+            self.assertAlmostEqual((npv_up - npv_down) / (2.0 * bump_size), sensitivities['sensitivity'][input_name])
+
+    def test_multiple_processes_equals_single_process(self):
+        # Terminal NPV picklable, so that the storage can be sent to the worker processes
+        trinomial_inputs = _create_trinomial_test_inputs(terminal_storage_npv=cs.LinearTerminalNpv(fixed_cost=15.4))
+        single_process_sensitivities = cs.trinomial_sensitivities(**trinomial_inputs, bumps=self._bumps)
+        multi_process_sensitivities = cs.trinomial_sensitivities(**trinomial_inputs, bumps=self._bumps, max_workers=2)
+        pd.testing.assert_frame_equal(single_process_sensitivities, multi_process_sensitivities)
+
+    def test_max_workers_less_than_one_raises(self):
+        with self.assertRaises(ValueError):
+            cs.trinomial_sensitivities(**_create_trinomial_test_inputs(), bumps=self._bumps, max_workers=0)
+
+    def test_unsupported_bump_input_raises(self):
+        with self.assertRaises(ValueError):
+            cs.trinomial_sensitivities(**_create_trinomial_test_inputs(), bumps={'time_step': 0.001})
+
+    def test_non_positive_bump_size_raises(self):
+        with self.assertRaises(ValueError):
+            cs.trinomial_sensitivities(**_create_trinomial_test_inputs(), bumps={'spot_volatility': 0.0})
+
+
+class TestTrinomialSimulate(unittest.TestCase):
+
+    def test_npv_equals_numpy_engine_trinomial_value(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        simulation_results = cs.trinomial_simulate(**trinomial_inputs, num_paths=100, seed=12)
+        self.assertEqual(cs.trinomial_value(**trinomial_inputs, engine='numpy'), simulation_results.npv)
+
+    def test_npv_approximately_equals_dotnet_engine_trinomial_value(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        simulation_results = cs.trinomial_simulate(**trinomial_inputs, num_paths=100, seed=12)
+        dotnet_value = cs.trinomial_value(**trinomial_inputs)
+        self.assertAlmostEqual(dotnet_value, simulation_results.npv, delta=abs(dotnet_value) * 1E-8)
+
+    def test_mean_path_npv_approximately_equals_npv(self):
+        simulation_results = cs.trinomial_simulate(**_create_trinomial_test_inputs(), num_paths=10000, seed=12)
+        standard_error = simulation_results.path_npvs.std() / np.sqrt(len(simulation_results.path_npvs))
+        self.assertAlmostEqual(simulation_results.npv, simulation_results.path_npvs.mean(), delta=standard_error * 4)
+
+    def test_results_arrays_have_path_and_period_dimensions(self):
+        simulation_results = cs.trinomial_simulate(**_create_trinomial_test_inputs(), num_paths=50, seed=12)
+        num_periods = len(simulation_results.periods)
+        self.assertEqual(pd.Period(date(2019, 9, 2), freq='D'), simulation_results.periods[0])
+        self.assertEqual(pd.Period(date(2019, 9, 24), freq='D'), simulation_results.periods[-1])
+        for results_array in (simulation_results.spot_prices, simulation_results.inject_withdraw,
+                              simulation_results.cmdty_consumed, simulation_results.inventories):
+            self.assertEqual((50, num_periods), results_array.shape)
+        self.assertEqual((50,), simulation_results.path_npvs.shape)
+
+    def test_inventories_equal_cumulative_decisions_less_losses(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        simulation_results = cs.trinomial_simulate(**trinomial_inputs, num_paths=50, seed=12)
+        inventory = np.full(50, trinomial_inputs['inventory'])
+        for i in range(len(simulation_results.periods)):
+            inventory = inventory * (1.0 - 0.001) + simulation_results.inject_withdraw[:, i]
+            np.testing.assert_allclose(inventory, simulation_results.inventories[:, i], atol=1E-10)
+
+    def test_multiple_threads_equals_single_thread(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        single_thread_results = cs.trinomial_simulate(**trinomial_inputs, num_paths=100, seed=12, num_threads=1)
+        multi_thread_results = cs.trinomial_simulate(**trinomial_inputs, num_paths=100, seed=12, num_threads=4)
+        for single_thread_array, multi_thread_array in zip(single_thread_results[2:], multi_thread_results[2:]):
+            np.testing.assert_array_equal(single_thread_array, multi_thread_array)
+
+    def test_negligible_volatility_all_paths_equal(self):
+        simulation_results = cs.trinomial_simulate(**_create_trinomial_test_inputs(spot_volatility_factor=1E-8),
+                                                   num_paths=20, seed=12)
+        self.assertTrue(np.all(simulation_results.inject_withdraw == simulation_results.inject_withdraw[0]))
+        self.assertAlmostEqual(simulation_results.path_npvs.min(), simulation_results.path_npvs.max(),
+                               delta=abs(simulation_results.path_npvs.max()) * 1E-6)
+
+    def test_current_period_after_storage_end_zero_npvs_and_no_periods(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        trinomial_inputs['val_date'] = date(2019, 9, 26)
+        simulation_results = cs.trinomial_simulate(**trinomial_inputs, num_paths=10, seed=12)
+        self.assertEqual(0.0, simulation_results.npv)
+        self.assertEqual(0, len(simulation_results.periods))
+        np.testing.assert_array_equal(np.zeros(10), simulation_results.path_npvs)
+
+    def test_num_paths_less_than_one_raises(self):
+        with self.assertRaises(ValueError):
+            cs.trinomial_simulate(**_create_trinomial_test_inputs(), num_paths=0)
+
+
+class TestTrinomialValuationResults(unittest.TestCase):
+
+    def test_npv_equals_trinomial_value(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        for engine in ('dotnet', 'numpy'):
+            with self.subTest(engine=engine):
+                valuation_results = cs.trinomial_valuation_results(**trinomial_inputs, engine=engine)
+                self.assertEqual(cs.trinomial_value(**trinomial_inputs, engine=engine), valuation_results.npv)
+
+    def test_results_arrays_have_price_level_and_grid_point_dimensions(self):
+        for engine in ('dotnet', 'numpy'):
+            with self.subTest(engine=engine):
+                valuation_results = cs.trinomial_valuation_results(**_create_trinomial_test_inputs(), engine=engine)
+                num_periods = len(valuation_results.periods)
+                self.assertEqual(pd.Period(date(2019, 9, 2), freq='D'), valuation_results.periods[0])
+                self.assertEqual(pd.Period(date(2019, 9, 24), freq='D'), valuation_results.periods[-1])
+                for i in range(num_periods):
+                    num_levels = len(valuation_results.tree_prices[i])
+                    num_grid_points = len(valuation_results.inventory_grids[i])
+                    self.assertEqual(num_levels, len(valuation_results.tree_probabilities[i]))
+                    self.assertEqual((num_levels, num_grid_points), valuation_results.storage_npvs[i].shape)
+                    self.assertEqual((num_levels, num_grid_points),
+                                     valuation_results.inject_withdraw_decisions[i].shape)
+                max_levels = max(len(prices) for prices in valuation_results.tree_prices)
+                max_grid_points = max(len(grid) for grid in valuation_results.inventory_grids)
+                self.assertEqual((num_periods, max_levels), valuation_results.padded('tree_prices').shape)
+                self.assertEqual((num_periods, max_levels, max_grid_points),
+                                 valuation_results.padded('storage_npvs').shape)
+
+    def test_numpy_engine_first_period_storage_npv_at_inventory_equals_npv(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        valuation_results = cs.trinomial_valuation_results(**trinomial_inputs, engine='numpy')
+        first_period_npvs = np.interp(trinomial_inputs['inventory'], valuation_results.inventory_grids[0],
+                                      valuation_results.storage_npvs[0][0])
+        self.assertAlmostEqual(valuation_results.npv, first_period_npvs, places=8)
+
+    def test_current_period_after_storage_end_zero_npv_and_no_periods(self):
+        trinomial_inputs = _create_trinomial_test_inputs()
+        trinomial_inputs['val_date'] = date(2019, 9, 26)
+        for engine in ('dotnet', 'numpy'):
+            with self.subTest(engine=engine):
+                valuation_results = cs.trinomial_valuation_results(**trinomial_inputs, engine=engine)
+                self.assertEqual(0.0, valuation_results.npv)
+                self.assertEqual(0, len(valuation_results.periods))
+                self.assertEqual(0, len(valuation_results.storage_npvs))
@@ -0,0 +1,142 @@
+# Copyright(c) 2020 Jake Fowler
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+import unittest
+import sys
+import subprocess
+import numpy as np
+import pandas as pd
+import clr
+import System as dotnet
+import cmdty_storage as cs
+from cmdty_storage import utils
+
+
+class TestSeriesToTimeSeries(unittest.TestCase):
+
+    def _assert_net_time_series_equal(self, expected, actual):
+        self.assertEqual(expected.Count, actual.Count)
+        for i in range(expected.Count):
+            self.assertEqual(expected.Indices[i], actual.Indices[i])
+            self.assertEqual(expected.Data[i], actual.Data[i])
+
+    def _assert_bulk_matches_elementwise(self, series, freq):
+        time_period_type = utils.FREQ_TO_PERIOD_TYPE[freq]
+        expected = utils._series_to_time_series_elementwise(series, time_period_type, dotnet.Double, lambda x: x)
+        actual = utils.series_to_double_time_series(series, time_period_type)
+        self._assert_net_time_series_equal(expected, actual)
+
+    def test_series_to_double_time_series_daily_period_index(self):
+        series = pd.Series(np.linspace(10.0, 20.0, 50), pd.period_range('2019-08-28', freq='D', periods=50))
+        self._assert_bulk_matches_elementwise(series, 'D')
+
+    def test_series_to_double_time_series_hourly_period_index(self):
+        series = pd.Series(np.linspace(10.0, 20.0, 100), pd.period_range('2019-08-28', freq='H', periods=100))
+        self._assert_bulk_matches_elementwise(series, 'H')
+
+    def test_series_to_double_time_series_quarter_hourly_period_index(self):
+        series = pd.Series(np.linspace(10.0, 20.0, 100), pd.period_range('2019-08-28', freq='15min', periods=100))
+        self._assert_bulk_matches_elementwise(series, '15min')
+
+    def test_series_to_double_time_series_datetime_index(self):
+        series = pd.Series(np.linspace(10.0, 20.0, 50), pd.date_range('2019-08-28', freq='D', periods=50))
+        self._assert_bulk_matches_elementwise(series, 'D')
+
+    def test_series_to_double_time_series_integer_values(self):
+        series = pd.Series(range(10), pd.period_range('2019-08-28', freq='D', periods=10))
+        net_time_series = utils.series_to_double_time_series(series, utils.FREQ_TO_PERIOD_TYPE['D'])
+        self.assertEqual(9.0, net_time_series.Data[9])
+
+    def test_series_to_double_time_series_empty_series(self):
+        series = pd.Series([], pd.PeriodIndex([], freq='D'))
+        net_time_series = utils.series_to_double_time_series(series, utils.FREQ_TO_PERIOD_TYPE['D'])
+        self.assertEqual(0, net_time_series.Count)
+
+    def test_series_to_time_series_double_data_selector_matches_elementwise(self):
+        series = pd.Series([(1.0, 2.5), (3.0, 4.5), (5.0, 6.5)], pd.period_range('2019-08-28', freq='D', periods=3))
+        time_period_type = utils.FREQ_TO_PERIOD_TYPE['D']
+        expected = utils._series_to_time_series_elementwise(series, time_period_type, dotnet.Double, lambda tup: tup[1])
+        actual = utils.series_to_time_series(series, time_period_type, dotnet.Double, lambda tup: tup[1])
+        self._assert_net_time_series_equal(expected, actual)
+
+    def test_period_index_offsets_multiple_freq(self):
+        period_index = pd.period_range('2019-08-28', freq='15min', periods=5)
+        np.testing.assert_array_equal(np.arange(5), utils.period_index_offsets(period_index))
+
+    def test_numpy_to_net_double_array(self):
+        values = np.array([1.5, -2.25, 3.0])
+        net_array = utils.numpy_to_net_double_array(values)
+        self.assertEqual(3, net_array.Length)
+        for i in range(3):
+            self.assertEqual(values[i], net_array[i])
+
+
+class TestSettlementRuleForDotnet(unittest.TestCase):
+
+    _periods = pd.period_range('2019-08-28', '2019-10-05', freq='D')
+
+    def _assert_net_rule_equals_python_rule(self, settlement_rule, python_settlement_rule):
+        net_settlement_rule = utils.settlement_rule_for_dotnet(settlement_rule, 'D', self._periods)
+        for period in self._periods:
+            net_settle_day = net_settlement_rule.Invoke(utils.from_datetime_like(period, utils.FREQ_TO_PERIOD_TYPE['D']))
+            expected_settle_day = python_settlement_rule(period)
+            self.assertEqual(pd.Period(expected_settle_day, freq='D'), utils.net_time_period_to_pandas_period(net_settle_day, 'D'))
+
+    def test_python_callable_evaluated_into_lookup_table(self):
+        settlement_rule = lambda period: period.asfreq('M').asfreq('D', 'end') + 20
+        self._assert_net_rule_equals_python_rule(settlement_rule, settlement_rule)
+
+    def test_days_after_month_end(self):
+        self._assert_net_rule_equals_python_rule(cs.DaysAfterMonthEnd(20),
+                                                 lambda period: period.asfreq('M').asfreq('D', 'end') + 20)
+
+    def test_same_period(self):
+        self._assert_net_rule_equals_python_rule(cs.SamePeriod(), lambda period: period)
+
+
+class TestDiscountFactorCurveForDotnet(unittest.TestCase):
+
+    def test_discount_factors_equal_act365_continuously_compounded(self):
+        interest_rates = pd.Series(data=[0.01, 0.012, np.nan, 0.015],
+                                   index=pd.period_range('2019-08-31', '2019-09-03', freq='D'))
+        net_curve = utils.discount_factor_curve_for_dotnet(interest_rates, pd.Period('2019-09-01', freq='D'), 'D')
+        day_type = utils.FREQ_TO_PERIOD_TYPE['D']
+        self.assertEqual(1.0, net_curve.DiscountFactor(utils.from_datetime_like(pd.Period('2019-08-31', freq='D'), day_type)))
+        self.assertAlmostEqual(np.exp(-2 / 365.0 * 0.015),
+                               net_curve.DiscountFactor(utils.from_datetime_like(pd.Period('2019-09-03', freq='D'), day_type)),
+                               places=14)
+        with self.assertRaises(dotnet.ArgumentException):
+            net_curve.DiscountFactor(utils.from_datetime_like(pd.Period('2019-09-02', freq='D'), day_type))
+
+
+class TestLazyClrLoading(unittest.TestCase):
+
+    def test_import_does_not_load_clr(self):
+        script = 'import sys; import cmdty_storage; print("clr" in sys.modules)'
+        output = subprocess.run([sys.executable, '-c', script], check=True, stdout=subprocess.PIPE,
+                                universal_newlines=True).stdout
+        self.assertEqual('False', output.strip())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using Cmdty.TimePeriodValueTypes;
+using JetBrains.Annotations;
+
+namespace Cmdty.Storage
+{
+    /// <summary>
+    /// Factory methods for cmdty settlement rules, mapping delivery period to settlement day, which are evaluated
+    /// without calling back into user code.
+    /// </summary>
+    public static class CmdtySettlementRules
+    {
+        /// <summary>
+        /// Settlement on the day numDays after the last day of the calendar month containing the start of the period.
+        /// </summary>
+        public static Func<T, Day> DaysAfterMonthEnd<T>(int numDays)
+            where T : ITimePeriod<T>
+        {
+            return period => Month.FromDateTime(period.Start).Offset(1).First<Day>().Offset(numDays - 1);
+        }
+
+        /// <summary>
+        /// Settlement on the day containing the start of the period.
+        /// </summary>
+        public static Func<T, Day> SamePeriod<T>()
+            where T : ITimePeriod<T>
+        {
+            return period => period.First<Day>();
+        }
+
+        /// <summary>
+        /// Settlement looked up from a precomputed table. Element i of settlementDayOffsets is the offset from
+        /// referenceDay of the settlement day for period firstPeriod.Offset(i).
+        /// </summary>
+        public static Func<T, Day> LookupTable<T>(T firstPeriod, Day referenceDay, [NotNull] IEnumerable<int> settlementDayOffsets)
+            where T : ITimePeriod<T>
+        {
+            if (settlementDayOffsets == null) throw new ArgumentNullException(nameof(settlementDayOffsets));
+            Day[] settlementDays = settlementDayOffsets.Select(referenceDay.Offset).ToArray();
+
+            return period =>
+            {
+                int index = period.OffsetFrom(firstPeriod);
+                if (index < 0 || index >= settlementDays.Length)
+                    throw new ArgumentException($"Settlement day lookup table does not contain period {period}.", nameof(period));
+                return settlementDays[index];
+            };
+        }
+
+    }
+}
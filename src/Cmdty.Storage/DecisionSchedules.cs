@@ -0,0 +1,89 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using Cmdty.TimePeriodValueTypes;
+using JetBrains.Annotations;
+
+namespace Cmdty.Storage
+{
+    /// <summary>
+    /// Factory methods for decision schedules, returning true for the periods which start a decision block, over which
+    /// the inject/withdraw volume is held constant, and which are evaluated without calling back into user code.
+    /// </summary>
+    public static class DecisionSchedules
+    {
+        /// <summary>
+        /// Decision blocks of numPeriods periods, with a block starting on firstPeriod.
+        /// </summary>
+        public static Func<T, bool> EveryNPeriods<T>(T firstPeriod, int numPeriods)
+            where T : ITimePeriod<T>
+        {
+            if (numPeriods < 1)
+                throw new ArgumentException("Number of periods must be at least 1.", nameof(numPeriods));
+            return period => period.OffsetFrom(firstPeriod) % numPeriods == 0;
+        }
+
+        /// <summary>
+        /// Decision blocks looked up from a precomputed table. The periods starting a decision block are the periods
+        /// firstPeriod.Offset(i) for each i in decisionPeriodOffsets, with tableLength the number of periods in the table.
+        /// </summary>
+        public static Func<T, bool> LookupTable<T>(T firstPeriod, int tableLength, [NotNull] IEnumerable<int> decisionPeriodOffsets)
+            where T : ITimePeriod<T>
+        {
+            if (decisionPeriodOffsets == null) throw new ArgumentNullException(nameof(decisionPeriodOffsets));
+            var isDecisionPeriod = new bool[tableLength];
+            foreach (int offset in decisionPeriodOffsets)
+            {
+                if (offset < 0 || offset >= tableLength)
+                    throw new ArgumentException($"Decision period offset {offset} is outside of the table.", nameof(decisionPeriodOffsets));
+                isDecisionPeriod[offset] = true;
+            }
+
+            return period =>
+            {
+                int index = period.OffsetFrom(firstPeriod);
+                if (index < 0 || index >= isDecisionPeriod.Length)
+                    throw new ArgumentException($"Decision schedule lookup table does not contain period {period}.", nameof(period));
+                return isDecisionPeriod[index];
+            };
+        }
+
+        /// <summary>
+        /// Starts of the decision blocks from firstDecisionPeriod, which always starts a block, until the period before
+        /// endPeriod.
+        /// </summary>
+        internal static T[] DecisionBlockStarts<T>(Func<T, bool> isDecisionPeriod, T firstDecisionPeriod, T endPeriod)
+            where T : ITimePeriod<T>
+        {
+            return firstDecisionPeriod.EnumerateTo(endPeriod.Offset(-1))
+                        .Where(period => period.Equals(firstDecisionPeriod) || isDecisionPeriod(period))
+                        .ToArray();
+        }
+
+    }
+}
@@ -0,0 +1,117 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Linq;
+using Cmdty.TimePeriodValueTypes;
+using Cmdty.TimeSeries;
+using JetBrains.Annotations;
+
+namespace Cmdty.Storage
+{
+    /// <summary>
+    /// Discount factors to a present day, precomputed for every day from the present day onwards into a dense array
+    /// so that each lookup is an array read.
+    /// </summary>
+    public sealed class DiscountFactorCurve
+    {
+        private readonly double[] _discountFactors;
+
+        public Day PresentDay { get; }
+
+        /// <summary>
+        /// Creates an instance of DiscountFactorCurve.
+        /// </summary>
+        /// <param name="presentDay">The day discounted to.</param>
+        /// <param name="discountFactors">Discount factors with element i being the discount factor for the day i days after
+        /// presentDay. Elements with value NaN represent days for which the discount factor is not available.</param>
+        public DiscountFactorCurve(Day presentDay, [NotNull] IEnumerable<double> discountFactors)
+        {
+            if (discountFactors == null) throw new ArgumentNullException(nameof(discountFactors));
+            PresentDay = presentDay;
+            _discountFactors = discountFactors.ToArray();
+        }
+
+        public static DiscountFactorCurve FromAct365ContinuouslyCompoundedInterestRateCurve(Day presentDay,
+                                        [NotNull] TimeSeries<Day, double> act365ContCompInterestRates)
+        {
+            if (act365ContCompInterestRates == null) throw new ArgumentNullException(nameof(act365ContCompInterestRates));
+            if (act365ContCompInterestRates.IsEmpty || act365ContCompInterestRates.End <= presentDay)
+                return new DiscountFactorCurve(presentDay, new[] {1.0});
+
+            int numDays = act365ContCompInterestRates.End.OffsetFrom(presentDay) + 1;
+            var discountFactors = new double[numDays];
+            discountFactors[0] = 1.0;
+            for (int i = 1; i < numDays; i++)
+            {
+                Day cashFlowDay = presentDay.Offset(i);
+                discountFactors[i] = act365ContCompInterestRates.ContainsKey(cashFlowDay)
+                    ? Math.Exp(-i / 365.0 * act365ContCompInterestRates[cashFlowDay])
+                    : double.NaN;
+            }
+            return new DiscountFactorCurve(presentDay, discountFactors);
+        }
+
+        public double DiscountFactor(Day cashFlowDay)
+        {
+            if (cashFlowDay <= PresentDay)
+                return 1.0;
+            int dayOffset = cashFlowDay.OffsetFrom(PresentDay);
+            if (dayOffset >= _discountFactors.Length || double.IsNaN(_discountFactors[dayOffset]))
+                throw new ArgumentException("Discount factor curve does not contain point for date " + cashFlowDay);
+            return _discountFactors[dayOffset];
+        }
+
+        /// <summary>
+        /// Discount factor with the same signature as the discount factor functions used by the valuation builders.
+        /// presentDay must equal the PresentDay property.
+        /// </summary>
+        public double DiscountFactor(Day presentDay, Day cashFlowDay)
+        {
+            if (!presentDay.Equals(PresentDay))
+                throw new ArgumentException($"Discount factor curve has present day {PresentDay} so cannot discount to {presentDay}.", nameof(presentDay));
+            return DiscountFactor(cashFlowDay);
+        }
+
+        /// <summary>
+        /// Returns a function mapping cash flow day to discount factor to presentDay. If discountFactors was created from
+        /// an instance of DiscountFactorCurve with the same present day, the array lookup of the curve is used directly,
+        /// otherwise results of discountFactors are memoized. The returned function is thread-safe.
+        /// </summary>
+        internal static Func<Day, double> DiscountToPresentDay(Func<Day, Day, double> discountFactors, Day presentDay)
+        {
+            if (discountFactors.Target is DiscountFactorCurve discountFactorCurve && discountFactorCurve.PresentDay.Equals(presentDay))
+                return discountFactorCurve.DiscountFactor;
+
+            // Concurrent dictionary used as the tree valuation can call the returned function from multiple threads
+            var discountFactorCache = new ConcurrentDictionary<Day, double>();
+            Func<Day, double> discountToPresentDay = cashFlowDay => discountFactors(presentDay, cashFlowDay);
+            return cashFlowDay => discountFactorCache.GetOrAdd(cashFlowDay, discountToPresentDay);
+        }
+
+    }
+}
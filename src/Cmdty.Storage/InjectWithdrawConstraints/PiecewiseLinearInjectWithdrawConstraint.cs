@@ -27,47 +27,55 @@
 using System.Collections.Generic;
 using System.Linq;
 using JetBrains.Annotations;
-using MathNet.Numerics.Interpolation;
 
 namespace Cmdty.Storage
 {
     public sealed class PiecewiseLinearInjectWithdrawConstraint : IInjectWithdrawConstraint
     {
-        private readonly InjectWithdrawRangeByInventory[] _injectWithdrawRanges;
+        private readonly double[] _inventories;
+        private readonly double[] _minInjectWithdrawRates;
+        private readonly double[] _maxInjectWithdrawRates;
+        private readonly double[] _minInjectWithdrawRateSlopes;
+        private readonly double[] _maxInjectWithdrawRateSlopes;
 
-        private readonly LinearSpline _maxInjectWithdrawLinear;
-        private readonly LinearSpline _minInjectWithdrawLinear;
+        // Bracket table for the most recently used inventory percentage loss. Replaced as a whole, so can be read concurrently
+        private BracketTable _bracketTable;
 
         public PiecewiseLinearInjectWithdrawConstraint([NotNull] IEnumerable<InjectWithdrawRangeByInventory> injectWithdrawRanges)
         {
             if (injectWithdrawRanges == null) throw new ArgumentNullException(nameof(injectWithdrawRanges));
 
-            _injectWithdrawRanges = injectWithdrawRanges.OrderBy(injectWithdrawRange => injectWithdrawRange.Inventory)
+            InjectWithdrawRangeByInventory[] sortedInjectWithdrawRanges = injectWithdrawRanges
+                                                .OrderBy(injectWithdrawRange => injectWithdrawRange.Inventory)
                                                 .ToArray();
 
-            if (_injectWithdrawRanges.Length < 2)
+            if (sortedInjectWithdrawRanges.Length < 2)
                 throw new ArgumentException("Inject/withdraw ranges collection must contain at least two elements.", nameof(injectWithdrawRanges));
 
-            double[] inventories = _injectWithdrawRanges.Select(injectWithdrawRange => injectWithdrawRange.Inventory)
+            _inventories = sortedInjectWithdrawRanges.Select(injectWithdrawRange => injectWithdrawRange.Inventory)
                                                         .ToArray();
+            InventoryBreakpoints = Array.AsReadOnly(_inventories);
 
-            double[] maxInjectWithdrawRates = _injectWithdrawRanges
+            _maxInjectWithdrawRates = sortedInjectWithdrawRanges
                                                     .Select(injectWithdrawRange => injectWithdrawRange.InjectWithdrawRange.MaxInjectWithdrawRate)
                                                     .ToArray();
 
-            double[] minInjectWithdrawRates = _injectWithdrawRanges
+            _minInjectWithdrawRates = sortedInjectWithdrawRanges
                                                     .Select(injectWithdrawRange => injectWithdrawRange.InjectWithdrawRange.MinInjectWithdrawRate)
                                                     .ToArray();
 
-            _maxInjectWithdrawLinear = LinearSpline.InterpolateSorted(inventories, maxInjectWithdrawRates);
-            _minInjectWithdrawLinear = LinearSpline.InterpolateSorted(inventories, minInjectWithdrawRates);
-
+            _maxInjectWithdrawRateSlopes = SegmentSlopes(_inventories, _maxInjectWithdrawRates);
+            _minInjectWithdrawRateSlopes = SegmentSlopes(_inventories, _minInjectWithdrawRates);
         }
 
+        /// <summary>
+        /// Inventories at which the inject/withdraw rates are specified, in ascending order. The rates change slope at these levels.
+        /// </summary>
+        public IReadOnlyList<double> InventoryBreakpoints { get; }
+
         public InjectWithdrawRange GetInjectWithdrawRange(double inventory)
         {
-            double maxInjectWithdrawRate = _maxInjectWithdrawLinear.Interpolate(inventory);
-            double minInjectWithdrawRate = _minInjectWithdrawLinear.Interpolate(inventory);
+            InterpolateInjectWithdrawRates(inventory, out double minInjectWithdrawRate, out double maxInjectWithdrawRate);
             return new InjectWithdrawRange(minInjectWithdrawRate, maxInjectWithdrawRate);
         }
 
@@ -75,12 +83,13 @@ public InjectWithdrawRange GetInjectWithdrawRange(double inventory)
             double nextPeriodInventorySpaceUpperBound,
             double currentPeriodMinInventory, double currentPeriodMaxInventory, double inventoryPercentLoss)
         {
-            var currentPeriodInjectWithdrawRangeAtMaxInventory = GetInjectWithdrawRange(currentPeriodMaxInventory);
+            InterpolateInjectWithdrawRates(currentPeriodMaxInventory, out double minInjectWithdrawRateAtMaxInventory,
+                                            out double maxInjectWithdrawRateAtMaxInventory);
 
             double nextPeriodMaxInventoryFromThisPeriodMaxInventory = currentPeriodMaxInventory * (1 - inventoryPercentLoss)
-                                                                      + currentPeriodInjectWithdrawRangeAtMaxInventory.MaxInjectWithdrawRate;
+                                                                      + maxInjectWithdrawRateAtMaxInventory;
             double nextPeriodMinInventoryFromThisPeriodMaxInventory = currentPeriodMaxInventory * (1 - inventoryPercentLoss)
-                                                                      + currentPeriodInjectWithdrawRangeAtMaxInventory.MinInjectWithdrawRate;
+                                                                      + minInjectWithdrawRateAtMaxInventory;
 
             if (nextPeriodMinInventoryFromThisPeriodMaxInventory <= nextPeriodInventorySpaceUpperBound &&
                 nextPeriodInventorySpaceLowerBound <= nextPeriodMaxInventoryFromThisPeriodMaxInventory)
@@ -89,15 +98,38 @@ public InjectWithdrawRange GetInjectWithdrawRange(double inventory)
                 return currentPeriodMaxInventory;
             }
 
-            // Search for inventory bracket
-            double bracketUpperInventory = _injectWithdrawRanges[_injectWithdrawRanges.Length - 1].Inventory;
+            BracketTable bracketTable = GetBracketTable(inventoryPercentLoss);
+            double[] inventoriesAfterWithdraw = bracketTable.InventoriesAfterWithdraw;
+            int topBracketIndex = _inventories.Length - 2;
+
+            // Search for the highest inventory bracket which contains nextPeriodInventorySpaceUpperBound after withdrawal, with the
+            // upper end of the top bracket taken as the current period max inventory after withdrawal. Binary search if the inventories
+            // after withdrawal are increasing, otherwise linear scan.
+            if (bracketTable.InventoriesAfterWithdrawIncreasing)
+            {
+                // Index of last element of inventoriesAfterWithdraw[0..topBracketIndex] which is <= nextPeriodInventorySpaceUpperBound
+                int bracketIndex = LastIndexLessThanOrEqual(inventoriesAfterWithdraw, topBracketIndex, nextPeriodInventorySpaceUpperBound);
+                if (bracketIndex == topBracketIndex)
+                {
+                    if (nextPeriodInventorySpaceUpperBound <= nextPeriodMinInventoryFromThisPeriodMaxInventory)
+                        return InterpolateLinearAndSolve(_inventories[topBracketIndex], inventoriesAfterWithdraw[topBracketIndex],
+                            _inventories[topBracketIndex + 1], nextPeriodMinInventoryFromThisPeriodMaxInventory, nextPeriodInventorySpaceUpperBound);
+                    if (inventoriesAfterWithdraw[topBracketIndex] < nextPeriodInventorySpaceUpperBound)
+                        throw new ApplicationException("Storage inventory constraints cannot be satisfied.");
+                    bracketIndex--; // Bracket below has nextPeriodInventorySpaceUpperBound at its upper end
+                }
+                if (bracketIndex < 0)
+                    throw new ApplicationException("Storage inventory constraints cannot be satisfied.");
+                return InterpolateLinearAndSolve(_inventories[bracketIndex], inventoriesAfterWithdraw[bracketIndex],
+                    _inventories[bracketIndex + 1], inventoriesAfterWithdraw[bracketIndex + 1], nextPeriodInventorySpaceUpperBound);
+            }
+
+            double bracketUpperInventory = _inventories[topBracketIndex + 1];
             double bracketUpperInventoryAfterWithdraw = nextPeriodMinInventoryFromThisPeriodMaxInventory;
-            for (int i = _injectWithdrawRanges.Length - 2; i >= 0; i--)
+            for (int i = topBracketIndex; i >= 0; i--)
             {
-                var bracketLowerDecisionRange = _injectWithdrawRanges[i];
-                double bracketLowerInventory = bracketLowerDecisionRange.Inventory;
-                double bracketLowerInventoryAfterWithdraw = bracketLowerInventory * (1 - inventoryPercentLoss) +
-                                                bracketLowerDecisionRange.InjectWithdrawRange.MinInjectWithdrawRate;
+                double bracketLowerInventory = _inventories[i];
+                double bracketLowerInventoryAfterWithdraw = inventoriesAfterWithdraw[i];
 
                 if (bracketLowerInventoryAfterWithdraw <= nextPeriodInventorySpaceUpperBound &&
                     nextPeriodInventorySpaceUpperBound <= bracketUpperInventoryAfterWithdraw)
@@ -118,12 +150,13 @@ public InjectWithdrawRange GetInjectWithdrawRange(double inventory)
         public double InventorySpaceLowerBound(double nextPeriodInventorySpaceLowerBound, double nextPeriodInventorySpaceUpperBound,
                                                 double currentPeriodMinInventory, double currentPeriodMaxInventory, double inventoryPercentLoss)
         {
-            var currentPeriodInjectWithdrawRangeAtMinInventory = GetInjectWithdrawRange(currentPeriodMinInventory);
+            InterpolateInjectWithdrawRates(currentPeriodMinInventory, out double minInjectWithdrawRateAtMinInventory,
+                                            out double maxInjectWithdrawRateAtMinInventory);
 
             double nextPeriodMaxInventoryFromThisPeriodMinInventory = currentPeriodMinInventory * (1 - inventoryPercentLoss)
-                                                                      + currentPeriodInjectWithdrawRangeAtMinInventory.MaxInjectWithdrawRate;
+                                                                      + maxInjectWithdrawRateAtMinInventory;
             double nextPeriodMinInventoryFromThisPeriodMinInventory = currentPeriodMinInventory * (1 - inventoryPercentLoss)
-                                                                      + currentPeriodInjectWithdrawRangeAtMinInventory.MinInjectWithdrawRate;
+                                                                      + minInjectWithdrawRateAtMinInventory;
 
             if (nextPeriodMinInventoryFromThisPeriodMinInventory <= nextPeriodInventorySpaceUpperBound &&
                 nextPeriodInventorySpaceLowerBound <= nextPeriodMaxInventoryFromThisPeriodMinInventory)
@@ -132,16 +165,39 @@ public InjectWithdrawRange GetInjectWithdrawRange(double inventory)
                 return currentPeriodMinInventory;
             }
 
-            // Search for inventory bracket
-            double bracketLowerInventory = _injectWithdrawRanges[0].Inventory;
+            BracketTable bracketTable = GetBracketTable(inventoryPercentLoss);
+            double[] inventoriesAfterInject = bracketTable.InventoriesAfterInject;
+            int lastIndex = _inventories.Length - 1;
+
+            // Search for the lowest inventory bracket which contains nextPeriodInventorySpaceLowerBound after injection, with the
+            // lower end of the bottom bracket taken as the current period min inventory after injection. Binary search if the
+            // inventories after injection are increasing, otherwise linear scan.
+            if (bracketTable.InventoriesAfterInjectIncreasing)
+            {
+                // Index of first element of inventoriesAfterInject[1..lastIndex] which is >= nextPeriodInventorySpaceLowerBound
+                int bracketUpperIndex = FirstIndexGreaterThanOrEqual(inventoriesAfterInject, 1, nextPeriodInventorySpaceLowerBound);
+                if (bracketUpperIndex == 1)
+                {
+                    if (nextPeriodMaxInventoryFromThisPeriodMinInventory <= nextPeriodInventorySpaceLowerBound)
+                        return InterpolateLinearAndSolve(_inventories[0], nextPeriodMaxInventoryFromThisPeriodMinInventory,
+                            _inventories[1], inventoriesAfterInject[1], nextPeriodInventorySpaceLowerBound);
+                    if (nextPeriodInventorySpaceLowerBound < inventoriesAfterInject[1])
+                        throw new ApplicationException("Storage inventory constraints cannot be satisfied.");
+                    bracketUpperIndex++; // Bracket above has nextPeriodInventorySpaceLowerBound at its lower end
+                }
+                if (bracketUpperIndex > lastIndex)
+                    throw new ApplicationException("Storage inventory constraints cannot be satisfied.");
+                return InterpolateLinearAndSolve(_inventories[bracketUpperIndex - 1], inventoriesAfterInject[bracketUpperIndex - 1],
+                    _inventories[bracketUpperIndex], inventoriesAfterInject[bracketUpperIndex], nextPeriodInventorySpaceLowerBound);
+            }
+
+            double bracketLowerInventory = _inventories[0];
             double bracketLowerInventoryAfterInject= nextPeriodMaxInventoryFromThisPeriodMinInventory;
 
-            for (int i = 1; i < _injectWithdrawRanges.Length; i++)
+            for (int i = 1; i <= lastIndex; i++)
             {
-                var bracketUpperDecisionRange = _injectWithdrawRanges[i];
-                double bracketUpperInventory = bracketUpperDecisionRange.Inventory;
-                double bracketUpperInventoryAfterInject = bracketUpperInventory * (1 - inventoryPercentLoss) +
-                                            bracketUpperDecisionRange.InjectWithdrawRange.MaxInjectWithdrawRate;
+                double bracketUpperInventory = _inventories[i];
+                double bracketUpperInventoryAfterInject = inventoriesAfterInject[i];
 
                 if (bracketLowerInventoryAfterInject <= nextPeriodInventorySpaceLowerBound &&
                     nextPeriodInventorySpaceLowerBound <= bracketUpperInventoryAfterInject)
@@ -159,6 +215,64 @@ public InjectWithdrawRange GetInjectWithdrawRange(double inventory)
             throw new ApplicationException("Storage inventory constraints cannot be satisfied.");
         }
 
+        // Single bracket search for both rates, with linear extrapolation outside of the breakpoints, as MathNet LinearSpline
+        private void InterpolateInjectWithdrawRates(double inventory, out double minInjectWithdrawRate, out double maxInjectWithdrawRate)
+        {
+            int segmentIndex = Math.Max(LastIndexLessThanOrEqual(_inventories, _inventories.Length - 2, inventory), 0);
+            double inventoryFromSegmentStart = inventory - _inventories[segmentIndex];
+            minInjectWithdrawRate = _minInjectWithdrawRates[segmentIndex] + inventoryFromSegmentStart * _minInjectWithdrawRateSlopes[segmentIndex];
+            maxInjectWithdrawRate = _maxInjectWithdrawRates[segmentIndex] + inventoryFromSegmentStart * _maxInjectWithdrawRateSlopes[segmentIndex];
+        }
+
+        private BracketTable GetBracketTable(double inventoryPercentLoss)
+        {
+            BracketTable bracketTable = _bracketTable;
+            if (bracketTable == null || bracketTable.InventoryPercentLoss != inventoryPercentLoss)
+            {
+                bracketTable = new BracketTable(inventoryPercentLoss, _inventories, _minInjectWithdrawRates, _maxInjectWithdrawRates);
+                _bracketTable = bracketTable;
+            }
+            return bracketTable;
+        }
+
+        private static int LastIndexLessThanOrEqual(double[] values, int maxIndex, double value)
+        {
+            int lowIndex = 0;
+            int highIndex = maxIndex;
+            while (lowIndex <= highIndex)
+            {
+                int midIndex = lowIndex + (highIndex - lowIndex) / 2;
+                if (values[midIndex] <= value)
+                    lowIndex = midIndex + 1;
+                else
+                    highIndex = midIndex - 1;
+            }
+            return highIndex;
+        }
+
+        private static int FirstIndexGreaterThanOrEqual(double[] values, int minIndex, double value)
+        {
+            int lowIndex = minIndex;
+            int highIndex = values.Length - 1;
+            while (lowIndex <= highIndex)
+            {
+                int midIndex = lowIndex + (highIndex - lowIndex) / 2;
+                if (values[midIndex] >= value)
+                    highIndex = midIndex - 1;
+                else
+                    lowIndex = midIndex + 1;
+            }
+            return lowIndex;
+        }
+
+        private static double[] SegmentSlopes(double[] inventories, double[] rates)
+        {
+            var slopes = new double[inventories.Length - 1];
+            for (int i = 0; i < slopes.Length; i++)
+                slopes[i] = (rates[i + 1] - rates[i]) / (inventories[i + 1] - inventories[i]);
+            return slopes;
+        }
+
         /// <summary>
         /// Derives a linear equation from a pair of points (x1, y1) and (x2, y2) and then solves for x, for a known y
         /// </summary>
@@ -173,5 +287,40 @@ private static double InterpolateLinearAndSolve(double x1, double y1, double x2,
             return x;
         }
 
+        /// <summary>
+        /// Inventories in the next period after maximum withdrawal and injection from each breakpoint inventory, for an inventory percentage loss.
+        /// </summary>
+        private sealed class BracketTable
+        {
+            public double InventoryPercentLoss { get; }
+            public double[] InventoriesAfterWithdraw { get; }
+            public double[] InventoriesAfterInject { get; }
+            // Whether searchable by binary search, excluding the elements which the searches replace with the current period value
+            public bool InventoriesAfterWithdrawIncreasing { get; }
+            public bool InventoriesAfterInjectIncreasing { get; }
+
+            public BracketTable(double inventoryPercentLoss, double[] inventories, double[] minInjectWithdrawRates, double[] maxInjectWithdrawRates)
+            {
+                InventoryPercentLoss = inventoryPercentLoss;
+                InventoriesAfterWithdraw = new double[inventories.Length];
+                InventoriesAfterInject = new double[inventories.Length];
+                for (int i = 0; i < inventories.Length; i++)
+                {
+                    InventoriesAfterWithdraw[i] = inventories[i] * (1 - inventoryPercentLoss) + minInjectWithdrawRates[i];
+                    InventoriesAfterInject[i] = inventories[i] * (1 - inventoryPercentLoss) + maxInjectWithdrawRates[i];
+                }
+                InventoriesAfterWithdrawIncreasing = IsNonDecreasing(InventoriesAfterWithdraw, 0, inventories.Length - 2);
+                InventoriesAfterInjectIncreasing = IsNonDecreasing(InventoriesAfterInject, 1, inventories.Length - 1);
+            }
+
+            private static bool IsNonDecreasing(double[] values, int startIndex, int endIndex)
+            {
+                for (int i = startIndex; i < endIndex; i++)
+                    if (values[i + 1] < values[i])
+                        return false;
+                return true;
+            }
+        }
+
     }
 }
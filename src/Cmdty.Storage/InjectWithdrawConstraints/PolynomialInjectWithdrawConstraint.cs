@@ -42,6 +42,13 @@ public sealed class PolynomialInjectWithdrawConstraint : IInjectWithdrawConstrai
         private readonly int _newtonRaphsonMaxNumIterations;
         private readonly int _newtonRaphsonSubdivision;
 
+        // Bounded memo of solved inventory space bounds, keyed on next period inventory space bound, inventory percentage loss,
+        // and current period min and max inventory. Emptied when full
+        private const int MaxNumCachedBounds = 1024;
+        private readonly object _cachedBoundsLock = new object();
+        private readonly Dictionary<(double, double, double, double), double> _cachedUpperBounds = new Dictionary<(double, double, double, double), double>();
+        private readonly Dictionary<(double, double, double, double), double> _cachedLowerBounds = new Dictionary<(double, double, double, double), double>();
+
         public PolynomialInjectWithdrawConstraint([NotNull] IEnumerable<InjectWithdrawRangeByInventory> injectWithdrawRanges,
                         double newtonRaphsonAccuracy= 1E-10, int newtonRaphsonMaxNumIterations=100, int newtonRaphsonSubdivision=20)
         {
@@ -101,16 +108,26 @@ public InjectWithdrawRange GetInjectWithdrawRange(double inventory)
                 return currentPeriodMaxInventory;
             }
             
-            double PolyToSolve(double inventory) => inventory * (1 - inventoryPercentLoss) 
-                                                    + _minInjectWithdrawPolynomial.Evaluate(inventory)
-                                                    - nextPeriodInventorySpaceUpperBound ;
-            double PolyToSolve1StDeriv(double inventory) => (1 - inventoryPercentLoss) + _minInjectWithdrawPolynomial1StDeriv.Evaluate(inventory);
-
-            if (!RobustNewtonRaphson.TryFindRoot(PolyToSolve, PolyToSolve1StDeriv, currentPeriodMinInventory,
-                currentPeriodMaxInventory, _newtonRaphsonAccuracy, _newtonRaphsonMaxNumIterations,
-                        _newtonRaphsonSubdivision, out double thisPeriodMaxInventory))
+            var boundKey = (nextPeriodInventorySpaceUpperBound, inventoryPercentLoss, currentPeriodMinInventory, currentPeriodMaxInventory);
+            if (!TryGetCachedBound(_cachedUpperBounds, boundKey, out double thisPeriodMaxInventory))
             {
-                throw new ApplicationException("Cannot solve for the current period inventory space upper bound. Try changing Newton Raphson parameters.");
+                // Highest inventory from which withdrawing at the max rate reaches the next period inventory space upper bound
+                if (!TrySolveLowDegree(_minInjectWithdrawPolynomial, nextPeriodInventorySpaceUpperBound, inventoryPercentLoss,
+                                currentPeriodMinInventory, currentPeriodMaxInventory, true, out thisPeriodMaxInventory))
+                {
+                    double PolyToSolve(double inventory) => inventory * (1 - inventoryPercentLoss) 
+                                                            + _minInjectWithdrawPolynomial.Evaluate(inventory)
+                                                            - nextPeriodInventorySpaceUpperBound ;
+                    double PolyToSolve1StDeriv(double inventory) => (1 - inventoryPercentLoss) + _minInjectWithdrawPolynomial1StDeriv.Evaluate(inventory);
+
+                    if (!RobustNewtonRaphson.TryFindRoot(PolyToSolve, PolyToSolve1StDeriv, currentPeriodMinInventory,
+                        currentPeriodMaxInventory, _newtonRaphsonAccuracy, _newtonRaphsonMaxNumIterations,
+                                _newtonRaphsonSubdivision, out thisPeriodMaxInventory))
+                    {
+                        throw new ApplicationException("Cannot solve for the current period inventory space upper bound. Try changing Newton Raphson parameters.");
+                    }
+                }
+                AddCachedBound(_cachedUpperBounds, boundKey, thisPeriodMaxInventory);
             }
 
             if (thisPeriodMaxInventory < currentPeriodMinInventory)// TODO allow tolerance? If so, need to think how this will feed through to other parts of code.
@@ -136,16 +153,26 @@ public InjectWithdrawRange GetInjectWithdrawRange(double inventory)
                 return currentPeriodMinInventory;
             }
 
-            double PolyToSolve(double inventory) => inventory * (1 - inventoryPercentLoss) 
-                                                    + _maxInjectWithdrawPolynomial.Evaluate(inventory)
-                                                    - nextPeriodInventorySpaceLowerBound;
-            double PolyToSolve1StDeriv(double inventory) => (1 - inventoryPercentLoss) + _maxInjectWithdrawPolynomial1StDeriv.Evaluate(inventory);
-
-            if (!RobustNewtonRaphson.TryFindRoot(PolyToSolve, PolyToSolve1StDeriv, currentPeriodMinInventory,
-                currentPeriodMaxInventory, _newtonRaphsonAccuracy, _newtonRaphsonMaxNumIterations, 
-                        _newtonRaphsonSubdivision, out double thisPeriodMinInventory))
+            var boundKey = (nextPeriodInventorySpaceLowerBound, inventoryPercentLoss, currentPeriodMinInventory, currentPeriodMaxInventory);
+            if (!TryGetCachedBound(_cachedLowerBounds, boundKey, out double thisPeriodMinInventory))
             {
-                throw new ApplicationException("Cannot solve for the current period inventory space lower bound. Try changing Newton Raphson parameters.");
+                // Lowest inventory from which injecting at the max rate reaches the next period inventory space lower bound
+                if (!TrySolveLowDegree(_maxInjectWithdrawPolynomial, nextPeriodInventorySpaceLowerBound, inventoryPercentLoss,
+                                currentPeriodMinInventory, currentPeriodMaxInventory, false, out thisPeriodMinInventory))
+                {
+                    double PolyToSolve(double inventory) => inventory * (1 - inventoryPercentLoss) 
+                                                            + _maxInjectWithdrawPolynomial.Evaluate(inventory)
+                                                            - nextPeriodInventorySpaceLowerBound;
+                    double PolyToSolve1StDeriv(double inventory) => (1 - inventoryPercentLoss) + _maxInjectWithdrawPolynomial1StDeriv.Evaluate(inventory);
+
+                    if (!RobustNewtonRaphson.TryFindRoot(PolyToSolve, PolyToSolve1StDeriv, currentPeriodMinInventory,
+                        currentPeriodMaxInventory, _newtonRaphsonAccuracy, _newtonRaphsonMaxNumIterations, 
+                                _newtonRaphsonSubdivision, out thisPeriodMinInventory))
+                    {
+                        throw new ApplicationException("Cannot solve for the current period inventory space lower bound. Try changing Newton Raphson parameters.");
+                    }
+                }
+                AddCachedBound(_cachedLowerBounds, boundKey, thisPeriodMinInventory);
             }
 
             if (thisPeriodMinInventory > currentPeriodMaxInventory) // TODO allow tolerance? If so, need to think how this will feed through to other parts of code.
@@ -154,5 +181,172 @@ public InjectWithdrawRange GetInjectWithdrawRange(double inventory)
             return Math.Max(thisPeriodMinInventory, currentPeriodMinInventory);
         }
 
+        private bool TryGetCachedBound(Dictionary<(double, double, double, double), double> cachedBounds, 
+                                        (double, double, double, double) boundKey, out double bound)
+        {
+            lock (_cachedBoundsLock)
+                return cachedBounds.TryGetValue(boundKey, out bound);
+        }
+
+        private void AddCachedBound(Dictionary<(double, double, double, double), double> cachedBounds, 
+                                        (double, double, double, double) boundKey, double bound)
+        {
+            lock (_cachedBoundsLock)
+            {
+                if (cachedBounds.Count == MaxNumCachedBounds)
+                    cachedBounds.Clear();
+                cachedBounds[boundKey] = bound;
+            }
+        }
+
+        /// <summary>
+        /// Solves inventory * (1 - inventoryPercentLoss) + rate(inventory) = nextPeriodInventory in closed form, where the rate
+        /// polynomial is at most cubic, after dropping leading coefficients which are negligible over the inventory range.
+        /// Roots are polished with Newton-Raphson steps on the full polynomial, and only accepted if within the Newton-Raphson accuracy. If more than
+        /// one root lies in the inventory range the highest or lowest is returned. Returns false if no such root is found, in
+        /// which case the numerical solver should be used.
+        /// </summary>
+        private bool TrySolveLowDegree(Polynomial ratePolynomial, double nextPeriodInventory, double inventoryPercentLoss,
+                                double currentPeriodMinInventory, double currentPeriodMaxInventory, bool highestRoot, out double inventory)
+        {
+            inventory = double.NaN;
+            double[] rateCoefficients = ratePolynomial.Coefficients;
+
+            // Coefficients of the polynomial to solve, in ascending order of power
+            var coefficients = new double[Math.Max(rateCoefficients.Length, 2)];
+            Array.Copy(rateCoefficients, coefficients, rateCoefficients.Length);
+            coefficients[0] -= nextPeriodInventory;
+            coefficients[1] += 1 - inventoryPercentLoss;
+
+            double inventoryScale = Math.Max(Math.Max(Math.Abs(currentPeriodMinInventory), Math.Abs(currentPeriodMaxInventory)), 1.0);
+            int degree = EffectiveDegree(coefficients, inventoryScale);
+
+            double root1 = double.NaN, root2 = double.NaN, root3 = double.NaN;
+            switch (degree)
+            {
+                case 1:
+                    root1 = -coefficients[0] / coefficients[1];
+                    break;
+                case 2:
+                    (root1, root2) = QuadraticRealRoots(coefficients[0], coefficients[1], coefficients[2]);
+                    break;
+                case 3:
+                    (root1, root2, root3) = CubicRealRoots(coefficients[0] / coefficients[3], coefficients[1] / coefficients[3], 
+                                                            coefficients[2] / coefficients[3]);
+                    break;
+                default:
+                    return false;
+            }
+
+            double rangeTolerance = (currentPeriodMaxInventory - currentPeriodMinInventory + 1.0) * 1E-9;
+            double selectedRoot = double.NaN;
+            void SelectRoot(double root)
+            {
+                if (double.IsNaN(root) || root < currentPeriodMinInventory - rangeTolerance || root > currentPeriodMaxInventory + rangeTolerance)
+                    return;
+                // Polished and checked on all coefficients, so dropped coefficients don't move the root
+                double polishedRoot = PolishRoot(coefficients, root);
+                if (Math.Abs(EvaluatePolynomial(coefficients, polishedRoot)) > _newtonRaphsonAccuracy)
+                    return;
+                if (double.IsNaN(selectedRoot) || (highestRoot ? polishedRoot > selectedRoot : polishedRoot < selectedRoot))
+                    selectedRoot = polishedRoot;
+            }
+            SelectRoot(root1);
+            SelectRoot(root2);
+            SelectRoot(root3);
+
+            inventory = selectedRoot;
+            return !double.IsNaN(inventory);
+        }
+
+        private static int EffectiveDegree(double[] coefficients, double inventoryScale)
+        {
+            var termMagnitudes = new double[coefficients.Length];
+            double maxTermMagnitude = 0.0;
+            double inventoryScalePower = 1.0;
+            for (int i = 0; i < coefficients.Length; i++)
+            {
+                termMagnitudes[i] = Math.Abs(coefficients[i]) * inventoryScalePower;
+                maxTermMagnitude = Math.Max(maxTermMagnitude, termMagnitudes[i]);
+                inventoryScalePower *= inventoryScale;
+            }
+            int degree = coefficients.Length - 1;
+            while (degree > 0 && termMagnitudes[degree] <= maxTermMagnitude * 1E-12)
+                degree--;
+            return degree;
+        }
+
+        private static double EvaluatePolynomial(double[] coefficients, double x)
+        {
+            double value = coefficients[coefficients.Length - 1];
+            for (int i = coefficients.Length - 2; i >= 0; i--)
+                value = value * x + coefficients[i];
+            return value;
+        }
+
+        private static double PolishRoot(double[] coefficients, double root)
+        {
+            for (int iteration = 0; iteration < 2; iteration++)
+            {
+                double value = coefficients[coefficients.Length - 1];
+                double derivative = 0.0;
+                for (int i = coefficients.Length - 2; i >= 0; i--)
+                {
+                    derivative = derivative * root + value;
+                    value = value * root + coefficients[i];
+                }
+                if (value == 0.0 || derivative == 0.0)
+                    break;
+                root -= value / derivative;
+            }
+            return root;
+        }
+
+        /// <summary>
+        /// Real roots of c + bx + ax^2, with NaN for missing roots. Uses the form which avoids cancellation.
+        /// </summary>
+        private static (double Root1, double Root2) QuadraticRealRoots(double c, double b, double a)
+        {
+            double discriminant = b * b - 4.0 * a * c;
+            if (discriminant < 0.0)
+                return (double.NaN, double.NaN);
+            double q = -0.5 * (b + (b >= 0.0 ? 1.0 : -1.0) * Math.Sqrt(discriminant));
+            return (q / a, q == 0.0 ? double.NaN : c / q);
+        }
+
+        /// <summary>
+        /// Real roots of x^3 + a2 x^2 + a1 x + a0, with NaN for missing roots. Trigonometric method if there are three
+        /// real roots, otherwise Cardano's formula.
+        /// </summary>
+        private static (double Root1, double Root2, double Root3) CubicRealRoots(double a0, double a1, double a2)
+        {
+            // Depressed cubic t^3 + pt + q with x = t - a2/3
+            double shift = a2 / 3.0;
+            double p = a1 - a2 * shift;
+            double q = a0 - a1 * shift + 2.0 * shift * shift * shift;
+            double halfQ = q / 2.0;
+            double thirdP = p / 3.0;
+            double discriminant = halfQ * halfQ + thirdP * thirdP * thirdP;
+
+            if (discriminant > 0.0)
+            {
+                double u = Cbrt(-halfQ - (halfQ >= 0.0 ? 1.0 : -1.0) * Math.Sqrt(discriminant));
+                double t = u == 0.0 ? 0.0 : u - thirdP / u;
+                return (t - shift, double.NaN, double.NaN);
+            }
+
+            if (thirdP == 0.0)
+                return (-shift, double.NaN, double.NaN);
+
+            double r = Math.Sqrt(-thirdP);
+            double cosArg = Math.Max(-1.0, Math.Min(1.0, -halfQ / (r * r * r)));
+            double phi = Math.Acos(cosArg) / 3.0;
+            const double twoPiOverThree = 2.0 * Math.PI / 3.0;
+            return (2.0 * r * Math.Cos(phi) - shift, 2.0 * r * Math.Cos(phi - twoPiOverThree) - shift, 
+                        2.0 * r * Math.Cos(phi + twoPiOverThree) - shift);
+        }
+
+        private static double Cbrt(double x) => x < 0.0 ? -Math.Pow(-x, 1.0 / 3.0) : Math.Pow(x, 1.0 / 3.0);
+
     }
 }
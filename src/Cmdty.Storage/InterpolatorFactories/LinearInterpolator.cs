@@ -0,0 +1,139 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using JetBrains.Annotations;
+
+namespace Cmdty.Storage
+{
+    /// <summary>
+    /// Piecewise linear interpolation held in arrays, with linear extrapolation from the first and last segments, giving
+    /// results identical to MathNet LinearSpline. If the x coordinates are evenly spaced, with the possible exception of a
+    /// shorter last segment as created by <see cref="FixedSpacingStateSpaceGridCalc"/>, the segment containing the
+    /// interpolated point is calculated arithmetically in constant time, otherwise it is found by binary search.
+    /// </summary>
+    public sealed class LinearInterpolator
+    {
+        // Relative tolerance on segment lengths for x coordinates to be considered evenly spaced
+        private const double UniformSpacingTolerance = 1E-8;
+
+        private readonly double[] _xCoords;
+        private readonly double[] _yCoords;
+        private readonly double[] _slopes;
+        private readonly double _inverseSpacing;
+
+        public LinearInterpolator([NotNull] IEnumerable<double> xCoords, [NotNull] IEnumerable<double> yCoords)
+        {
+            if (xCoords == null) throw new ArgumentNullException(nameof(xCoords));
+            if (yCoords == null) throw new ArgumentNullException(nameof(yCoords));
+            _xCoords = xCoords.ToArray();
+            _yCoords = yCoords.ToArray();
+            if (_xCoords.Length != _yCoords.Length)
+                throw new ArgumentException("xCoords and yCoords must have the same number of elements.");
+            if (_xCoords.Length == 0)
+                throw new ArgumentException("xCoords and yCoords cannot be empty.");
+
+            for (int i = 1; i < _xCoords.Length; i++)
+            {
+                if (_xCoords[i] < _xCoords[i - 1])
+                {
+                    Array.Sort(_xCoords, _yCoords);
+                    break;
+                }
+            }
+
+            _slopes = new double[Math.Max(_xCoords.Length - 1, 1)];
+            for (int i = 0; i < _xCoords.Length - 1; i++)
+                _slopes[i] = (_yCoords[i + 1] - _yCoords[i]) / (_xCoords[i + 1] - _xCoords[i]);
+
+            IsUniformGrid = HasUniformSpacing(_xCoords);
+            if (IsUniformGrid)
+                _inverseSpacing = 1.0 / (_xCoords[1] - _xCoords[0]);
+        }
+
+        /// <summary>
+        /// True if segments are found arithmetically rather than by binary search.
+        /// </summary>
+        public bool IsUniformGrid { get; }
+
+        public int Count => _xCoords.Length;
+
+        public double Interpolate(double x)
+        {
+            if (_xCoords.Length == 1) // Trivial case of a single point
+                return _yCoords[0];
+            int segment = IsUniformGrid ? UniformGridSegmentIndex(x) : SegmentIndex(x);
+            return _yCoords[segment] + (x - _xCoords[segment]) * _slopes[segment];
+        }
+
+        // Index of the segment, clamped to the first and last, for which x is at or above the left end and below the right end.
+        // The same as MathNet LinearSpline, which matters for results being identical when x equals a coordinate.
+        private int SegmentIndex(double x)
+        {
+            int index = Array.BinarySearch(_xCoords, x);
+            if (index < 0)
+                index = ~index - 1;
+            return Math.Min(Math.Max(index, 0), _xCoords.Length - 2);
+        }
+
+        private int UniformGridSegmentIndex(double x)
+        {
+            int lastSegment = _xCoords.Length - 2;
+            double offset = (x - _xCoords[0]) * _inverseSpacing;
+            if (!(offset > 0.0)) // Also handles NaN
+                return 0;
+            if (offset >= lastSegment)
+                return x < _xCoords[lastSegment] ? SegmentIndex(x) : lastSegment;
+            int segment = (int) offset;
+            // Correct for accumulated rounding of the coordinates
+            while (segment > 0 && x < _xCoords[segment])
+                segment--;
+            while (segment < lastSegment && x >= _xCoords[segment + 1])
+                segment++;
+            return segment;
+        }
+
+        private static bool HasUniformSpacing(double[] xCoords)
+        {
+            if (xCoords.Length < 3)
+                return xCoords.Length == 2 && xCoords[1] > xCoords[0];
+            double spacing = xCoords[1] - xCoords[0];
+            if (!(spacing > 0.0))
+                return false;
+            double tolerance = spacing * UniformSpacingTolerance;
+            for (int i = 1; i < xCoords.Length - 2; i++)
+            {
+                if (Math.Abs(xCoords[i + 1] - xCoords[i] - spacing) > tolerance)
+                    return false;
+            }
+            // The last segment can be shorter
+            double lastSegmentLength = xCoords[xCoords.Length - 1] - xCoords[xCoords.Length - 2];
+            return lastSegmentLength > 0.0 && lastSegmentLength <= spacing + tolerance;
+        }
+
+    }
+}
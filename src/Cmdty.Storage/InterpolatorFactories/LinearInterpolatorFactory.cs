@@ -25,10 +25,7 @@
 
 using System;
 using System.Collections.Generic;
-using System.Linq;
 using JetBrains.Annotations;
-using MathNet.Numerics.Interpolation;
-// ReSharper disable PossibleMultipleEnumeration
 
 namespace Cmdty.Storage
 {
@@ -36,18 +33,8 @@ public sealed class LinearInterpolatorFactory : IInterpolatorFactory  // TODO mo
     {
         public Func<double, double> CreateInterpolator([NotNull] IEnumerable<double> xCoords, [NotNull] IEnumerable<double> yCoords)
         {
-            if (xCoords == null) throw new ArgumentNullException(nameof(xCoords));
-            if (yCoords == null) throw new ArgumentNullException(nameof(yCoords));
-            if (xCoords.Count() != yCoords.Count())
-                throw new ArgumentException("xCoords and yCoords must have the same number of elements.");
-
-            if (xCoords.Count() == 1) // Trivial case of a single point
-            {
-                double singleY = yCoords.Single();
-                return x => singleY;
-            }
-            LinearSpline linearSpline = LinearSpline.Interpolate(xCoords, yCoords); // TODO use InterpolateSorted method?
-            return linearSpline.Interpolate;
+            var linearInterpolator = new LinearInterpolator(xCoords, yCoords);
+            return linearInterpolator.Interpolate;
         }
 
     }
@@ -23,13 +23,29 @@
 // OTHER DEALINGS IN THE SOFTWARE.
 #endregion
 
+using System;
+using System.Collections.Generic;
 using Cmdty.TimePeriodValueTypes;
+using Cmdty.TimeSeries;
 
 namespace Cmdty.Storage
 {
     public interface IIntrinsicCalculate<T>
         where T : ITimePeriod<T>
     {
+        /// <summary>
+        /// Sets the decision schedule, so that inject/withdraw decisions are only made in the current period and the periods for
+        /// which isDecisionPeriod returns true, each starting a decision block. The volume is held constant for each period of the
+        /// block, with prices, costs and inventory losses still accruing by period, and backward induction is only performed over
+        /// the block starts. By default a decision is made in every period. See <see cref="DecisionSchedules"/>.
+        /// </summary>
+        IIntrinsicCalculate<T> WithDecisionSchedule(Func<T, bool> isDecisionPeriod);
         IntrinsicStorageValuationResults<T> Calculate();
+        /// <summary>
+        /// Calculates the intrinsic value for each pair of starting inventory and forward curve, with all other inputs
+        /// shared between scenarios. The starting inventory and forward curve specified earlier in the fluent chain are ignored.
+        /// </summary>
+        IntrinsicStorageValuationResults<T>[] CalculateBatch(IReadOnlyList<double> startingInventories, 
+                                                IReadOnlyList<TimeSeries<T, double>> forwardCurves);
     }
 }
\ No newline at end of file
@@ -45,6 +45,7 @@ public sealed class IntrinsicStorageValuation<T> : IIntrinsicAddStartingInventor
         private Func<ICmdtyStorage<T>, IDoubleStateSpaceGridCalc> _gridCalcFactory;
         private IInterpolatorFactory _interpolatorFactory;
         private double _numericalTolerance;
+        private Func<T, bool> _isDecisionPeriod;
 
         private IntrinsicStorageValuation([NotNull] ICmdtyStorage<T> storage)
         {
@@ -111,16 +112,71 @@ IIntrinsicCalculate<T> IIntrinsicAddNumericalTolerance<T>.WithNumericalTolerance
             return this;
         }
 
+        IIntrinsicCalculate<T> IIntrinsicCalculate<T>.WithDecisionSchedule([NotNull] Func<T, bool> isDecisionPeriod)
+        {
+            _isDecisionPeriod = isDecisionPeriod ?? throw new ArgumentNullException(nameof(isDecisionPeriod));
+            return this;
+        }
+
         IntrinsicStorageValuationResults<T> IIntrinsicCalculate<T>.Calculate()
         {
             return Calculate(_currentPeriod, _startingInventory, _forwardCurve, _storage, _settleDateRule, _discountFactors,
-                    _gridCalcFactory, _interpolatorFactory, _numericalTolerance);
+                    _gridCalcFactory, _interpolatorFactory, _numericalTolerance, _isDecisionPeriod);
+        }
+
+        IntrinsicStorageValuationResults<T>[] IIntrinsicCalculate<T>.CalculateBatch(
+                    [NotNull] IReadOnlyList<double> startingInventories, [NotNull] IReadOnlyList<TimeSeries<T, double>> forwardCurves)
+        {
+            if (startingInventories == null) throw new ArgumentNullException(nameof(startingInventories));
+            if (forwardCurves == null) throw new ArgumentNullException(nameof(forwardCurves));
+            if (startingInventories.Count != forwardCurves.Count)
+                throw new ArgumentException("Number of starting inventories must equal number of forward curves.", nameof(forwardCurves));
+
+            // Inputs which don't vary by scenario are evaluated once and shared across all scenarios
+            var settleDateCache = new Dictionary<T, Day>();
+            Day SettleDateRule(T period)
+            {
+                if (!settleDateCache.TryGetValue(period, out Day settleDate))
+                {
+                    settleDate = _settleDateRule(period);
+                    settleDateCache[period] = settleDate;
+                }
+                return settleDate;
+            }
+
+            var discountFactorCache = new Dictionary<(Day, Day), double>();
+            double DiscountFactorsMemoized(Day presentDay, Day cashFlowDay)
+            {
+                if (!discountFactorCache.TryGetValue((presentDay, cashFlowDay), out double discountFactor))
+                {
+                    discountFactor = _discountFactors(presentDay, cashFlowDay);
+                    discountFactorCache[(presentDay, cashFlowDay)] = discountFactor;
+                }
+                return discountFactor;
+            }
+            // A DiscountFactorCurve is already an array lookup so is used without memoization
+            Func<Day, Day, double> discountFactors = _discountFactors.Target is DiscountFactorCurve
+                ? _discountFactors
+                : DiscountFactorsMemoized;
+
+            IDoubleStateSpaceGridCalc gridCalc = _gridCalcFactory(_storage);
+
+            var results = new IntrinsicStorageValuationResults<T>[startingInventories.Count];
+            for (int i = 0; i < results.Length; i++)
+            {
+                TimeSeries<T, double> forwardCurve = forwardCurves[i] ?? 
+                        throw new ArgumentException($"Forward curve at index {i} is null.", nameof(forwardCurves));
+                results[i] = Calculate(_currentPeriod, startingInventories[i], forwardCurve, _storage, SettleDateRule, discountFactors,
+                    storage => gridCalc, _interpolatorFactory, _numericalTolerance, _isDecisionPeriod);
+            }
+
+            return results;
         }
 
         private static IntrinsicStorageValuationResults<T> Calculate(T currentPeriod, double startingInventory,
                 TimeSeries<T, double> forwardCurve, ICmdtyStorage<T> storage, Func<T, Day> settleDateRule,
                 Func<Day, Day, double> discountFactors, Func<ICmdtyStorage<T>, IDoubleStateSpaceGridCalc> gridCalcFactory,
-                IInterpolatorFactory interpolatorFactory, double numericalTolerance)
+                IInterpolatorFactory interpolatorFactory, double numericalTolerance, Func<T, bool> isDecisionPeriod)
         {
             if (startingInventory < 0)
                 throw new ArgumentException("Inventory cannot be negative.", nameof(startingInventory));
@@ -165,28 +221,22 @@ IntrinsicStorageValuationResults<T> IIntrinsicCalculate<T>.Calculate()
 
             // Calculate discount factor function
             Day dayToDiscountTo = currentPeriod.First<Day>(); // TODO IMPORTANT, this needs to change
-            
-            // Memoize the discount factor
-            var discountFactorCache = new Dictionary<Day, double>(); // TODO do this in more elegant way and share with Tree calc
-            double DiscountToCurrentDay(Day cashFlowDate)
-            {
-                if (!discountFactorCache.TryGetValue(cashFlowDate, out double discountFactor))
-                {
-                    discountFactor = discountFactors(dayToDiscountTo, cashFlowDate);
-                    discountFactorCache[cashFlowDate] = discountFactor;
-                }
-                return discountFactor;
-            }
+            Func<Day, double> DiscountToCurrentDay = DiscountFactorCurve.DiscountToPresentDay(discountFactors, dayToDiscountTo);
+
+            double cmdtyPriceAtEnd = forwardCurve[storage.EndPeriod];
+            Func<double, double> terminalValueByInventory = 
+                finalInventory => storage.TerminalStorageNpv(cmdtyPriceAtEnd, finalInventory);
+            IDoubleStateSpaceGridCalc gridCalc = gridCalcFactory(storage);
+
+            if (isDecisionPeriod != null)
+                return CalculateForDecisionBlocks(startingInventory, forwardCurve, storage, settleDateRule, inventorySpace,
+                    DiscountToCurrentDay, terminalValueByInventory, gridCalc, interpolatorFactory, numericalTolerance, isDecisionPeriod);
 
             // Perform backward induction
             var storageValueByInventory = new Func<double, double>[inventorySpace.Count];
-
-            double cmdtyPriceAtEnd = forwardCurve[storage.EndPeriod];
-            storageValueByInventory[inventorySpace.Count - 1] = 
-                finalInventory => storage.TerminalStorageNpv(cmdtyPriceAtEnd, finalInventory) ;
+            storageValueByInventory[inventorySpace.Count - 1] = terminalValueByInventory;
 
             int backCounter = inventorySpace.Count - 2;
-            IDoubleStateSpaceGridCalc gridCalc = gridCalcFactory(storage);
 
             foreach (T periodLoop in inventorySpace.Indices.Reverse().Skip(1))
             {
@@ -252,6 +302,103 @@ IntrinsicStorageValuationResults<T> IIntrinsicCalculate<T>.Calculate()
             return new IntrinsicStorageValuationResults<T>(storageNpv, new TimeSeries<T, StorageProfile>(periods, storageProfiles));
         }
 
+        // Backward induction over the starts of the decision blocks only, with the inject/withdraw volume held for each period of the block
+        private static IntrinsicStorageValuationResults<T> CalculateForDecisionBlocks(double startingInventory,
+                TimeSeries<T, double> forwardCurve, ICmdtyStorage<T> storage, Func<T, Day> settleDateRule,
+                TimeSeries<T, InventoryRange> inventorySpace, Func<Day, double> discountFactors, 
+                Func<double, double> terminalValueByInventory, IDoubleStateSpaceGridCalc gridCalc, 
+                IInterpolatorFactory interpolatorFactory, double numericalTolerance, Func<T, bool> isDecisionPeriod)
+        {
+            T startActiveStorage = inventorySpace.Start.Offset(-1);
+            T[] blockStarts = DecisionSchedules.DecisionBlockStarts(isDecisionPeriod, startActiveStorage, storage.EndPeriod);
+            T[] blockEnds = blockStarts.Skip(1).Append(storage.EndPeriod).ToArray();
+
+            // Element i is the storage value by inventory at the start of block i, with the terminal value last
+            var storageValueByInventory = new Func<double, double>[blockStarts.Length + 1];
+            storageValueByInventory[blockStarts.Length] = terminalValueByInventory;
+
+            (double StorageNpv, double OptimalInjectWithdraw) OptimalBlockDecisionAndValue(int blockIndex, double inventory)
+            {
+                T blockStart = blockStarts[blockIndex];
+                int numBlockPeriods = blockEnds[blockIndex].OffsetFrom(blockStart);
+                (double nextBlockInventorySpaceMin, double nextBlockInventorySpaceMax) = inventorySpace[blockEnds[blockIndex]];
+                double[] decisionSet = StorageHelper.CalculateBlockBangBangDecisionSet(storage, blockStart, numBlockPeriods,
+                                    inventory, nextBlockInventorySpaceMin, nextBlockInventorySpaceMax, numericalTolerance);
+
+                var cmdtyPrices = new double[numBlockPeriods];
+                var discountFactorsFromCmdtySettlement = new double[numBlockPeriods];
+                for (int i = 0; i < numBlockPeriods; i++)
+                {
+                    T period = blockStart.Offset(i);
+                    cmdtyPrices[i] = forwardCurve[period];
+                    discountFactorsFromCmdtySettlement[i] = discountFactors(settleDateRule(period));
+                }
+
+                var discountedCmdtyVolumes = new double[numBlockPeriods];
+                var valuesForDecision = new double[decisionSet.Length];
+                for (int j = 0; j < decisionSet.Length; j++)
+                {
+                    (double costNpv, double inventoryAfterBlock) = StorageHelper.DecisionBlockVolumesAndCosts(storage, blockStart,
+                                    inventory, decisionSet[j], discountFactorsFromCmdtySettlement, discountFactors, discountedCmdtyVolumes);
+                    double cmdtyPurchaseNpv = 0.0;
+                    for (int i = 0; i < numBlockPeriods; i++)
+                        cmdtyPurchaseNpv += cmdtyPrices[i] * discountedCmdtyVolumes[i];
+                    valuesForDecision[j] = storageValueByInventory[blockIndex + 1](inventoryAfterBlock) - cmdtyPurchaseNpv - costNpv;
+                }
+
+                (double storageNpv, int indexOfOptimalDecision) = StorageHelper.MaxValueAndIndex(valuesForDecision);
+                return (StorageNpv: storageNpv, OptimalInjectWithdraw: decisionSet[indexOfOptimalDecision]);
+            }
+
+            // The first block only has the starting inventory, so is valued in the forward loop
+            for (int blockIndex = blockStarts.Length - 1; blockIndex > 0; blockIndex--)
+            {
+                (double inventorySpaceMin, double inventorySpaceMax) = inventorySpace[blockStarts[blockIndex]];
+                double[] inventorySpaceGrid = gridCalc.GetGridPoints(inventorySpaceMin, inventorySpaceMax)
+                                                        .ToArray();
+                var storageValuesGrid = new double[inventorySpaceGrid.Length];
+                for (int i = 0; i < inventorySpaceGrid.Length; i++)
+                    storageValuesGrid[i] = OptimalBlockDecisionAndValue(blockIndex, inventorySpaceGrid[i]).StorageNpv;
+
+                storageValueByInventory[blockIndex] =
+                    interpolatorFactory.CreateInterpolator(inventorySpaceGrid, storageValuesGrid);
+            }
+
+            // Loop forward from start inventory choosing optimal decisions, held for each period of the block
+            double storageNpv = 0.0;
+
+            var storageProfiles = new StorageProfile[inventorySpace.Count];
+            var periods = new T[inventorySpace.Count];
+
+            double inventoryLoop = startingInventory;
+            int periodIndex = 0;
+            for (int blockIndex = 0; blockIndex < blockStarts.Length; blockIndex++)
+            {
+                (double blockStorageNpv, double optimalInjectWithdraw) = OptimalBlockDecisionAndValue(blockIndex, inventoryLoop);
+                if (blockIndex == 0)
+                {
+                    storageNpv = blockStorageNpv;
+                }
+
+                foreach (T periodLoop in blockStarts[blockIndex].EnumerateTo(blockEnds[blockIndex].Offset(-1)))
+                {
+                    double inventoryLoss = storage.CmdtyInventoryPercentLoss(periodLoop) * inventoryLoop;
+                    double cmdtyConsumedOnAction = optimalInjectWithdraw > 0.0
+                        ? storage.CmdtyVolumeConsumedOnInject(periodLoop, inventoryLoop, optimalInjectWithdraw)
+                        : storage.CmdtyVolumeConsumedOnWithdraw(periodLoop, inventoryLoop, -optimalInjectWithdraw);
+                    inventoryLoop += optimalInjectWithdraw - inventoryLoss;
+
+                    double netPosition = -optimalInjectWithdraw - cmdtyConsumedOnAction;
+                    storageProfiles[periodIndex] = new StorageProfile(inventoryLoop, optimalInjectWithdraw, cmdtyConsumedOnAction, 
+                                                        inventoryLoss, netPosition);
+                    periods[periodIndex] = periodLoop;
+                    periodIndex++;
+                }
+            }
+
+            return new IntrinsicStorageValuationResults<T>(storageNpv, new TimeSeries<T, StorageProfile>(periods, storageProfiles));
+        }
+
         private static (double StorageNpv, double OptimalInjectWithdraw, double CmdtyConsumedOnAction, double InventoryLoss) 
             OptimalDecisionAndValue(ICmdtyStorage<T> storage, T period, double inventory,
             double nextStepInventorySpaceMin, double nextStepInventorySpaceMax, double cmdtyPrice,
@@ -289,14 +436,9 @@ private static (double StorageNpv, double OptimalInjectWithdraw, double CmdtyCon
 
             double injectWithdrawNpv = -injectWithdrawVolume * cmdtyPrice * discountFactorFromCmdtySettlement;
 
-            IReadOnlyList<DomesticCashFlow> inventoryCostCashFlows = storage.CmdtyInventoryCost(period, inventory);
-            double inventoryCostNpv = inventoryCostCashFlows.Sum(cashFlow => cashFlow.Amount * discountFactors(cashFlow.Date));
-
-            IReadOnlyList<DomesticCashFlow> decisionCostCashFlows = injectWithdrawVolume > 0.0
-                    ? storage.InjectionCost(period, inventory, injectWithdrawVolume)
-                    : storage.WithdrawalCost(period, inventory, -injectWithdrawVolume);
+            double inventoryCostNpv = StorageHelper.InventoryCostNpv(storage, period, inventory, discountFactors);
 
-            double decisionCostNpv = decisionCostCashFlows.Sum(cashFlow => cashFlow.Amount * discountFactors(cashFlow.Date));
+            double decisionCostNpv = StorageHelper.DecisionCostNpv(storage, period, inventory, injectWithdrawVolume, discountFactors);
 
             double cmdtyUsedForInjectWithdrawVolume = injectWithdrawVolume > 0.0
                 ? storage.CmdtyVolumeConsumedOnInject(period, inventory, injectWithdrawVolume)
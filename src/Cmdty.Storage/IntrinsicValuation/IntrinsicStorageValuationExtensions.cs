@@ -85,6 +85,16 @@ public static class IntrinsicStorageValuationExtensions
             return addDiscountFactorFunc.WithDiscountFactorFunc(DiscountFactor);
         }
 
+        public static IIntrinsicAddInventoryGridCalculation<T> WithDiscountFactorCurve<T>(
+            [NotNull] this IIntrinsicAddDiscountFactorFunc<T> addDiscountFactorFunc, [NotNull] DiscountFactorCurve discountFactorCurve)
+            where T : ITimePeriod<T>
+        {
+            if (addDiscountFactorFunc == null) throw new ArgumentNullException(nameof(addDiscountFactorFunc));
+            if (discountFactorCurve == null) throw new ArgumentNullException(nameof(discountFactorCurve));
+
+            return addDiscountFactorFunc.WithDiscountFactorFunc(discountFactorCurve.DiscountFactor);
+        }
+
         public static IIntrinsicAddInterpolator<T> WithFixedGridSpacing<T>([NotNull] this IIntrinsicAddInventoryGridCalculation<T> intrinsicAddSpacing, double gridSpacing)
             where T : ITimePeriod<T>
         {
@@ -117,6 +127,27 @@ IDoubleStateSpaceGridCalc GridCalcFactory(ICmdtyStorage<T> storage)
             return intrinsicAddSpacing.WithStateSpaceGridCalculation(GridCalcFactory);
         }
 
+        /// <summary>
+        /// Uses <see cref="AdaptiveStateSpaceGridCalc"/>, with grid points concentrated around the inventory breakpoints of
+        /// piecewise linear inject/withdraw constraints and the inventory space bounds. See
+        /// <see cref="AdaptiveStateSpaceGridCalc.ForStorage{T}"/> for the parameters.
+        /// </summary>
+        public static IIntrinsicAddInterpolator<T> WithAdaptiveInventoryGrid<T>([NotNull] this IIntrinsicAddInventoryGridCalculation<T> intrinsicAddSpacing, 
+                    int numGridPointsOverGlobalInventoryRange, int refinementFactor = 4, double refinementWidth = 3.0)
+            where T : ITimePeriod<T>
+        {
+            if (intrinsicAddSpacing == null) throw new ArgumentNullException(nameof(intrinsicAddSpacing));
+            if (numGridPointsOverGlobalInventoryRange < 3)
+                throw new ArgumentException($"Parameter {nameof(numGridPointsOverGlobalInventoryRange)} value must be at least 3.", nameof(numGridPointsOverGlobalInventoryRange));
+            if (refinementFactor < 1)
+                throw new ArgumentException($"Parameter {nameof(refinementFactor)} value must be at least 1.", nameof(refinementFactor));
+            if (refinementWidth < 0.0)
+                throw new ArgumentException($"Parameter {nameof(refinementWidth)} value cannot be negative.", nameof(refinementWidth));
+
+            return intrinsicAddSpacing.WithStateSpaceGridCalculation(storage => 
+                AdaptiveStateSpaceGridCalc.ForStorage(storage, numGridPointsOverGlobalInventoryRange, refinementFactor, refinementWidth));
+        }
+
         public static IIntrinsicAddNumericalTolerance<T> WithLinearInventorySpaceInterpolation<T>([NotNull] this IIntrinsicAddInterpolator<T> addInterpolator)
             where T : ITimePeriod<T>
         {
@@ -43,6 +43,11 @@ public IntrinsicStorageValuationResults(double netPresentValue, [NotNull] TimeSe
             StorageProfile = storageProfile ?? throw new ArgumentNullException(nameof(storageProfile));
         }
 
+        public StorageProfileArrays GetStorageProfileArrays()
+        {
+            return StorageProfileArrays.FromStorageProfile(StorageProfile);
+        }
+
         public override string ToString()
         {
             return $"{nameof(NetPresentValue)}: {NetPresentValue}, {nameof(StorageProfile)}.Count = {StorageProfile.Count}";
@@ -0,0 +1,93 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using Cmdty.TimePeriodValueTypes;
+using Cmdty.TimeSeries;
+using JetBrains.Annotations;
+
+namespace Cmdty.Storage
+{
+    /// <summary>
+    /// Column-wise representation of a storage profile, with each property of <see cref="StorageProfile"/>
+    /// held in a contiguous array. Useful for efficient bulk transfer of results, e.g. into numpy arrays.
+    /// </summary>
+    public sealed class StorageProfileArrays
+    {
+        public double[] Inventory { get; }
+        public double[] InjectWithdrawVolume { get; }
+        public double[] CmdtyConsumed { get; }
+        public double[] InventoryLoss { get; }
+        public double[] NetPosition { get; }
+
+        public int Count => Inventory.Length;
+
+        public StorageProfileArrays([NotNull] double[] inventory, [NotNull] double[] injectWithdrawVolume, 
+                        [NotNull] double[] cmdtyConsumed, [NotNull] double[] inventoryLoss, [NotNull] double[] netPosition)
+        {
+            Inventory = inventory ?? throw new ArgumentNullException(nameof(inventory));
+            InjectWithdrawVolume = injectWithdrawVolume ?? throw new ArgumentNullException(nameof(injectWithdrawVolume));
+            CmdtyConsumed = cmdtyConsumed ?? throw new ArgumentNullException(nameof(cmdtyConsumed));
+            InventoryLoss = inventoryLoss ?? throw new ArgumentNullException(nameof(inventoryLoss));
+            NetPosition = netPosition ?? throw new ArgumentNullException(nameof(netPosition));
+
+            int count = inventory.Length;
+            if (injectWithdrawVolume.Length != count || cmdtyConsumed.Length != count || 
+                        inventoryLoss.Length != count || netPosition.Length != count)
+                throw new ArgumentException("All storage profile arrays must have the same length.");
+        }
+
+        public static StorageProfileArrays FromStorageProfile<T>([NotNull] TimeSeries<T, StorageProfile> storageProfile)
+            where T : ITimePeriod<T>
+        {
+            if (storageProfile == null) throw new ArgumentNullException(nameof(storageProfile));
+
+            int count = storageProfile.Count;
+            var inventory = new double[count];
+            var injectWithdrawVolume = new double[count];
+            var cmdtyConsumed = new double[count];
+            var inventoryLoss = new double[count];
+            var netPosition = new double[count];
+
+            for (int i = 0; i < count; i++)
+            {
+                StorageProfile profile = storageProfile[i];
+                inventory[i] = profile.Inventory;
+                injectWithdrawVolume[i] = profile.InjectWithdrawVolume;
+                cmdtyConsumed[i] = profile.CmdtyConsumed;
+                inventoryLoss[i] = profile.InventoryLoss;
+                netPosition[i] = profile.NetPosition;
+            }
+
+            return new StorageProfileArrays(inventory, injectWithdrawVolume, cmdtyConsumed, inventoryLoss, netPosition);
+        }
+
+        public override string ToString()
+        {
+            return $"{nameof(Count)}: {Count}";
+        }
+
+    }
+}
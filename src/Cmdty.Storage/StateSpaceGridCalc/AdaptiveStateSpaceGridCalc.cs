@@ -0,0 +1,141 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using Cmdty.TimePeriodValueTypes;
+using JetBrains.Annotations;
+
+namespace Cmdty.Storage
+{
+    /// <summary>
+    /// Non-uniform grid with points concentrated where the storage value is least linear in inventory: around the
+    /// inventory breakpoints of piecewise linear inject/withdraw constraints, and the state space bounds. Breakpoints inside
+    /// the state space are always grid points. Points within <see cref="RefinementWidth"/> of a breakpoint or bound are
+    /// <see cref="RefinedSpacing"/> apart, with points elsewhere at most <see cref="Spacing"/> apart.
+    /// </summary>
+    public sealed class AdaptiveStateSpaceGridCalc : IDoubleStateSpaceGridCalc
+    {
+        private readonly double[] _breakpoints;
+
+        public double Spacing { get; }
+        public double RefinedSpacing { get; }
+        public double RefinementWidth { get; }
+        public IReadOnlyList<double> Breakpoints { get; }
+
+        public AdaptiveStateSpaceGridCalc(double spacing, double refinedSpacing, double refinementWidth, 
+                                          [NotNull] IEnumerable<double> breakpoints)
+        {
+            if (breakpoints == null) throw new ArgumentNullException(nameof(breakpoints));
+            if (spacing <= 0.0)
+                throw new ArgumentException("Parameter must be positive", nameof(spacing));
+            if (refinedSpacing <= 0.0)
+                throw new ArgumentException("Parameter must be positive", nameof(refinedSpacing));
+            if (refinedSpacing > spacing)
+                throw new ArgumentException($"Parameter {nameof(refinedSpacing)} value cannot be above parameter {nameof(spacing)} value", 
+                    nameof(refinedSpacing));
+            if (refinementWidth < 0.0)
+                throw new ArgumentException("Parameter cannot be negative", nameof(refinementWidth));
+            Spacing = spacing;
+            RefinedSpacing = refinedSpacing;
+            RefinementWidth = refinementWidth;
+            _breakpoints = breakpoints.Distinct().OrderBy(breakpoint => breakpoint).ToArray();
+            Breakpoints = Array.AsReadOnly(_breakpoints);
+        }
+
+        /// <summary>
+        /// Creates an instance for a storage, with breakpoints from <see cref="StorageHelper.InventoryBreakpoints{T}"/> if
+        /// the storage implements <see cref="ICmdtyStorageInjectWithdrawConstraints{T}"/>. Otherwise its constraints, so
+        /// breakpoints, are unknown and the grid has no breakpoints, only being refined near the state space bounds.
+        /// Away from breakpoints and bounds the spacing is the global inventory range divided by
+        /// <paramref name="numGridPointsOverGlobalInventoryRange"/> minus one. Within <paramref name="refinementWidth"/>
+        /// of these spacings of a breakpoint or bound, the spacing is divided by <paramref name="refinementFactor"/>.
+        /// </summary>
+        public static AdaptiveStateSpaceGridCalc ForStorage<T>([NotNull] ICmdtyStorage<T> storage, int numGridPointsOverGlobalInventoryRange,
+                                                               int refinementFactor = 4, double refinementWidth = 3.0)
+            where T : ITimePeriod<T>
+        {
+            if (storage == null) throw new ArgumentNullException(nameof(storage));
+            if (numGridPointsOverGlobalInventoryRange < 3)
+                throw new ArgumentException($"Parameter {nameof(numGridPointsOverGlobalInventoryRange)} value must be at least 3.", nameof(numGridPointsOverGlobalInventoryRange));
+            if (refinementFactor < 1)
+                throw new ArgumentException($"Parameter {nameof(refinementFactor)} value must be at least 1.", nameof(refinementFactor));
+            if (refinementWidth < 0.0)
+                throw new ArgumentException($"Parameter {nameof(refinementWidth)} value cannot be negative.", nameof(refinementWidth));
+
+            T[] storagePeriods = storage.StartPeriod.EnumerateTo(storage.EndPeriod).ToArray();
+            double globalMaxInventory = storagePeriods.Max(period => storage.MaxInventory(period));
+            double globalMinInventory = storagePeriods.Min(period => storage.MinInventory(period));
+            double spacing = (globalMaxInventory - globalMinInventory) / (numGridPointsOverGlobalInventoryRange - 1);
+
+            IReadOnlyList<double> breakpoints = storage is ICmdtyStorageInjectWithdrawConstraints<T> constraintsStorage
+                ? StorageHelper.InventoryBreakpoints(constraintsStorage)
+                : new double[0];
+            return new AdaptiveStateSpaceGridCalc(spacing, spacing / refinementFactor, spacing * refinementWidth, breakpoints);
+        }
+
+        public IEnumerable<double> GetGridPoints(double stateSpaceLowerBound, double stateSpaceUpperBound)
+        {
+            if (stateSpaceLowerBound > stateSpaceUpperBound)
+                throw new ArgumentException($"Parameter {nameof(stateSpaceLowerBound)} value cannot be above parameter {nameof(stateSpaceUpperBound)} value");
+
+            yield return stateSpaceLowerBound;
+
+            if (stateSpaceLowerBound == stateSpaceUpperBound)
+                yield break;
+
+            double halfRefinedSpacing = RefinedSpacing / 2.0;
+            double segmentStart = stateSpaceLowerBound;
+            int breakpointIndex = 0;
+            while (segmentStart < stateSpaceUpperBound)
+            {
+                // Breakpoints closer than half the refined spacing to the previous grid point or the upper bound are skipped
+                while (breakpointIndex < _breakpoints.Length && _breakpoints[breakpointIndex] <= segmentStart + halfRefinedSpacing)
+                    breakpointIndex++;
+                double segmentEnd = breakpointIndex < _breakpoints.Length && _breakpoints[breakpointIndex] < stateSpaceUpperBound - halfRefinedSpacing
+                    ? _breakpoints[breakpointIndex] : stateSpaceUpperBound;
+
+                double gridPoint = segmentStart;
+                while (true)
+                {
+                    double step;
+                    if (gridPoint - segmentStart < RefinementWidth || segmentEnd - gridPoint <= RefinementWidth)
+                        step = RefinedSpacing;
+                    else // Don't step over the start of the refined region before segmentEnd
+                        step = Math.Max(Math.Min(Spacing, segmentEnd - RefinementWidth - gridPoint), RefinedSpacing);
+                    gridPoint += step;
+                    if (gridPoint > segmentEnd - halfRefinedSpacing)
+                        break;
+                    yield return gridPoint;
+                }
+
+                yield return segmentEnd;
+                segmentStart = segmentEnd;
+            }
+        }
+
+    }
+}
@@ -36,7 +36,8 @@ namespace Cmdty.Storage
     /// <summary>
     /// Represents ownership of a commodity storage facility, either virtual or physical.
     /// </summary>
-    public sealed class CmdtyStorage<T> : ICmdtyStorage<T> where T : ITimePeriod<T>
+    public sealed class CmdtyStorage<T> : ICmdtyStorageCostNpv<T>, ICmdtyStorageInventorySpaceCache<T>,
+                    ICmdtyStorageInjectWithdrawConstraints<T> where T : ITimePeriod<T>
     {
         private readonly Func<T, IInjectWithdrawConstraint> _injectWithdrawConstraints;
         private readonly Func<T, double> _maxInventory;
@@ -48,6 +49,7 @@ public sealed class CmdtyStorage<T> : ICmdtyStorage<T> where T : ITimePeriod<T>
         private readonly Func<T, double> _cmdtyInventoryLoss;
         private readonly Func<T, double, IReadOnlyList<DomesticCashFlow>> _cmdtyInventoryCost;
         private readonly Func<double, double, double> _terminalStorageValue;
+        private readonly PerUnitTerms _perUnitTerms;
 
         public bool MustBeEmptyAtEnd { get; }
 
@@ -63,7 +65,8 @@ public sealed class CmdtyStorage<T> : ICmdtyStorage<T> where T : ITimePeriod<T>
                             Func<T, double, double, double> injectCmdtyConsumed,
                             Func<T, double, double, double> withdrawCmdtyConsumed,
                             Func<T, double> cmdtyInventoryLoss,
-                            Func<T, double, IReadOnlyList<DomesticCashFlow>> cmdtyInventoryCost)
+                            Func<T, double, IReadOnlyList<DomesticCashFlow>> cmdtyInventoryCost,
+                            PerUnitTerms perUnitTerms)
         {
             StartPeriod = startPeriod;
             EndPeriod = endPeriod;
@@ -78,10 +81,18 @@ public sealed class CmdtyStorage<T> : ICmdtyStorage<T> where T : ITimePeriod<T>
             _withdrawCmdtyConsumed = withdrawCmdtyConsumed;
             _cmdtyInventoryLoss = cmdtyInventoryLoss;
             _cmdtyInventoryCost = cmdtyInventoryCost;
+            _perUnitTerms = perUnitTerms;
+            InventorySpaceCache = new InventorySpaceCache<T>();
         }
 
         public T StartPeriod { get; }
         public T EndPeriod { get; }
+
+        /// <summary>
+        /// Inventory space calculated by <see cref="StorageHelper.CalculateInventorySpace{T}"/>, cached by starting
+        /// inventory and current period so that revaluations with only market data changes skip the calculation.
+        /// </summary>
+        public InventorySpaceCache<T> InventorySpaceCache { get; }
         
         public InjectWithdrawRange GetInjectWithdrawRange(T date, double inventory)
         {
@@ -98,6 +109,13 @@ public InjectWithdrawRange GetInjectWithdrawRange(T date, double inventory)
 
             return _injectWithdrawConstraints(date).GetInjectWithdrawRange(inventory);
         }
+
+        public IInjectWithdrawConstraint GetInjectWithdrawConstraint(T period)
+        {
+            if (period.CompareTo(EndPeriod) >= 0)
+                throw new ArgumentException($"Period {period} is not before the storage end period.", nameof(period));
+            return _injectWithdrawConstraints(period);
+        }
         
         public double MaxInventory(T date)
         {
@@ -168,8 +186,102 @@ public IReadOnlyList<DomesticCashFlow> CmdtyInventoryCost([NotNull] T period, do
             return _cmdtyInventoryCost(period, inventory);
         }
 
+        public double InjectionCostNpv(T period, double inventory, double injectedVolume, [NotNull] Func<Day, double> discountFactors)
+        {
+            return StorageHelper.CashFlowsNpv(InjectionCost(period, inventory, injectedVolume), discountFactors);
+        }
+
+        public double WithdrawalCostNpv(T period, double inventory, double withdrawnVolume, [NotNull] Func<Day, double> discountFactors)
+        {
+            return StorageHelper.CashFlowsNpv(WithdrawalCost(period, inventory, withdrawnVolume), discountFactors);
+        }
+
+        public double InventoryCostNpv(T period, double inventory, [NotNull] Func<Day, double> discountFactors)
+        {
+            return StorageHelper.CashFlowsNpv(CmdtyInventoryCost(period, inventory), discountFactors);
+        }
+
+        /// <summary>
+        /// Creates a representation of this storage with constraints, costs and volumes consumed evaluated into arrays
+        /// for each period from <paramref name="start"/> to <paramref name="end"/> inclusive, for fast repeated evaluation
+        /// during valuation. Costs and volumes consumed specified with the per unit builder methods are evaluated without
+        /// allocating cash flow lists.
+        /// </summary>
+        public FrozenCmdtyStorage<T> Freeze(T start, T end)
+        {
+            if (start.CompareTo(StartPeriod) < 0)
+                throw new ArgumentException($"Start period {start} cannot be before the storage start period {StartPeriod}.", nameof(start));
+            if (end.CompareTo(EndPeriod) > 0)
+                throw new ArgumentException($"End period {end} cannot be after the storage end period {EndPeriod}.", nameof(end));
+            if (start.CompareTo(end) > 0)
+                throw new ArgumentException("Start period cannot be after end period.", nameof(start));
+
+            int numPeriods = end.OffsetFrom(start) + 1;
+            var minInventories = new double[numPeriods];
+            var maxInventories = new double[numPeriods];
+            for (int i = 0; i < numPeriods; i++)
+            {
+                T period = start.Offset(i);
+                minInventories[i] = _minInventory(period);
+                maxInventories[i] = _maxInventory(period);
+            }
+
+            // No decisions are made in the end period, for which costs and constraints needn't be specified
+            int numActivePeriods = end.Equals(EndPeriod) ? numPeriods - 1 : numPeriods;
+            var injectWithdrawConstraints = new IInjectWithdrawConstraint[numActivePeriods];
+            var inventoryPercentLosses = new double[numActivePeriods];
+            for (int i = 0; i < numActivePeriods; i++)
+            {
+                T period = start.Offset(i);
+                injectWithdrawConstraints[i] = _injectWithdrawConstraints(period);
+                inventoryPercentLosses[i] = _cmdtyInventoryLoss(period);
+            }
+
+            return new FrozenCmdtyStorage<T>(this, start, minInventories, maxInventories, injectWithdrawConstraints, inventoryPercentLosses,
+                        FreezePerUnitCost(start, numActivePeriods, _perUnitTerms.InjectionCost, _perUnitTerms.InjectionCostDate), 
+                        FreezePerUnitCost(start, numActivePeriods, _perUnitTerms.WithdrawalCost, _perUnitTerms.WithdrawalCostDate),
+                        FreezePerUnitCost(start, numActivePeriods, _perUnitTerms.InventoryCost, _perUnitTerms.InventoryCostDate),
+                        FreezePerUnitValues(start, numActivePeriods, _perUnitTerms.InjectCmdtyConsumed),
+                        FreezePerUnitValues(start, numActivePeriods, _perUnitTerms.WithdrawCmdtyConsumed));
+        }
+
+        private static double[] FreezePerUnitValues(T start, int numPeriods, Func<T, double> perUnitValue)
+        {
+            if (perUnitValue == null)
+                return null;
+            var values = new double[numPeriods];
+            for (int i = 0; i < numPeriods; i++)
+                values[i] = perUnitValue(start.Offset(i));
+            return values;
+        }
+
+        private static (double[] PerUnitCosts, Day[] CashFlowDays) FreezePerUnitCost(T start, int numPeriods, Func<T, double> perUnitCost, 
+                                    Func<T, Day> cashFlowDate)
+        {
+            if (perUnitCost == null)
+                return (null, null);
+            var cashFlowDays = new Day[numPeriods];
+            for (int i = 0; i < numPeriods; i++)
+                cashFlowDays[i] = cashFlowDate(start.Offset(i));
+            return (FreezePerUnitValues(start, numPeriods, perUnitCost), cashFlowDays);
+        }
+
         public static IBuilder<T> Builder => new StorageBuilder();
 
+        // Per period rates behind costs and volumes consumed specified with the per unit builder methods. Null properties
+        // correspond to those specified by an arbitrary function.
+        private sealed class PerUnitTerms
+        {
+            public Func<T, double> InjectionCost { get; set; }
+            public Func<T, Day> InjectionCostDate { get; set; }
+            public Func<T, double> WithdrawalCost { get; set; }
+            public Func<T, Day> WithdrawalCostDate { get; set; }
+            public Func<T, double> InventoryCost { get; set; }
+            public Func<T, Day> InventoryCostDate { get; set; }
+            public Func<T, double> InjectCmdtyConsumed { get; set; }
+            public Func<T, double> WithdrawCmdtyConsumed { get; set; }
+        }
+
         private sealed class StorageBuilder : IBuilder<T>, IAddInjectWithdrawConstraints<T>, IAddMaxInventory<T>, IAddMinInventory<T>, IAddInjectionCost<T>, 
                     IAddWithdrawalCost<T>, IAddTerminalStorageState<T>, IBuildCmdtyStorage<T>, IAddCmdtyConsumedOnInject<T>, IAddCmdtyConsumedOnWithdraw<T>,
                     IAddCmdtyInventoryLoss<T>, IAddCmdtyInventoryCost<T>
@@ -187,6 +299,7 @@ private sealed class StorageBuilder : IBuilder<T>, IAddInjectWithdrawConstraints
             private Func<T, double, double, double> _withdrawCmdtyConsumed;
             private Func<T, double> _cmdtyInventoryLoss;
             private Func<T, double, IReadOnlyList<DomesticCashFlow>> _cmdtyInventoryCost;
+            private readonly PerUnitTerms _perUnitTerms = new PerUnitTerms();
 
             // ReSharper disable once StaticMemberInGenericType
             private static readonly IReadOnlyList<DomesticCashFlow> EmptyCashFlows = ImmutableArray<DomesticCashFlow>.Empty;
@@ -328,6 +441,8 @@ IAddMaxInventory<T> IAddMinInventory<T>.WithMinInventory(Func<T, double> minInve
 
                 _injectionCashFlows = (date, inventory, injectedVolume) 
                     => new [] {new DomesticCashFlow(cashFlowDate(date), perVolumeUnitCost * injectedVolume)};
+                _perUnitTerms.InjectionCost = period => perVolumeUnitCost;
+                _perUnitTerms.InjectionCostDate = cashFlowDate;
                 return this;
             }
 
@@ -337,6 +452,8 @@ public IAddCmdtyConsumedOnInject<T> WithPerUnitInjectionCost(double perVolumeUni
                     throw new ArgumentException("Per unit inject cost must be non-negative.", nameof(perVolumeUnitCost));
                 _injectionCashFlows = (period, inventory, injectedVolume) 
                     => new[] { new DomesticCashFlow(period.First<Day>(), perVolumeUnitCost * injectedVolume) };
+                _perUnitTerms.InjectionCost = period => perVolumeUnitCost;
+                _perUnitTerms.InjectionCostDate = period => period.First<Day>();
                 return this;
             }
 
@@ -365,6 +482,8 @@ IAddCmdtyConsumedOnInject<T> IAddInjectionCost<T>.WithPerUnitInjectionCostTimeSe
 
                 _injectionCashFlows = (period, inventory, injectedVolume)
                     => new[] { new DomesticCashFlow(period.First<Day>(), perVolumeUnitCostSeries[period] * injectedVolume) };
+                _perUnitTerms.InjectionCost = period => perVolumeUnitCostSeries[period];
+                _perUnitTerms.InjectionCostDate = period => period.First<Day>();
                 return this;
             }
 
@@ -372,6 +491,8 @@ IAddCmdtyConsumedOnInject<T> IAddInjectionCost<T>.WithPerUnitInjectionCostTimeSe
                 Func<T, double, double, IReadOnlyList<DomesticCashFlow>> injectionCost)
             {
                 _injectionCashFlows = injectionCost ?? throw new ArgumentNullException(nameof(injectionCost));
+                _perUnitTerms.InjectionCost = null;
+                _perUnitTerms.InjectionCostDate = null;
                 return this;
             }
 
@@ -384,6 +505,8 @@ IAddCmdtyConsumedOnInject<T> IAddInjectionCost<T>.WithPerUnitInjectionCostTimeSe
 
                 _withdrawalCashFlows = (date, inventory, withdrawnVolume) 
                     => new[] { new DomesticCashFlow(cashFlowDate(date), perVolumeUnitCost * Math.Abs(withdrawnVolume)) };
+                _perUnitTerms.WithdrawalCost = period => perVolumeUnitCost;
+                _perUnitTerms.WithdrawalCostDate = cashFlowDate;
                 return this;
             }
 
@@ -393,6 +516,8 @@ public IAddCmdtyConsumedOnWithdraw<T> WithPerUnitWithdrawalCost(double perVolume
                     throw new ArgumentException("Per unit withdrawal cost must be non-negative.", nameof(perVolumeUnitCost));
                 _withdrawalCashFlows = (period, inventory, withdrawnVolume)
                     => new[] { new DomesticCashFlow(period.First<Day>(), perVolumeUnitCost * Math.Abs(withdrawnVolume)) };
+                _perUnitTerms.WithdrawalCost = period => perVolumeUnitCost;
+                _perUnitTerms.WithdrawalCostDate = period => period.First<Day>();
                 return this;
             }
 
@@ -405,6 +530,8 @@ public IAddCmdtyConsumedOnWithdraw<T> WithPerUnitWithdrawalCost(double perVolume
 
                 _withdrawalCashFlows = (period, inventory, withdrawnVolume)
                     => new[] { new DomesticCashFlow(period.First<Day>(), perVolumeUnitCostSeries[period] * Math.Abs(withdrawnVolume)) };
+                _perUnitTerms.WithdrawalCost = period => perVolumeUnitCostSeries[period];
+                _perUnitTerms.WithdrawalCostDate = period => period.First<Day>();
                 return this;
             }
 
@@ -412,6 +539,8 @@ public IAddCmdtyConsumedOnWithdraw<T> WithPerUnitWithdrawalCost(double perVolume
                 Func<T, double, double, IReadOnlyList<DomesticCashFlow>> withdrawalCost)
             {
                 _withdrawalCashFlows = withdrawalCost ?? throw new ArgumentNullException(nameof(withdrawalCost));
+                _perUnitTerms.WithdrawalCost = null;
+                _perUnitTerms.WithdrawalCostDate = null;
                 return this;
             }
             
@@ -444,18 +573,20 @@ CmdtyStorage<T> IBuildCmdtyStorage<T>.Build()
                 return new CmdtyStorage<T>(_startPeriod, _endPeriod, _injectWithdrawConstraints, maxInventory, 
                         _minInventory, _injectionCashFlows, _withdrawalCashFlows, terminalStorageValue, _mustBeEmptyAtEnd, 
                         _injectCmdtyConsumed, _withdrawCmdtyConsumed, _cmdtyInventoryLoss,
-                        _cmdtyInventoryCost);
+                        _cmdtyInventoryCost, _perUnitTerms);
             }
 
             IAddWithdrawalCost<T> IAddCmdtyConsumedOnInject<T>.WithNoCmdtyConsumedOnInject()
             {
                 _injectCmdtyConsumed = (period, inventory, injectedVolume) => 0.0;
+                _perUnitTerms.InjectCmdtyConsumed = period => 0.0;
                 return this;
             }
 
             IAddWithdrawalCost<T> IAddCmdtyConsumedOnInject<T>.WithFixedPercentCmdtyConsumedOnInject(double percentCmdtyConsumed)
             {
                 _injectCmdtyConsumed = (period, inventory, injectedVolume) => percentCmdtyConsumed * Math.Abs(injectedVolume);
+                _perUnitTerms.InjectCmdtyConsumed = period => percentCmdtyConsumed;
                 return this;
             }
 
@@ -467,6 +598,7 @@ IAddWithdrawalCost<T> IAddCmdtyConsumedOnInject<T>.WithFixedPercentCmdtyConsumed
                     "Percentage of cmdty consumed on inject");
 
                 _injectCmdtyConsumed = (period, inventory, injectedVolume) => percentCmdtyConsumedSeries[period] * Math.Abs(injectedVolume);
+                _perUnitTerms.InjectCmdtyConsumed = period => percentCmdtyConsumedSeries[period];
                 return this;
             }
 
@@ -474,18 +606,21 @@ IAddWithdrawalCost<T> IAddCmdtyConsumedOnInject<T>.WithFixedPercentCmdtyConsumed
                             [NotNull] Func<T, double, double, double> volumeOfCmdtyConsumed)
             {
                 _injectCmdtyConsumed = volumeOfCmdtyConsumed ?? throw new ArgumentNullException(nameof(volumeOfCmdtyConsumed));
+                _perUnitTerms.InjectCmdtyConsumed = null;
                 return this;
             }
 
             IAddCmdtyInventoryLoss<T> IAddCmdtyConsumedOnWithdraw<T>.WithNoCmdtyConsumedOnWithdraw()
             {
                 _withdrawCmdtyConsumed = (period, inventory, withdrawnVolume) => 0.0;
+                _perUnitTerms.WithdrawCmdtyConsumed = period => 0.0;
                 return this;
             }
 
             IAddCmdtyInventoryLoss<T> IAddCmdtyConsumedOnWithdraw<T>.WithFixedPercentCmdtyConsumedOnWithdraw(double percentCmdtyConsumed)
             {
                 _withdrawCmdtyConsumed = (period, inventory, withdrawnVolume) => percentCmdtyConsumed * Math.Abs(withdrawnVolume);
+                _perUnitTerms.WithdrawCmdtyConsumed = period => percentCmdtyConsumed;
                 return this;
             }
 
@@ -498,6 +633,7 @@ IAddCmdtyInventoryLoss<T> IAddCmdtyConsumedOnWithdraw<T>.WithFixedPercentCmdtyCo
                     "Percentage of cmdty consumed on withdraw");
 
                 _withdrawCmdtyConsumed = (period, inventory, withdrawnVolume) => percentCmdtyConsumedSeries[period] * Math.Abs(withdrawnVolume);
+                _perUnitTerms.WithdrawCmdtyConsumed = period => percentCmdtyConsumedSeries[period];
                 return this;
             }
 
@@ -505,6 +641,7 @@ IAddCmdtyInventoryLoss<T> IAddCmdtyConsumedOnWithdraw<T>.WithFixedPercentCmdtyCo
                                 [NotNull] Func<T, double, double, double> volumeOfCmdtyConsumed)
             {
                 _withdrawCmdtyConsumed = volumeOfCmdtyConsumed ?? throw new ArgumentNullException(nameof(volumeOfCmdtyConsumed));
+                _perUnitTerms.WithdrawCmdtyConsumed = null;
                 return this;
             }
 
@@ -540,12 +677,16 @@ IAddCmdtyInventoryCost<T> IAddCmdtyInventoryLoss<T>.WithFixedPercentCmdtyInvento
                 [NotNull] Func<T, double, IReadOnlyList<DomesticCashFlow>> cmdtyInventoryCost)
             {
                 _cmdtyInventoryCost = cmdtyInventoryCost ?? throw new ArgumentNullException(nameof(cmdtyInventoryCost));
+                _perUnitTerms.InventoryCost = null;
+                _perUnitTerms.InventoryCostDate = null;
                 return this;
             }
 
             IAddTerminalStorageState<T> IAddCmdtyInventoryCost<T>.WithNoInventoryCost()
             {
                 _cmdtyInventoryCost = (period, inventory) => EmptyCashFlows;
+                _perUnitTerms.InventoryCost = period => 0.0;
+                _perUnitTerms.InventoryCostDate = period => period.First<Day>();
                 return this;
             }
 
@@ -553,6 +694,8 @@ IAddTerminalStorageState<T> IAddCmdtyInventoryCost<T>.WithFixedPerUnitInventoryC
             {
                 _cmdtyInventoryCost = (period, inventory) 
                     => new[]{new DomesticCashFlow(period.First<Day>(), inventory * perUnitCost)};
+                _perUnitTerms.InventoryCost = period => perUnitCost;
+                _perUnitTerms.InventoryCostDate = period => period.First<Day>();
                 return this;
             }
 
@@ -564,6 +707,8 @@ IAddTerminalStorageState<T> IAddCmdtyInventoryCost<T>.WithPerUnitInventoryCostTi
 
                 _cmdtyInventoryCost = (period, inventory)
                     => new[] { new DomesticCashFlow(period.First<Day>(), inventory * perUnitCostSeries[period]) };
+                _perUnitTerms.InventoryCost = period => perUnitCostSeries[period];
+                _perUnitTerms.InventoryCostDate = period => period.First<Day>();
                 return this;
             }
         }
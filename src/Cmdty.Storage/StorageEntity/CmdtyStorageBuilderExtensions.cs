@@ -30,6 +30,7 @@
 using Cmdty.TimeSeries;
 using JetBrains.Annotations;
 using MathNet.Numerics;
+using MathNet.Numerics.Interpolation;
 
 namespace Cmdty.Storage
 {
@@ -121,6 +122,44 @@ IInjectWithdrawConstraint ConstraintFactory(InjectWithdrawRangeByInventory[] inj
             return addInjectionCost;
         }
 
+        /// <summary>
+        /// Adds terminal NPV of any inventory left in storage at the end of cmdtyPrice * inventory * priceMultiplier - fixedCost.
+        /// The fixed cost is only charged if inventory is left in storage, so an empty storage has terminal NPV of zero.
+        /// Evaluated without calling back into user code, so is suitable when valuing from another runtime such as Python.
+        /// </summary>
+        public static IBuildCmdtyStorage<T> WithLinearTerminalInventoryNpv<T>([NotNull] this IAddTerminalStorageState<T> builder,
+                            double priceMultiplier, double fixedCost)
+            where T : ITimePeriod<T>
+        {
+            if (builder == null) throw new ArgumentNullException(nameof(builder));
+            return builder.WithTerminalInventoryNpv((cmdtyPrice, finalInventory) =>
+                                finalInventory > 0.0 ? cmdtyPrice * finalInventory * priceMultiplier - fixedCost : 0.0);
+        }
+
+        /// <summary>
+        /// Adds terminal NPV of any inventory left in storage at the end of cmdtyPrice * inventory * priceMultiplier, where
+        /// priceMultiplier is linearly interpolated by inventory from the table specified by inventories and priceMultipliers.
+        /// </summary>
+        public static IBuildCmdtyStorage<T> WithPiecewiseLinearTerminalInventoryNpv<T>([NotNull] this IAddTerminalStorageState<T> builder,
+                            [NotNull] IEnumerable<double> inventories, [NotNull] IEnumerable<double> priceMultipliers)
+            where T : ITimePeriod<T>
+        {
+            if (builder == null) throw new ArgumentNullException(nameof(builder));
+            if (inventories == null) throw new ArgumentNullException(nameof(inventories));
+            if (priceMultipliers == null) throw new ArgumentNullException(nameof(priceMultipliers));
+
+            double[] inventoryArray = inventories.ToArray();
+            double[] priceMultiplierArray = priceMultipliers.ToArray();
+            if (inventoryArray.Length != priceMultiplierArray.Length)
+                throw new ArgumentException("Inventories and price multipliers must have the same number of elements.", nameof(priceMultipliers));
+            if (inventoryArray.Length < 2)
+                throw new ArgumentException("Terminal inventory NPV table must contain at least two elements.", nameof(inventories));
+
+            LinearSpline priceMultiplierLinear = LinearSpline.Interpolate(inventoryArray, priceMultiplierArray);
+            return builder.WithTerminalInventoryNpv((cmdtyPrice, finalInventory)
+                                    => cmdtyPrice * finalInventory * priceMultiplierLinear.Interpolate(finalInventory));
+        }
+
         private static IAddInjectionCost<T> AddInjectWithdrawRanges<T>(
             IAddInjectWithdrawConstraints<T> builder,
             IEnumerable<InjectWithdrawRangeByInventoryAndPeriod<T>> injectWithdrawRanges, 
@@ -0,0 +1,230 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Collections.Generic;
+using Cmdty.TimePeriodValueTypes;
+using JetBrains.Annotations;
+
+namespace Cmdty.Storage
+{
+    /// <summary>
+    /// Commodity storage with constraints, costs and volumes consumed held in arrays indexed by offset from
+    /// <see cref="FrozenStart"/>, created by <see cref="CmdtyStorage{T}.Freeze"/>. Periods outside of the frozen range
+    /// are evaluated by the <see cref="CmdtyStorage{T}"/> it was created from.
+    /// </summary>
+    public sealed class FrozenCmdtyStorage<T> : ICmdtyStorageCostNpv<T>, ICmdtyStorageInventorySpaceCache<T>,
+                    ICmdtyStorageInjectWithdrawConstraints<T> where T : ITimePeriod<T>
+    {
+        // ReSharper disable once StaticMemberInGenericType
+        private static readonly InjectWithdrawRange ZeroInjectWithdrawRange = new InjectWithdrawRange(0.0, 0.0);
+
+        private readonly CmdtyStorage<T> _storage;
+        // Indexed by offset from FrozenStart, for all periods until FrozenEnd inclusive
+        private readonly double[] _minInventories;
+        private readonly double[] _maxInventories;
+        // Indexed by offset from FrozenStart, for periods until FrozenEnd excluding the storage end period
+        private readonly IInjectWithdrawConstraint[] _injectWithdrawConstraints;
+        private readonly double[] _inventoryPercentLosses;
+        // Null if not specified as per unit rates
+        private readonly double[] _injectionCosts;
+        private readonly Day[] _injectionCostDays;
+        private readonly double[] _withdrawalCosts;
+        private readonly Day[] _withdrawalCostDays;
+        private readonly double[] _inventoryCosts;
+        private readonly Day[] _inventoryCostDays;
+        private readonly double[] _injectCmdtyConsumed;
+        private readonly double[] _withdrawCmdtyConsumed;
+
+        internal FrozenCmdtyStorage(CmdtyStorage<T> storage, T frozenStart, double[] minInventories, double[] maxInventories,
+                    IInjectWithdrawConstraint[] injectWithdrawConstraints, double[] inventoryPercentLosses,
+                    (double[] PerUnitCosts, Day[] CashFlowDays) injectionCosts, (double[] PerUnitCosts, Day[] CashFlowDays) withdrawalCosts,
+                    (double[] PerUnitCosts, Day[] CashFlowDays) inventoryCosts, double[] injectCmdtyConsumed, double[] withdrawCmdtyConsumed)
+        {
+            _storage = storage;
+            FrozenStart = frozenStart;
+            FrozenEnd = frozenStart.Offset(minInventories.Length - 1);
+            _minInventories = minInventories;
+            _maxInventories = maxInventories;
+            _injectWithdrawConstraints = injectWithdrawConstraints;
+            _inventoryPercentLosses = inventoryPercentLosses;
+            (_injectionCosts, _injectionCostDays) = injectionCosts;
+            (_withdrawalCosts, _withdrawalCostDays) = withdrawalCosts;
+            (_inventoryCosts, _inventoryCostDays) = inventoryCosts;
+            _injectCmdtyConsumed = injectCmdtyConsumed;
+            _withdrawCmdtyConsumed = withdrawCmdtyConsumed;
+        }
+
+        public T FrozenStart { get; }
+        public T FrozenEnd { get; }
+
+        public bool MustBeEmptyAtEnd => _storage.MustBeEmptyAtEnd;
+        public T StartPeriod => _storage.StartPeriod;
+        public T EndPeriod => _storage.EndPeriod;
+
+        /// <summary>
+        /// The inventory space cache of the storage this was created from, the inventory space of which is the same.
+        /// </summary>
+        public InventorySpaceCache<T> InventorySpaceCache => _storage.InventorySpaceCache;
+
+        private bool TryGetIndex(T period, out int index)
+        {
+            index = period.OffsetFrom(FrozenStart);
+            return index >= 0 && index < _minInventories.Length;
+        }
+
+        private bool TryGetActiveIndex(T period, out int index)
+        {
+            index = period.OffsetFrom(FrozenStart);
+            return index >= 0 && index < _injectWithdrawConstraints.Length;
+        }
+
+        public InjectWithdrawRange GetInjectWithdrawRange(T date, double inventory)
+        {
+            if (!TryGetIndex(date, out int index))
+                return _storage.GetInjectWithdrawRange(date, inventory);
+
+            double minInventory = _minInventories[index];
+            if (inventory < minInventory)
+                throw new ArgumentException($"Inventory is below minimum allowed value of {minInventory} during period {date}.", nameof(inventory));
+
+            double maxInventory = _maxInventories[index];
+            if (inventory > maxInventory)
+                throw new ArgumentException($"Inventory is above maximum allowed value of {maxInventory} during period {date}.", nameof(inventory));
+
+            if (index == _injectWithdrawConstraints.Length) // Storage end period
+                return ZeroInjectWithdrawRange;
+
+            return _injectWithdrawConstraints[index].GetInjectWithdrawRange(inventory);
+        }
+
+        public IInjectWithdrawConstraint GetInjectWithdrawConstraint(T period)
+        {
+            return TryGetActiveIndex(period, out int index) ? _injectWithdrawConstraints[index] : _storage.GetInjectWithdrawConstraint(period);
+        }
+
+        public double MaxInventory(T date)
+        {
+            return TryGetIndex(date, out int index) ? _maxInventories[index] : _storage.MaxInventory(date);
+        }
+
+        public double MinInventory(T date)
+        {
+            return TryGetIndex(date, out int index) ? _minInventories[index] : _storage.MinInventory(date);
+        }
+
+        public IReadOnlyList<DomesticCashFlow> InjectionCost(T date, double inventory, double injectedVolume)
+        {
+            return _storage.InjectionCost(date, inventory, injectedVolume);
+        }
+
+        public double CmdtyVolumeConsumedOnInject(T date, double inventory, double injectedVolume)
+        {
+            if (_injectCmdtyConsumed != null && TryGetActiveIndex(date, out int index))
+                return _injectCmdtyConsumed[index] * Math.Abs(injectedVolume);
+            return _storage.CmdtyVolumeConsumedOnInject(date, inventory, injectedVolume);
+        }
+
+        public IReadOnlyList<DomesticCashFlow> WithdrawalCost(T date, double inventory, double withdrawnVolume)
+        {
+            return _storage.WithdrawalCost(date, inventory, withdrawnVolume);
+        }
+
+        public double CmdtyVolumeConsumedOnWithdraw(T date, double inventory, double withdrawnVolume)
+        {
+            if (_withdrawCmdtyConsumed != null && TryGetActiveIndex(date, out int index))
+                return _withdrawCmdtyConsumed[index] * Math.Abs(withdrawnVolume);
+            return _storage.CmdtyVolumeConsumedOnWithdraw(date, inventory, withdrawnVolume);
+        }
+
+        public double InventorySpaceUpperBound([NotNull] T period, double nextPeriodInventorySpaceLowerBound, double nextPeriodInventorySpaceUpperBound)
+        {
+            if (period == null) throw new ArgumentNullException(nameof(period));
+            if (!TryGetActiveIndex(period, out int index))
+                return _storage.InventorySpaceUpperBound(period, nextPeriodInventorySpaceLowerBound, nextPeriodInventorySpaceUpperBound);
+            return _injectWithdrawConstraints[index].InventorySpaceUpperBound(nextPeriodInventorySpaceLowerBound, nextPeriodInventorySpaceUpperBound,
+                                _minInventories[index], _maxInventories[index], _inventoryPercentLosses[index]);
+        }
+
+        public double InventorySpaceLowerBound([NotNull] T period, double nextPeriodInventorySpaceLowerBound, double nextPeriodInventorySpaceUpperBound)
+        {
+            if (period == null) throw new ArgumentNullException(nameof(period));
+            if (!TryGetActiveIndex(period, out int index))
+                return _storage.InventorySpaceLowerBound(period, nextPeriodInventorySpaceLowerBound, nextPeriodInventorySpaceUpperBound);
+            return _injectWithdrawConstraints[index].InventorySpaceLowerBound(nextPeriodInventorySpaceLowerBound, nextPeriodInventorySpaceUpperBound,
+                                _minInventories[index], _maxInventories[index], _inventoryPercentLosses[index]);
+        }
+
+        public double TerminalStorageNpv(double cmdtyPrice, double finalInventory)
+        {
+            return _storage.TerminalStorageNpv(cmdtyPrice, finalInventory);
+        }
+
+        public double CmdtyInventoryPercentLoss([NotNull] T period)
+        {
+            if (period == null) throw new ArgumentNullException(nameof(period));
+            return TryGetActiveIndex(period, out int index) ? _inventoryPercentLosses[index] : _storage.CmdtyInventoryPercentLoss(period);
+        }
+
+        public IReadOnlyList<DomesticCashFlow> CmdtyInventoryCost([NotNull] T period, double inventory)
+        {
+            return _storage.CmdtyInventoryCost(period, inventory);
+        }
+
+        /// <summary>
+        /// Present value of the <see cref="InjectionCost"/> cash flows, evaluated without allocation if
+        /// specified as a per unit cost.
+        /// </summary>
+        public double InjectionCostNpv(T period, double inventory, double injectedVolume, [NotNull] Func<Day, double> discountFactors)
+        {
+            if (_injectionCosts != null && TryGetActiveIndex(period, out int index))
+                return _injectionCosts[index] * injectedVolume * discountFactors(_injectionCostDays[index]);
+            return StorageHelper.CashFlowsNpv(_storage.InjectionCost(period, inventory, injectedVolume), discountFactors);
+        }
+
+        /// <summary>
+        /// Present value of the <see cref="WithdrawalCost"/> cash flows, evaluated without allocation if
+        /// specified as a per unit cost.
+        /// </summary>
+        public double WithdrawalCostNpv(T period, double inventory, double withdrawnVolume, [NotNull] Func<Day, double> discountFactors)
+        {
+            if (_withdrawalCosts != null && TryGetActiveIndex(period, out int index))
+                return _withdrawalCosts[index] * Math.Abs(withdrawnVolume) * discountFactors(_withdrawalCostDays[index]);
+            return StorageHelper.CashFlowsNpv(_storage.WithdrawalCost(period, inventory, withdrawnVolume), discountFactors);
+        }
+
+        /// <summary>
+        /// Present value of the <see cref="CmdtyInventoryCost"/> cash flows, evaluated without allocation if
+        /// specified as a per unit cost.
+        /// </summary>
+        public double InventoryCostNpv(T period, double inventory, [NotNull] Func<Day, double> discountFactors)
+        {
+            if (_inventoryCosts != null && TryGetActiveIndex(period, out int index))
+                return inventory * _inventoryCosts[index] * discountFactors(_inventoryCostDays[index]);
+            return StorageHelper.CashFlowsNpv(_storage.CmdtyInventoryCost(period, inventory), discountFactors);
+        }
+
+    }
+}
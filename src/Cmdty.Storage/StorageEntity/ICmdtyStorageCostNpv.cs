@@ -0,0 +1,42 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using Cmdty.TimePeriodValueTypes;
+using JetBrains.Annotations;
+
+namespace Cmdty.Storage
+{
+    /// <summary>
+    /// Commodity storage which can evaluate the present value of its costs directly, used by <see cref="StorageHelper"/>
+    /// in place of the cash flows of the <see cref="ICmdtyStorage{T}"/> cost members where available.
+    /// </summary>
+    public interface ICmdtyStorageCostNpv<T> : ICmdtyStorage<T> where T : ITimePeriod<T>
+    {
+        double InjectionCostNpv(T period, double inventory, double injectedVolume, [NotNull] Func<Day, double> discountFactors);
+        double WithdrawalCostNpv(T period, double inventory, double withdrawnVolume, [NotNull] Func<Day, double> discountFactors);
+        double InventoryCostNpv(T period, double inventory, [NotNull] Func<Day, double> discountFactors);
+    }
+}
@@ -0,0 +1,142 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Collections.Generic;
+using Cmdty.TimePeriodValueTypes;
+using Cmdty.TimeSeries;
+using JetBrains.Annotations;
+
+namespace Cmdty.Storage
+{
+    /// <summary>
+    /// Bounded least recently used cache of inventory space time series, keyed on starting inventory and current period.
+    /// Instances are thread-safe.
+    /// </summary>
+    public sealed class InventorySpaceCache<T> where T : ITimePeriod<T>
+    {
+        public const int DefaultCapacity = 64;
+
+        private readonly object _lock = new object();
+        private readonly Dictionary<(double StartingInventory, T CurrentPeriod), LinkedListNode<CacheEntry>> _entriesByKey;
+        private readonly LinkedList<CacheEntry> _entriesByRecentUse; // Most recently used first
+        private long _hits;
+        private long _misses;
+
+        public InventorySpaceCache(int capacity = DefaultCapacity)
+        {
+            if (capacity < 0)
+                throw new ArgumentException("Capacity cannot be negative.", nameof(capacity));
+            Capacity = capacity;
+            _entriesByKey = new Dictionary<(double, T), LinkedListNode<CacheEntry>>();
+            _entriesByRecentUse = new LinkedList<CacheEntry>();
+        }
+
+        public int Capacity { get; }
+
+        public long Hits
+        {
+            get { lock (_lock) return _hits; }
+        }
+
+        public long Misses
+        {
+            get { lock (_lock) return _misses; }
+        }
+
+        public int Count
+        {
+            get { lock (_lock) return _entriesByRecentUse.Count; }
+        }
+
+        /// <summary>
+        /// Returns the cached inventory space for a starting inventory and current period, calling
+        /// <paramref name="calculateInventorySpace"/> and caching the result if not already present.
+        /// </summary>
+        public TimeSeries<T, InventoryRange> GetOrAdd(double startingInventory, T currentPeriod, 
+                            [NotNull] Func<TimeSeries<T, InventoryRange>> calculateInventorySpace)
+        {
+            if (calculateInventorySpace == null) throw new ArgumentNullException(nameof(calculateInventorySpace));
+            var key = (startingInventory, currentPeriod);
+            lock (_lock)
+            {
+                if (_entriesByKey.TryGetValue(key, out LinkedListNode<CacheEntry> node))
+                {
+                    _hits++;
+                    _entriesByRecentUse.Remove(node);
+                    _entriesByRecentUse.AddFirst(node);
+                    return node.Value.InventorySpace;
+                }
+                _misses++;
+            }
+
+            // Calculated outside of the lock so concurrent valuations of different inventories don't block each other
+            TimeSeries<T, InventoryRange> inventorySpace = calculateInventorySpace();
+            if (Capacity == 0)
+                return inventorySpace;
+
+            lock (_lock)
+            {
+                if (_entriesByKey.TryGetValue(key, out LinkedListNode<CacheEntry> node)) // Added by another thread
+                    return node.Value.InventorySpace;
+                if (_entriesByRecentUse.Count == Capacity)
+                {
+                    LinkedListNode<CacheEntry> leastRecentlyUsed = _entriesByRecentUse.Last;
+                    _entriesByRecentUse.RemoveLast();
+                    _entriesByKey.Remove(leastRecentlyUsed.Value.Key);
+                }
+                _entriesByKey[key] = _entriesByRecentUse.AddFirst(new CacheEntry(key, inventorySpace));
+            }
+            return inventorySpace;
+        }
+
+        /// <summary>
+        /// Removes all cached inventory spaces and resets the hit and miss counters.
+        /// </summary>
+        public void Clear()
+        {
+            lock (_lock)
+            {
+                _entriesByKey.Clear();
+                _entriesByRecentUse.Clear();
+                _hits = 0;
+                _misses = 0;
+            }
+        }
+
+        private sealed class CacheEntry
+        {
+            public (double StartingInventory, T CurrentPeriod) Key { get; }
+            public TimeSeries<T, InventoryRange> InventorySpace { get; }
+
+            public CacheEntry((double StartingInventory, T CurrentPeriod) key, TimeSeries<T, InventoryRange> inventorySpace)
+            {
+                Key = key;
+                InventorySpace = inventorySpace;
+            }
+        }
+
+    }
+}
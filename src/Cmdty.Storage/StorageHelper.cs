@@ -43,6 +43,19 @@ public static class StorageHelper
 
             T startActiveStorage = storage.StartPeriod.CompareTo(currentPeriod) > 0 ? storage.StartPeriod : currentPeriod;
 
+            // Inventory space only depends on the storage, starting inventory and start period
+            InventorySpaceCache<T> inventorySpaceCache = (storage as ICmdtyStorageInventorySpaceCache<T>)?.InventorySpaceCache;
+            if (inventorySpaceCache != null)
+                return inventorySpaceCache.GetOrAdd(startingInventory, startActiveStorage,
+                    () => CalculateInventorySpaceUncached(storage, startingInventory, startActiveStorage));
+
+            return CalculateInventorySpaceUncached(storage, startingInventory, startActiveStorage);
+        }
+
+        private static TimeSeries<T, InventoryRange> CalculateInventorySpaceUncached<T>(ICmdtyStorage<T> storage, double startingInventory, 
+                                    T startActiveStorage)
+            where T : ITimePeriod<T>
+        {
             int numPeriods = storage.EndPeriod.OffsetFrom(startActiveStorage);
 
             // Calculate the inventory space range going forward
@@ -176,6 +189,95 @@ public static class StorageHelper
             // TODO case of yieldedWithdrawalRate equals to yieldedInjectionRate?
         }
 
+        /// <summary>
+        /// Bang-bang decision set for a volume injected or withdrawn in each of the <paramref name="numBlockPeriods"/> periods
+        /// of a decision block starting with <paramref name="blockStart"/>. As for a single period, the inject/withdraw rates are
+        /// those at the inventory at the start of the block. The inventory at the start of each later period of the block must be
+        /// within the storage min and max inventory, and the inventory after the block within the next block inventory range.
+        /// Where the rates don't allow these inventory constraints to be met, such as when the inject/withdraw constraints change
+        /// within the block, the inventory constraints take precedence.
+        /// </summary>
+        public static double[] CalculateBlockBangBangDecisionSet<T>([NotNull] ICmdtyStorage<T> storage, T blockStart, int numBlockPeriods,
+                        double currentInventory, double nextBlockMinInventory, double nextBlockMaxInventory, double numericalTolerance)
+            where T : ITimePeriod<T>
+        {
+            if (storage == null) throw new ArgumentNullException(nameof(storage));
+            if (numBlockPeriods < 1)
+                throw new ArgumentException("Number of block periods must be at least 1.", nameof(numBlockPeriods));
+
+            double minInjectWithdrawRate = double.NegativeInfinity;
+            double maxInjectWithdrawRate = double.PositiveInfinity;
+            double minDecision = double.NegativeInfinity;
+            double maxDecision = double.PositiveInfinity;
+            // Inventory after each period with nothing injected or withdrawn, and its sensitivity to the volume held
+            double inventoryWithoutDecision = currentInventory;
+            double sensitivityToDecision = 0.0;
+            for (int i = 0; i < numBlockPeriods; i++)
+            {
+                T period = blockStart.Offset(i);
+                InjectWithdrawRange injectWithdrawRange = storage.GetInjectWithdrawRange(period, currentInventory);
+                minInjectWithdrawRate = Math.Max(minInjectWithdrawRate, injectWithdrawRange.MinInjectWithdrawRate);
+                maxInjectWithdrawRate = Math.Min(maxInjectWithdrawRate, injectWithdrawRange.MaxInjectWithdrawRate);
+
+                double inventoryPercentLoss = storage.CmdtyInventoryPercentLoss(period);
+                inventoryWithoutDecision -= inventoryPercentLoss * inventoryWithoutDecision;
+                sensitivityToDecision = sensitivityToDecision - inventoryPercentLoss * sensitivityToDecision + 1.0;
+
+                bool lastPeriod = i == numBlockPeriods - 1;
+                double nextMinInventory = lastPeriod ? nextBlockMinInventory : storage.MinInventory(period.Offset(1));
+                double nextMaxInventory = lastPeriod ? nextBlockMaxInventory : storage.MaxInventory(period.Offset(1));
+                minDecision = Math.Max(minDecision, (nextMinInventory - inventoryWithoutDecision) / sensitivityToDecision);
+                maxDecision = Math.Min(maxDecision, (nextMaxInventory - inventoryWithoutDecision) / sensitivityToDecision);
+            }
+
+            if (minDecision - maxDecision >= numericalTolerance)
+                throw new InventoryConstraintsCannotBeFulfilledException(
+                    $"Inventory constraints cannot be fulfilled with the decision held constant over the decision block starting {blockStart}.");
+            minDecision = Math.Min(minDecision, maxDecision);
+
+            double yieldedWithdrawalRate = Math.Min(Math.Max(minInjectWithdrawRate, minDecision), maxDecision);
+            double yieldedInjectionRate = Math.Min(Math.Max(maxInjectWithdrawRate, minDecision), maxDecision);
+
+            if (yieldedWithdrawalRate >= 0.0 || yieldedInjectionRate <= 0.0) // No zero decision
+                return new[] {yieldedWithdrawalRate, yieldedInjectionRate};
+            return new[] {yieldedWithdrawalRate, 0.0, yieldedInjectionRate};
+        }
+
+        /// <summary>
+        /// Price independent part of the NPV of injecting or withdrawing <paramref name="injectWithdrawVolume"/> in each period of
+        /// the decision block starting with <paramref name="blockStart"/>, with element i of <paramref name="discountFactorsFromCmdtySettlement"/>
+        /// for period i of the block. Element i of <paramref name="discountedCmdtyVolumes"/> is set to the volume bought in period i,
+        /// including the volume consumed, multiplied by the discount factor from its settlement. The NPV for cmdty prices in each
+        /// period of the block is minus their sum product with the discounted volumes, less the returned CostNpv, being the NPV
+        /// of the injection, withdrawal and inventory costs.
+        /// </summary>
+        public static (double CostNpv, double InventoryAfterBlock) DecisionBlockVolumesAndCosts<T>([NotNull] ICmdtyStorage<T> storage,
+                        T blockStart, double inventory, double injectWithdrawVolume, 
+                        [NotNull] IReadOnlyList<double> discountFactorsFromCmdtySettlement, Func<Day, double> discountFactors,
+                        [NotNull] double[] discountedCmdtyVolumes)
+            where T : ITimePeriod<T>
+        {
+            if (storage == null) throw new ArgumentNullException(nameof(storage));
+            if (discountFactorsFromCmdtySettlement == null) throw new ArgumentNullException(nameof(discountFactorsFromCmdtySettlement));
+            if (discountedCmdtyVolumes == null) throw new ArgumentNullException(nameof(discountedCmdtyVolumes));
+
+            double costNpv = 0.0;
+            for (int i = 0; i < discountFactorsFromCmdtySettlement.Count; i++)
+            {
+                T period = blockStart.Offset(i);
+                double cmdtyConsumed = injectWithdrawVolume > 0.0
+                    ? storage.CmdtyVolumeConsumedOnInject(period, inventory, injectWithdrawVolume)
+                    : storage.CmdtyVolumeConsumedOnWithdraw(period, inventory, -injectWithdrawVolume);
+                // Note that calculations assume that decision volumes do NOT include volumes consumed, and that these volumes are purchased in the market
+                discountedCmdtyVolumes[i] = (injectWithdrawVolume + cmdtyConsumed) * discountFactorsFromCmdtySettlement[i];
+                costNpv += DecisionCostNpv(storage, period, inventory, injectWithdrawVolume, discountFactors) +
+                           InventoryCostNpv(storage, period, inventory, discountFactors);
+                inventory = inventory + injectWithdrawVolume - storage.CmdtyInventoryPercentLoss(period) * inventory;
+            }
+
+            return (CostNpv: costNpv, InventoryAfterBlock: inventory);
+        }
+
         public static (double Max, int IndexOfMax) MaxValueAndIndex([NotNull] double[] array) // TODO move to Cmdty.Core?
         {
             if (array == null) throw new ArgumentNullException(nameof(array));
@@ -207,11 +309,7 @@ public static (double ImmediateNpv, double CmdtyConsumed)
 
             double injectWithdrawNpv = -injectWithdrawVolume * cmdtyPrice * discountFactorFromCmdtySettlement;
 
-            IReadOnlyList<DomesticCashFlow> storageCostCashFlows = injectWithdrawVolume > 0.0
-                    ? storage.InjectionCost(period, inventory, injectWithdrawVolume)
-                    : storage.WithdrawalCost(period, inventory, -injectWithdrawVolume);
-
-            double storageCostNpv = storageCostCashFlows.Sum(cashFlow => cashFlow.Amount * discountFactors(cashFlow.Date));
+            double storageCostNpv = DecisionCostNpv(storage, period, inventory, injectWithdrawVolume, discountFactors);
 
             double cmdtyUsedForInjectWithdrawVolume = injectWithdrawVolume > 0.0
                 ? storage.CmdtyVolumeConsumedOnInject(period, inventory, injectWithdrawVolume)
@@ -225,5 +323,68 @@ public static (double ImmediateNpv, double CmdtyConsumed)
             return (ImmediateNpv: immediateNpv, CmdtyConsumed: cmdtyUsedForInjectWithdrawVolume);
         }
 
+        /// <summary>
+        /// Present value of the injection cost if <paramref name="injectWithdrawVolume"/> is positive, otherwise the withdrawal cost.
+        /// Evaluated by <see cref="ICmdtyStorageCostNpv{T}"/> if implemented, so without allocating cash flows for per unit
+        /// costs of <see cref="FrozenCmdtyStorage{T}"/>.
+        /// </summary>
+        public static double DecisionCostNpv<T>(ICmdtyStorage<T> storage, T period, double inventory, double injectWithdrawVolume, 
+                                Func<Day, double> discountFactors)
+            where T : ITimePeriod<T>
+        {
+            if (storage is ICmdtyStorageCostNpv<T> costNpvStorage)
+                return injectWithdrawVolume > 0.0
+                    ? costNpvStorage.InjectionCostNpv(period, inventory, injectWithdrawVolume, discountFactors)
+                    : costNpvStorage.WithdrawalCostNpv(period, inventory, -injectWithdrawVolume, discountFactors);
+
+            IReadOnlyList<DomesticCashFlow> storageCostCashFlows = injectWithdrawVolume > 0.0
+                ? storage.InjectionCost(period, inventory, injectWithdrawVolume)
+                : storage.WithdrawalCost(period, inventory, -injectWithdrawVolume);
+            return CashFlowsNpv(storageCostCashFlows, discountFactors);
+        }
+
+        /// <summary>
+        /// Present value of the inventory cost. Evaluated by <see cref="ICmdtyStorageCostNpv{T}"/> if implemented, so
+        /// without allocating cash flows for per unit costs of <see cref="FrozenCmdtyStorage{T}"/>.
+        /// </summary>
+        public static double InventoryCostNpv<T>(ICmdtyStorage<T> storage, T period, double inventory, Func<Day, double> discountFactors)
+            where T : ITimePeriod<T>
+        {
+            if (storage is ICmdtyStorageCostNpv<T> costNpvStorage)
+                return costNpvStorage.InventoryCostNpv(period, inventory, discountFactors);
+            return CashFlowsNpv(storage.CmdtyInventoryCost(period, inventory), discountFactors);
+        }
+
+        /// <summary>
+        /// Distinct inventory levels, in ascending order, at which the <see cref="PiecewiseLinearInjectWithdrawConstraint"/>
+        /// of any period before the storage end changes slope. Empty if the storage doesn't use such constraints.
+        /// </summary>
+        public static IReadOnlyList<double> InventoryBreakpoints<T>([NotNull] ICmdtyStorageInjectWithdrawConstraints<T> storage)
+            where T : ITimePeriod<T>
+        {
+            if (storage == null) throw new ArgumentNullException(nameof(storage));
+
+            var breakpoints = new SortedSet<double>();
+            IInjectWithdrawConstraint previousConstraint = null;
+            for (T period = storage.StartPeriod; period.CompareTo(storage.EndPeriod) < 0; period = period.Offset(1))
+            {
+                IInjectWithdrawConstraint constraint = storage.GetInjectWithdrawConstraint(period);
+                if (ReferenceEquals(constraint, previousConstraint))
+                    continue; // Usually the same instance is used for all periods
+                if (constraint is PiecewiseLinearInjectWithdrawConstraint piecewiseLinearConstraint)
+                    breakpoints.UnionWith(piecewiseLinearConstraint.InventoryBreakpoints);
+                previousConstraint = constraint;
+            }
+            return breakpoints.ToArray();
+        }
+
+        internal static double CashFlowsNpv(IReadOnlyList<DomesticCashFlow> cashFlows, Func<Day, double> discountFactors)
+        {
+            double npv = 0.0;
+            for (int i = 0; i < cashFlows.Count; i++)
+                npv += cashFlows[i].Amount * discountFactors(cashFlows[i].Date);
+            return npv;
+        }
+
     }
 }
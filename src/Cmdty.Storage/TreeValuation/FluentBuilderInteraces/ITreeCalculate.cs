@@ -23,6 +23,7 @@
 // OTHER DEALINGS IN THE SOFTWARE.
 #endregion
 
+using System;
 using Cmdty.TimePeriodValueTypes;
 
 namespace Cmdty.Storage
@@ -30,8 +31,28 @@ namespace Cmdty.Storage
     public interface ITreeCalculate<T>
         where T : ITimePeriod<T>
     {
+        /// <summary>
+        /// Sets the maximum number of threads used to value the price levels of each tree time step in parallel.
+        /// Defaults to 1, with all calculations performed on the calling thread. Results do not depend on the value.
+        /// </summary>
+        ITreeCalculate<T> WithMaxDegreeOfParallelism(int maxDegreeOfParallelism);
+        /// <summary>
+        /// Sets the decision schedule, so that inject/withdraw decisions are only made in the current period and the periods for
+        /// which isDecisionPeriod returns true, with the volume held constant for each period of the decision block. Only supported
+        /// by <see cref="CalculateValueOnly"/> and <see cref="CalculateNpv"/>, as the full results are held by period.
+        /// See <see cref="DecisionSchedules"/>.
+        /// </summary>
+        ITreeCalculate<T> WithDecisionSchedule(Func<T, bool> isDecisionPeriod);
         TreeStorageValuationResults<T> Calculate();
         (TreeStorageValuationResults<T> ValuationResults, ITreeDecisionSimulator<T> DecisionSimulator) CalculateWithDecisionSimulator();
+        /// <summary>
+        /// Calculates the NPV, and the first period decisions, holding only the results for the next time step during backward
+        /// induction, so that memory use does not grow with the number of periods.
+        /// </summary>
+        TreeStorageValueOnlyResults CalculateValueOnly();
+        /// <summary>
+        /// Calculates the NPV, as <see cref="CalculateValueOnly"/>.
+        /// </summary>
         double CalculateNpv();
     }
 }
\ No newline at end of file
@@ -26,6 +26,7 @@
 using System;
 using System.Collections.Generic;
 using System.Linq;
+using System.Threading.Tasks;
 using Cmdty.Core.Trees;
 using Cmdty.TimePeriodValueTypes;
 using Cmdty.TimeSeries;
@@ -48,6 +49,8 @@ public sealed class TreeStorageValuation<T> : ITreeAddStartingInventory<T>, ITre
         private Func<ICmdtyStorage<T>, IDoubleStateSpaceGridCalc> _gridCalcFactory;
         private IInterpolatorFactory _interpolatorFactory;
         private double _numericalTolerance;
+        private int _maxDegreeOfParallelism = 1;
+        private Func<T, bool> _isDecisionPeriod;
 
         private TreeStorageValuation([NotNull] ICmdtyStorage<T> storage)
         {
@@ -121,11 +124,34 @@ ITreeCalculate<T> ITreeAddNumericalTolerance<T>.WithNumericalTolerance(double nu
             return this;
         }
 
+        ITreeCalculate<T> ITreeCalculate<T>.WithMaxDegreeOfParallelism(int maxDegreeOfParallelism)
+        {
+            if (maxDegreeOfParallelism < 1)
+                throw new ArgumentException("Max degree of parallelism must be at least 1.", nameof(maxDegreeOfParallelism));
+            _maxDegreeOfParallelism = maxDegreeOfParallelism;
+            return this;
+        }
+
+        ITreeCalculate<T> ITreeCalculate<T>.WithDecisionSchedule([NotNull] Func<T, bool> isDecisionPeriod)
+        {
+            _isDecisionPeriod = isDecisionPeriod ?? throw new ArgumentNullException(nameof(isDecisionPeriod));
+            return this;
+        }
+
         TreeStorageValuationResults<T> ITreeCalculate<T>.Calculate()
         {
+            if (_isDecisionPeriod != null)
+                throw new InvalidOperationException("Full results cannot be calculated with a decision schedule. Use CalculateValueOnly or CalculateNpv instead.");
             return Calculate(_currentPeriod, _startingInventory, _forwardCurve, _treeFactory, _storage,
                 _settleDateRule, _discountFactors, _gridCalcFactory,
-                    _interpolatorFactory, _numericalTolerance);
+                    _interpolatorFactory, _numericalTolerance, _maxDegreeOfParallelism, false, null).ValuationResults;
+        }
+
+        TreeStorageValueOnlyResults ITreeCalculate<T>.CalculateValueOnly()
+        {
+            return Calculate(_currentPeriod, _startingInventory, _forwardCurve, _treeFactory, _storage,
+                _settleDateRule, _discountFactors, _gridCalcFactory,
+                    _interpolatorFactory, _numericalTolerance, _maxDegreeOfParallelism, true, _isDecisionPeriod).ValueOnlyResults;
         }
 
         (TreeStorageValuationResults<T> ValuationResults, ITreeDecisionSimulator<T> DecisionSimulator) 
@@ -137,20 +163,24 @@ TreeStorageValuationResults<T> ITreeCalculate<T>.Calculate()
 
         double ITreeCalculate<T>.CalculateNpv()
         {
-            return (this as ITreeCalculate<T>).Calculate().NetPresentValue;
+            return (this as ITreeCalculate<T>).CalculateValueOnly().NetPresentValue;
         }
 
-        private static TreeStorageValuationResults<T> Calculate(T currentPeriod, double startingInventory, 
+        // If valueOnly is true only the results for the next time step are held during backward induction, so memory use does not
+        // grow with the number of periods, and only ValueOnlyResults is returned. Otherwise only ValuationResults is returned.
+        // isDecisionPeriod is null for a decision in every period, and otherwise is only supported if valueOnly is true.
+        private static (TreeStorageValuationResults<T> ValuationResults, TreeStorageValueOnlyResults ValueOnlyResults) 
+            Calculate(T currentPeriod, double startingInventory, 
             TimeSeries<T, double> forwardCurve, Func<TimeSeries<T, double>, TimeSeries<T, IReadOnlyList<TreeNode>>> treeFactory, 
             ICmdtyStorage<T> storage, Func<T, Day> settleDateRule, Func<Day, Day, double> discountFactors, 
             Func<ICmdtyStorage<T>, IDoubleStateSpaceGridCalc> gridCalcFactory, IInterpolatorFactory interpolatorFactory, 
-            double numericalTolerance)
+            double numericalTolerance, int maxDegreeOfParallelism, bool valueOnly, Func<T, bool> isDecisionPeriod)
         {
             if (startingInventory < 0)
                 throw new ArgumentException("Inventory cannot be negative.", nameof(startingInventory));
 
             if (currentPeriod.CompareTo(storage.EndPeriod) > 0)
-                return TreeStorageValuationResults<T>.CreateExpiredResults();
+                return ExpiredResults(valueOnly);
 
             if (currentPeriod.Equals(storage.EndPeriod))
             {
@@ -158,7 +188,7 @@ TreeStorageValuationResults<T> ITreeCalculate<T>.Calculate()
                 {
                     if (startingInventory > 0)
                         throw new InventoryConstraintsCannotBeFulfilledException("Storage must be empty at end, but inventory is greater than zero.");
-                    return TreeStorageValuationResults<T>.CreateExpiredResults();
+                    return ExpiredResults(valueOnly);
                 }
             }
 
@@ -176,46 +206,49 @@ TreeStorageValuationResults<T> ITreeCalculate<T>.Calculate()
 
             // Perform backward induction
             int numPeriods = inventorySpace.Count + 1; // +1 as inventorySpaceGrid doesn't contain first period
-            var storageValueByInventory = new Func<double, double>[numPeriods][];
-            var inventorySpaceGrids = new double[numPeriods][];
-            var storageNpvs = new double[numPeriods][][];
-            var injectWithdrawDecisions = new double[numPeriods][][];
+            int numPeriodsHeld = valueOnly ? 0 : numPeriods;
+            var storageValueByInventory = new Func<double, double>[numPeriodsHeld][];
+            var inventorySpaceGrids = new double[numPeriodsHeld][];
+            var storageNpvs = new double[numPeriodsHeld][][];
+            var injectWithdrawDecisions = new double[numPeriodsHeld][][];
 
             TimeSeries<T, IReadOnlyList<TreeNode>> spotPriceTree = treeFactory(forwardCurve);
 
             // Calculate NPVs at end period
             IReadOnlyList<TreeNode> treeNodesForEndPeriod = spotPriceTree[storage.EndPeriod];
 
-            storageValueByInventory[numPeriods - 1] = 
-                                    new Func<double, double>[treeNodesForEndPeriod.Count];
+            var terminalValueByPriceLevel = new Func<double, double>[treeNodesForEndPeriod.Count];
 
             for (int i = 0; i < treeNodesForEndPeriod.Count; i++)
             {
                 double cmdtyPrice = treeNodesForEndPeriod[i].Value;
-                storageValueByInventory[numPeriods - 1][i] = inventory => storage.TerminalStorageNpv(cmdtyPrice, inventory);
+                terminalValueByPriceLevel[i] = inventory => storage.TerminalStorageNpv(cmdtyPrice, inventory);
             }
+            if (!valueOnly)
+                storageValueByInventory[numPeriods - 1] = terminalValueByPriceLevel;
 
             // Calculate discount factor function
             Day dayToDiscountTo = currentPeriod.First<Day>(); // TODO IMPORTANT, this needs to change
+            Func<Day, double> DiscountToCurrentDay = DiscountFactorCurve.DiscountToPresentDay(discountFactors, dayToDiscountTo);
 
-            // Memoize the discount factor
-            var discountFactorCache = new Dictionary<Day, double>(); // TODO do this in more elegant way and share with intrinsic calc
-            double DiscountToCurrentDay(Day cashFlowDate)
-            {
-                if (!discountFactorCache.TryGetValue(cashFlowDate, out double discountFactor))
-                {
-                    discountFactor = discountFactors(dayToDiscountTo, cashFlowDate);
-                    discountFactorCache[cashFlowDate] = discountFactor;
-                }
-                return discountFactor;
-            }
+            IDoubleStateSpaceGridCalc gridCalc = gridCalcFactory(storage);
+            var parallelOptions = new ParallelOptions {MaxDegreeOfParallelism = maxDegreeOfParallelism};
+
+            if (isDecisionPeriod != null)
+                return (ValuationResults: null, 
+                    ValueOnlyResults: CalculateValueOnlyForDecisionBlocks(startingInventory, storage, settleDateRule, inventorySpace, 
+                        spotPriceTree, terminalValueByPriceLevel, DiscountToCurrentDay, gridCalc, interpolatorFactory, 
+                        numericalTolerance, maxDegreeOfParallelism, parallelOptions, isDecisionPeriod));
 
             // Loop back through other periods
             T startActiveStorage = inventorySpace.Start.Offset(-1);
             T[] periodsForResultsTimeSeries = startActiveStorage.EnumerateTo(inventorySpace.End).ToArray();
 
             int backCounter = numPeriods - 2;
-            IDoubleStateSpaceGridCalc gridCalc = gridCalcFactory(storage);
+            // Storage value by price level and inventory for the start of the period after periodLoop
+            Func<double, double>[] continuationValueByInventory = terminalValueByPriceLevel;
+            double[][] firstPeriodStorageNpvs = null;
+            double[][] firstPeriodDecisions = null;
 
             foreach (T periodLoop in periodsForResultsTimeSeries.Reverse().Skip(1))
             {
@@ -233,17 +266,16 @@ TreeStorageValuationResults<T> ITreeCalculate<T>.Calculate()
 
                 (double nextStepInventorySpaceMin, double nextStepInventorySpaceMax) = inventorySpace[periodLoop.Offset(1)];
 
-                Func<double, double>[] continuationValueByInventory = storageValueByInventory[backCounter + 1];
-
                 IReadOnlyList<TreeNode> thisStepTreeNodes = spotPriceTree[periodLoop];
-                storageValueByInventory[backCounter] = new Func<double, double>[thisStepTreeNodes.Count];
+                var storageValueByPriceLevel = new Func<double, double>[thisStepTreeNodes.Count];
                 var storageNpvsByPriceLevelAndInventory = new double[thisStepTreeNodes.Count][];
                 var decisionVolumesByPriceLevelAndInventory = new double[thisStepTreeNodes.Count][];
 
                 Day cmdtySettlementDate = settleDateRule(periodLoop);
                 double discountFactorFromCmdtySettlement = DiscountToCurrentDay(cmdtySettlementDate);
                 
-                for (var priceLevelIndex = 0; priceLevelIndex < thisStepTreeNodes.Count; priceLevelIndex++)
+                // Price levels are independent of each other, and each writes to its own array elements
+                void CalculatePriceLevel(int priceLevelIndex)
                 {
                     TreeNode treeNode = thisStepTreeNodes[priceLevelIndex];
                     var storageValuesGrid = new double[inventorySpaceGrid.Length];
@@ -258,14 +290,31 @@ TreeStorageValuationResults<T> ITreeCalculate<T>.Calculate()
                                         continuationValueByInventory, discountFactorFromCmdtySettlement, DiscountToCurrentDay, numericalTolerance);
                     }
 
-                    storageValueByInventory[backCounter][priceLevelIndex] =
+                    storageValueByPriceLevel[priceLevelIndex] =
                         interpolatorFactory.CreateInterpolator(inventorySpaceGrid, storageValuesGrid);
                     storageNpvsByPriceLevelAndInventory[priceLevelIndex] = storageValuesGrid;
                     decisionVolumesByPriceLevelAndInventory[priceLevelIndex] = decisionVolumesGrid;
                 }
-                inventorySpaceGrids[backCounter] = inventorySpaceGrid;
-                storageNpvs[backCounter] = storageNpvsByPriceLevelAndInventory;
-                injectWithdrawDecisions[backCounter] = decisionVolumesByPriceLevelAndInventory;
+
+                if (maxDegreeOfParallelism == 1)
+                {
+                    for (var priceLevelIndex = 0; priceLevelIndex < thisStepTreeNodes.Count; priceLevelIndex++)
+                        CalculatePriceLevel(priceLevelIndex);
+                }
+                else
+                {
+                    Parallel.For(0, thisStepTreeNodes.Count, parallelOptions, CalculatePriceLevel);
+                }
+                if (!valueOnly)
+                {
+                    storageValueByInventory[backCounter] = storageValueByPriceLevel;
+                    inventorySpaceGrids[backCounter] = inventorySpaceGrid;
+                    storageNpvs[backCounter] = storageNpvsByPriceLevelAndInventory;
+                    injectWithdrawDecisions[backCounter] = decisionVolumesByPriceLevelAndInventory;
+                }
+                continuationValueByInventory = storageValueByPriceLevel;
+                firstPeriodStorageNpvs = storageNpvsByPriceLevelAndInventory;
+                firstPeriodDecisions = decisionVolumesByPriceLevelAndInventory;
                 backCounter--;
             }
 
@@ -276,7 +325,14 @@ TreeStorageValuationResults<T> ITreeCalculate<T>.Calculate()
             for (var i = 0; i < startTreeNodes.Count; i++)
             {
                 TreeNode treeNode = startTreeNodes[i];
-                storageNpv += storageNpvs[0][i][0] * treeNode.Probability;
+                storageNpv += firstPeriodStorageNpvs[i][0] * treeNode.Probability;
+            }
+
+            if (valueOnly)
+            {
+                double[] firstPeriodDecisionByPriceLevel = firstPeriodDecisions.Select(decisions => decisions[0]).ToArray();
+                return (ValuationResults: null, 
+                    ValueOnlyResults: new TreeStorageValueOnlyResults(storageNpv, firstPeriodDecisionByPriceLevel));
             }
 
             var storageNpvByInventory =
@@ -288,9 +344,178 @@ TreeStorageValuationResults<T> ITreeCalculate<T>.Calculate()
             var injectWithdrawDecisionsTimeSeries =
                 new TimeSeries<T, IReadOnlyList<IReadOnlyList<double>>>(periodsForResultsTimeSeries, injectWithdrawDecisions);
 
-            return new TreeStorageValuationResults<T>(storageNpv, spotPriceTree, storageNpvByInventory, 
+            var valuationResults = new TreeStorageValuationResults<T>(storageNpv, spotPriceTree, storageNpvByInventory, 
                             inventorySpaceGridsTimeSeries, storageNpvsTimeSeries, injectWithdrawDecisionsTimeSeries,
                             inventorySpace);
+            return (ValuationResults: valuationResults, ValueOnlyResults: null);
+        }
+
+        // Backward induction over the starts of the decision blocks only, with the inject/withdraw volume held for each period of 
+        // the block. Each tree node at the block start uses the expected spot price in each period of the block, and the
+        // probabilities of the tree nodes at the block end, conditional on that node.
+        private static TreeStorageValueOnlyResults CalculateValueOnlyForDecisionBlocks(double startingInventory, 
+            ICmdtyStorage<T> storage, Func<T, Day> settleDateRule, TimeSeries<T, InventoryRange> inventorySpace, 
+            TimeSeries<T, IReadOnlyList<TreeNode>> spotPriceTree, Func<double, double>[] terminalValueByPriceLevel, 
+            Func<Day, double> discountFactors, IDoubleStateSpaceGridCalc gridCalc, IInterpolatorFactory interpolatorFactory, 
+            double numericalTolerance, int maxDegreeOfParallelism, ParallelOptions parallelOptions, Func<T, bool> isDecisionPeriod)
+        {
+            T startActiveStorage = inventorySpace.Start.Offset(-1);
+            T[] blockStarts = DecisionSchedules.DecisionBlockStarts(isDecisionPeriod, startActiveStorage, storage.EndPeriod);
+            T[] blockEnds = blockStarts.Skip(1).Append(storage.EndPeriod).ToArray();
+
+            // Storage value by price level and inventory for the start of the block after blockStart
+            Func<double, double>[] continuationValueByInventory = terminalValueByPriceLevel;
+            double[][] blockStorageNpvs = null;
+            double[][] blockDecisions = null;
+
+            for (int blockIndex = blockStarts.Length - 1; blockIndex >= 0; blockIndex--)
+            {
+                T blockStart = blockStarts[blockIndex];
+                int numBlockPeriods = blockEnds[blockIndex].OffsetFrom(blockStart);
+                double[] inventorySpaceGrid;
+                if (blockStart.Equals(startActiveStorage))
+                {
+                    inventorySpaceGrid = new[] {startingInventory};
+                }
+                else
+                {
+                    (double inventorySpaceMin, double inventorySpaceMax) = inventorySpace[blockStart];
+                    inventorySpaceGrid = gridCalc.GetGridPoints(inventorySpaceMin, inventorySpaceMax)
+                                                    .ToArray();
+                }
+
+                (double nextBlockInventorySpaceMin, double nextBlockInventorySpaceMax) = inventorySpace[blockEnds[blockIndex]];
+
+                var discountFactorsFromCmdtySettlement = new double[numBlockPeriods];
+                for (int k = 0; k < numBlockPeriods; k++)
+                    discountFactorsFromCmdtySettlement[k] = discountFactors(settleDateRule(blockStart.Offset(k)));
+
+                // Decisions, volumes and costs don't depend on the price level, so are shared by the tree nodes
+                var decisionSets = new double[inventorySpaceGrid.Length][];
+                var discountedCmdtyVolumes = new double[inventorySpaceGrid.Length][][];
+                var costNpvs = new double[inventorySpaceGrid.Length][];
+                var inventoriesAfterBlock = new double[inventorySpaceGrid.Length][];
+                for (int i = 0; i < inventorySpaceGrid.Length; i++)
+                {
+                    double inventory = inventorySpaceGrid[i];
+                    double[] decisionSet = StorageHelper.CalculateBlockBangBangDecisionSet(storage, blockStart, numBlockPeriods,
+                                    inventory, nextBlockInventorySpaceMin, nextBlockInventorySpaceMax, numericalTolerance);
+                    decisionSets[i] = decisionSet;
+                    discountedCmdtyVolumes[i] = new double[decisionSet.Length][];
+                    costNpvs[i] = new double[decisionSet.Length];
+                    inventoriesAfterBlock[i] = new double[decisionSet.Length];
+                    for (int j = 0; j < decisionSet.Length; j++)
+                    {
+                        discountedCmdtyVolumes[i][j] = new double[numBlockPeriods];
+                        (costNpvs[i][j], inventoriesAfterBlock[i][j]) = StorageHelper.DecisionBlockVolumesAndCosts(storage, 
+                            blockStart, inventory, decisionSet[j], discountFactorsFromCmdtySettlement, discountFactors, 
+                            discountedCmdtyVolumes[i][j]);
+                    }
+                }
+
+                IReadOnlyList<TreeNode> blockStartTreeNodes = spotPriceTree[blockStart];
+                var storageValueByPriceLevel = new Func<double, double>[blockStartTreeNodes.Count];
+                var storageNpvsByPriceLevelAndInventory = new double[blockStartTreeNodes.Count][];
+                var decisionVolumesByPriceLevelAndInventory = new double[blockStartTreeNodes.Count][];
+
+                // Price levels are independent of each other, and each writes to its own array elements
+                void CalculatePriceLevel(int priceLevelIndex)
+                {
+                    (double[] expectedSpotPrices, double[] blockEndNodeProbabilities) = 
+                                    BlockNodeExpectations(spotPriceTree, blockStart, priceLevelIndex, numBlockPeriods);
+                    var storageValuesGrid = new double[inventorySpaceGrid.Length];
+                    var decisionVolumesGrid = new double[inventorySpaceGrid.Length];
+
+                    for (int i = 0; i < inventorySpaceGrid.Length; i++)
+                    {
+                        double[] decisionSet = decisionSets[i];
+                        var valuesForDecisions = new double[decisionSet.Length];
+                        for (int j = 0; j < decisionSet.Length; j++)
+                        {
+                            double inventoryAfterBlock = inventoriesAfterBlock[i][j];
+                            double expectedContinuationValue = 0.0;
+                            for (int n = 0; n < blockEndNodeProbabilities.Length; n++)
+                            {
+                                if (blockEndNodeProbabilities[n] > 0.0)
+                                    expectedContinuationValue += continuationValueByInventory[n](inventoryAfterBlock) * 
+                                                                 blockEndNodeProbabilities[n];
+                            }
+
+                            double expectedCmdtyPurchaseNpv = 0.0;
+                            for (int k = 0; k < numBlockPeriods; k++)
+                                expectedCmdtyPurchaseNpv += expectedSpotPrices[k] * discountedCmdtyVolumes[i][j][k];
+                            valuesForDecisions[j] = expectedContinuationValue - expectedCmdtyPurchaseNpv - costNpvs[i][j];
+                        }
+
+                        (double storageNpv, int indexOfOptimalDecision) = StorageHelper.MaxValueAndIndex(valuesForDecisions);
+                        storageValuesGrid[i] = storageNpv;
+                        decisionVolumesGrid[i] = decisionSet[indexOfOptimalDecision];
+                    }
+
+                    storageValueByPriceLevel[priceLevelIndex] =
+                        interpolatorFactory.CreateInterpolator(inventorySpaceGrid, storageValuesGrid);
+                    storageNpvsByPriceLevelAndInventory[priceLevelIndex] = storageValuesGrid;
+                    decisionVolumesByPriceLevelAndInventory[priceLevelIndex] = decisionVolumesGrid;
+                }
+
+                if (maxDegreeOfParallelism == 1)
+                {
+                    for (var priceLevelIndex = 0; priceLevelIndex < blockStartTreeNodes.Count; priceLevelIndex++)
+                        CalculatePriceLevel(priceLevelIndex);
+                }
+                else
+                {
+                    Parallel.For(0, blockStartTreeNodes.Count, parallelOptions, CalculatePriceLevel);
+                }
+                continuationValueByInventory = storageValueByPriceLevel;
+                blockStorageNpvs = storageNpvsByPriceLevelAndInventory;
+                blockDecisions = decisionVolumesByPriceLevelAndInventory;
+            }
+
+            double npv = 0;
+            IReadOnlyList<TreeNode> startTreeNodes = spotPriceTree[startActiveStorage];
+            for (var i = 0; i < startTreeNodes.Count; i++)
+                npv += blockStorageNpvs[i][0] * startTreeNodes[i].Probability;
+
+            double[] firstBlockDecisionByPriceLevel = blockDecisions.Select(decisions => decisions[0]).ToArray();
+            return new TreeStorageValueOnlyResults(npv, firstBlockDecisionByPriceLevel);
+        }
+
+        // Expected spot price in each of the numBlockPeriods periods from blockStart, and the probability of each tree node at
+        // the end of the block, conditional on the tree node of blockStart with index startPriceLevelIndex
+        private static (double[] ExpectedSpotPrices, double[] EndNodeProbabilities) BlockNodeExpectations(
+            TimeSeries<T, IReadOnlyList<TreeNode>> spotPriceTree, T blockStart, int startPriceLevelIndex, int numBlockPeriods)
+        {
+            var expectedSpotPrices = new double[numBlockPeriods];
+            var nodeProbabilities = new double[spotPriceTree[blockStart].Count];
+            nodeProbabilities[startPriceLevelIndex] = 1.0;
+
+            for (int k = 0; k < numBlockPeriods; k++)
+            {
+                IReadOnlyList<TreeNode> treeNodes = spotPriceTree[blockStart.Offset(k)];
+                var nextNodeProbabilities = new double[spotPriceTree[blockStart.Offset(k + 1)].Count];
+                for (int n = 0; n < treeNodes.Count; n++)
+                {
+                    double nodeProbability = nodeProbabilities[n];
+                    if (nodeProbability == 0.0)
+                        continue;
+                    TreeNode treeNode = treeNodes[n];
+                    expectedSpotPrices[k] += treeNode.Value * nodeProbability;
+                    foreach (NodeTransition transition in treeNode.Transitions)
+                        nextNodeProbabilities[transition.DestinationNode.ValueLevelIndex] += nodeProbability * transition.Probability;
+                }
+                nodeProbabilities = nextNodeProbabilities;
+            }
+
+            return (ExpectedSpotPrices: expectedSpotPrices, EndNodeProbabilities: nodeProbabilities);
+        }
+
+        private static (TreeStorageValuationResults<T> ValuationResults, TreeStorageValueOnlyResults ValueOnlyResults)
+            ExpiredResults(bool valueOnly)
+        {
+            if (valueOnly)
+                return (ValuationResults: null, ValueOnlyResults: TreeStorageValueOnlyResults.CreateExpiredResults());
+            return (ValuationResults: TreeStorageValuationResults<T>.CreateExpiredResults(), ValueOnlyResults: null);
         }
 
         // TODO create class on hold this tuple?
@@ -309,8 +534,7 @@ private static (double StorageNpv, double OptimalInjectWithdraw, double CmdtyCon
             var cmdtyConsumedForDecisions = new double[decisionSet.Length];
             var immediateNpvs = new double[decisionSet.Length];
 
-            IReadOnlyList<DomesticCashFlow> inventoryCostCashFlows = storage.CmdtyInventoryCost(period, inventory);
-            double inventoryCostNpv = inventoryCostCashFlows.Sum(cashFlow => cashFlow.Amount * discountFactors(cashFlow.Date));
+            double inventoryCostNpv = StorageHelper.InventoryCostNpv(storage, period, inventory, discountFactors);
 
             for (var j = 0; j < decisionSet.Length; j++)
             {
@@ -359,7 +583,7 @@ private static (double StorageNpv, double OptimalInjectWithdraw, double CmdtyCon
 
             // Calculate discount factor function
             Day dayToDiscountTo = spotPricePath.Start.First<Day>(); // TODO IMPORTANT, this needs to change
-            double DiscountToCurrentDay(Day day) => _discountFactors(dayToDiscountTo, day);
+            Func<Day, double> DiscountToCurrentDay = DiscountFactorCurve.DiscountToPresentDay(_discountFactors, dayToDiscountTo);
 
             TreeNode treeNode = tree[0][0];
             var decisions = new double[valuationResults.StorageNpvByInventory.Count - 1]; // -1 because StorageNpvByInventory included the end period on which a decision can't be made
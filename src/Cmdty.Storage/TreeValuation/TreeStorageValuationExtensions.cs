@@ -81,6 +81,27 @@ IDoubleStateSpaceGridCalc GridCalcFactory(ICmdtyStorage<T> storage)
             return treeAddSpacing.WithStateSpaceGridCalculation(GridCalcFactory);
         }
 
+        /// <summary>
+        /// Uses <see cref="AdaptiveStateSpaceGridCalc"/>, with grid points concentrated around the inventory breakpoints of
+        /// piecewise linear inject/withdraw constraints and the inventory space bounds. See
+        /// <see cref="AdaptiveStateSpaceGridCalc.ForStorage{T}"/> for the parameters.
+        /// </summary>
+        public static ITreeAddInterpolator<T> WithAdaptiveInventoryGrid<T>([NotNull] this ITreeAddInventoryGridCalculation<T> treeAddSpacing, 
+                    int numGridPointsOverGlobalInventoryRange, int refinementFactor = 4, double refinementWidth = 3.0)
+            where T : ITimePeriod<T>
+        {
+            if (treeAddSpacing == null) throw new ArgumentNullException(nameof(treeAddSpacing));
+            if (numGridPointsOverGlobalInventoryRange < 3)
+                throw new ArgumentException($"Parameter {nameof(numGridPointsOverGlobalInventoryRange)} value must be at least 3.", nameof(numGridPointsOverGlobalInventoryRange));
+            if (refinementFactor < 1)
+                throw new ArgumentException($"Parameter {nameof(refinementFactor)} value must be at least 1.", nameof(refinementFactor));
+            if (refinementWidth < 0.0)
+                throw new ArgumentException($"Parameter {nameof(refinementWidth)} value cannot be negative.", nameof(refinementWidth));
+
+            return treeAddSpacing.WithStateSpaceGridCalculation(storage => 
+                AdaptiveStateSpaceGridCalc.ForStorage(storage, numGridPointsOverGlobalInventoryRange, refinementFactor, refinementWidth));
+        }
+
         public static ITreeAddNumericalTolerance<T> WithLinearInventorySpaceInterpolation<T>([NotNull] this ITreeAddInterpolator<T> addInterpolator)
             where T : ITimePeriod<T>
         {
@@ -172,6 +193,16 @@ public static ITreeAddCmdtySettlementRule<T> WithIntrinsicTree<T>([NotNull] this
             return addDiscountFactorFunc.WithDiscountFactorFunc(DiscountFactor);
         }
 
+        public static ITreeAddInventoryGridCalculation<T> WithDiscountFactorCurve<T>(
+            [NotNull] this ITreeAddDiscountFactorFunc<T> addDiscountFactorFunc, [NotNull] DiscountFactorCurve discountFactorCurve)
+            where T : ITimePeriod<T>
+        {
+            if (addDiscountFactorFunc == null) throw new ArgumentNullException(nameof(addDiscountFactorFunc));
+            if (discountFactorCurve == null) throw new ArgumentNullException(nameof(discountFactorCurve));
+
+            return addDiscountFactorFunc.WithDiscountFactorFunc(discountFactorCurve.DiscountFactor);
+        }
+
 
     }
 }
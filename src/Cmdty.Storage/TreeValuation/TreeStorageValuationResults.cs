@@ -58,6 +58,11 @@ public sealed class TreeStorageValuationResults<T>
             InventorySpace = inventorySpace;
         }
 
+        public TreeStorageValuationResultsArrays GetResultsArrays()
+        {
+            return TreeStorageValuationResultsArrays.FromValuationResults(this);
+        }
+
         // TODO ToString override
         // TODO Deconstruct method
 
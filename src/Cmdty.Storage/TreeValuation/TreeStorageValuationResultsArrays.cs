@@ -0,0 +1,152 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Collections.Generic;
+using Cmdty.Core.Trees;
+using Cmdty.TimePeriodValueTypes;
+using JetBrains.Annotations;
+
+namespace Cmdty.Storage
+{
+    /// <summary>
+    /// Contiguous array representation of the tree, inventory grids, storage NPVs and inject/withdraw decisions of
+    /// <see cref="TreeStorageValuationResults{T}"/> for each period in which a decision is made. Values are ordered by
+    /// period, then price level, then inventory grid point, with the number of price levels and grid points of each
+    /// period held in <see cref="NumPriceLevels"/> and <see cref="NumGridPoints"/>. Useful for efficient bulk transfer
+    /// of results, e.g. into numpy arrays.
+    /// </summary>
+    public sealed class TreeStorageValuationResultsArrays
+    {
+        public int[] NumPriceLevels { get; }
+        public int[] NumGridPoints { get; }
+        public double[] TreePrices { get; }
+        public double[] TreeProbabilities { get; }
+        public double[] InventoryGrids { get; }
+        public double[] StorageNpvs { get; }
+        public double[] InjectWithdrawDecisions { get; }
+
+        public int NumPeriods => NumPriceLevels.Length;
+
+        public TreeStorageValuationResultsArrays([NotNull] int[] numPriceLevels, [NotNull] int[] numGridPoints,
+            [NotNull] double[] treePrices, [NotNull] double[] treeProbabilities, [NotNull] double[] inventoryGrids,
+            [NotNull] double[] storageNpvs, [NotNull] double[] injectWithdrawDecisions)
+        {
+            NumPriceLevels = numPriceLevels ?? throw new ArgumentNullException(nameof(numPriceLevels));
+            NumGridPoints = numGridPoints ?? throw new ArgumentNullException(nameof(numGridPoints));
+            TreePrices = treePrices ?? throw new ArgumentNullException(nameof(treePrices));
+            TreeProbabilities = treeProbabilities ?? throw new ArgumentNullException(nameof(treeProbabilities));
+            InventoryGrids = inventoryGrids ?? throw new ArgumentNullException(nameof(inventoryGrids));
+            StorageNpvs = storageNpvs ?? throw new ArgumentNullException(nameof(storageNpvs));
+            InjectWithdrawDecisions = injectWithdrawDecisions ?? throw new ArgumentNullException(nameof(injectWithdrawDecisions));
+
+            if (numGridPoints.Length != numPriceLevels.Length)
+                throw new ArgumentException("numPriceLevels and numGridPoints must have the same length.");
+            int totalPriceLevels = 0;
+            int totalGridPoints = 0;
+            int totalNodeGridPoints = 0;
+            for (int i = 0; i < numPriceLevels.Length; i++)
+            {
+                totalPriceLevels += numPriceLevels[i];
+                totalGridPoints += numGridPoints[i];
+                totalNodeGridPoints += numPriceLevels[i] * numGridPoints[i];
+            }
+            if (treePrices.Length != totalPriceLevels || treeProbabilities.Length != totalPriceLevels)
+                throw new ArgumentException("Tree arrays must have an element for each price level of each period.");
+            if (inventoryGrids.Length != totalGridPoints)
+                throw new ArgumentException("inventoryGrids must have an element for each grid point of each period.");
+            if (storageNpvs.Length != totalNodeGridPoints || injectWithdrawDecisions.Length != totalNodeGridPoints)
+                throw new ArgumentException("storageNpvs and injectWithdrawDecisions must have an element for each price level and grid point of each period.");
+        }
+
+        public static TreeStorageValuationResultsArrays FromValuationResults<T>([NotNull] TreeStorageValuationResults<T> valuationResults)
+            where T : ITimePeriod<T>
+        {
+            if (valuationResults == null) throw new ArgumentNullException(nameof(valuationResults));
+
+            // The last period of the results time series is the storage end, on which no decision is made, so it has no grid
+            int numPeriods = Math.Max(valuationResults.InventorySpaceGrids.Count - 1, 0);
+            var numPriceLevels = new int[numPeriods];
+            var numGridPoints = new int[numPeriods];
+            int totalPriceLevels = 0;
+            int totalGridPoints = 0;
+            int totalNodeGridPoints = 0;
+            for (int i = 0; i < numPeriods; i++)
+            {
+                numPriceLevels[i] = valuationResults.StorageNpvs[i].Count;
+                numGridPoints[i] = valuationResults.InventorySpaceGrids[i].Count;
+                totalPriceLevels += numPriceLevels[i];
+                totalGridPoints += numGridPoints[i];
+                totalNodeGridPoints += numPriceLevels[i] * numGridPoints[i];
+            }
+
+            var treePrices = new double[totalPriceLevels];
+            var treeProbabilities = new double[totalPriceLevels];
+            var inventoryGrids = new double[totalGridPoints];
+            var storageNpvs = new double[totalNodeGridPoints];
+            var injectWithdrawDecisions = new double[totalNodeGridPoints];
+
+            int priceLevelIndex = 0;
+            int gridPointIndex = 0;
+            int nodeGridPointIndex = 0;
+            for (int i = 0; i < numPeriods; i++)
+            {
+                T period = valuationResults.InventorySpaceGrids.Indices[i];
+                IReadOnlyList<TreeNode> treeNodes = valuationResults.Tree[period];
+                for (int j = 0; j < numPriceLevels[i]; j++)
+                {
+                    treePrices[priceLevelIndex] = treeNodes[j].Value;
+                    treeProbabilities[priceLevelIndex] = treeNodes[j].Probability;
+                    priceLevelIndex++;
+                }
+
+                IReadOnlyList<double> inventoryGrid = valuationResults.InventorySpaceGrids[i];
+                for (int k = 0; k < numGridPoints[i]; k++)
+                    inventoryGrids[gridPointIndex++] = inventoryGrid[k];
+
+                IReadOnlyList<IReadOnlyList<double>> periodStorageNpvs = valuationResults.StorageNpvs[i];
+                IReadOnlyList<IReadOnlyList<double>> periodDecisions = valuationResults.InjectWithdrawDecisions[i];
+                for (int j = 0; j < numPriceLevels[i]; j++)
+                {
+                    for (int k = 0; k < numGridPoints[i]; k++)
+                    {
+                        storageNpvs[nodeGridPointIndex] = periodStorageNpvs[j][k];
+                        injectWithdrawDecisions[nodeGridPointIndex] = periodDecisions[j][k];
+                        nodeGridPointIndex++;
+                    }
+                }
+            }
+
+            return new TreeStorageValuationResultsArrays(numPriceLevels, numGridPoints, treePrices, treeProbabilities,
+                                    inventoryGrids, storageNpvs, injectWithdrawDecisions);
+        }
+
+        public override string ToString()
+        {
+            return $"{nameof(NumPeriods)}: {NumPeriods}";
+        }
+
+    }
+}
@@ -0,0 +1,68 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Collections.Generic;
+using JetBrains.Annotations;
+
+namespace Cmdty.Storage
+{
+    /// <summary>
+    /// Results of a tree valuation in which only the values for the next time step were held during backward induction.
+    /// </summary>
+    public sealed class TreeStorageValueOnlyResults
+    {
+        public double NetPresentValue { get; }
+        /// <summary>
+        /// Optimal inject (positive) or withdraw (negative) volume in the first period in which a decision is made, by
+        /// price level of the tree in this period. Empty if the storage has expired.
+        /// </summary>
+        public IReadOnlyList<double> FirstPeriodInjectWithdrawDecisions { get; }
+
+        public TreeStorageValueOnlyResults(double netPresentValue, [NotNull] IReadOnlyList<double> firstPeriodInjectWithdrawDecisions)
+        {
+            NetPresentValue = netPresentValue;
+            FirstPeriodInjectWithdrawDecisions = firstPeriodInjectWithdrawDecisions ?? 
+                                                 throw new ArgumentNullException(nameof(firstPeriodInjectWithdrawDecisions));
+        }
+
+        public void Deconstruct(out double netPresentValue, out IReadOnlyList<double> firstPeriodInjectWithdrawDecisions)
+        {
+            netPresentValue = NetPresentValue;
+            firstPeriodInjectWithdrawDecisions = FirstPeriodInjectWithdrawDecisions;
+        }
+
+        public override string ToString()
+        {
+            return $"{nameof(NetPresentValue)}: {NetPresentValue}, {nameof(FirstPeriodInjectWithdrawDecisions)}.Count: {FirstPeriodInjectWithdrawDecisions.Count}";
+        }
+
+        public static TreeStorageValueOnlyResults CreateExpiredResults()
+        {
+            return new TreeStorageValueOnlyResults(0.0, new double[0]);
+        }
+
+    }
+}
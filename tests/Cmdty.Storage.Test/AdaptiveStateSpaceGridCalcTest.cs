@@ -0,0 +1,197 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using Cmdty.TimePeriodValueTypes;
+using Xunit;
+
+namespace Cmdty.Storage.Test
+{
+    public sealed class AdaptiveStateSpaceGridCalcTest
+    {
+
+        [Fact]
+        public void GetGridPoints_NoBreakpoints_ReturnsRefinedSpacingNearBoundsAndSpacingElsewhere()
+        {
+            var gridCalc = new AdaptiveStateSpaceGridCalc(2.0, 0.5, 1.0, new double[0]);
+
+            var gridPoints = gridCalc.GetGridPoints(0.0, 10.0);
+
+            var expectedGridPoints = new[] {0.0, 0.5, 1.0, 3.0, 5.0, 7.0, 9.0, 9.5, 10.0};
+            Assert.Equal(expectedGridPoints, gridPoints);
+        }
+
+        [Fact]
+        public void GetGridPoints_BreakpointsInsideStateSpace_ReturnsBreakpointsWithRefinedSpacingAround()
+        {
+            var gridCalc = new AdaptiveStateSpaceGridCalc(2.0, 0.5, 1.0, new[] {9.9, 4.1, -1.0, 4.0, 12.0});
+
+            var gridPoints = gridCalc.GetGridPoints(0.0, 10.0);
+
+            // 4.1 is skipped as too close to breakpoint 4.0, and 9.9 too close to the upper bound
+            var expectedGridPoints = new[] {0.0, 0.5, 1.0, 3.0, 3.5, 4.0, 4.5, 5.0, 7.0, 9.0, 9.5, 10.0};
+            Assert.Equal(expectedGridPoints, gridPoints);
+        }
+
+        [Fact]
+        public void GetGridPoints_ZeroRefinementWidth_ReturnsBreakpointsSeparatedBySpacing()
+        {
+            var gridCalc = new AdaptiveStateSpaceGridCalc(2.0, 0.5, 0.0, new[] {5.0});
+
+            var gridPoints = gridCalc.GetGridPoints(0.0, 10.0);
+
+            var expectedGridPoints = new[] {0.0, 2.0, 4.0, 5.0, 7.0, 9.0, 10.0};
+            Assert.Equal(expectedGridPoints, gridPoints);
+        }
+
+        [Fact]
+        public void GetGridPoints_StateSpaceLowerBoundEqualToUpperBound_ReturnsSinglePoint()
+        {
+            var gridCalc = new AdaptiveStateSpaceGridCalc(2.0, 0.5, 1.0, new[] {5.0});
+
+            var gridPoints = gridCalc.GetGridPoints(5.0, 5.0);
+
+            Assert.Equal(new[] {5.0}, gridPoints);
+        }
+
+        [Fact]
+        public void GetGridPoints_StateSpaceLowerBoundHigherThanUpperBound_ThrowsArgumentException()
+        {
+            var gridCalc = new AdaptiveStateSpaceGridCalc(2.0, 0.5, 1.0, new double[0]);
+
+            Assert.Throws<ArgumentException>(() => gridCalc.GetGridPoints(10.0, 9.99).ToArray());
+        }
+
+        [Fact]
+        public void Constructor_RefinedSpacingAboveSpacing_ThrowsArgumentException()
+        {
+            Assert.Throws<ArgumentException>(() => new AdaptiveStateSpaceGridCalc(2.0, 2.5, 1.0, new double[0]));
+        }
+
+        [Fact]
+        public void ForStorage_PiecewiseLinearConstraints_BreakpointsEqualConstraintInventories()
+        {
+            var storage = CmdtyStorage<Day>.Builder
+                .WithActiveTimePeriod(new Day(2019, 9, 1), new Day(2019, 10, 1))
+                .WithTimeAndInventoryVaryingInjectWithdrawRatesPiecewiseLinear(new List<InjectWithdrawRangeByInventoryAndPeriod<Day>>
+                {
+                    (period: new Day(2019, 9, 1), injectWithdrawRanges: new List<InjectWithdrawRangeByInventory>
+                    {
+                        (inventory: 0.0, (minInjectWithdrawRate: -44.85, maxInjectWithdrawRate: 56.8)),
+                        (inventory: 300.0, (minInjectWithdrawRate: -45.85, maxInjectWithdrawRate: 54.1)),
+                        (inventory: 1000.0, (minInjectWithdrawRate: -50.1, maxInjectWithdrawRate: 48.9)),
+                    }),
+                    (period: new Day(2019, 9, 20), injectWithdrawRanges: new List<InjectWithdrawRangeByInventory>
+                    {
+                        (inventory: 0.0, (minInjectWithdrawRate: -44.85, maxInjectWithdrawRate: 56.8)),
+                        (inventory: 650.0, (minInjectWithdrawRate: -45.85, maxInjectWithdrawRate: 54.1)),
+                        (inventory: 1000.0, (minInjectWithdrawRate: -50.1, maxInjectWithdrawRate: 48.9)),
+                    }),
+                })
+                .WithPerUnitInjectionCost(0.8, injectionDate => injectionDate)
+                .WithNoCmdtyConsumedOnInject()
+                .WithPerUnitWithdrawalCost(1.2, withdrawalDate => withdrawalDate)
+                .WithNoCmdtyConsumedOnWithdraw()
+                .WithNoCmdtyInventoryLoss()
+                .WithNoInventoryCost()
+                .MustBeEmptyAtEnd()
+                .Build();
+
+            AdaptiveStateSpaceGridCalc gridCalc = AdaptiveStateSpaceGridCalc.ForStorage(storage, 11);
+
+            Assert.Equal(new[] {0.0, 300.0, 650.0, 1000.0}, gridCalc.Breakpoints);
+            Assert.Equal(100.0, gridCalc.Spacing, 12);
+            Assert.Equal(25.0, gridCalc.RefinedSpacing, 12);
+            Assert.Equal(300.0, gridCalc.RefinementWidth, 12);
+
+            AdaptiveStateSpaceGridCalc frozenGridCalc = AdaptiveStateSpaceGridCalc.ForStorage(
+                storage.Freeze(storage.StartPeriod, storage.EndPeriod), 11);
+            Assert.Equal(gridCalc.Breakpoints, frozenGridCalc.Breakpoints);
+        }
+
+        [Fact]
+        public void ForStorage_StorageNotExposingInjectWithdrawConstraints_NoBreakpoints()
+        {
+            var storage = CmdtyStorage<Day>.Builder
+                .WithActiveTimePeriod(new Day(2019, 9, 1), new Day(2019, 10, 1))
+                .WithTimeAndInventoryVaryingInjectWithdrawRatesPiecewiseLinear(new List<InjectWithdrawRangeByInventoryAndPeriod<Day>>
+                {
+                    (period: new Day(2019, 9, 1), injectWithdrawRanges: new List<InjectWithdrawRangeByInventory>
+                    {
+                        (inventory: 0.0, (minInjectWithdrawRate: -44.85, maxInjectWithdrawRate: 56.8)),
+                        (inventory: 300.0, (minInjectWithdrawRate: -45.85, maxInjectWithdrawRate: 54.1)),
+                        (inventory: 1000.0, (minInjectWithdrawRate: -50.1, maxInjectWithdrawRate: 48.9)),
+                    }),
+                })
+                .WithPerUnitInjectionCost(0.8, injectionDate => injectionDate)
+                .WithNoCmdtyConsumedOnInject()
+                .WithPerUnitWithdrawalCost(1.2, withdrawalDate => withdrawalDate)
+                .WithNoCmdtyConsumedOnWithdraw()
+                .WithNoCmdtyInventoryLoss()
+                .WithNoInventoryCost()
+                .MustBeEmptyAtEnd()
+                .Build();
+
+            AdaptiveStateSpaceGridCalc gridCalc = AdaptiveStateSpaceGridCalc.ForStorage(new StorageWrapper(storage), 11);
+
+            Assert.Empty(gridCalc.Breakpoints);
+            Assert.Equal(100.0, gridCalc.Spacing, 12);
+            Assert.Equal(25.0, gridCalc.RefinedSpacing, 12);
+        }
+
+        // Implements only ICmdtyStorage, so the inject/withdraw constraints of the wrapped storage are unknown
+        private sealed class StorageWrapper : ICmdtyStorage<Day>
+        {
+            private readonly ICmdtyStorage<Day> _storage;
+
+            public StorageWrapper(ICmdtyStorage<Day> storage) => _storage = storage;
+
+            public bool MustBeEmptyAtEnd => _storage.MustBeEmptyAtEnd;
+            public Day StartPeriod => _storage.StartPeriod;
+            public Day EndPeriod => _storage.EndPeriod;
+            public InjectWithdrawRange GetInjectWithdrawRange(Day date, double inventory) => _storage.GetInjectWithdrawRange(date, inventory);
+            public double MaxInventory(Day date) => _storage.MaxInventory(date);
+            public double MinInventory(Day date) => _storage.MinInventory(date);
+            public IReadOnlyList<DomesticCashFlow> InjectionCost(Day date, double inventory, double injectedVolume) 
+                => _storage.InjectionCost(date, inventory, injectedVolume);
+            public double CmdtyVolumeConsumedOnInject(Day date, double inventory, double injectedVolume) 
+                => _storage.CmdtyVolumeConsumedOnInject(date, inventory, injectedVolume);
+            public IReadOnlyList<DomesticCashFlow> WithdrawalCost(Day date, double inventory, double withdrawnVolume) 
+                => _storage.WithdrawalCost(date, inventory, withdrawnVolume);
+            public double CmdtyVolumeConsumedOnWithdraw(Day date, double inventory, double withdrawnVolume) 
+                => _storage.CmdtyVolumeConsumedOnWithdraw(date, inventory, withdrawnVolume);
+            public double InventorySpaceUpperBound(Day period, double nextPeriodInventorySpaceLowerBound, double nextPeriodInventorySpaceUpperBound) 
+                => _storage.InventorySpaceUpperBound(period, nextPeriodInventorySpaceLowerBound, nextPeriodInventorySpaceUpperBound);
+            public double InventorySpaceLowerBound(Day period, double nextPeriodInventorySpaceLowerBound, double nextPeriodInventorySpaceUpperBound) 
+                => _storage.InventorySpaceLowerBound(period, nextPeriodInventorySpaceLowerBound, nextPeriodInventorySpaceUpperBound);
+            public double TerminalStorageNpv(double cmdtyPrice, double finalInventory) => _storage.TerminalStorageNpv(cmdtyPrice, finalInventory);
+            public double CmdtyInventoryPercentLoss(Day period) => _storage.CmdtyInventoryPercentLoss(period);
+            public IReadOnlyList<DomesticCashFlow> CmdtyInventoryCost(Day period, double inventory) => _storage.CmdtyInventoryCost(period, inventory);
+        }
+
+    }
+}
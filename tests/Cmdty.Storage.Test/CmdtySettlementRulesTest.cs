@@ -0,0 +1,78 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using Cmdty.TimePeriodValueTypes;
+using Xunit;
+
+namespace Cmdty.Storage.Test
+{
+    public sealed class CmdtySettlementRulesTest
+    {
+        [Fact]
+        public void DaysAfterMonthEnd_ReturnsDayNumDaysAfterEndOfMonthContainingPeriod()
+        {
+            Func<Day, Day> settlementRule = CmdtySettlementRules.DaysAfterMonthEnd<Day>(20);
+            Assert.Equal(new Day(2019, 10, 20), settlementRule(new Day(2019, 9, 2)));
+            Assert.Equal(new Day(2019, 10, 20), settlementRule(new Day(2019, 9, 30)));
+            Assert.Equal(new Day(2020, 3, 20), settlementRule(new Day(2020, 2, 29)));
+        }
+
+        [Fact]
+        public void DaysAfterMonthEnd_QuarterHourPeriod_UsesMonthContainingPeriodStart()
+        {
+            Func<QuarterHour, Day> settlementRule = CmdtySettlementRules.DaysAfterMonthEnd<QuarterHour>(5);
+            var period = TimePeriodFactory.FromDateTime<QuarterHour>(new DateTime(2019, 12, 31, 23, 45, 0));
+            Assert.Equal(new Day(2020, 1, 5), settlementRule(period));
+        }
+
+        [Fact]
+        public void SamePeriod_ReturnsDayContainingPeriodStart()
+        {
+            Func<Hour, Day> settlementRule = CmdtySettlementRules.SamePeriod<Hour>();
+            Assert.Equal(new Day(2019, 9, 2), settlementRule(TimePeriodFactory.FromDateTime<Hour>(new DateTime(2019, 9, 2, 23, 0, 0))));
+        }
+
+        [Fact]
+        public void LookupTable_ReturnsSettlementDayFromTable()
+        {
+            Func<Day, Day> settlementRule = CmdtySettlementRules.LookupTable(new Day(2019, 9, 1), new Day(2019, 10, 1),
+                                                                    new[] {19, 19, 25});
+            Assert.Equal(new Day(2019, 10, 20), settlementRule(new Day(2019, 9, 1)));
+            Assert.Equal(new Day(2019, 10, 20), settlementRule(new Day(2019, 9, 2)));
+            Assert.Equal(new Day(2019, 10, 26), settlementRule(new Day(2019, 9, 3)));
+        }
+
+        [Fact]
+        public void LookupTable_PeriodNotInTable_ThrowsArgumentException()
+        {
+            Func<Day, Day> settlementRule = CmdtySettlementRules.LookupTable(new Day(2019, 9, 1), new Day(2019, 10, 1),
+                                                                    new[] {19, 19, 25});
+            Assert.Throws<ArgumentException>(() => settlementRule(new Day(2019, 9, 4)));
+            Assert.Throws<ArgumentException>(() => settlementRule(new Day(2019, 8, 31)));
+        }
+
+    }
+}
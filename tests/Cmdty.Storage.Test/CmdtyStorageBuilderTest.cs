@@ -1,4 +1,4 @@
-#region License
+﻿#region License
 // Copyright (c) 2019 Jake Fowler
 //
 // Permission is hereby granted, free of charge, to any person 
@@ -23,6 +23,7 @@
 // OTHER DEALINGS IN THE SOFTWARE.
 #endregion
 
+using System;
 using System.Collections.Generic;
 using Cmdty.TimePeriodValueTypes;
 using Xunit;
@@ -195,6 +196,62 @@ public void Build_WithTimeAndInventoryVaryingInjectWithdrawRates_MinAndMaxInvent
 
         }
 
+        [Fact]
+        public void TerminalStorageNpv_WithLinearTerminalInventoryNpv_EqualsPriceTimesInventoryTimesMultiplierMinusFixedCost()
+        {
+            const double priceMultiplier = 0.95;
+            const double fixedCost = 15.4;
+            CmdtyStorage<Day> storage = BuildCmdtyStorageWithTerminalNpv(
+                                builder => builder.WithLinearTerminalInventoryNpv(priceMultiplier, fixedCost));
+
+            foreach (double cmdtyPrice in new[] {0.0, 23.85, 75.9})
+            foreach (double inventory in new[] {500.58, 1100.74})
+            {
+                double expectedNpv = cmdtyPrice * inventory * priceMultiplier - fixedCost;
+                Assert.Equal(expectedNpv, storage.TerminalStorageNpv(cmdtyPrice, inventory));
+            }
+        }
+
+        [Fact]
+        public void TerminalStorageNpv_WithLinearTerminalInventoryNpvZeroInventory_EqualsZero()
+        {
+            CmdtyStorage<Day> storage = BuildCmdtyStorageWithTerminalNpv(
+                                builder => builder.WithLinearTerminalInventoryNpv(0.95, 15.4));
+
+            foreach (double cmdtyPrice in new[] {0.0, 23.85, 75.9})
+                Assert.Equal(0.0, storage.TerminalStorageNpv(cmdtyPrice, 0.0));
+        }
+
+        [Fact]
+        public void TerminalStorageNpv_WithPiecewiseLinearTerminalInventoryNpv_PriceMultiplierLinearlyInterpolatedByInventory()
+        {
+            CmdtyStorage<Day> storage = BuildCmdtyStorageWithTerminalNpv(
+                                builder => builder.WithPiecewiseLinearTerminalInventoryNpv(
+                                    new[] {1000.0, 0.0, 500.0}, new[] {0.8, 1.0, 0.9}));
+
+            const double cmdtyPrice = 23.85;
+            Assert.Equal(cmdtyPrice * 500.0 * 0.9, storage.TerminalStorageNpv(cmdtyPrice, 500.0), 10);
+            Assert.Equal(cmdtyPrice * 250.0 * 0.95, storage.TerminalStorageNpv(cmdtyPrice, 250.0), 10);
+            Assert.Equal(cmdtyPrice * 800.0 * 0.84, storage.TerminalStorageNpv(cmdtyPrice, 800.0), 10);
+        }
+
+        private static CmdtyStorage<Day> BuildCmdtyStorageWithTerminalNpv(
+                    Func<IAddTerminalStorageState<Day>, IBuildCmdtyStorage<Day>> addTerminalStorageState)
+        {
+            IAddTerminalStorageState<Day> builder = CmdtyStorage<Day>.Builder
+                                .WithActiveTimePeriod(new Day(2019, 10, 1), new Day(2019, 11, 1))
+                                .WithConstantInjectWithdrawRange(-ConstantMaxWithdrawRate, ConstantMaxInjectRate)
+                                .WithConstantMinInventory(ConstantMinInventory)
+                                .WithConstantMaxInventory(ConstantMaxInventory)
+                                .WithPerUnitInjectionCost(ConstantInjectionCost, injectionDate => injectionDate)
+                                .WithNoCmdtyConsumedOnInject()
+                                .WithPerUnitWithdrawalCost(ConstantWithdrawalCost, withdrawalDate => withdrawalDate)
+                                .WithNoCmdtyConsumedOnWithdraw()
+                                .WithNoCmdtyInventoryLoss()
+                                .WithNoInventoryCost();
+            return addTerminalStorageState(builder).Build();
+        }
+
 
 
     }
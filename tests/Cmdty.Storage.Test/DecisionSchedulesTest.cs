@@ -0,0 +1,77 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Linq;
+using Cmdty.TimePeriodValueTypes;
+using Xunit;
+
+namespace Cmdty.Storage.Test
+{
+    public sealed class DecisionSchedulesTest
+    {
+        [Fact]
+        public void EveryNPeriods_ReturnsTrueForPeriodsMultipleOfNPeriodsFromFirstPeriod()
+        {
+            Func<Day, bool> isDecisionPeriod = DecisionSchedules.EveryNPeriods(new Day(2019, 9, 2), 7);
+            Assert.True(isDecisionPeriod(new Day(2019, 9, 2)));
+            Assert.False(isDecisionPeriod(new Day(2019, 9, 3)));
+            Assert.False(isDecisionPeriod(new Day(2019, 9, 8)));
+            Assert.True(isDecisionPeriod(new Day(2019, 9, 9)));
+            Assert.True(isDecisionPeriod(new Day(2019, 9, 23)));
+        }
+
+        [Fact]
+        public void EveryNPeriods_NumPeriodsLessThanOne_ThrowsArgumentException()
+        {
+            Assert.Throws<ArgumentException>(() => DecisionSchedules.EveryNPeriods(new Day(2019, 9, 2), 0));
+        }
+
+        [Fact]
+        public void LookupTable_ReturnsTrueForDecisionPeriodOffsets()
+        {
+            var firstPeriod = TimePeriodFactory.FromDateTime<Hour>(new DateTime(2019, 9, 2, 0, 0, 0));
+            Func<Hour, bool> isDecisionPeriod = DecisionSchedules.LookupTable(firstPeriod, 12, new[] {0, 4, 8});
+            bool[] expected = Enumerable.Range(0, 12).Select(offset => offset % 4 == 0).ToArray();
+            Assert.Equal(expected, Enumerable.Range(0, 12).Select(offset => isDecisionPeriod(firstPeriod.Offset(offset))));
+        }
+
+        [Fact]
+        public void LookupTable_DecisionPeriodOffsetOutsideTable_ThrowsArgumentException()
+        {
+            Assert.Throws<ArgumentException>(() => DecisionSchedules.LookupTable(new Day(2019, 9, 1), 3, new[] {0, 3}));
+            Assert.Throws<ArgumentException>(() => DecisionSchedules.LookupTable(new Day(2019, 9, 1), 3, new[] {-1}));
+        }
+
+        [Fact]
+        public void LookupTable_PeriodNotInTable_ThrowsArgumentException()
+        {
+            Func<Day, bool> isDecisionPeriod = DecisionSchedules.LookupTable(new Day(2019, 9, 1), 3, new[] {0, 2});
+            Assert.Throws<ArgumentException>(() => isDecisionPeriod(new Day(2019, 9, 4)));
+            Assert.Throws<ArgumentException>(() => isDecisionPeriod(new Day(2019, 8, 31)));
+        }
+
+    }
+}
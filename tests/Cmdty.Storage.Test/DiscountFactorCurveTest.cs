@@ -0,0 +1,78 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using Cmdty.TimePeriodValueTypes;
+using Cmdty.TimeSeries;
+using Xunit;
+
+namespace Cmdty.Storage.Test
+{
+    public sealed class DiscountFactorCurveTest
+    {
+        private static readonly Day PresentDay = new Day(2019, 9, 1);
+
+        [Fact]
+        public void FromAct365ContinuouslyCompoundedInterestRateCurve_DiscountFactorEqualsExpOfRateTimesYearFraction()
+        {
+            var interestRates = new TimeSeries<Day, double>(PresentDay, new[] {0.01, 0.02, 0.03, 0.04});
+            var discountFactorCurve = DiscountFactorCurve.FromAct365ContinuouslyCompoundedInterestRateCurve(PresentDay, interestRates);
+
+            Assert.Equal(Math.Exp(-1 / 365.0 * 0.02), discountFactorCurve.DiscountFactor(PresentDay.Offset(1)), 12);
+            Assert.Equal(Math.Exp(-3 / 365.0 * 0.04), discountFactorCurve.DiscountFactor(PresentDay.Offset(3)), 12);
+        }
+
+        [Fact]
+        public void DiscountFactor_CashFlowDayNotAfterPresentDay_ReturnsOne()
+        {
+            var discountFactorCurve = new DiscountFactorCurve(PresentDay, new[] {1.0, 0.99});
+            Assert.Equal(1.0, discountFactorCurve.DiscountFactor(PresentDay));
+            Assert.Equal(1.0, discountFactorCurve.DiscountFactor(PresentDay.Offset(-10)));
+        }
+
+        [Fact]
+        public void DiscountFactor_CashFlowDayAfterCurveEnd_ThrowsArgumentException()
+        {
+            var discountFactorCurve = new DiscountFactorCurve(PresentDay, new[] {1.0, 0.99});
+            Assert.Throws<ArgumentException>(() => discountFactorCurve.DiscountFactor(PresentDay.Offset(2)));
+        }
+
+        [Fact]
+        public void DiscountFactor_CashFlowDayWithNaNDiscountFactor_ThrowsArgumentException()
+        {
+            var discountFactorCurve = new DiscountFactorCurve(PresentDay, new[] {1.0, double.NaN, 0.98});
+            Assert.Throws<ArgumentException>(() => discountFactorCurve.DiscountFactor(PresentDay.Offset(1)));
+            Assert.Equal(0.98, discountFactorCurve.DiscountFactor(PresentDay.Offset(2)));
+        }
+
+        [Fact]
+        public void DiscountFactor_PresentDayDifferentToCurvePresentDay_ThrowsArgumentException()
+        {
+            var discountFactorCurve = new DiscountFactorCurve(PresentDay, new[] {1.0, 0.99});
+            Assert.Throws<ArgumentException>(() => discountFactorCurve.DiscountFactor(PresentDay.Offset(1), PresentDay.Offset(1)));
+        }
+
+    }
+}
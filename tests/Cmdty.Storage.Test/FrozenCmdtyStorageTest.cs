@@ -0,0 +1,169 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Collections.Generic;
+using System.Linq;
+using Cmdty.TimePeriodValueTypes;
+using Cmdty.TimeSeries;
+using Xunit;
+
+namespace Cmdty.Storage.Test
+{
+    public sealed class FrozenCmdtyStorageTest
+    {
+        private static readonly Day StorageStart = new Day(2019, 9, 1);
+        private static readonly Day StorageEnd = new Day(2019, 9, 30);
+
+        private static CmdtyStorage<Day> CreateStorage()
+        {
+            var injectWithdrawRanges = new List<InjectWithdrawRangeByInventoryAndPeriod<Day>>
+            {
+                (period: StorageStart, injectWithdrawRanges: new List<InjectWithdrawRangeByInventory>
+                {
+                    (inventory: 0.0, (minInjectWithdrawRate: -44.85, maxInjectWithdrawRate: 56.8)),
+                    (inventory: 1000.0, (minInjectWithdrawRate: -78.5, maxInjectWithdrawRate: 40.5))
+                }),
+                (period: new Day(2019, 9, 20), injectWithdrawRanges: new List<InjectWithdrawRangeByInventory>
+                {
+                    (inventory: 0.0, (minInjectWithdrawRate: -40.0, maxInjectWithdrawRate: 50.0)),
+                    (inventory: 1000.0, (minInjectWithdrawRate: -70.0, maxInjectWithdrawRate: 38.0))
+                })
+            };
+
+            return CmdtyStorage<Day>.Builder
+                .WithActiveTimePeriod(StorageStart, StorageEnd)
+                .WithTimeAndInventoryVaryingInjectWithdrawRatesPiecewiseLinear(injectWithdrawRanges)
+                .WithPerUnitInjectionCost(0.8, injectionDate => injectionDate.Offset(5))
+                .WithFixedPercentCmdtyConsumedOnInject(0.01)
+                .WithPerUnitWithdrawalCost(1.2)
+                .WithFixedPercentCmdtyConsumedOnWithdraw(0.008)
+                .WithFixedPercentCmdtyInventoryLoss(0.001)
+                .WithFixedPerUnitInventoryCost(0.05)
+                .WithTerminalInventoryNpv((cmdtyPrice, inventory) => cmdtyPrice * inventory - 10.0)
+                .Build();
+        }
+
+        [Fact]
+        public void Freeze_EvaluatesConstraintsAndCostsEqualToStorage()
+        {
+            CmdtyStorage<Day> storage = CreateStorage();
+            FrozenCmdtyStorage<Day> frozenStorage = storage.Freeze(StorageStart, StorageEnd);
+            Func<Day, double> discountFactors = day => Math.Exp(-0.01 * day.OffsetFrom(StorageStart) / 365.0);
+
+            const double inventory = 500.0;
+            foreach (Day period in StorageStart.EnumerateTo(StorageEnd.Offset(-1)))
+            {
+                Assert.Equal(storage.MinInventory(period), frozenStorage.MinInventory(period));
+                Assert.Equal(storage.MaxInventory(period), frozenStorage.MaxInventory(period));
+                Assert.Equal(storage.CmdtyInventoryPercentLoss(period), frozenStorage.CmdtyInventoryPercentLoss(period));
+                InjectWithdrawRange injectWithdrawRange = storage.GetInjectWithdrawRange(period, inventory);
+                InjectWithdrawRange frozenInjectWithdrawRange = frozenStorage.GetInjectWithdrawRange(period, inventory);
+                Assert.Equal(injectWithdrawRange.MinInjectWithdrawRate, frozenInjectWithdrawRange.MinInjectWithdrawRate);
+                Assert.Equal(injectWithdrawRange.MaxInjectWithdrawRate, frozenInjectWithdrawRange.MaxInjectWithdrawRate);
+                Assert.Equal(storage.InventorySpaceUpperBound(period, 100.0, 800.0), frozenStorage.InventorySpaceUpperBound(period, 100.0, 800.0));
+                Assert.Equal(storage.InventorySpaceLowerBound(period, 100.0, 800.0), frozenStorage.InventorySpaceLowerBound(period, 100.0, 800.0));
+                Assert.Equal(storage.CmdtyVolumeConsumedOnInject(period, inventory, 25.0), 
+                                frozenStorage.CmdtyVolumeConsumedOnInject(period, inventory, 25.0));
+                Assert.Equal(storage.CmdtyVolumeConsumedOnWithdraw(period, inventory, 25.0), 
+                                frozenStorage.CmdtyVolumeConsumedOnWithdraw(period, inventory, 25.0));
+                Assert.Equal(CashFlowsNpv(storage.InjectionCost(period, inventory, 25.0), discountFactors),
+                                frozenStorage.InjectionCostNpv(period, inventory, 25.0, discountFactors));
+                Assert.Equal(CashFlowsNpv(storage.WithdrawalCost(period, inventory, 25.0), discountFactors),
+                                frozenStorage.WithdrawalCostNpv(period, inventory, 25.0, discountFactors));
+                Assert.Equal(CashFlowsNpv(storage.CmdtyInventoryCost(period, inventory), discountFactors),
+                                frozenStorage.InventoryCostNpv(period, inventory, discountFactors));
+            }
+
+            Assert.Equal(0.0, frozenStorage.GetInjectWithdrawRange(StorageEnd, inventory).MinInjectWithdrawRate);
+            Assert.Equal(0.0, frozenStorage.GetInjectWithdrawRange(StorageEnd, inventory).MaxInjectWithdrawRate);
+        }
+
+        [Fact]
+        public void Freeze_PeriodsOutsideFrozenRange_EvaluatedByStorage()
+        {
+            CmdtyStorage<Day> storage = CreateStorage();
+            var frozenStart = new Day(2019, 9, 10);
+            FrozenCmdtyStorage<Day> frozenStorage = storage.Freeze(frozenStart, new Day(2019, 9, 25));
+            Func<Day, double> discountFactors = day => 0.99;
+
+            Day period = new Day(2019, 9, 5);
+            Assert.Equal(storage.MaxInventory(period), frozenStorage.MaxInventory(period));
+            Assert.Equal(storage.GetInjectWithdrawRange(period, 500.0).MaxInjectWithdrawRate, 
+                            frozenStorage.GetInjectWithdrawRange(period, 500.0).MaxInjectWithdrawRate);
+            Assert.Equal(CashFlowsNpv(storage.InjectionCost(period, 500.0, 25.0), discountFactors),
+                            frozenStorage.InjectionCostNpv(period, 500.0, 25.0, discountFactors));
+            Assert.Equal(0.0, frozenStorage.GetInjectWithdrawRange(StorageEnd, 500.0).MaxInjectWithdrawRate);
+        }
+
+        [Fact]
+        public void Freeze_StartBeforeStorageStart_ThrowsArgumentException()
+        {
+            CmdtyStorage<Day> storage = CreateStorage();
+            Assert.Throws<ArgumentException>(() => storage.Freeze(StorageStart.Offset(-1), StorageEnd));
+        }
+
+        [Fact]
+        public void Freeze_EndAfterStorageEnd_ThrowsArgumentException()
+        {
+            CmdtyStorage<Day> storage = CreateStorage();
+            Assert.Throws<ArgumentException>(() => storage.Freeze(StorageStart, StorageEnd.Offset(1)));
+        }
+
+        [Fact]
+        public void IntrinsicValuation_FrozenStorage_EqualsStorageValuation()
+        {
+            CmdtyStorage<Day> storage = CreateStorage();
+            var currentPeriod = new Day(2019, 9, 3);
+            TimeSeries<Day, double> forwardCurve = new TimeSeries<Day, double>(StorageStart,
+                                StorageStart.EnumerateTo(StorageEnd).Select(day => 50.0 + 3.0 * Math.Sin(day.OffsetFrom(StorageStart) / 3.0)));
+
+            IntrinsicStorageValuationResults<Day> Value(ICmdtyStorage<Day> storageToValue) => IntrinsicStorageValuation<Day>
+                .ForStorage(storageToValue)
+                .WithStartingInventory(150.0)
+                .ForCurrentPeriod(currentPeriod)
+                .WithForwardCurve(forwardCurve)
+                .WithCmdtySettlementRule(day => day.Offset(10))
+                .WithDiscountFactorFunc((valuationDate, cashFlowDate) => Math.Exp(-0.02 * cashFlowDate.OffsetFrom(valuationDate) / 365.0))
+                .WithFixedGridSpacing(10.0)
+                .WithLinearInventorySpaceInterpolation()
+                .WithNumericalTolerance(1E-10)
+                .Calculate();
+
+            IntrinsicStorageValuationResults<Day> valuationResults = Value(storage);
+            IntrinsicStorageValuationResults<Day> frozenValuationResults = Value(storage.Freeze(currentPeriod, StorageEnd));
+
+            Assert.Equal(valuationResults.NetPresentValue, frozenValuationResults.NetPresentValue);
+            Assert.Equal(valuationResults.StorageProfile.Select(profile => profile.Value.InjectWithdrawVolume),
+                            frozenValuationResults.StorageProfile.Select(profile => profile.Value.InjectWithdrawVolume));
+        }
+
+        private static double CashFlowsNpv(IReadOnlyList<DomesticCashFlow> cashFlows, Func<Day, double> discountFactors)
+        {
+            return cashFlows.Sum(cashFlow => cashFlow.Amount * discountFactors(cashFlow.Date));
+        }
+
+    }
+}
@@ -23,6 +23,7 @@
 // OTHER DEALINGS IN THE SOFTWARE.
 #endregion
 
+using System;
 using System.Linq;
 using Cmdty.TimePeriodValueTypes;
 using Cmdty.TimeSeries;
@@ -35,18 +36,37 @@ namespace Cmdty.Storage.Test
     public sealed class IntrinsicStorageValuationTest
     {
 
+        private static readonly TimeSeries<Month, Day> SettlementDates = new TimeSeries<Month, Day>.Builder
+            {
+                {new Month(2019, 9),  new Day(2019, 10, 5)}
+            }.Build();
+
         private static IntrinsicStorageValuationResults<Day> GenerateValuationResults(double startingInventory, 
                                                                         TimeSeries<Day, double> forwardCurve, Day currentPeriod)
+        {
+            CmdtyStorage<Day> storage = CreateSeptemberStorage();
+
+            IntrinsicStorageValuationResults<Day> valuationResults = IntrinsicStorageValuation<Day>
+                .ForStorage(storage)
+                .WithStartingInventory(startingInventory)
+                .ForCurrentPeriod(currentPeriod)
+                .WithForwardCurve(forwardCurve)
+                .WithMonthlySettlement(SettlementDates)
+                .WithDiscountFactorFunc((valuationDate, cashFlowDate) => 1.0) // No discounting
+                .WithFixedGridSpacing(10.0)
+                .WithLinearInventorySpaceInterpolation()
+                .WithNumericalTolerance(1E-10)
+                .Calculate();
+
+            return valuationResults;
+        }
+
+        private static CmdtyStorage<Day> CreateSeptemberStorage()
         {
             var storageStart = new Day(2019, 9, 1);
             var storageEnd = new Day(2019, 9, 30);
 
-            TimeSeries<Month, Day> settlementDates = new TimeSeries<Month, Day>.Builder
-                {
-                    {new Month(2019, 9),  new Day(2019, 10, 5)}
-                }.Build();
-
-            CmdtyStorage<Day> storage = CmdtyStorage<Day>.Builder
+            return CmdtyStorage<Day>.Builder
                 .WithActiveTimePeriod(storageStart, storageEnd)
                 .WithConstantInjectWithdrawRange(-45.5, 56.6)
                 .WithConstantMinInventory(0.0)
@@ -59,20 +79,6 @@ public sealed class IntrinsicStorageValuationTest
                 .WithNoInventoryCost()
                 .MustBeEmptyAtEnd()
                 .Build();
-
-            IntrinsicStorageValuationResults<Day> valuationResults = IntrinsicStorageValuation<Day>
-                .ForStorage(storage)
-                .WithStartingInventory(startingInventory)
-                .ForCurrentPeriod(currentPeriod)
-                .WithForwardCurve(forwardCurve)
-                .WithMonthlySettlement(settlementDates)
-                .WithDiscountFactorFunc((valuationDate, cashFlowDate) => 1.0) // No discounting
-                .WithFixedGridSpacing(10.0)
-                .WithLinearInventorySpaceInterpolation()
-                .WithNumericalTolerance(1E-10)
-                .Calculate();
-
-            return valuationResults;
         }
 
         private static TimeSeries<Day, double> GenerateBackwardatedCurve(Day storageStart, Day storageEnd)
@@ -127,6 +133,154 @@ public void Calculate_ZeroInventoryCurveBackwardated_ResultWithZerosDecisionProf
                                 new Day(2019, 9, 29));
         }
 
+        [Fact]
+        public void GetStorageProfileArrays_EqualToStorageProfileData()
+        {
+            var valuationResults = IntrinsicValuationZeroInventoryForwardCurveWithSpread(2.01);
+
+            StorageProfileArrays profileArrays = valuationResults.GetStorageProfileArrays();
+
+            Assert.Equal(valuationResults.StorageProfile.Count, profileArrays.Count);
+            for (int i = 0; i < profileArrays.Count; i++)
+            {
+                StorageProfile storageProfile = valuationResults.StorageProfile[i];
+                Assert.Equal(storageProfile.Inventory, profileArrays.Inventory[i]);
+                Assert.Equal(storageProfile.InjectWithdrawVolume, profileArrays.InjectWithdrawVolume[i]);
+                Assert.Equal(storageProfile.CmdtyConsumed, profileArrays.CmdtyConsumed[i]);
+                Assert.Equal(storageProfile.InventoryLoss, profileArrays.InventoryLoss[i]);
+                Assert.Equal(storageProfile.NetPosition, profileArrays.NetPosition[i]);
+            }
+        }
+
+        [Fact]
+        public void CalculateBatch_EqualToCalculateForEachScenario()
+        {
+            var currentPeriod = new Day(2019, 9, 15);
+            TimeSeries<Day, double> backwardatedCurve = GenerateBackwardatedCurve(new Day(2019, 9, 1), new Day(2019, 9, 30));
+            TimeSeries<Day, double> contangoCurve = new TimeSeries<Day, double>(backwardatedCurve.Start, 
+                                                            backwardatedCurve.Data.Reverse().ToArray());
+            var startingInventories = new[] {0.0, 150.0, 430.5};
+            var forwardCurves = new[] {backwardatedCurve, contangoCurve, backwardatedCurve};
+
+            IntrinsicStorageValuationResults<Day>[] batchResults = IntrinsicStorageValuation<Day>
+                .ForStorage(CreateSeptemberStorage())
+                .WithStartingInventory(startingInventories[0])
+                .ForCurrentPeriod(currentPeriod)
+                .WithForwardCurve(forwardCurves[0])
+                .WithMonthlySettlement(SettlementDates)
+                .WithDiscountFactorFunc((valuationDate, cashFlowDate) => 1.0) // No discounting
+                .WithFixedGridSpacing(10.0)
+                .WithLinearInventorySpaceInterpolation()
+                .WithNumericalTolerance(1E-10)
+                .CalculateBatch(startingInventories, forwardCurves);
+
+            Assert.Equal(startingInventories.Length, batchResults.Length);
+            for (int i = 0; i < startingInventories.Length; i++)
+            {
+                IntrinsicStorageValuationResults<Day> singleResults = 
+                    GenerateValuationResults(startingInventories[i], forwardCurves[i], currentPeriod);
+                Assert.Equal(singleResults.NetPresentValue, batchResults[i].NetPresentValue);
+                Assert.Equal(singleResults.StorageProfile.Indices, batchResults[i].StorageProfile.Indices);
+                StorageProfileArrays singleProfile = singleResults.GetStorageProfileArrays();
+                StorageProfileArrays batchProfile = batchResults[i].GetStorageProfileArrays();
+                Assert.Equal(singleProfile.Inventory, batchProfile.Inventory);
+                Assert.Equal(singleProfile.InjectWithdrawVolume, batchProfile.InjectWithdrawVolume);
+                Assert.Equal(singleProfile.NetPosition, batchProfile.NetPosition);
+            }
+        }
+
+        private static IntrinsicStorageValuationResults<Day> GenerateValuationResultsWithDecisionSchedule(double startingInventory,
+                                    TimeSeries<Day, double> forwardCurve, Day currentPeriod, Func<Day, bool> isDecisionPeriod)
+        {
+            return IntrinsicStorageValuation<Day>
+                .ForStorage(CreateSeptemberStorage())
+                .WithStartingInventory(startingInventory)
+                .ForCurrentPeriod(currentPeriod)
+                .WithForwardCurve(forwardCurve)
+                .WithMonthlySettlement(SettlementDates)
+                .WithDiscountFactorFunc((valuationDate, cashFlowDate) => 1.0) // No discounting
+                .WithFixedGridSpacing(10.0)
+                .WithLinearInventorySpaceInterpolation()
+                .WithNumericalTolerance(1E-10)
+                .WithDecisionSchedule(isDecisionPeriod)
+                .Calculate();
+        }
+
+        [Fact]
+        public void Calculate_DecisionScheduleEveryPeriod_EqualToCalculateWithoutDecisionSchedule()
+        {
+            var currentPeriod = new Day(2019, 9, 15);
+            const double startingInventory = 150.0;
+            TimeSeries<Day, double> forwardCurve = GenerateBackwardatedCurve(new Day(2019, 9, 1), new Day(2019, 9, 30));
+
+            IntrinsicStorageValuationResults<Day> results = GenerateValuationResults(startingInventory, forwardCurve, currentPeriod);
+            IntrinsicStorageValuationResults<Day> decisionScheduleResults = GenerateValuationResultsWithDecisionSchedule(
+                    startingInventory, forwardCurve, currentPeriod, DecisionSchedules.EveryNPeriods(currentPeriod, 1));
+
+            Assert.Equal(results.NetPresentValue, decisionScheduleResults.NetPresentValue, 10);
+            Assert.Equal(results.StorageProfile.Indices, decisionScheduleResults.StorageProfile.Indices);
+            StorageProfileArrays profile = results.GetStorageProfileArrays();
+            StorageProfileArrays decisionScheduleProfile = decisionScheduleResults.GetStorageProfileArrays();
+            Assert.Equal(profile.InjectWithdrawVolume, decisionScheduleProfile.InjectWithdrawVolume);
+            Assert.Equal(profile.Inventory, decisionScheduleProfile.Inventory);
+        }
+
+        [Fact]
+        public void Calculate_WithDecisionSchedule_InjectWithdrawVolumeConstantWithinDecisionBlocks()
+        {
+            var currentPeriod = new Day(2019, 9, 10);
+            TimeSeries<Day, double> backwardatedCurve = GenerateBackwardatedCurve(new Day(2019, 9, 1), new Day(2019, 9, 30));
+            var contangoCurve = new TimeSeries<Day, double>(backwardatedCurve.Start, backwardatedCurve.Data.Reverse().ToArray());
+            Func<Day, bool> isDecisionPeriod = DecisionSchedules.EveryNPeriods(new Day(2019, 9, 1), 7);
+
+            IntrinsicStorageValuationResults<Day> results = GenerateValuationResultsWithDecisionSchedule(0.0, contangoCurve, 
+                                                                        currentPeriod, isDecisionPeriod);
+
+            Assert.Equal(currentPeriod, results.StorageProfile.Start);
+            Assert.Equal(new Day(2019, 9, 29), results.StorageProfile.End);
+            Assert.True(results.StorageProfile.Data.Any(profile => profile.InjectWithdrawVolume != 0.0));
+            foreach (Day period in currentPeriod.Offset(1).EnumerateTo(results.StorageProfile.End))
+            {
+                if (!isDecisionPeriod(period))
+                    Assert.Equal(results.StorageProfile[period.Offset(-1)].InjectWithdrawVolume, 
+                                    results.StorageProfile[period].InjectWithdrawVolume);
+            }
+            Assert.Equal(0.0, results.StorageProfile[results.StorageProfile.End].Inventory, 8);
+        }
+
+        [Fact]
+        public void Calculate_WithDiscountFactorCurve_EqualToWithAct365ContinuouslyCompoundedInterestRateCurve()
+        {
+            var currentPeriod = new Day(2019, 9, 15);
+            const double startingInventory = 150.0;
+            TimeSeries<Day, double> forwardCurve = GenerateBackwardatedCurve(new Day(2019, 9, 1), new Day(2019, 9, 30));
+            var interestRates = new TimeSeries<Day, double>(currentPeriod, 
+                                    Enumerable.Range(0, 30).Select(i => 0.005 + i * 0.0001).ToArray());
+
+            IntrinsicStorageValuationResults<Day> Calculate(Func<IIntrinsicAddDiscountFactorFunc<Day>, 
+                                                            IIntrinsicAddInventoryGridCalculation<Day>> addDiscounting)
+            {
+                return addDiscounting(IntrinsicStorageValuation<Day>
+                        .ForStorage(CreateSeptemberStorage())
+                        .WithStartingInventory(startingInventory)
+                        .ForCurrentPeriod(currentPeriod)
+                        .WithForwardCurve(forwardCurve)
+                        .WithMonthlySettlement(SettlementDates))
+                    .WithFixedGridSpacing(10.0)
+                    .WithLinearInventorySpaceInterpolation()
+                    .WithNumericalTolerance(1E-10)
+                    .Calculate();
+            }
+
+            IntrinsicStorageValuationResults<Day> interestRateCurveResults = 
+                Calculate(add => add.WithAct365ContinuouslyCompoundedInterestRateCurve(interestRates));
+            IntrinsicStorageValuationResults<Day> discountFactorCurveResults = 
+                Calculate(add => add.WithDiscountFactorCurve(
+                    DiscountFactorCurve.FromAct365ContinuouslyCompoundedInterestRateCurve(currentPeriod, interestRates)));
+
+            Assert.Equal(interestRateCurveResults.NetPresentValue, discountFactorCurveResults.NetPresentValue, 10);
+        }
+
         [Fact]
         public void Calculate_ZeroInventoryForwardSpreadLessThanCycleCost_ResultWithZeroNetPresentValue()
         {
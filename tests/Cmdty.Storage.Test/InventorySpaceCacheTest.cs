@@ -0,0 +1,101 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using Cmdty.TimePeriodValueTypes;
+using Cmdty.TimeSeries;
+using Xunit;
+
+namespace Cmdty.Storage.Test
+{
+    public sealed class InventorySpaceCacheTest
+    {
+        [Fact]
+        public void GetOrAdd_CapacityExceeded_EvictsLeastRecentlyUsed()
+        {
+            var cache = new InventorySpaceCache<Day>(2);
+            var period = new Day(2019, 8, 1);
+            int numCalculations = 0;
+            Func<TimeSeries<Day, InventoryRange>> calculateInventorySpace = () =>
+            {
+                numCalculations++;
+                return new TimeSeries<Day, InventoryRange>(period, new[] { new InventoryRange(0.0, 10.0) });
+            };
+
+            cache.GetOrAdd(1.0, period, calculateInventorySpace);
+            cache.GetOrAdd(2.0, period, calculateInventorySpace);
+            cache.GetOrAdd(1.0, period, calculateInventorySpace); // Makes 2.0 least recently used
+            cache.GetOrAdd(3.0, period, calculateInventorySpace); // Evicts 2.0
+            cache.GetOrAdd(1.0, period, calculateInventorySpace);
+            cache.GetOrAdd(2.0, period, calculateInventorySpace);
+
+            Assert.Equal(4, numCalculations);
+            Assert.Equal(2, cache.Hits);
+            Assert.Equal(4, cache.Misses);
+            Assert.Equal(2, cache.Count);
+        }
+
+        [Fact]
+        public void GetOrAdd_ZeroCapacity_AlwaysCalculates()
+        {
+            var cache = new InventorySpaceCache<Day>(0);
+            var period = new Day(2019, 8, 1);
+            int numCalculations = 0;
+            Func<TimeSeries<Day, InventoryRange>> calculateInventorySpace = () =>
+            {
+                numCalculations++;
+                return new TimeSeries<Day, InventoryRange>(period, new[] { new InventoryRange(0.0, 10.0) });
+            };
+
+            cache.GetOrAdd(1.0, period, calculateInventorySpace);
+            cache.GetOrAdd(1.0, period, calculateInventorySpace);
+
+            Assert.Equal(2, numCalculations);
+            Assert.Equal(0, cache.Count);
+        }
+
+        [Fact]
+        public void Clear_ResetsEntriesAndCounters()
+        {
+            var cache = new InventorySpaceCache<Day>();
+            var period = new Day(2019, 8, 1);
+            cache.GetOrAdd(1.0, period, () => new TimeSeries<Day, InventoryRange>(period, new[] { new InventoryRange(0.0, 10.0) }));
+            cache.GetOrAdd(1.0, period, () => new TimeSeries<Day, InventoryRange>(period, new[] { new InventoryRange(0.0, 10.0) }));
+
+            cache.Clear();
+
+            Assert.Equal(0, cache.Count);
+            Assert.Equal(0, cache.Hits);
+            Assert.Equal(0, cache.Misses);
+        }
+
+        [Fact]
+        public void Constructor_NegativeCapacity_ThrowsArgumentException()
+        {
+            Assert.Throws<ArgumentException>(() => new InventorySpaceCache<Day>(-1));
+        }
+
+    }
+}
@@ -0,0 +1,109 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Linq;
+using MathNet.Numerics.Interpolation;
+using Xunit;
+
+namespace Cmdty.Storage.Test
+{
+    public sealed class LinearInterpolatorTest
+    {
+        [Fact]
+        public void Constructor_EvenlySpacedXCoords_IsUniformGridTrue()
+        {
+            var linearInterpolator = new LinearInterpolator(new[] {0.0, 2.5, 5.0, 7.5, 10.0}, new[] {1.0, 2.0, 3.0, 2.0, 1.0});
+            Assert.True(linearInterpolator.IsUniformGrid);
+        }
+
+        [Fact]
+        public void Constructor_EvenlySpacedExceptShorterLastSegment_IsUniformGridTrue()
+        {
+            var linearInterpolator = new LinearInterpolator(new[] {0.0, 2.5, 5.0, 7.5, 8.0}, new[] {1.0, 2.0, 3.0, 2.0, 1.0});
+            Assert.True(linearInterpolator.IsUniformGrid);
+        }
+
+        [Fact]
+        public void Constructor_UnevenlySpacedXCoords_IsUniformGridFalse()
+        {
+            var linearInterpolator = new LinearInterpolator(new[] {0.0, 2.5, 4.0, 7.5, 10.0}, new[] {1.0, 2.0, 3.0, 2.0, 1.0});
+            Assert.False(linearInterpolator.IsUniformGrid);
+        }
+
+        [Fact]
+        public void Constructor_DifferentNumberOfXAndYCoords_ThrowsArgumentException()
+        {
+            Assert.Throws<ArgumentException>(() => new LinearInterpolator(new[] {0.0, 1.0, 2.0}, new[] {1.0, 2.0}));
+        }
+
+        [Fact]
+        public void Interpolate_UnsortedXCoords_InterpolatesSortedCoords()
+        {
+            var linearInterpolator = new LinearInterpolator(new[] {3.0, 1.0, 2.0}, new[] {30.0, 10.0, 25.0});
+            Assert.Equal(17.5, linearInterpolator.Interpolate(1.5));
+            Assert.Equal(27.5, linearInterpolator.Interpolate(2.5));
+        }
+
+        [Fact]
+        public void Interpolate_SinglePoint_ReturnsSingleYCoord()
+        {
+            var linearInterpolator = new LinearInterpolator(new[] {5.0}, new[] {12.5});
+            Assert.Equal(12.5, linearInterpolator.Interpolate(-100.0));
+            Assert.Equal(12.5, linearInterpolator.Interpolate(100.0));
+        }
+
+        [Fact]
+        public void Interpolate_OutsideXCoords_ExtrapolatesFromEndSegments()
+        {
+            var linearInterpolator = new LinearInterpolator(new[] {1.0, 2.0, 3.0}, new[] {10.0, 20.0, 40.0});
+            Assert.Equal(0.0, linearInterpolator.Interpolate(0.0));
+            Assert.Equal(60.0, linearInterpolator.Interpolate(4.0));
+        }
+
+        [Fact]
+        public void Interpolate_UniformAndNonUniformGrids_EqualToMathNetLinearSpline()
+        {
+            var random = new Random(12);
+            foreach (bool uniformGrid in new[] {true, false})
+            {
+                double[] xCoords = Enumerable.Range(0, 101)
+                    .Select(i => 150.0 + i * 12.3 + (uniformGrid ? 0.0 : random.NextDouble() * 5.0)).ToArray();
+                xCoords[100] = xCoords[99] + 4.1; // Shorter last segment as created by FixedSpacingStateSpaceGridCalc
+                double[] yCoords = xCoords.Select(x => 1000.0 * Math.Sin(x / 100.0)).ToArray();
+
+                var linearInterpolator = new LinearInterpolator(xCoords, yCoords);
+                Assert.Equal(uniformGrid, linearInterpolator.IsUniformGrid);
+                LinearSpline linearSpline = LinearSpline.InterpolateSorted(xCoords, yCoords);
+
+                double[] xs = xCoords.Concat(Enumerable.Range(0, 1000)
+                    .Select(i => 100.0 + random.NextDouble() * 1400.0)).ToArray();
+                foreach (double x in xs)
+                    Assert.Equal(linearSpline.Interpolate(x), linearInterpolator.Interpolate(x));
+            }
+        }
+
+    }
+}
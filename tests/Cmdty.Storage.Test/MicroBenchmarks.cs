@@ -0,0 +1,200 @@
+﻿#region License
+// Copyright (c) 2020 Jake Fowler
+//
+// Permission is hereby granted, free of charge, to any person 
+// obtaining a copy of this software and associated documentation 
+// files (the "Software"), to deal in the Software without 
+// restriction, including without limitation the rights to use, 
+// copy, modify, merge, publish, distribute, sublicense, and/or sell 
+// copies of the Software, and to permit persons to whom the 
+// Software is furnished to do so, subject to the following 
+// conditions:
+//
+// The above copyright notice and this permission notice shall be 
+// included in all copies or substantial portions of the Software.
+//
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, 
+// EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES 
+// OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND 
+// NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT 
+// HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, 
+// WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING 
+// FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR 
+// OTHER DEALINGS IN THE SOFTWARE.
+#endregion
+
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Linq;
+using MathNet.Numerics.Interpolation;
+using Xunit;
+using Xunit.Abstractions;
+
+namespace Cmdty.Storage.Test
+{
+    /// <summary>
+    /// Micro-benchmarks of optimised implementations against the reference implementations of their test classes.
+    /// Timings depend on the machine so are written to the test output rather than asserted on, and the benchmarks are
+    /// skipped in test runs, so are run by temporarily removing the skip.
+    /// </summary>
+    public sealed class MicroBenchmarks
+    {
+        private const string SkipReason = "Micro-benchmark, run manually.";
+
+        private readonly ITestOutputHelper _testOutputHelper;
+
+        public MicroBenchmarks(ITestOutputHelper testOutputHelper)
+        {
+            _testOutputHelper = testOutputHelper;
+        }
+
+        [Fact(Skip = SkipReason)]
+        public void PiecewiseLinearInjectWithdrawConstraint_InventorySpaceBounds_BracketTableVersusLinearScan()
+        {
+            const int numEvaluations = 200_000;
+            const double inventoryPercentLoss = 0.001;
+            var random = new Random(8);
+            // Next period inventories which can't be reached from the current period min and max inventories, so a bracket is searched for
+            double[] nextPeriodInventories = Enumerable.Range(0, numEvaluations).Select(i => 100.0 + random.NextDouble() * 750.0).ToArray();
+
+            foreach (int numRatchets in new[] {5, 20, 40})
+            {
+                List<InjectWithdrawRangeByInventory> injectWithdrawRanges = PiecewiseLinearInjectWithdrawConstraintTest.CreateRatchets(numRatchets);
+                var linearScanConstraint = new PiecewiseLinearInjectWithdrawConstraintTest.LinearScanInjectWithdrawConstraint(injectWithdrawRanges);
+                var linearInjectWithdrawConstraint = new PiecewiseLinearInjectWithdrawConstraint(injectWithdrawRanges);
+
+                (TimeSpan linearScanTime, double[] linearScanResults) = Time(() => 
+                                InventorySpaceBounds(linearScanConstraint, nextPeriodInventories, inventoryPercentLoss));
+                (TimeSpan bracketTableTime, double[] results) = Time(() => 
+                                InventorySpaceBounds(linearInjectWithdrawConstraint, nextPeriodInventories, inventoryPercentLoss));
+
+                _testOutputHelper.WriteLine($"{numEvaluations} InventorySpaceUpperBound and InventorySpaceLowerBound evaluations with {numRatchets} ratchets, " +
+                                            $"linear scan: {linearScanTime.TotalMilliseconds:F1}ms, bracket table: {bracketTableTime.TotalMilliseconds:F1}ms");
+                Assert.Equal(linearScanResults, results);
+            }
+        }
+
+        [Fact(Skip = SkipReason)]
+        public void PiecewiseLinearInjectWithdrawConstraint_GetInjectWithdrawRange_FusedLookupVersusTwoLinearSplines()
+        {
+            const int numEvaluations = 1_000_000;
+            List<InjectWithdrawRangeByInventory> injectWithdrawRanges = PiecewiseLinearInjectWithdrawConstraintTest.CreateRatchets(40);
+            var linearScanConstraint = new PiecewiseLinearInjectWithdrawConstraintTest.LinearScanInjectWithdrawConstraint(injectWithdrawRanges);
+            var linearInjectWithdrawConstraint = new PiecewiseLinearInjectWithdrawConstraint(injectWithdrawRanges);
+            var random = new Random(8);
+            double[] inventories = Enumerable.Range(0, numEvaluations).Select(i => random.NextDouble() * 1000.0).ToArray();
+
+            (TimeSpan splineTime, double[] splineResults) = Time(() => GetInjectWithdrawRanges(linearScanConstraint, inventories));
+            (TimeSpan fusedTime, double[] results) = Time(() => GetInjectWithdrawRanges(linearInjectWithdrawConstraint, inventories));
+
+            _testOutputHelper.WriteLine($"{numEvaluations} GetInjectWithdrawRange evaluations with {injectWithdrawRanges.Count} ratchets, " +
+                                        $"two LinearSplines: {splineTime.TotalMilliseconds:F1}ms, fused lookup: {fusedTime.TotalMilliseconds:F1}ms");
+            Assert.Equal(splineResults, results);
+        }
+
+        [Theory(Skip = SkipReason)]
+        [InlineData(3)]
+        [InlineData(4)]
+        public void PolynomialInjectWithdrawConstraint_InventorySpaceBounds_ClosedFormVersusNewtonRaphsonAndPiecewiseLinear(int numRatchets)
+        {
+            const int numEvaluations = 50_000;
+            const int numDistinctInventories = 50;
+            const double inventoryPercentLoss = 0.001;
+            List<InjectWithdrawRangeByInventory> injectWithdrawRanges = PolynomialInjectWithdrawConstraintTest.CreateRatchets(numRatchets);
+            var random = new Random(8);
+            // Next period inventories which can't be reached from the current period min and max inventories, so the bounds are solved for
+            double[] uniqueInventories = Enumerable.Range(0, numEvaluations).Select(i => 150.0 + random.NextDouble() * 650.0).ToArray();
+            double[] repeatedInventories = Enumerable.Range(0, numEvaluations).Select(i => uniqueInventories[i % numDistinctInventories]).ToArray();
+
+            (TimeSpan newtonRaphsonTime, double[] newtonRaphsonResults) = Time(() => InventorySpaceBounds(
+                        new PolynomialInjectWithdrawConstraintTest.NewtonRaphsonInjectWithdrawConstraint(injectWithdrawRanges), 
+                        uniqueInventories, inventoryPercentLoss));
+            (TimeSpan closedFormTime, double[] closedFormResults) = Time(() => InventorySpaceBounds(
+                        new PolynomialInjectWithdrawConstraint(injectWithdrawRanges), uniqueInventories, inventoryPercentLoss));
+            (TimeSpan repeatedNewtonRaphsonTime, _) = Time(() => InventorySpaceBounds(
+                        new PolynomialInjectWithdrawConstraintTest.NewtonRaphsonInjectWithdrawConstraint(injectWithdrawRanges), 
+                        repeatedInventories, inventoryPercentLoss));
+            (TimeSpan repeatedClosedFormTime, _) = Time(() => InventorySpaceBounds(
+                        new PolynomialInjectWithdrawConstraint(injectWithdrawRanges), repeatedInventories, inventoryPercentLoss));
+            (TimeSpan piecewiseLinearTime, _) = Time(() => InventorySpaceBounds(
+                        new PiecewiseLinearInjectWithdrawConstraint(injectWithdrawRanges), uniqueInventories, inventoryPercentLoss));
+
+            _testOutputHelper.WriteLine($"{numEvaluations} InventorySpaceUpperBound and InventorySpaceLowerBound evaluations with {numRatchets} ratchets");
+            _testOutputHelper.WriteLine($"Distinct inputs, Newton-Raphson: {newtonRaphsonTime.TotalMilliseconds:F1}ms, " +
+                                        $"closed form: {closedFormTime.TotalMilliseconds:F1}ms, piecewise linear: {piecewiseLinearTime.TotalMilliseconds:F1}ms");
+            _testOutputHelper.WriteLine($"{numDistinctInventories} repeated inputs, Newton-Raphson: {repeatedNewtonRaphsonTime.TotalMilliseconds:F1}ms, " +
+                                        $"closed form: {repeatedClosedFormTime.TotalMilliseconds:F1}ms");
+
+            for (int i = 0; i < newtonRaphsonResults.Length; i++)
+                Assert.InRange(closedFormResults[i], newtonRaphsonResults[i] - 1E-8, newtonRaphsonResults[i] + 1E-8);
+        }
+
+        [Fact(Skip = SkipReason)]
+        public void LinearInterpolator_Interpolate_LinearInterpolatorVersusMathNetLinearSpline()
+        {
+            const int numGridPoints = 1001;
+            const int numEvaluations = 2_000_000;
+            double[] xCoords = Enumerable.Range(0, numGridPoints).Select(i => i * 10.0).ToArray();
+            double[] yCoords = xCoords.Select(x => Math.Sqrt(x) * 100.0).ToArray();
+            var random = new Random(8);
+            double[] xs = Enumerable.Range(0, numEvaluations).Select(i => random.NextDouble() * xCoords[numGridPoints - 1]).ToArray();
+
+            (TimeSpan linearSplineConstructTime, LinearSpline linearSpline) = Time(() => LinearSpline.Interpolate(xCoords, yCoords));
+            (TimeSpan linearInterpolatorConstructTime, LinearInterpolator linearInterpolator) = Time(() => new LinearInterpolator(xCoords, yCoords));
+
+            // Evaluated through delegates, as the valuation engines do
+            (TimeSpan linearSplineTime, double[] linearSplineResults) = Time(() => Evaluate(linearSpline.Interpolate, xs));
+            (TimeSpan linearInterpolatorTime, double[] linearInterpolatorResults) = Time(() => Evaluate(linearInterpolator.Interpolate, xs));
+
+            _testOutputHelper.WriteLine($"Construction with {numGridPoints} points, LinearSpline: {linearSplineConstructTime.TotalMilliseconds:F3}ms, " +
+                                        $"LinearInterpolator: {linearInterpolatorConstructTime.TotalMilliseconds:F3}ms");
+            _testOutputHelper.WriteLine($"{numEvaluations} evaluations through delegate, LinearSpline: {linearSplineTime.TotalMilliseconds:F1}ms, " +
+                                        $"LinearInterpolator: {linearInterpolatorTime.TotalMilliseconds:F1}ms");
+            Assert.Equal(linearSplineResults, linearInterpolatorResults);
+        }
+
+        private static (TimeSpan Time, TResult Result) Time<TResult>(Func<TResult> func)
+        {
+            var stopwatch = Stopwatch.StartNew();
+            TResult result = func();
+            return (stopwatch.Elapsed, result);
+        }
+
+        private static double[] InventorySpaceBounds(IInjectWithdrawConstraint injectWithdrawConstraint, 
+                                                     double[] nextPeriodInventories, double inventoryPercentLoss)
+        {
+            var results = new double[nextPeriodInventories.Length * 2];
+            for (int i = 0; i < nextPeriodInventories.Length; i++)
+            {
+                double nextPeriodInventory = nextPeriodInventories[i];
+                results[i * 2] = injectWithdrawConstraint.InventorySpaceUpperBound(nextPeriodInventory, nextPeriodInventory,
+                                            0.0, 1000.0, inventoryPercentLoss);
+                results[i * 2 + 1] = injectWithdrawConstraint.InventorySpaceLowerBound(nextPeriodInventory, nextPeriodInventory,
+                                            0.0, 1000.0, inventoryPercentLoss);
+            }
+            return results;
+        }
+
+        private static double[] Evaluate(Func<double, double> func, double[] xs)
+        {
+            var results = new double[xs.Length];
+            for (int i = 0; i < xs.Length; i++)
+                results[i] = func(xs[i]);
+            return results;
+        }
+
+        private static double[] GetInjectWithdrawRanges(IInjectWithdrawConstraint injectWithdrawConstraint, double[] inventories)
+        {
+            var results = new double[inventories.Length * 2];
+            for (int i = 0; i < inventories.Length; i++)
+            {
+                InjectWithdrawRange injectWithdrawRange = injectWithdrawConstraint.GetInjectWithdrawRange(inventories[i]);
+                results[i * 2] = injectWithdrawRange.MinInjectWithdrawRate;
+                results[i * 2 + 1] = injectWithdrawRange.MaxInjectWithdrawRate;
+            }
+            return results;
+        }
+
+    }
+}
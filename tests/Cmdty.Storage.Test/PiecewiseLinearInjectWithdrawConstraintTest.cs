@@ -23,14 +23,16 @@
 // OTHER DEALINGS IN THE SOFTWARE.
 #endregion
 
+using System;
 using System.Collections.Generic;
+using System.Linq;
+using MathNet.Numerics.Interpolation;
 using Xunit;
 
 namespace Cmdty.Storage.Test
 {
     public sealed class PiecewiseLinearInjectWithdrawConstraintTest
     {
-
         [Fact]
         public void InventorySpaceUpperBound_ConstantInjectWithdrawRate_EqualsNextPeriodInventoryPlusMaxWithdrawalRateAdjustedForLoss()
         {
@@ -202,5 +204,187 @@ public void GetInjectWithdrawRange_InventoryHalfWayBetweenPillars_EqualToMeanOfA
             Assert.Equal(maxInjectWithdrawExpected, maxInjectWithdraw);
         }
 
+        [Fact]
+        public void InventorySpaceBounds_ManyRatchets_EqualToLinearScanOverBrackets()
+        {
+            List<InjectWithdrawRangeByInventory> injectWithdrawRanges = CreateRatchets(40);
+            var linearInjectWithdrawConstraint = new PiecewiseLinearInjectWithdrawConstraint(injectWithdrawRanges);
+            var linearScanConstraint = new LinearScanInjectWithdrawConstraint(injectWithdrawRanges);
+            var random = new Random(12);
+
+            // Alternate between loss percentages so the bracket table is rebuilt
+            foreach (double inventoryPercentLoss in new[] {0.0, 0.001, 0.0, 0.03})
+            {
+                for (int i = 0; i < 1000; i++)
+                {
+                    double nextPeriodMinInventory = 100.0 + random.NextDouble() * 750.0;
+                    double nextPeriodMaxInventory = nextPeriodMinInventory + random.NextDouble() * (850.0 - nextPeriodMinInventory);
+                    double currentPeriodMinInventory = random.NextDouble() * 100.0;
+                    double currentPeriodMaxInventory = 900.0 + random.NextDouble() * 100.0;
+
+                    Assert.Equal(linearScanConstraint.InventorySpaceUpperBound(nextPeriodMinInventory, nextPeriodMaxInventory, 
+                                    currentPeriodMinInventory, currentPeriodMaxInventory, inventoryPercentLoss),
+                                linearInjectWithdrawConstraint.InventorySpaceUpperBound(nextPeriodMinInventory, nextPeriodMaxInventory,
+                                    currentPeriodMinInventory, currentPeriodMaxInventory, inventoryPercentLoss));
+                    Assert.Equal(linearScanConstraint.InventorySpaceLowerBound(nextPeriodMinInventory, nextPeriodMaxInventory,
+                                    currentPeriodMinInventory, currentPeriodMaxInventory, inventoryPercentLoss),
+                                linearInjectWithdrawConstraint.InventorySpaceLowerBound(nextPeriodMinInventory, nextPeriodMaxInventory,
+                                    currentPeriodMinInventory, currentPeriodMaxInventory, inventoryPercentLoss));
+                }
+            }
+        }
+
+        [Fact]
+        public void GetInjectWithdrawRange_ManyRatchets_EqualToTwoLinearSplines()
+        {
+            List<InjectWithdrawRangeByInventory> injectWithdrawRanges = CreateRatchets(40);
+            var linearInjectWithdrawConstraint = new PiecewiseLinearInjectWithdrawConstraint(injectWithdrawRanges);
+            var linearScanConstraint = new LinearScanInjectWithdrawConstraint(injectWithdrawRanges);
+            var random = new Random(12);
+
+            for (int i = 0; i < 1000; i++)
+            {
+                double inventory = random.NextDouble() * 1000.0;
+                InjectWithdrawRange expectedInjectWithdrawRange = linearScanConstraint.GetInjectWithdrawRange(inventory);
+                InjectWithdrawRange injectWithdrawRange = linearInjectWithdrawConstraint.GetInjectWithdrawRange(inventory);
+                Assert.Equal(expectedInjectWithdrawRange.MinInjectWithdrawRate, injectWithdrawRange.MinInjectWithdrawRate);
+                Assert.Equal(expectedInjectWithdrawRange.MaxInjectWithdrawRate, injectWithdrawRange.MaxInjectWithdrawRate);
+            }
+        }
+
+        [Fact]
+        public void InventorySpaceUpperBound_InventoryAfterWithdrawalNotIncreasing_ConsistentWithGetInjectWithdrawRange()
+        {
+            const double inventoryPercentLoss = 0.0;
+            var injectWithdrawalRanges = new List<InjectWithdrawRangeByInventory>
+            {
+                (inventory: 0.0, (minInjectWithdrawRate: 0.0, maxInjectWithdrawRate: 50.0)),
+                (inventory: 100.0, (minInjectWithdrawRate: -150.0, maxInjectWithdrawRate: 50.0)), // Inventory after withdrawal decreases
+                (inventory: 500.0, (minInjectWithdrawRate: -160.0, maxInjectWithdrawRate: 50.0)),
+                (inventory: 1000.0, (minInjectWithdrawRate: -170.0, maxInjectWithdrawRate: 50.0))
+            };
+
+            var linearInjectWithdrawConstraint = new PiecewiseLinearInjectWithdrawConstraint(injectWithdrawalRanges);
+
+            const double nextPeriodMinInventory = 0.0;
+            const double nextPeriodMaxInventory = 600.0;
+            double thisPeriodMaxInventory = linearInjectWithdrawConstraint.InventorySpaceUpperBound(nextPeriodMinInventory, 
+                                                nextPeriodMaxInventory, 0.0, 1000.0, inventoryPercentLoss);
+            double thisPeriodMaxWithdrawalRateAtInventory = linearInjectWithdrawConstraint
+                .GetInjectWithdrawRange(thisPeriodMaxInventory).MinInjectWithdrawRate;
+
+            Assert.Equal(nextPeriodMaxInventory, thisPeriodMaxInventory + thisPeriodMaxWithdrawalRateAtInventory, 12);
+        }
+
+        [Fact]
+        public void InventorySpaceUpperBound_NextPeriodInventoryNotReachable_ThrowsApplicationException()
+        {
+            var linearInjectWithdrawConstraint = new PiecewiseLinearInjectWithdrawConstraint(CreateRatchets(10));
+            Assert.Throws<ApplicationException>(() => 
+                linearInjectWithdrawConstraint.InventorySpaceUpperBound(1500.0, 2000.0, 0.0, 1000.0, 0.0));
+        }
+
+        [Fact]
+        public void InventorySpaceLowerBound_NextPeriodInventoryNotReachable_ThrowsApplicationException()
+        {
+            var linearInjectWithdrawConstraint = new PiecewiseLinearInjectWithdrawConstraint(CreateRatchets(10));
+            Assert.Throws<ApplicationException>(() =>
+                linearInjectWithdrawConstraint.InventorySpaceLowerBound(-1000.0, -500.0, 0.0, 1000.0, 0.0));
+        }
+
+        internal static List<InjectWithdrawRangeByInventory> CreateRatchets(int numRatchets)
+        {
+            return Enumerable.Range(0, numRatchets)
+                .Select(i => i * 1000.0 / (numRatchets - 1))
+                .Select(inventory => new InjectWithdrawRangeByInventory(inventory, 
+                    new InjectWithdrawRange(-45.0 - inventory * 0.01 - Math.Sin(inventory), 55.0 - inventory * 0.01 + Math.Cos(inventory))))
+                .ToList();
+        }
+
+        /// <summary>
+        /// Reference implementation which interpolates the rates with two MathNet LinearSplines and scans through all brackets,
+        /// recalculating the inventories after injection or withdrawal on each call.
+        /// </summary>
+        internal sealed class LinearScanInjectWithdrawConstraint : IInjectWithdrawConstraint
+        {
+            private readonly InjectWithdrawRangeByInventory[] _injectWithdrawRanges;
+            private readonly LinearSpline _maxInjectWithdrawLinear;
+            private readonly LinearSpline _minInjectWithdrawLinear;
+
+            public LinearScanInjectWithdrawConstraint(IEnumerable<InjectWithdrawRangeByInventory> injectWithdrawRanges)
+            {
+                _injectWithdrawRanges = injectWithdrawRanges.OrderBy(injectWithdrawRange => injectWithdrawRange.Inventory).ToArray();
+                double[] inventories = _injectWithdrawRanges.Select(injectWithdrawRange => injectWithdrawRange.Inventory).ToArray();
+                _maxInjectWithdrawLinear = LinearSpline.InterpolateSorted(inventories, _injectWithdrawRanges
+                                            .Select(injectWithdrawRange => injectWithdrawRange.InjectWithdrawRange.MaxInjectWithdrawRate).ToArray());
+                _minInjectWithdrawLinear = LinearSpline.InterpolateSorted(inventories, _injectWithdrawRanges
+                                            .Select(injectWithdrawRange => injectWithdrawRange.InjectWithdrawRange.MinInjectWithdrawRate).ToArray());
+            }
+
+            public InjectWithdrawRange GetInjectWithdrawRange(double inventory)
+            {
+                return new InjectWithdrawRange(_minInjectWithdrawLinear.Interpolate(inventory), _maxInjectWithdrawLinear.Interpolate(inventory));
+            }
+
+            public double InventorySpaceUpperBound(double nextPeriodInventorySpaceLowerBound, double nextPeriodInventorySpaceUpperBound,
+                                                double currentPeriodMinInventory, double currentPeriodMaxInventory, double inventoryPercentLoss)
+            {
+                InjectWithdrawRange injectWithdrawRange = GetInjectWithdrawRange(currentPeriodMaxInventory);
+                double nextPeriodMaxInventory = currentPeriodMaxInventory * (1 - inventoryPercentLoss) + injectWithdrawRange.MaxInjectWithdrawRate;
+                double nextPeriodMinInventory = currentPeriodMaxInventory * (1 - inventoryPercentLoss) + injectWithdrawRange.MinInjectWithdrawRate;
+                if (nextPeriodMinInventory <= nextPeriodInventorySpaceUpperBound && nextPeriodInventorySpaceLowerBound <= nextPeriodMaxInventory)
+                    return currentPeriodMaxInventory;
+
+                double bracketUpperInventory = _injectWithdrawRanges[_injectWithdrawRanges.Length - 1].Inventory;
+                double bracketUpperInventoryAfterWithdraw = nextPeriodMinInventory;
+                for (int i = _injectWithdrawRanges.Length - 2; i >= 0; i--)
+                {
+                    double bracketLowerInventory = _injectWithdrawRanges[i].Inventory;
+                    double bracketLowerInventoryAfterWithdraw = bracketLowerInventory * (1 - inventoryPercentLoss) +
+                                                                _injectWithdrawRanges[i].InjectWithdrawRange.MinInjectWithdrawRate;
+                    if (bracketLowerInventoryAfterWithdraw <= nextPeriodInventorySpaceUpperBound &&
+                        nextPeriodInventorySpaceUpperBound <= bracketUpperInventoryAfterWithdraw)
+                        return InterpolateLinearAndSolve(bracketLowerInventory, bracketLowerInventoryAfterWithdraw, bracketUpperInventory,
+                                                    bracketUpperInventoryAfterWithdraw, nextPeriodInventorySpaceUpperBound);
+                    bracketUpperInventoryAfterWithdraw = bracketLowerInventoryAfterWithdraw;
+                    bracketUpperInventory = bracketLowerInventory;
+                }
+                throw new ApplicationException("Storage inventory constraints cannot be satisfied.");
+            }
+
+            public double InventorySpaceLowerBound(double nextPeriodInventorySpaceLowerBound, double nextPeriodInventorySpaceUpperBound,
+                                                double currentPeriodMinInventory, double currentPeriodMaxInventory, double inventoryPercentLoss)
+            {
+                InjectWithdrawRange injectWithdrawRange = GetInjectWithdrawRange(currentPeriodMinInventory);
+                double nextPeriodMaxInventory = currentPeriodMinInventory * (1 - inventoryPercentLoss) + injectWithdrawRange.MaxInjectWithdrawRate;
+                double nextPeriodMinInventory = currentPeriodMinInventory * (1 - inventoryPercentLoss) + injectWithdrawRange.MinInjectWithdrawRate;
+                if (nextPeriodMinInventory <= nextPeriodInventorySpaceUpperBound && nextPeriodInventorySpaceLowerBound <= nextPeriodMaxInventory)
+                    return currentPeriodMinInventory;
+
+                double bracketLowerInventory = _injectWithdrawRanges[0].Inventory;
+                double bracketLowerInventoryAfterInject = nextPeriodMaxInventory;
+                for (int i = 1; i < _injectWithdrawRanges.Length; i++)
+                {
+                    double bracketUpperInventory = _injectWithdrawRanges[i].Inventory;
+                    double bracketUpperInventoryAfterInject = bracketUpperInventory * (1 - inventoryPercentLoss) +
+                                                              _injectWithdrawRanges[i].InjectWithdrawRange.MaxInjectWithdrawRate;
+                    if (bracketLowerInventoryAfterInject <= nextPeriodInventorySpaceLowerBound &&
+                        nextPeriodInventorySpaceLowerBound <= bracketUpperInventoryAfterInject)
+                        return InterpolateLinearAndSolve(bracketLowerInventory, bracketLowerInventoryAfterInject, bracketUpperInventory,
+                                                    bracketUpperInventoryAfterInject, nextPeriodInventorySpaceLowerBound);
+                    bracketLowerInventoryAfterInject = bracketUpperInventoryAfterInject;
+                    bracketLowerInventory = bracketUpperInventory;
+                }
+                throw new ApplicationException("Storage inventory constraints cannot be satisfied.");
+            }
+
+            private static double InterpolateLinearAndSolve(double x1, double y1, double x2, double y2, double y)
+            {
+                double gradient = (y2 - y1) / (x2 - x1);
+                double constant = y1 - gradient * x1;
+                return (y - constant) / gradient;
+            }
+        }
+
     }
 }
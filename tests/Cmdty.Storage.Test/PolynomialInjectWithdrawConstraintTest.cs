@@ -23,14 +23,17 @@
 // OTHER DEALINGS IN THE SOFTWARE.
 #endregion
 
+using System;
 using System.Collections.Generic;
+using System.Linq;
+using MathNet.Numerics;
+using MathNet.Numerics.RootFinding;
 using Xunit;
 
 namespace Cmdty.Storage.Test
 {
     public sealed class PolynomialInjectWithdrawConstraintTest
     {
-
         [Fact]
         public void InventorySpaceUpperBound_ConstantInjectWithdrawRate_EqualsNextPeriodInventoryPlusMaxWithdrawalRateAdjustedForLoss()
         {
@@ -153,6 +156,129 @@ public void InventorySpaceLowerBound_InventoryDependentInjectWithdrawRate_Consis
             Assert.Equal(nextPeriodMinInventory, derivedNextPeriodMinInventory, 12);
         }
 
+        [Theory]
+        [InlineData(3)] // Quadratic rates, solved in closed form
+        [InlineData(4)] // Cubic rates, solved in closed form
+        [InlineData(6)] // Quintic rates, solved numerically
+        public void InventorySpaceBounds_PolynomialDegrees_ConsistentWithGetInjectWithdrawRange(int numRatchets)
+        {
+            const double inventoryPercentLoss = 0.01;
+            var polynomialInjectWithdrawConstraint = new PolynomialInjectWithdrawConstraint(CreateRatchets(numRatchets));
+
+            const double nextPeriodMinInventory = 452.0;
+            const double nextPeriodMaxInventory = 734.0;
+            double thisPeriodMaxInventory = polynomialInjectWithdrawConstraint.InventorySpaceUpperBound(nextPeriodMinInventory, 
+                                                nextPeriodMaxInventory, 0.0, 1000.0, inventoryPercentLoss);
+            double thisPeriodMinInventory = polynomialInjectWithdrawConstraint.InventorySpaceLowerBound(nextPeriodMinInventory,
+                                                nextPeriodMaxInventory, 0.0, 1000.0, inventoryPercentLoss);
+
+            double derivedNextPeriodMaxInventory = thisPeriodMaxInventory * (1 - inventoryPercentLoss) + 
+                            polynomialInjectWithdrawConstraint.GetInjectWithdrawRange(thisPeriodMaxInventory).MinInjectWithdrawRate;
+            double derivedNextPeriodMinInventory = thisPeriodMinInventory * (1 - inventoryPercentLoss) +
+                            polynomialInjectWithdrawConstraint.GetInjectWithdrawRange(thisPeriodMinInventory).MaxInjectWithdrawRate;
+            Assert.Equal(nextPeriodMaxInventory, derivedNextPeriodMaxInventory, 10);
+            Assert.Equal(nextPeriodMinInventory, derivedNextPeriodMinInventory, 10);
+        }
+
+        [Fact]
+        public void InventorySpaceBounds_RepeatedInputs_EqualToFirstCall()
+        {
+            var polynomialInjectWithdrawConstraint = new PolynomialInjectWithdrawConstraint(CreateRatchets(4));
+
+            double firstUpperBound = polynomialInjectWithdrawConstraint.InventorySpaceUpperBound(452.0, 734.0, 0.0, 1000.0, 0.01);
+            double firstLowerBound = polynomialInjectWithdrawConstraint.InventorySpaceLowerBound(452.0, 734.0, 0.0, 1000.0, 0.01);
+            // Different loss, so not equal to the cached bounds
+            double otherLossUpperBound = polynomialInjectWithdrawConstraint.InventorySpaceUpperBound(452.0, 734.0, 0.0, 1000.0, 0.02);
+
+            Assert.Equal(firstUpperBound, polynomialInjectWithdrawConstraint.InventorySpaceUpperBound(452.0, 734.0, 0.0, 1000.0, 0.01));
+            Assert.Equal(firstLowerBound, polynomialInjectWithdrawConstraint.InventorySpaceLowerBound(452.0, 734.0, 0.0, 1000.0, 0.01));
+            Assert.NotEqual(firstUpperBound, otherLossUpperBound);
+        }
+
+        [Theory]
+        [InlineData(3)]
+        [InlineData(4)]
+        public void InventorySpaceBounds_ClosedForm_EqualToNewtonRaphson(int numRatchets)
+        {
+            const double inventoryPercentLoss = 0.001;
+            List<InjectWithdrawRangeByInventory> injectWithdrawRanges = CreateRatchets(numRatchets);
+            var polynomialInjectWithdrawConstraint = new PolynomialInjectWithdrawConstraint(injectWithdrawRanges);
+            var newtonRaphsonConstraint = new NewtonRaphsonInjectWithdrawConstraint(injectWithdrawRanges);
+            var random = new Random(8);
+
+            for (int i = 0; i < 1000; i++)
+            {
+                // Next period inventory which can't be reached from the current period min and max inventories, so the bounds are solved for
+                double nextPeriodInventory = 150.0 + random.NextDouble() * 650.0;
+                double expectedUpperBound = newtonRaphsonConstraint.InventorySpaceUpperBound(nextPeriodInventory, nextPeriodInventory, 
+                                                0.0, 1000.0, inventoryPercentLoss);
+                double expectedLowerBound = newtonRaphsonConstraint.InventorySpaceLowerBound(nextPeriodInventory, nextPeriodInventory,
+                                                0.0, 1000.0, inventoryPercentLoss);
+                Assert.InRange(polynomialInjectWithdrawConstraint.InventorySpaceUpperBound(nextPeriodInventory, nextPeriodInventory,
+                                    0.0, 1000.0, inventoryPercentLoss), expectedUpperBound - 1E-8, expectedUpperBound + 1E-8);
+                Assert.InRange(polynomialInjectWithdrawConstraint.InventorySpaceLowerBound(nextPeriodInventory, nextPeriodInventory,
+                                    0.0, 1000.0, inventoryPercentLoss), expectedLowerBound - 1E-8, expectedLowerBound + 1E-8);
+            }
+        }
+
+        internal static List<InjectWithdrawRangeByInventory> CreateRatchets(int numRatchets)
+        {
+            return Enumerable.Range(0, numRatchets)
+                .Select(i => i * 1000.0 / (numRatchets - 1))
+                .Select(inventory => new InjectWithdrawRangeByInventory(inventory,
+                    new InjectWithdrawRange(-45.0 - inventory * 0.01 - inventory * inventory * 1E-5, 55.0 - inventory * 0.01 + inventory * inventory * 2E-6)))
+                .ToList();
+        }
+
+        /// <summary>
+        /// Reference implementation which solves for the inventory space bounds with RobustNewtonRaphson on every call.
+        /// </summary>
+        internal sealed class NewtonRaphsonInjectWithdrawConstraint : IInjectWithdrawConstraint
+        {
+            private readonly Polynomial _maxInjectWithdrawPolynomial;
+            private readonly Polynomial _minInjectWithdrawPolynomial;
+            private readonly Polynomial _maxInjectWithdrawPolynomial1StDeriv;
+            private readonly Polynomial _minInjectWithdrawPolynomial1StDeriv;
+
+            public NewtonRaphsonInjectWithdrawConstraint(List<InjectWithdrawRangeByInventory> injectWithdrawRanges)
+            {
+                double[] inventories = injectWithdrawRanges.Select(iwi => iwi.Inventory).ToArray();
+                int polyOrder = injectWithdrawRanges.Count - 1;
+                _maxInjectWithdrawPolynomial = new Polynomial(Fit.Polynomial(inventories, 
+                                injectWithdrawRanges.Select(iwi => iwi.InjectWithdrawRange.MaxInjectWithdrawRate).ToArray(), polyOrder));
+                _maxInjectWithdrawPolynomial1StDeriv = _maxInjectWithdrawPolynomial.Differentiate();
+                _minInjectWithdrawPolynomial = new Polynomial(Fit.Polynomial(inventories, 
+                                injectWithdrawRanges.Select(iwi => iwi.InjectWithdrawRange.MinInjectWithdrawRate).ToArray(), polyOrder));
+                _minInjectWithdrawPolynomial1StDeriv = _minInjectWithdrawPolynomial.Differentiate();
+            }
+
+            public InjectWithdrawRange GetInjectWithdrawRange(double inventory)
+            {
+                return new InjectWithdrawRange(_minInjectWithdrawPolynomial.Evaluate(inventory), _maxInjectWithdrawPolynomial.Evaluate(inventory));
+            }
+
+            public double InventorySpaceUpperBound(double nextPeriodInventorySpaceLowerBound, double nextPeriodInventorySpaceUpperBound,
+                                                double currentPeriodMinInventory, double currentPeriodMaxInventory, double inventoryPercentLoss)
+            {
+                double PolyToSolve(double inventory) => inventory * (1 - inventoryPercentLoss) + _minInjectWithdrawPolynomial.Evaluate(inventory)
+                                                        - nextPeriodInventorySpaceUpperBound;
+                double PolyToSolve1StDeriv(double inventory) => (1 - inventoryPercentLoss) + _minInjectWithdrawPolynomial1StDeriv.Evaluate(inventory);
+                double thisPeriodMaxInventory = RobustNewtonRaphson.FindRoot(PolyToSolve, PolyToSolve1StDeriv, currentPeriodMinInventory,
+                                                        currentPeriodMaxInventory, 1E-10, 100, 20);
+                return Math.Min(thisPeriodMaxInventory, currentPeriodMaxInventory);
+            }
+
+            public double InventorySpaceLowerBound(double nextPeriodInventorySpaceLowerBound, double nextPeriodInventorySpaceUpperBound,
+                                                double currentPeriodMinInventory, double currentPeriodMaxInventory, double inventoryPercentLoss)
+            {
+                double PolyToSolve(double inventory) => inventory * (1 - inventoryPercentLoss) + _maxInjectWithdrawPolynomial.Evaluate(inventory)
+                                                        - nextPeriodInventorySpaceLowerBound;
+                double PolyToSolve1StDeriv(double inventory) => (1 - inventoryPercentLoss) + _maxInjectWithdrawPolynomial1StDeriv.Evaluate(inventory);
+                double thisPeriodMinInventory = RobustNewtonRaphson.FindRoot(PolyToSolve, PolyToSolve1StDeriv, currentPeriodMinInventory,
+                                                        currentPeriodMaxInventory, 1E-10, 100, 20);
+                return Math.Max(thisPeriodMinInventory, currentPeriodMinInventory);
+            }
+        }
 
         // TODO tests for being bounded by global max and min inventory
 
@@ -298,6 +298,63 @@ public void CalculateInventorySpace_CurrentPeriodBeforeStorageStartPeriod_AsExpe
             Assert.Equal(expectedInventoryUpper, inventoryRange.MaxInventory);
         }
 
+        [Fact]
+        public void CalculateInventorySpace_CalledTwiceWithSameInputs_ReturnsCachedInventorySpace()
+        {
+            CmdtyStorage<Day> storage = CreateStorageForCacheTests();
+            var currentPeriod = new Day(2019, 8, 20);
+
+            TimeSeries<Day, InventoryRange> inventorySpace1 = StorageHelper.CalculateInventorySpace(storage, 8.0, currentPeriod);
+            TimeSeries<Day, InventoryRange> inventorySpace2 = StorageHelper.CalculateInventorySpace(storage, 8.0, currentPeriod);
+
+            Assert.Same(inventorySpace1, inventorySpace2);
+            Assert.Equal(1, storage.InventorySpaceCache.Hits);
+            Assert.Equal(1, storage.InventorySpaceCache.Misses);
+        }
+
+        [Fact]
+        public void CalculateInventorySpace_DifferentStartingInventory_NotReturnedFromCache()
+        {
+            CmdtyStorage<Day> storage = CreateStorageForCacheTests();
+            var currentPeriod = new Day(2019, 8, 20);
+
+            TimeSeries<Day, InventoryRange> inventorySpace1 = StorageHelper.CalculateInventorySpace(storage, 8.0, currentPeriod);
+            TimeSeries<Day, InventoryRange> inventorySpace2 = StorageHelper.CalculateInventorySpace(storage, 9.0, currentPeriod);
+
+            Assert.NotSame(inventorySpace1, inventorySpace2);
+            Assert.NotEqual(inventorySpace1[new Day(2019, 8, 21)].MaxInventory, inventorySpace2[new Day(2019, 8, 21)].MaxInventory);
+            Assert.Equal(0, storage.InventorySpaceCache.Hits);
+            Assert.Equal(2, storage.InventorySpaceCache.Misses);
+        }
+
+        [Fact]
+        public void CalculateInventorySpace_DifferentCurrentPeriodsBeforeStorageStart_ReturnsCachedInventorySpace()
+        {
+            CmdtyStorage<Day> storage = CreateStorageForCacheTests();
+
+            TimeSeries<Day, InventoryRange> inventorySpace1 = StorageHelper.CalculateInventorySpace(storage, 8.0, new Day(2019, 7, 10));
+            TimeSeries<Day, InventoryRange> inventorySpace2 = StorageHelper.CalculateInventorySpace(storage, 8.0, new Day(2019, 7, 20));
+
+            Assert.Same(inventorySpace1, inventorySpace2);
+            Assert.Equal(1, storage.InventorySpaceCache.Hits);
+        }
+
+        private static CmdtyStorage<Day> CreateStorageForCacheTests()
+        {
+            return CmdtyStorage<Day>.Builder
+                .WithActiveTimePeriod(new Day(2019, 8, 1), new Day(2019, 8, 28))
+                .WithConstantInjectWithdrawRange(-6.0, 5.0)
+                .WithConstantMinInventory(0.0)
+                .WithConstantMaxInventory(23.5)
+                .WithPerUnitInjectionCost(1.5)
+                .WithNoCmdtyConsumedOnInject()
+                .WithPerUnitWithdrawalCost(0.8)
+                .WithNoCmdtyConsumedOnWithdraw()
+                .WithFixedPercentCmdtyInventoryLoss(0.03)
+                .WithNoInventoryCost()
+                .WithTerminalInventoryNpv((cmdtyPrice, inventory) => 0.0)
+                .Build();
+        }
 
     }
 }
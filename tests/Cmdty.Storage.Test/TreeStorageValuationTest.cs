@@ -26,6 +26,7 @@
 using System;
 using System.Collections.Generic;
 using System.Linq;
+using Cmdty.Core.Trees;
 using Cmdty.TimePeriodValueTypes;
 using Cmdty.TimeSeries;
 using MathNet.Numerics.Distributions;
@@ -753,6 +754,352 @@ public void Calculate_CurrentPeriodAfterEndPeriod_ResultsWithZeroNpvAndEmptyTime
             Assert.True(valuationResults.InventorySpace.IsEmpty);
         }
 
+        [Fact]
+        public void Calculate_WithMaxDegreeOfParallelism_ResultsIdenticalToSingleThreaded()
+        {
+            var currentDate = new Day(2019, 8, 29);
+            var storageStart = new Day(2019, 9, 1);
+            var storageEnd = new Day(2019, 12, 1);
+
+            (DoubleTimeSeries<Day> forwardCurve, DoubleTimeSeries<Day> spotVolCurve) = CreateDailyTestForwardAndSpotVolCurves(currentDate, storageEnd);
+
+            CmdtyStorage<Day> storage = CmdtyStorage<Day>.Builder
+                .WithActiveTimePeriod(storageStart, storageEnd)
+                .WithConstantInjectWithdrawRange(-800.0, 400.0)
+                .WithConstantMinInventory(0.0)
+                .WithConstantMaxInventory(20_000.0)
+                .WithPerUnitInjectionCost(1.23, injectionDate => injectionDate.Offset(10))
+                .WithFixedPercentCmdtyConsumedOnInject(0.01)
+                .WithPerUnitWithdrawalCost(0.98, withdrawalDate => withdrawalDate.Offset(4))
+                .WithFixedPercentCmdtyConsumedOnWithdraw(0.015)
+                .WithNoCmdtyInventoryLoss()
+                .WithNoInventoryCost()
+                .MustBeEmptyAtEnd()
+                .Build();
+
+            TreeStorageValuationResults<Day> Calculate(int maxDegreeOfParallelism) =>
+                TreeStorageValuation<Day>.ForStorage(storage)
+                    .WithStartingInventory(0.0)
+                    .ForCurrentPeriod(currentDate)
+                    .WithForwardCurve(forwardCurve)
+                    .WithOneFactorTrinomialTree(spotVolCurve, 12.5, 1.0 / 365.0)
+                    .WithCmdtySettlementRule(day => day)
+                    .WithAct365ContinuouslyCompoundedInterestRate(day => 0.05)
+                    .WithFixedNumberOfPointsOnGlobalInventoryRange(50)
+                    .WithLinearInventorySpaceInterpolation()
+                    .WithNumericalTolerance(1E-10)
+                    .WithMaxDegreeOfParallelism(maxDegreeOfParallelism)
+                    .Calculate();
+
+            TreeStorageValuationResults<Day> serialResults = Calculate(1);
+            TreeStorageValuationResults<Day> parallelResults = Calculate(4);
+
+            Assert.Equal(serialResults.NetPresentValue, parallelResults.NetPresentValue);
+            foreach (Day period in serialResults.StorageNpvs.Indices)
+            {
+                IReadOnlyList<IReadOnlyList<double>> serialNpvs = serialResults.StorageNpvs[period];
+                IReadOnlyList<IReadOnlyList<double>> parallelNpvs = parallelResults.StorageNpvs[period];
+                Assert.Equal(serialNpvs.Count, parallelNpvs.Count);
+                for (int i = 0; i < serialNpvs.Count; i++)
+                {
+                    Assert.Equal(serialNpvs[i], parallelNpvs[i]);
+                    Assert.Equal(serialResults.InjectWithdrawDecisions[period][i], parallelResults.InjectWithdrawDecisions[period][i]);
+                }
+            }
+        }
+
+        [Fact]
+        public void CalculateValueOnly_ResultsEqualToCalculate()
+        {
+            var currentDate = new Day(2019, 8, 29);
+            var storageStart = new Day(2019, 9, 1);
+            var storageEnd = new Day(2019, 12, 1);
+
+            (DoubleTimeSeries<Day> forwardCurve, DoubleTimeSeries<Day> spotVolCurve) = CreateDailyTestForwardAndSpotVolCurves(currentDate, storageEnd);
+
+            CmdtyStorage<Day> storage = CmdtyStorage<Day>.Builder
+                .WithActiveTimePeriod(storageStart, storageEnd)
+                .WithConstantInjectWithdrawRange(-800.0, 400.0)
+                .WithConstantMinInventory(0.0)
+                .WithConstantMaxInventory(20_000.0)
+                .WithPerUnitInjectionCost(1.23, injectionDate => injectionDate.Offset(10))
+                .WithFixedPercentCmdtyConsumedOnInject(0.01)
+                .WithPerUnitWithdrawalCost(0.98, withdrawalDate => withdrawalDate.Offset(4))
+                .WithFixedPercentCmdtyConsumedOnWithdraw(0.015)
+                .WithNoCmdtyInventoryLoss()
+                .WithNoInventoryCost()
+                .MustBeEmptyAtEnd()
+                .Build();
+
+            ITreeCalculate<Day> treeCalculate = TreeStorageValuation<Day>.ForStorage(storage)
+                    .WithStartingInventory(0.0)
+                    .ForCurrentPeriod(currentDate)
+                    .WithForwardCurve(forwardCurve)
+                    .WithOneFactorTrinomialTree(spotVolCurve, 12.5, 1.0 / 365.0)
+                    .WithCmdtySettlementRule(day => day)
+                    .WithAct365ContinuouslyCompoundedInterestRate(day => 0.05)
+                    .WithFixedNumberOfPointsOnGlobalInventoryRange(50)
+                    .WithLinearInventorySpaceInterpolation()
+                    .WithNumericalTolerance(1E-10);
+
+            TreeStorageValuationResults<Day> valuationResults = treeCalculate.Calculate();
+            TreeStorageValueOnlyResults valueOnlyResults = treeCalculate.CalculateValueOnly();
+
+            Assert.Equal(valuationResults.NetPresentValue, valueOnlyResults.NetPresentValue);
+            Assert.Equal(valuationResults.NetPresentValue, treeCalculate.CalculateNpv());
+            IReadOnlyList<IReadOnlyList<double>> firstPeriodDecisions = valuationResults.InjectWithdrawDecisions[0];
+            Assert.Equal(firstPeriodDecisions.Select(decisions => decisions[0]), valueOnlyResults.FirstPeriodInjectWithdrawDecisions);
+        }
+
+        private static CmdtyStorage<Day> CreateDecisionScheduleTestStorage(Day storageStart, Day storageEnd)
+        {
+            return CmdtyStorage<Day>.Builder
+                .WithActiveTimePeriod(storageStart, storageEnd)
+                .WithConstantInjectWithdrawRange(-800.0, 400.0)
+                .WithConstantMinInventory(0.0)
+                .WithConstantMaxInventory(20_000.0)
+                .WithPerUnitInjectionCost(1.23, injectionDate => injectionDate.Offset(10))
+                .WithFixedPercentCmdtyConsumedOnInject(0.01)
+                .WithPerUnitWithdrawalCost(0.98, withdrawalDate => withdrawalDate.Offset(4))
+                .WithFixedPercentCmdtyConsumedOnWithdraw(0.015)
+                .WithNoCmdtyInventoryLoss()
+                .WithNoInventoryCost()
+                .MustBeEmptyAtEnd()
+                .Build();
+        }
+
+        [Fact]
+        public void CalculateValueOnly_DecisionScheduleEveryPeriod_ResultsEqualToWithoutDecisionSchedule()
+        {
+            var currentDate = new Day(2019, 8, 29);
+            var storageEnd = new Day(2019, 10, 1);
+            (DoubleTimeSeries<Day> forwardCurve, DoubleTimeSeries<Day> spotVolCurve) = CreateDailyTestForwardAndSpotVolCurves(currentDate, storageEnd);
+
+            ITreeCalculate<Day> CreateTreeCalculate() => TreeStorageValuation<Day>
+                    .ForStorage(CreateDecisionScheduleTestStorage(new Day(2019, 9, 1), storageEnd))
+                    .WithStartingInventory(0.0)
+                    .ForCurrentPeriod(currentDate)
+                    .WithForwardCurve(forwardCurve)
+                    .WithOneFactorTrinomialTree(spotVolCurve, 12.5, 1.0 / 365.0)
+                    .WithCmdtySettlementRule(day => day)
+                    .WithAct365ContinuouslyCompoundedInterestRate(day => 0.05)
+                    .WithFixedNumberOfPointsOnGlobalInventoryRange(50)
+                    .WithLinearInventorySpaceInterpolation()
+                    .WithNumericalTolerance(1E-10);
+
+            TreeStorageValueOnlyResults valueOnlyResults = CreateTreeCalculate().CalculateValueOnly();
+            TreeStorageValueOnlyResults decisionScheduleResults = CreateTreeCalculate()
+                    .WithDecisionSchedule(DecisionSchedules.EveryNPeriods(currentDate, 1))
+                    .CalculateValueOnly();
+
+            double tolerance = Math.Abs(valueOnlyResults.NetPresentValue) * 1E-10;
+            Assert.InRange(decisionScheduleResults.NetPresentValue, valueOnlyResults.NetPresentValue - tolerance, 
+                                                valueOnlyResults.NetPresentValue + tolerance);
+            Assert.Equal(valueOnlyResults.FirstPeriodInjectWithdrawDecisions, decisionScheduleResults.FirstPeriodInjectWithdrawDecisions);
+        }
+
+        [Fact]
+        public void CalculateNpv_WithDecisionScheduleAndIntrinsicTree_EqualsIntrinsicValuationWithDecisionSchedule()
+        {
+            var currentDate = new Day(2019, 8, 29);
+            var storageStart = new Day(2019, 9, 1);
+            var storageEnd = new Day(2019, 10, 1);
+            (DoubleTimeSeries<Day> forwardCurve, _) = CreateDailyTestForwardAndSpotVolCurves(currentDate, storageEnd);
+            Func<Day, bool> isDecisionPeriod = DecisionSchedules.EveryNPeriods(storageStart, 7);
+
+            double treeNpv = TreeStorageValuation<Day>
+                    .ForStorage(CreateDecisionScheduleTestStorage(storageStart, storageEnd))
+                    .WithStartingInventory(0.0)
+                    .ForCurrentPeriod(currentDate)
+                    .WithForwardCurve(forwardCurve)
+                    .WithIntrinsicTree()
+                    .WithCmdtySettlementRule(day => day)
+                    .WithDiscountFactorFunc((presentDate, cashFlowDate) => 1.0)
+                    .WithFixedNumberOfPointsOnGlobalInventoryRange(50)
+                    .WithLinearInventorySpaceInterpolation()
+                    .WithNumericalTolerance(1E-10)
+                    .WithDecisionSchedule(isDecisionPeriod)
+                    .CalculateNpv();
+
+            double intrinsicNpv = IntrinsicStorageValuation<Day>
+                    .ForStorage(CreateDecisionScheduleTestStorage(storageStart, storageEnd))
+                    .WithStartingInventory(0.0)
+                    .ForCurrentPeriod(currentDate)
+                    .WithForwardCurve(forwardCurve)
+                    .WithCmdtySettlementRule(day => day)
+                    .WithDiscountFactorFunc((presentDate, cashFlowDate) => 1.0)
+                    .WithFixedNumberOfPointsOnGlobalInventoryRange(50)
+                    .WithLinearInventorySpaceInterpolation()
+                    .WithNumericalTolerance(1E-10)
+                    .WithDecisionSchedule(isDecisionPeriod)
+                    .Calculate()
+                    .NetPresentValue;
+
+            double tolerance = Math.Abs(intrinsicNpv) * 1E-10;
+            Assert.InRange(treeNpv, intrinsicNpv - tolerance, intrinsicNpv + tolerance);
+        }
+
+        [Fact]
+        public void Calculate_WithDecisionSchedule_ThrowsInvalidOperationException()
+        {
+            var currentDate = new Day(2019, 8, 29);
+            var storageEnd = new Day(2019, 10, 1);
+            (DoubleTimeSeries<Day> forwardCurve, _) = CreateDailyTestForwardAndSpotVolCurves(currentDate, storageEnd);
+
+            ITreeCalculate<Day> treeCalculate = TreeStorageValuation<Day>
+                    .ForStorage(CreateDecisionScheduleTestStorage(new Day(2019, 9, 1), storageEnd))
+                    .WithStartingInventory(0.0)
+                    .ForCurrentPeriod(currentDate)
+                    .WithForwardCurve(forwardCurve)
+                    .WithIntrinsicTree()
+                    .WithCmdtySettlementRule(day => day)
+                    .WithDiscountFactorFunc((presentDate, cashFlowDate) => 1.0)
+                    .WithFixedGridSpacing(100)
+                    .WithLinearInventorySpaceInterpolation()
+                    .WithNumericalTolerance(1E-10)
+                    .WithDecisionSchedule(DecisionSchedules.EveryNPeriods(currentDate, 7));
+
+            Assert.Throws<InvalidOperationException>(() => treeCalculate.Calculate());
+            Assert.Throws<InvalidOperationException>(() => treeCalculate.CalculateWithDecisionSimulator());
+        }
+
+        [Fact]
+        public void GetResultsArrays_EqualToValuationResultsForEachDecisionPeriod()
+        {
+            var currentDate = new Day(2019, 8, 29);
+            var storageStart = new Day(2019, 9, 1);
+            var storageEnd = new Day(2019, 10, 1);
+
+            (DoubleTimeSeries<Day> forwardCurve, DoubleTimeSeries<Day> spotVolCurve) = CreateDailyTestForwardAndSpotVolCurves(currentDate, storageEnd);
+
+            CmdtyStorage<Day> storage = CmdtyStorage<Day>.Builder
+                .WithActiveTimePeriod(storageStart, storageEnd)
+                .WithConstantInjectWithdrawRange(-800.0, 400.0)
+                .WithConstantMinInventory(0.0)
+                .WithConstantMaxInventory(10_000.0)
+                .WithPerUnitInjectionCost(1.23, injectionDate => injectionDate)
+                .WithNoCmdtyConsumedOnInject()
+                .WithPerUnitWithdrawalCost(0.98, withdrawalDate => withdrawalDate)
+                .WithNoCmdtyConsumedOnWithdraw()
+                .WithNoCmdtyInventoryLoss()
+                .WithNoInventoryCost()
+                .MustBeEmptyAtEnd()
+                .Build();
+
+            TreeStorageValuationResults<Day> valuationResults = TreeStorageValuation<Day>.ForStorage(storage)
+                    .WithStartingInventory(0.0)
+                    .ForCurrentPeriod(currentDate)
+                    .WithForwardCurve(forwardCurve)
+                    .WithOneFactorTrinomialTree(spotVolCurve, 12.5, 1.0 / 365.0)
+                    .WithCmdtySettlementRule(day => day)
+                    .WithAct365ContinuouslyCompoundedInterestRate(day => 0.05)
+                    .WithFixedNumberOfPointsOnGlobalInventoryRange(20)
+                    .WithLinearInventorySpaceInterpolation()
+                    .WithNumericalTolerance(1E-10)
+                    .Calculate();
+
+            TreeStorageValuationResultsArrays resultsArrays = valuationResults.GetResultsArrays();
+
+            Assert.Equal(valuationResults.InventorySpaceGrids.Count - 1, resultsArrays.NumPeriods);
+            int priceLevelIndex = 0;
+            int gridPointIndex = 0;
+            int nodeGridPointIndex = 0;
+            for (int i = 0; i < resultsArrays.NumPeriods; i++)
+            {
+                Day period = valuationResults.InventorySpaceGrids.Indices[i];
+                IReadOnlyList<TreeNode> treeNodes = valuationResults.Tree[period];
+                IReadOnlyList<double> inventoryGrid = valuationResults.InventorySpaceGrids[i];
+                Assert.Equal(treeNodes.Count, resultsArrays.NumPriceLevels[i]);
+                Assert.Equal(inventoryGrid.Count, resultsArrays.NumGridPoints[i]);
+                foreach (TreeNode treeNode in treeNodes)
+                {
+                    Assert.Equal(treeNode.Value, resultsArrays.TreePrices[priceLevelIndex]);
+                    Assert.Equal(treeNode.Probability, resultsArrays.TreeProbabilities[priceLevelIndex]);
+                    priceLevelIndex++;
+                }
+                foreach (double inventory in inventoryGrid)
+                    Assert.Equal(inventory, resultsArrays.InventoryGrids[gridPointIndex++]);
+                for (int j = 0; j < treeNodes.Count; j++)
+                {
+                    for (int k = 0; k < inventoryGrid.Count; k++)
+                    {
+                        Assert.Equal(valuationResults.StorageNpvs[i][j][k], resultsArrays.StorageNpvs[nodeGridPointIndex]);
+                        Assert.Equal(valuationResults.InjectWithdrawDecisions[i][j][k], resultsArrays.InjectWithdrawDecisions[nodeGridPointIndex]);
+                        nodeGridPointIndex++;
+                    }
+                }
+            }
+            Assert.Equal(resultsArrays.TreePrices.Length, priceLevelIndex);
+            Assert.Equal(resultsArrays.InventoryGrids.Length, gridPointIndex);
+            Assert.Equal(resultsArrays.StorageNpvs.Length, nodeGridPointIndex);
+        }
+
+        [Fact]
+        public void CalculateValueOnly_CurrentPeriodAfterEndPeriod_ResultsWithZeroNpvAndNoDecisions()
+        {
+            var storageStart = new Day(2019, 12, 1);
+            var storageEnd = new Day(2020, 4, 1);
+
+            CmdtyStorage<Day> storage = CmdtyStorage<Day>.Builder
+                            .WithActiveTimePeriod(storageStart, storageEnd)
+                            .WithConstantInjectWithdrawRange(-12, 43.5)
+                            .WithZeroMinInventory()
+                            .WithConstantMaxInventory(1000.0)
+                            .WithPerUnitInjectionCost(1.0, day => day)
+                            .WithNoCmdtyConsumedOnInject()
+                            .WithPerUnitWithdrawalCost(2.0, day => day)
+                            .WithNoCmdtyConsumedOnWithdraw()
+                            .WithNoCmdtyInventoryLoss()
+                            .WithNoInventoryCost()
+                            .MustBeEmptyAtEnd()
+                            .Build();
+
+            TreeStorageValueOnlyResults valueOnlyResults = TreeStorageValuation<Day>.ForStorage(storage)
+                            .WithStartingInventory(0.0)
+                            .ForCurrentPeriod(storageEnd.Offset(1))
+                            .WithForwardCurve(DoubleTimeSeries<Day>.Empty)
+                            .WithOneFactorTrinomialTree(DoubleTimeSeries<Day>.Empty, 16.5, 1.0 / 365.0)
+                            .WithCmdtySettlementRule(day => day)
+                            .WithDiscountFactorFunc((presentDate, cashFlowDate) => 1.0)
+                            .WithFixedGridSpacing(100)
+                            .WithLinearInventorySpaceInterpolation()
+                            .WithNumericalTolerance(1E-10)
+                            .CalculateValueOnly();
+
+            Assert.Equal(0.0, valueOnlyResults.NetPresentValue);
+            Assert.Empty(valueOnlyResults.FirstPeriodInjectWithdrawDecisions);
+        }
+
+        [Fact]
+        public void WithMaxDegreeOfParallelism_LessThanOne_ThrowsArgumentException()
+        {
+            ITreeCalculate<Day> treeCalculate = TreeStorageValuation<Day>.ForStorage(
+                    CmdtyStorage<Day>.Builder
+                        .WithActiveTimePeriod(new Day(2019, 9, 1), new Day(2019, 9, 30))
+                        .WithConstantInjectWithdrawRange(-800.0, 400.0)
+                        .WithConstantMinInventory(0.0)
+                        .WithConstantMaxInventory(20_000.0)
+                        .WithPerUnitInjectionCost(1.23, injectionDate => injectionDate)
+                        .WithNoCmdtyConsumedOnInject()
+                        .WithPerUnitWithdrawalCost(0.98, withdrawalDate => withdrawalDate)
+                        .WithNoCmdtyConsumedOnWithdraw()
+                        .WithNoCmdtyInventoryLoss()
+                        .WithNoInventoryCost()
+                        .MustBeEmptyAtEnd()
+                        .Build())
+                .WithStartingInventory(0.0)
+                .ForCurrentPeriod(new Day(2019, 8, 29))
+                .WithForwardCurve(TimeSeries<Day, double>.Empty)
+                .WithIntrinsicTree()
+                .WithCmdtySettlementRule(day => day)
+                .WithDiscountFactorFunc((presentDate, cashFlowDate) => 1.0)
+                .WithFixedGridSpacing(100)
+                .WithLinearInventorySpaceInterpolation()
+                .WithNumericalTolerance(1E-10);
+
+            Assert.Throws<ArgumentException>(() => treeCalculate.WithMaxDegreeOfParallelism(0));
+        }
+
 
     }
 }